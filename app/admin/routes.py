@@ -2926,6 +2926,85 @@ def data_sync_progress(sync_id):
     return jsonify(progress)
 
 
+@admin_bp.route('/data-sync/warmup/status')
+@login_required
+@admin_required
+def data_sync_warmup_status():
+    """Get progress/timing of the dashboard cache warm-up"""
+    from dashboards.preloader import get_warmup_status
+    return jsonify(get_warmup_status())
+
+
+@admin_bp.route('/data-sync/render-timings')
+@login_required
+@admin_required
+def data_sync_render_timings():
+    """Recent dashboard get_data wall times (parallel vs sequential queries)"""
+    from dashboards.config import DashboardConfig
+    from dashboards.executor import RenderTimings
+    return jsonify({
+        'parallel_enabled': DashboardConfig.PARALLEL_QUERIES_ENABLED,
+        'workers': DashboardConfig.PARALLEL_QUERY_WORKERS,
+        'dashboards': RenderTimings.summary(),
+    })
+
+
+@admin_bp.route('/data-sync/students-snapshot')
+@login_required
+@admin_required
+def data_sync_students_snapshot():
+    """In-memory students snapshot status (rows, data version, memory footprint)"""
+    from dashboards.data_providers.snapshot import snapshot_status
+    return jsonify(snapshot_status())
+
+
+@admin_bp.route('/data-sync/query-profile')
+@login_required
+@admin_required
+def data_sync_query_profile():
+    """Per-method query timings and the slow-query log (with query plans)"""
+    from dashboards.config import DashboardConfig
+    from dashboards.data_providers.profiler import QueryProfiler
+    
+    slow_only = request.args.get('slow') == '1'
+    return render_template(
+        'admin/data_sync/query_profile.html',
+        enabled=DashboardConfig.QUERY_PROFILING_ENABLED,
+        slow_query_ms=DashboardConfig.SLOW_QUERY_MS,
+        methods=QueryProfiler.summary(),
+        queries=QueryProfiler.entries(slow_only=slow_only),
+        slow_only=slow_only,
+    )
+
+
+@admin_bp.route('/data-sync/query-profile/reset', methods=['POST'])
+@login_required
+@admin_required
+def data_sync_query_profile_reset():
+    """Clear the query profile"""
+    from dashboards.data_providers.profiler import QueryProfiler
+    
+    log_action('reset_query_profile', 'dashboard_cache', None)
+    QueryProfiler.reset()
+    flash('پروفایل کوئری‌ها پاک شد', 'success')
+    return redirect(url_for('admin.data_sync_query_profile'))
+
+
+@admin_bp.route('/data-sync/warmup', methods=['POST'])
+@login_required
+@admin_required
+def data_sync_warmup():
+    """Manually start a dashboard cache warm-up"""
+    from dashboards.preloader import trigger_warmup
+    
+    log_action('trigger_dashboard_warmup', 'dashboard_cache', None)
+    if trigger_warmup('manual'):
+        flash('پیش‌گرم‌سازی کش داشبوردها شروع شد', 'success')
+    else:
+        flash('پیش‌گرم‌سازی در حال اجراست؛ یک اجرای دیگر پس از پایان آن انجام می‌شود', 'info')
+    return redirect(url_for('admin.data_sync_list'))
+
+
 @admin_bp.route('/data-sync/logs')
 @login_required
 @admin_required
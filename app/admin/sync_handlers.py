@@ -19,6 +19,61 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 FETCH_DATA_DIR = os.path.join(BASE_DIR, 'fetch_data')
 
 
+def _after_sync_success(data_source, sync_id=None, warm_caches=True):
+    """
+    Refresh dashboard-side state after a sync wrote new data
+    Failures here must never fail the sync itself
+    """
+    try:
+        from dashboards.config import DashboardConfig
+        from dashboards.data_providers.connection_pool import invalidate_pools
+        from dashboards.data_providers.filters import clear_table_cache
+        from dashboards.data_version import bump_data_version
+        invalidate_pools(DashboardConfig.FACULTY_DB)
+        clear_table_cache()
+        # New version => new cache keys for dashboards reading this source only
+        bump_data_version(data_source)
+    except Exception as e:
+        logger.warning(f"Error refreshing dashboard state after {data_source} sync: {e}", exc_info=True)
+        return
+    
+    if data_source in ('faculty', 'students') and DashboardConfig.AGGREGATES_ENABLED:
+        try:
+            # Stamped with the version just bumped; until this finishes providers read raw tables
+            from dashboards.data_providers.materialized import rebuild_aggregates
+            for result in rebuild_aggregates(sources=[data_source]):
+                if sync_id:
+                    add_sync_log(sync_id, f"جدول تجمیعی {result['name']} بازسازی شد ({result['rows']:,} سطر در {result['seconds']} ثانیه)", 'info')
+        except Exception as e:
+            logger.warning(f"Error rebuilding aggregate tables after {data_source} sync: {e}", exc_info=True)
+    
+    if data_source in ('faculty', 'students'):
+        try:
+            # Filter dropdowns; other workers reload theirs on their next request
+            from dashboards.dimensions import load_catalog
+            load_catalog()
+        except Exception as e:
+            logger.warning(f"Error reloading dimension catalog after {data_source} sync: {e}", exc_info=True)
+    
+    if data_source == 'students' and DashboardConfig.STUDENTS_SNAPSHOT_ENABLED:
+        try:
+            # Other workers reload theirs in the background on their next students request
+            from dashboards.data_providers.students import StudentsDataProvider
+            snapshot = StudentsDataProvider().load_snapshot()
+            if snapshot is not None and sync_id:
+                add_sync_log(sync_id, f"نسخه حافظه‌ای دانشجویان بارگذاری شد ({snapshot.rows:,} سطر، {snapshot.memory_bytes() / 1e6:.1f} مگابایت)", 'info')
+        except Exception as e:
+            logger.warning(f"Error loading students snapshot after sync: {e}", exc_info=True)
+    
+    if warm_caches:
+        try:
+            # Recompute common dashboard views now instead of on the first user's request
+            from dashboards.preloader import trigger_warmup
+            trigger_warmup(f"sync:{data_source}", sources=[data_source], sync_id=sync_id)
+        except Exception as e:
+            logger.warning(f"Error starting dashboard warm-up after {data_source} sync: {e}", exc_info=True)
+
+
 def run_faculty_sync(user_id=None, sync_id=None):
     """
     Run faculty data sync by executing faculty_main.py
@@ -158,6 +213,7 @@ def run_faculty_sync(user_id=None, sync_id=None):
             
             db.session.commit()
             logger.info(f"Faculty sync completed successfully: {records_count} records in {duration:.2f}s")
+            _after_sync_success('faculty', sync_id)
             
             # Clear progress after a delay
             threading.Timer(300, clear_sync_progress, args=[sync_id]).start()  # Clear after 5 minutes
@@ -379,6 +435,7 @@ def run_students_sync(user_id=None, sync_id=None):
             
             db.session.commit()
             logger.info(f"Students sync completed successfully: {records_count} records in {duration:.2f}s")
+            _after_sync_success('students', sync_id)
             
             # Clear progress after a delay
             threading.Timer(300, clear_sync_progress, args=[sync_id]).start()  # Clear after 5 minutes
@@ -609,6 +666,9 @@ def run_lms_sync(user_id=None, sync_id=None, manual_sync=False):
                         if iteration == 1:
                             add_sync_log(sync_id, f'اولین دور همگام‌سازی انجام شد: {total_records} رکورد', 'success')
                         
+                        if total_records:
+                            _after_sync_success('lms', warm_caches=False)
+                        
                         # Sleep for interval
                         time.sleep(FETCH_INTERVAL)
                         
@@ -759,6 +819,7 @@ def run_lms_sync(user_id=None, sync_id=None, manual_sync=False):
                 
                 db.session.commit()
                 logger.info(f"LMS sync completed successfully: {records_count} records in {duration:.2f}s")
+                _after_sync_success('lms', warm_caches=False)
                 
                 threading.Timer(300, clear_sync_progress, args=[sync_id]).start()
                 
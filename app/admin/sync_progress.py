@@ -15,7 +15,7 @@ logger = logging.getLogger(__name__)
 # In-memory progress tracking (for real-time updates)
 # Format: {sync_id: {'status': 'running', 'progress': 0-100, 'current_step': str, 'records_processed': int, 'total_records': int, 'logs': []}}
 _sync_progress: Dict[int, Dict] = {}
-_progress_lock = threading.Lock()
+_progress_lock = threading.RLock()  # add_sync_log re-enters via update_sync_progress
 
 
 def get_sync_progress(sync_id: int) -> Optional[Dict]:
@@ -225,23 +225,29 @@ app.register_blueprint(admin_bp)  # Admin panel
 app.register_blueprint(survey_bp)  # Survey system
 # app.register_blueprint(dashboard_bp)  # Legacy routes - DISABLED (using new architecture)
 
-# Start auto-sync scheduler
-try:
-    with app.app_context():
-        from admin.scheduler import start_scheduler
-        start_scheduler()
-        logger.info("Auto-sync scheduler initialized")
-except Exception as e:
-    logger.error(f"Failed to start auto-sync scheduler: {e}", exc_info=True)
+# Negotiated gzip/brotli for HTML and JSON responses (see DASHBOARD_COMPRESSION_*)
+from dashboards.compression import init_compression
+init_compression(app)
 
-# Start dashboard pre-loader
-try:
-    with app.app_context():
-        from dashboards.preloader import start_preloader
-        start_preloader()
-        logger.info("Dashboard pre-loader initialized")
-except Exception as e:
-    logger.warning(f"Failed to start dashboard pre-loader: {e}")
+# Start auto-sync scheduler (not in map render worker processes, which import this module as __mp_main__)
+if __name__ != "__mp_main__":
+    try:
+        with app.app_context():
+            from admin.scheduler import start_scheduler
+            start_scheduler()
+            logger.info("Auto-sync scheduler initialized")
+    except Exception as e:
+        logger.error(f"Failed to start auto-sync scheduler: {e}", exc_info=True)
+
+# Start dashboard pre-loader (not in worker processes either)
+if __name__ != "__mp_main__":
+    try:
+        with app.app_context():
+            from dashboards.preloader import start_preloader
+            start_preloader()
+            logger.info("Dashboard pre-loader initialized")
+    except Exception as e:
+        logger.warning(f"Failed to start dashboard pre-loader: {e}")
 
 # Context processor to make dashboard list available in all templates
 @app.context_processor
@@ -8,7 +8,6 @@ from dashboards_config import DASHBOARDS
 from auth_utils import requires_auth
 from flask import make_response
 from collections import defaultdict
-import geopandas as gpd
 import pandas as pd
 import numpy as np
 import matplotlib
@@ -29,6 +28,7 @@ from datetime import datetime, timedelta
 import datetime as dt
 import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from dashboards.visualizations.geometry import get_geometry_store
 
 def get_color_for_key(key: str) -> str:
     """Generate a bright color hex code based on a key string."""
@@ -339,7 +339,6 @@ def dashboard_d1():
 @dashboard_bp.route('/d2')
 @requires_auth
 def map_dashboard():
-    import geopandas as gpd
     import matplotlib.pyplot as plt
     from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
     import io
@@ -355,9 +354,7 @@ def map_dashboard():
     from mpl_toolkits.axes_grid1.inset_locator import inset_axes
 
     # Load shapefile
-    iran_gdf = gpd.read_file("data/iran_shapefile/gadm41_IRN_1.shp")[['NAME_1', 'geometry']]
-    iran_gdf['NAME_1'] = iran_gdf['NAME_1'].str.strip()
-    iran_gdf['NAME_1_normalized'] = iran_gdf['NAME_1'].str.lower()
+    iran_gdf = get_geometry_store().geodataframe()[['NAME_1', 'NAME_1_normalized', 'geometry']].copy()
 
     # Connect to DB
     DB_PATH2 = "C:\\services\\cert2\\app\\fetch_data\\faculty_data.db"
@@ -739,7 +736,6 @@ def map_dashboard():
 @dashboard_bp.route('/d3')
 @requires_auth
 def map_pardis_distribution():
-    import geopandas as gpd
     import matplotlib.pyplot as plt
     import pandas as pd
     from flask import render_template
@@ -755,9 +751,7 @@ def map_pardis_distribution():
     logger = logging.getLogger(__name__)
 
     # Load Iran shapefile
-    iran_gdf = gpd.read_file("data/iran_shapefile/gadm41_IRN_1.shp")[['NAME_1', 'geometry']]
-    iran_gdf['NAME_1'] = iran_gdf['NAME_1'].str.strip()
-    iran_gdf['NAME_1_normalized'] = iran_gdf['NAME_1'].str.lower()
+    iran_gdf = get_geometry_store().geodataframe()[['NAME_1', 'NAME_1_normalized', 'geometry']].copy()
 
     # Load province map
     conn = sqlite3.connect("C:\\services\\cert2\\app\\fetch_data\\faculty_data.db")
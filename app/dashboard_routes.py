@@ -7,6 +7,8 @@ from flask_login import current_user
 from auth_utils import requires_auth
 from dashboards.registry import DashboardRegistry
 from dashboards.context import get_user_context, UserContext
+from dashboards.map_images import send_image
+from dashboards.preloader import record_view
 from dashboards.dashboards import *  # Import all dashboards to register them
 import logging
 
@@ -15,6 +17,20 @@ logger = logging.getLogger(__name__)
 dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/dashboards")
 
 
+def _log_dashboard_view(dashboard_id: str, user_context: UserContext, filters: dict):
+    """Count a dashboard view with its effective data scope (written to the access log in batches)"""
+    try:
+        if current_user is None or not current_user.is_authenticated:
+            return
+        scope = user_context.apply_filters(filters)
+        record_view(
+            current_user.id, dashboard_id, user_context.access_level.value,
+            scope.get('province_code'), scope.get('faculty_code'),
+        )
+    except Exception as e:
+        logger.warning(f"Could not log view of dashboard {dashboard_id}: {e}")
+
+
 @dashboard_bp.route("/")
 @requires_auth
 def dashboard_list():
@@ -67,6 +83,9 @@ def show_dashboard(dashboard_id):
         if request.args.get('date_to'):
             filters['date_to'] = request.args.get('date_to')
         
+        # Record the view scope (used to pick which scopes the cache warm-up precomputes)
+        _log_dashboard_view(dashboard_id, user_context, filters)
+        
         # Handle dashboard request
         return dashboard.handle_request(user_context=user_context, filters=filters, **request.args)
         
@@ -79,6 +98,13 @@ def show_dashboard(dashboard_id):
         return render_template("error.html", error=f"خطا در نمایش داشبورد: {str(e)}"), 500
 
 
+@dashboard_bp.route("/images/<key>.png")
+@requires_auth
+def map_image(key):
+    """Rendered map image, addressed by a hash of its content"""
+    return send_image(key)
+
+
 # Register individual dashboard routes for backward compatibility
 # These routes will use the new architecture but maintain old URLs
 @dashboard_bp.route("/d1")
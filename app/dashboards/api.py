@@ -2,41 +2,69 @@
 API endpoints for dashboard filters
 Provides data for filter dropdowns
 """
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, Response, jsonify, request, session, stream_with_context
 from flask_login import login_required, current_user
-from dashboards.context import get_user_context
+from dashboards.cache import SingleFlightTimeout
+from dashboards.context import get_user_context, normalize_filters
 from dashboards.data_providers.faculty import FacultyDataProvider
-import sqlite3
+from dashboards.data_version import get_data_versions
+from dashboards.dimensions import get_catalog
+from dashboards.executor import QUERY_ERRORS_KEY
+from dashboards.http_cache import (
+    IMMUTABLE_CACHE_CONTROL, dashboard_etag, not_modified, not_modified_response, set_validators,
+)
+from dashboards.registry import DashboardRegistry
+from dashboards.serialization import encode_json, select_fields
+from dashboards.visualizations.geometry import SIMPLIFY_TOLERANCES, get_geometry_store, province_geometry_urls
+import json
 import logging
-from dashboards.config import DashboardConfig
 
 logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('dashboard_api', __name__, url_prefix='/api/dashboards')
 
+# Version of the dashboard data API (/api/dashboards/v<N>/<dashboard_id>/data)
+DATA_API_VERSION = 1
+
+def _int_arg(name):
+    """Integer query parameter, None when missing or malformed"""
+    try:
+        return int(request.args[name])
+    except (KeyError, ValueError, TypeError):
+        return None
+
+def _int_list_arg(name):
+    """Comma separated integers query parameter, None when missing or malformed"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return [int(c.strip()) for c in value.split(',') if c.strip()] or None
+    except ValueError:
+        return None
+
+def _dimension_response(key, dimension, **narrow):
+    """
+    Dimension items from the in-memory catalog, within the user's access
+    restriction; answered with 304 when the client's ETag still matches
+    """
+    context = get_user_context()
+    items, etag = get_catalog().lookup(dimension, context, **narrow)
+    response = jsonify({key: items})
+    response.set_etag(etag)
+    # Revalidate every time: a sync changes the ETag
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @api_bp.route('/provinces')
 @login_required
 def get_provinces():
     """Get list of provinces user can access"""
     try:
-        context = get_user_context()
-        
-        conn = sqlite3.connect(DashboardConfig.FACULTY_DB)
-        cursor = conn.cursor()
-        
-        query = "SELECT province_code, province_name FROM province ORDER BY province_name"
-        if context.province_code:
-            # User can only see their province
-            query += " WHERE province_code = ?"
-            cursor.execute(query, (context.province_code,))
-        else:
-            cursor.execute(query)
-        
-        provinces = [{"code": row[0], "name": row[1]} for row in cursor.fetchall()]
-        conn.close()
-        
-        return jsonify({"provinces": provinces})
+        return _dimension_response("provinces", 'provinces')
     except Exception as e:
+        logger.error(f"Error fetching provinces: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 @api_bp.route('/faculties')
@@ -44,59 +72,13 @@ def get_provinces():
 def get_faculties():
     """Get list of faculties user can access"""
     try:
-        context = get_user_context()
-        
-        conn = sqlite3.connect(DashboardConfig.FACULTY_DB)
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT DISTINCT code_markaz, markaz 
-            FROM faculty 
-            WHERE code_markaz IS NOT NULL
-        """
-        params = []
-        
-        # Support province_code from query parameter (for admin panel)
-        province_code = request.args.get('province_code')
-        if province_code:
-            try:
-                province_code = int(province_code)
-                query += " AND province_code = ?"
-                params.append(province_code)
-            except (ValueError, TypeError):
-                pass
-        elif context.province_code:
-            query += " AND province_code = ?"
-            params.append(context.province_code)
-        
-        # Support university_code from query parameter (for admin panel)
-        university_code = request.args.get('university_code')
-        if university_code:
-            try:
-                # Support comma-separated list
-                university_codes = [int(c.strip()) for c in str(university_code).split(',') if c.strip()]
-                if university_codes:
-                    placeholders = ','.join(['?'] * len(university_codes))
-                    query += f" AND university_code IN ({placeholders})"
-                    params.extend(university_codes)
-            except (ValueError, TypeError):
-                pass
-        elif context.university_code:
-            query += " AND university_code = ?"
-            params.append(context.university_code)
-        
-        if context.faculty_code:
-            # User can only see their faculty
-            query += " AND code_markaz = ?"
-            params.append(context.faculty_code)
-        
-        query += " ORDER BY markaz"
-        
-        cursor.execute(query, tuple(params))
-        faculties = [{"code": row[0], "name": row[1]} for row in cursor.fetchall()]
-        conn.close()
-        
-        return jsonify({"faculties": faculties})
+        # province_code / university_code (comma separated) narrow the list (admin panel)
+        province_code = _int_arg('province_code')
+        return _dimension_response(
+            "faculties", 'faculties',
+            province_code=[province_code] if province_code is not None else None,
+            university_code=_int_list_arg('university_code'),
+        )
     except Exception as e:
         logger.error(f"Error fetching faculties: {e}", exc_info=True)
         return jsonify({"error": str(e), "faculties": []}), 500
@@ -106,117 +88,26 @@ def get_faculties():
 def get_universities():
     """Get list of universities user can access"""
     try:
-        context = get_user_context()
-        
-        conn = sqlite3.connect(DashboardConfig.FACULTY_DB)
-        cursor = conn.cursor()
-        
-        # Support province_code from query parameter (for admin panel)
-        province_code = request.args.get('province_code')
-        
-        # First check if university table exists and has the right columns
-        cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='university'
-        """)
-        university_table_exists = cursor.fetchone()
-        
-        # Check if faculty table exists
-        cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='faculty'
-        """)
-        faculty_table_exists = cursor.fetchone()
-        
-        universities = []
-        
-        if university_table_exists:
-            # Try to get column names from university table
-            cursor.execute("PRAGMA table_info(university)")
-            columns = [col[1] for col in cursor.fetchall()]
-            
-            # Check if required columns exist
-            if 'university_code' in columns and 'university_name' in columns:
-                # Table exists with correct columns, use it
-                query = """
-                    SELECT DISTINCT university_code, university_name 
-                    FROM university 
-                    WHERE university_code IS NOT NULL
-                """
-                params = []
-                
-                if province_code:
-                    try:
-                        province_code = int(province_code)
-                        if 'province_code' in columns:
-                            query += " AND province_code = ?"
-                            params.append(province_code)
-                    except (ValueError, TypeError):
-                        pass
-                elif context.province_code and 'province_code' in columns:
-                    query += " AND province_code = ?"
-                    params.append(context.province_code)
-                
-                if context.university_code:
-                    query += " AND university_code = ?"
-                    params.append(context.university_code)
-                
-                query += " ORDER BY university_name"
-                
-                try:
-                    cursor.execute(query, tuple(params))
-                    universities = [{"code": row[0], "name": row[1]} for row in cursor.fetchall()]
-                except Exception as e:
-                    logger.warning(f"Error querying university table: {e}")
-                    universities = []
-        
-        # If university table doesn't exist or query failed, try faculty table
-        if not universities and faculty_table_exists:
-            # Try to get column names from faculty table
-            cursor.execute("PRAGMA table_info(faculty)")
-            columns = [col[1] for col in cursor.fetchall()]
-            
-            # Check if required columns exist
-            if 'university_code' in columns and 'university_name' in columns:
-                query = """
-                    SELECT DISTINCT university_code, university_name 
-                    FROM faculty 
-                    WHERE university_code IS NOT NULL
-                """
-                params = []
-                
-                if province_code:
-                    try:
-                        province_code = int(province_code)
-                        if 'province_code' in columns:
-                            query += " AND province_code = ?"
-                            params.append(province_code)
-                    except (ValueError, TypeError):
-                        pass
-                elif context.province_code and 'province_code' in columns:
-                    query += " AND province_code = ?"
-                    params.append(context.province_code)
-                
-                if context.university_code:
-                    query += " AND university_code = ?"
-                    params.append(context.university_code)
-                
-                query += " ORDER BY university_name"
-                
-                try:
-                    cursor.execute(query, tuple(params))
-                    universities = [{"code": row[0], "name": row[1]} for row in cursor.fetchall()]
-                except Exception as e:
-                    logger.warning(f"Error querying faculty table: {e}")
-                    universities = []
-        
-        conn.close()
-        
-        return jsonify({"universities": universities})
+        # province_code narrows the list (admin panel)
+        province_code = _int_arg('province_code')
+        return _dimension_response(
+            "universities", 'universities',
+            province_code=[province_code] if province_code is not None else None,
+        )
     except Exception as e:
         logger.error(f"Error fetching universities: {e}", exc_info=True)
         return jsonify({"error": str(e), "universities": []}), 500
 
+@api_bp.route('/terms')
+@login_required
+def get_terms():
+    """Get list of academic terms in the students data (newest first)"""
+    try:
+        return _dimension_response("terms", 'terms')
+    except Exception as e:
+        logger.error(f"Error fetching terms: {e}", exc_info=True)
+        return jsonify({"error": str(e), "terms": []}), 500
+
 @api_bp.route('/faculty-by-province/<int:province_code>')
 @login_required
 def get_faculty_by_province(province_code):
@@ -239,4 +130,171 @@ def get_faculty_by_province(province_code):
         logger.error(f"Error fetching faculty by province: {e}", exc_info=True)
         return jsonify({"error": str(e), "faculty": []}), 500
 
+def _faculty_list_options():
+    """sort/order/columns query parameters of the paged and streamed faculty lists"""
+    columns = request.args.get('columns')
+    return {
+        'sort': request.args.get('sort', 'name'),
+        'descending': request.args.get('order', 'asc').lower() == 'desc',
+        'columns': [c.strip() for c in columns.split(',') if c.strip()] if columns else None,
+    }
+
+@api_bp.route('/faculty-by-province/<int:province_code>/page')
+@login_required
+def get_faculty_page_by_province(province_code):
+    """
+    Keyset-paginated faculty list of a province
+    
+    Query parameters: limit, cursor (next_cursor of the previous page),
+    sort, order (asc/desc) and columns (comma separated)
+    """
+    try:
+        context = get_user_context()
+        
+        if context.province_code and context.province_code != province_code:
+            return jsonify({"error": "شما دسترسی به این استان را ندارید"}), 403
+        
+        limit = request.args.get('limit', type=int)
+        page = FacultyDataProvider().get_faculty_page(
+            province_code, context, limit=limit, cursor=request.args.get('cursor'), **_faculty_list_options()
+        )
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({"error": str(e), "faculty": []}), 400
+    except Exception as e:
+        logger.error(f"Error fetching faculty page by province: {e}", exc_info=True)
+        return jsonify({"error": str(e), "faculty": []}), 500
+
+@api_bp.route('/faculty-by-province/<int:province_code>/stream')
+@login_required
+def stream_faculty_by_province(province_code):
+    """
+    Whole faculty list of a province as NDJSON (one JSON object per line)
+    
+    Accepts the sort, order and columns parameters of the paged list; the
+    total is sent up front in X-Total-Count.
+    """
+    try:
+        context = get_user_context()
+        
+        if context.province_code and context.province_code != province_code:
+            return jsonify({"error": "شما دسترسی به این استان را ندارید"}), 403
+        
+        data_provider = FacultyDataProvider()
+        rows = data_provider.iter_faculty_list(province_code, context, **_faculty_list_options())
+        total = data_provider.count_faculty_list(province_code, context)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error streaming faculty by province: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+    
+    def generate():
+        try:
+            for row in rows:
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # Headers are already sent: end the stream with an error line
+            logger.error(f"Error streaming faculty by province: {e}", exc_info=True)
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'X-Total-Count': str(total), 'Cache-Control': 'no-store'},
+    )
+
+@api_bp.route(f'/v{DATA_API_VERSION}/<dashboard_id>/data')
+@login_required
+def get_dashboard_data(dashboard_id):
+    """
+    get_data output of a dashboard as JSON, for refreshing charts without
+    reloading the page
+    
+    Query parameters: the dashboard's filters (province_code, ...) and
+    fields (comma separated top-level data keys; default all). Data comes
+    from the dashboard cache; a matching If-None-Match gets a 304.
+    """
+    try:
+        dashboard = DashboardRegistry.get(dashboard_id)
+        if dashboard is None:
+            return jsonify({"error": "داشبورد یافت نشد"}), 404
+        
+        context = get_user_context()
+        if not dashboard.check_access(context):
+            return jsonify({"error": "شما دسترسی به این داشبورد را ندارید"}), 403
+        
+        try:
+            filters = dashboard._extract_filters_from_request(request.args.to_dict())
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"invalid filter: {e}"}), 400
+        filters = normalize_filters(context.apply_filters(filters))
+        fields = request.args.get('fields')
+        fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+        
+        data, cache_meta = dashboard.get_data_with_meta(context, filters)
+        try:
+            selected = select_fields(data, fields)
+        except KeyError as e:
+            return jsonify({"error": f"unknown fields: {e.args[0]}", "fields": sorted(data)}), 400
+        
+        # Data depends only on the scope in the cache key, not on the user
+        computed_at = cache_meta.get('computed_at')
+        etag = None
+        if computed_at:
+            cache_key = dashboard._generate_cache_key(context, filters)
+            etag = dashboard_etag(cache_key, computed_at, {'api': DATA_API_VERSION, 'fields': fields}, 0)
+            if not_modified(etag):
+                return not_modified_response(etag, computed_at)
+        
+        body = {
+            "api_version": DATA_API_VERSION,
+            "dashboard_id": dashboard_id,
+            "filters": filters,
+            "data": selected,
+            "meta": {
+                "cache": cache_meta.get('status'),
+                "age": cache_meta.get('age'),
+                "computed_at": computed_at,
+                "data_versions": get_data_versions(dashboard.data_sources),
+                "partial": bool(data.get(QUERY_ERRORS_KEY)),
+            },
+        }
+        response = Response(encode_json(body), mimetype='application/json')
+        if etag:
+            return set_validators(response, etag, computed_at)
+        response.headers['Cache-Control'] = 'private, no-store'
+        return response
+    except SingleFlightTimeout as e:
+        logger.warning(f"Timed out waiting for {dashboard_id} data: {e}")
+        return jsonify({"error": "داده‌های داشبورد در حال آماده‌سازی است، لطفاً چند لحظه دیگر دوباره تلاش کنید"}), 503
+    except Exception as e:
+        logger.error(f"Error fetching data of dashboard {dashboard_id}: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
 
+@api_bp.route(f'/v{DATA_API_VERSION}/geometry/provinces.geojson')
+@login_required
+def get_province_geometry():
+    """
+    Simplified province outlines for the interactive maps
+    
+    Query parameters: level (low, medium, high; default medium) and v (the
+    geometry version pages link to). The same for every user and apart
+    from the per-user map data, so a versioned URL is cached as immutable.
+    """
+    level = request.args.get('level', 'medium')
+    if level not in SIMPLIFY_TOLERANCES:
+        return jsonify({"error": f"unknown level: {level}", "levels": list(SIMPLIFY_TOLERANCES)}), 400
+    try:
+        store = get_geometry_store()
+        response = Response(store.geojson(level), mimetype='application/geo+json')
+        response.set_etag(f"{store.checksum[:32]}-{level}")
+        if request.args.get('v') == store.checksum[:16]:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    except Exception as e:
+        logger.error(f"Error fetching province geometry: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
@@ -3,12 +3,19 @@ Base Dashboard Class
 All dashboards should inherit from this class
 """
 from abc import ABC, abstractmethod
-from flask import render_template, make_response, request
+from flask import render_template, make_response, request, current_app, has_app_context, has_request_context
 from functools import wraps
 import logging
-from typing import Dict, Any, Optional
-from .context import UserContext, get_user_context
-from .cache import DashboardCache, cached
+import time
+from typing import Callable, Dict, Any, Optional, Tuple
+from .context import UserContext, get_user_context, normalize_filters
+from .cache import DashboardCache, SingleFlightTimeout, cached
+from .config import DashboardConfig
+from .data_version import get_data_versions
+from .executor import QUERY_ERRORS_KEY, RenderTimings, run_queries, track_query_mode
+from .http_cache import (
+    dashboard_etag, not_modified, not_modified_response, set_validators, templates_mtime, validators_skipped,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +34,12 @@ class BaseDashboard(ABC):
         self.description = description
         self.logger = logging.getLogger(f"dashboard.{dashboard_id}")
         self.cache_enabled = True
-        self.cache_ttl = 300  # 5 minutes default
+        self.cache_ttl = 300  # 5 minutes default (data is fresh for this long)
+        self.cache_hard_ttl: Optional[int] = None  # stale data served until this (default: cache_ttl + CACHE_STALE_TTL)
+        # Data sources (see data_version.DATA_SOURCES) this dashboard reads; their
+        # versions are part of the cache key so a sync invalidates exactly these entries.
+        # None means "depends on everything".
+        self.data_sources: Optional[Tuple[str, ...]] = None
     
     @abstractmethod
     def get_data(self, context: UserContext, **kwargs) -> Dict[str, Any]:
@@ -80,26 +92,23 @@ class BaseDashboard(ABC):
             # Apply user context filters
             filters = user_context.apply_filters(filters)
             
-            # Generate cache key
-            cache_key = self._generate_cache_key(user_context, filters)
+            # Fetch data (cached, coalesced across concurrent requests)
+            data, cache_meta = self.get_data_with_meta(user_context, filters)
             
-            # Try to get from cache
-            if self.cache_enabled:
-                cached_data = DashboardCache.get(cache_key)
-                if cached_data is not None:
-                    self.logger.debug(f"Cache hit for {self.dashboard_id}")
-                    return self.render(cached_data, user_context)
-            
-            # Fetch data
-            data = self.get_data(user_context, **filters)
-            
-            # Cache the data
-            if self.cache_enabled:
-                DashboardCache.set(cache_key, data, self.cache_ttl)
+            # Browser's copy is still current: skip rendering
+            validator = self.http_validator(user_context, filters, cache_meta)
+            if validator and not_modified(validator[0]):
+                return self.add_cache_meta_headers(not_modified_response(*validator), cache_meta)
             
             # Render
-            return self.render(data, user_context)
-            
+            response = self.render(dict(data, cache_meta=cache_meta), user_context)
+            if validator and getattr(response, 'status_code', None) == 200 and not validators_skipped():
+                set_validators(response, *validator)
+            return self.add_cache_meta_headers(response, cache_meta)
+        
+        except SingleFlightTimeout as e:
+            self.logger.warning(f"Timed out waiting for {self.dashboard_id} data: {e}")
+            return self.render_error("داده‌های داشبورد در حال آماده‌سازی است، لطفاً چند لحظه دیگر دوباره تلاش کنید", 503)
         except ValueError as e:
             # Authentication/authorization error
             self.logger.warning(f"Access denied for {self.dashboard_id}: {e}")
@@ -108,6 +117,129 @@ class BaseDashboard(ABC):
             self.logger.error(f"Error in dashboard {self.dashboard_id}: {e}", exc_info=True)
             return self.render_error(f"خطا در نمایش داشبورد: {str(e)}", 500)
     
+    def get_cached_data(self, user_context: UserContext, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get dashboard data from cache or compute it
+        
+        Args:
+            user_context: UserContext object
+            filters: Filters already restricted by the user context
+        
+        Returns:
+            Dashboard data dictionary
+        """
+        data, _ = self.get_data_with_meta(user_context, filters)
+        return data
+    
+    def get_data_with_meta(self, user_context: UserContext, filters: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Get dashboard data plus cache metadata
+        
+        Concurrent requests for the same cache key share a single get_data
+        call. Once data is older than cache_ttl it is still served (marked
+        stale) until cache_hard_ttl while a background refresh recomputes it.
+        
+        Args:
+            user_context: UserContext object
+            filters: Filters already restricted by the user context
+        
+        Returns:
+            (data, meta) where meta['status'] is fresh/stale/miss/bypass and
+            meta['age'] is the data age in seconds
+        """
+        # Equivalent filters (e.g. "5" vs 5) share a cache entry and run the same queries
+        filters = normalize_filters(filters)
+        
+        if not self.cache_enabled:
+            return self.timed_get_data(user_context, filters), {'status': 'bypass', 'age': 0.0, 'computed_at': None}
+        
+        # Background refreshes run outside the request; give them the app context
+        app = current_app._get_current_object() if has_app_context() else None
+        
+        def compute():
+            if app is None or has_app_context():
+                return self.timed_get_data(user_context, filters)
+            with app.app_context():
+                return self.timed_get_data(user_context, filters)
+        
+        cache_key = self._generate_cache_key(user_context, filters)
+        return DashboardCache.get_or_refresh(
+            cache_key,
+            compute,
+            soft_ttl=self.cache_ttl,
+            hard_ttl=self.effective_hard_ttl,
+            soft_ttl_for=self._fresh_period,
+        )
+    
+    def http_validator(
+        self, user_context: UserContext, filters: Dict[str, Any], cache_meta: Dict[str, Any]
+    ) -> Optional[Tuple[str, float]]:
+        """
+        (ETag, Last-Modified) of the page this request renders, or None when
+        it can't be validated (validators disabled or data not cached)
+        
+        The ETag covers everything the page is built from: data cache key
+        (scope, filters, data versions), when the data was computed, the
+        templates, and the per-user parts (user, accessible dashboards, host),
+        so one user's page never validates for another.
+        """
+        computed_at = cache_meta.get('computed_at')
+        if not DashboardConfig.HTTP_VALIDATORS_ENABLED or not computed_at or not has_request_context():
+            return None
+        from .registry import DashboardRegistry
+        template_version = templates_mtime()
+        private = {
+            'user': getattr(user_context.user, 'id', None),
+            'dashboards': [d['dashboard_id'] for d in DashboardRegistry.get_accessible_dashboards(user_context)],
+            'host': request.host,
+        }
+        cache_key = self._generate_cache_key(user_context, filters)
+        return dashboard_etag(cache_key, computed_at, private, template_version), max(computed_at, template_version)
+    
+    def timed_get_data(self, user_context: UserContext, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """get_data, recording its wall time in RenderTimings under the mode its queries ran in"""
+        start = time.perf_counter()
+        with track_query_mode() as queries:
+            try:
+                return self.get_data(user_context, **filters)
+            finally:
+                RenderTimings.record(self.dashboard_id, time.perf_counter() - start, queries.mode)
+    
+    def run_queries(
+        self,
+        queries: Dict[str, Callable[[], Any]],
+        fallbacks: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Evaluate a get_data's independent provider queries concurrently
+        
+        Args:
+            queries: Data key -> zero-argument callable producing it
+            fallbacks: Data key -> value shown when its query fails or times out
+        
+        Returns:
+            Data dictionary; failed keys hold their fallback and are listed
+            (key -> error) under data['query_errors']
+        """
+        data, errors = run_queries(queries, fallbacks)
+        if errors:
+            self.logger.warning(f"{self.dashboard_id}: {len(errors)} of {len(queries)} queries failed: {', '.join(errors)}")
+            data[QUERY_ERRORS_KEY] = errors
+        return data
+    
+    def _fresh_period(self, data: Any) -> float:
+        """Data with failed queries is recomputed after PARTIAL_DATA_TTL instead of cache_ttl"""
+        if isinstance(data, dict) and data.get(QUERY_ERRORS_KEY):
+            return DashboardConfig.PARTIAL_DATA_TTL
+        return self.cache_ttl
+    
+    @property
+    def effective_hard_ttl(self) -> int:
+        """Seconds cached data may be served at all (fresh or stale)"""
+        if self.cache_hard_ttl is not None:
+            return max(self.cache_hard_ttl, self.cache_ttl)
+        return self.cache_ttl + DashboardConfig.CACHE_STALE_TTL
+    
     def check_access(self, context: UserContext) -> bool:
         """
         Check if user has access to this dashboard
@@ -178,13 +310,18 @@ class BaseDashboard(ABC):
         return filters
     
     def _generate_cache_key(self, context: UserContext, filters: Dict[str, Any]) -> str:
-        """Generate cache key for this dashboard"""
+        """
+        Generate cache key for this dashboard
+        
+        The key is built from the context's effective data scope rather than
+        the user, so every user seeing the same data (e.g. all users of one
+        province, or admin and central org users) shares one entry.
+        """
         key_data = {
             'dashboard_id': self.dashboard_id,
-            'access_level': context.access_level.value,
-            'province_code': context.province_code,
-            'faculty_code': context.faculty_code,
-            'filters': filters
+            'scope': context.cache_scope(),
+            'filters': normalize_filters(filters),
+            'data_versions': get_data_versions(self.data_sources),
         }
         return DashboardCache.generate_key(f"dashboard:{self.dashboard_id}", **key_data)
     
@@ -203,6 +340,13 @@ class BaseDashboard(ABC):
         response.headers['Expires'] = '0'
         return response
     
+    def add_cache_meta_headers(self, response, cache_meta: Dict[str, Any]):
+        """Expose data freshness (X-Dashboard-Cache / X-Dashboard-Data-Age) on the response"""
+        if hasattr(response, 'headers'):
+            response.headers['X-Dashboard-Cache'] = cache_meta.get('status', 'miss')
+            response.headers['X-Dashboard-Data-Age'] = str(int(cache_meta.get('age') or 0))
+        return response
+    
     def get_template_context(self, data: Dict[str, Any], context: UserContext, **kwargs) -> Dict[str, Any]:
         """
         Prepare context for template rendering
@@ -1,59 +1,387 @@
 """
 Caching system for dashboards
+Bounded LRU+TTL cache with pluggable storage backends
 """
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
-from typing import Any, Callable, Optional
-from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
 import hashlib
 import json
 import logging
+import threading
+import time
+from .cache_backends import CacheBackend, create_backend
+from .config import DashboardConfig
+from .data_version import get_data_versions
 
 logger = logging.getLogger(__name__)
 
 
+class SingleFlightTimeout(TimeoutError):
+    """Raised when waiting for another caller's computation takes too long"""
+    pass
+
+
+class _Flight:
+    """One in-progress computation and the callers waiting on it"""
+    
+    __slots__ = ('done', 'result', 'error', 'waiters')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one computation
+    
+    The first caller for a key runs the function; callers arriving while it
+    runs wait (up to `timeout` seconds) and receive the same result, or the
+    same exception if the computation failed. Nothing is remembered once the
+    call finishes - storing results is the cache's job.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.stats = {'leaders': 0, 'coalesced': 0, 'timeouts': 0}
+    
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run fn for key, or wait for the call already running for key
+        
+        Args:
+            key: Coalescing key
+            fn: Zero-argument callable doing the work
+            timeout: Max seconds a follower waits (None = wait forever)
+        
+        Returns:
+            fn's result
+        
+        Raises:
+            SingleFlightTimeout: follower waited longer than timeout
+            Exception: whatever fn raised, re-raised in every caller
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.stats['leaders'] += 1
+            else:
+                flight.waiters += 1
+                self.stats['coalesced'] += 1
+        
+        if not leader:
+            if not flight.done.wait(timeout):
+                with self._lock:
+                    self.stats['timeouts'] += 1
+                raise SingleFlightTimeout(f"Timed out after {timeout}s waiting for {key}")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+    
+    def in_flight(self) -> int:
+        """Number of computations currently running"""
+        with self._lock:
+            return len(self._flights)
+
+
+class CachedPayload:
+    """
+    Cached dashboard data stamped with when it was computed
+    
+    The entry lives in the backend until the hard TTL; `soft_expires_at`
+    marks when it turns stale and should be refreshed. Wall-clock times
+    are used so shared backends agree across processes.
+    """
+    
+    __slots__ = ('data', 'computed_at', 'soft_expires_at')
+    
+    def __init__(self, data: Any, computed_at: float, soft_expires_at: float):
+        self.data = data
+        self.computed_at = computed_at
+        self.soft_expires_at = soft_expires_at
+    
+    def __getstate__(self):
+        return (self.data, self.computed_at, self.soft_expires_at)
+    
+    def __setstate__(self, state):
+        self.data, self.computed_at, self.soft_expires_at = state
+    
+    def is_fresh(self, now: float) -> bool:
+        return now < self.soft_expires_at
+    
+    def age(self, now: float) -> float:
+        return max(0.0, now - self.computed_at)
+
+
+class RefreshScheduler:
+    """
+    Runs background refreshes of stale cache entries
+    
+    At most `max_refreshes` refreshes are queued or running at once and a key
+    is never refreshed twice concurrently; requests arriving when the cap is
+    reached simply keep getting the stale value until a slot frees up.
+    """
+    
+    def __init__(self, max_refreshes: int):
+        self.max_refreshes = max(1, max_refreshes)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_refreshes)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.stats = {'scheduled': 0, 'skipped': 0, 'completed': 0, 'failed': 0}
+    
+    def schedule(self, key: str, fn: Callable[[], Any]) -> bool:
+        """Queue fn as the refresh for key, returns False if skipped"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            if not self._slots.acquire(blocking=False):
+                self.stats['skipped'] += 1
+                return False
+            self._refreshing.add(key)
+            self.stats['scheduled'] += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_refreshes,
+                    thread_name_prefix="dashboard-refresh",
+                )
+            executor = self._executor
+        executor.submit(self._run, key, fn)
+        return True
+    
+    def _run(self, key: str, fn: Callable[[], Any]):
+        outcome = 'failed'
+        try:
+            fn()
+            outcome = 'completed'
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+                self._slots.release()
+                self.stats[outcome] += 1
+    
+    def pending(self) -> int:
+        """Number of refreshes queued or running"""
+        with self._lock:
+            return len(self._refreshing)
+
+
 class DashboardCache:
-    """Simple in-memory cache for dashboard data"""
+    """
+    Cache for dashboard data
+    
+    Thin facade over a pluggable CacheBackend selected by
+    DASHBOARD_CACHE_BACKEND: `memory` (per-process LRU, default), `sqlite`
+    (local file shared by all workers, survives restarts) or `redis`.
+    """
+    
+    _backend: Optional[CacheBackend] = None
+    _backend_lock = threading.Lock()
+    _flights = SingleFlight()
+    _refresher = RefreshScheduler(DashboardConfig.CACHE_MAX_REFRESHES)
     
-    _cache: dict = {}
-    _ttl: dict = {}
+    @classmethod
+    def backend(cls) -> CacheBackend:
+        """Get the active backend, creating it on first use"""
+        if cls._backend is None:
+            with cls._backend_lock:
+                if cls._backend is None:
+                    cls._backend = create_backend()
+                    logger.info(f"Dashboard cache backend: {cls._backend.name}")
+        return cls._backend
+    
+    @classmethod
+    def set_backend(cls, backend: CacheBackend):
+        """Replace the active backend (used by tests and tooling)"""
+        with cls._backend_lock:
+            cls._backend = backend
     
     @classmethod
     def get(cls, key: str) -> Optional[Any]:
         """Get cached value if not expired"""
-        if key in cls._cache:
-            if datetime.now() < cls._ttl.get(key, datetime.min):
-                logger.debug(f"Cache hit: {key}")
-                return cls._cache[key]
-            else:
-                # Expired, remove it
-                del cls._cache[key]
-                del cls._ttl[key]
-                logger.debug(f"Cache expired: {key}")
-        return None
+        value = cls.backend().get(key)
+        if value is not None:
+            logger.debug(f"Cache hit: {key}")
+        return value
     
     @classmethod
     def set(cls, key: str, value: Any, ttl: int = 300):
         """Set cached value with TTL in seconds"""
-        cls._cache[key] = value
-        cls._ttl[key] = datetime.now() + timedelta(seconds=ttl)
+        cls.backend().set(key, value, ttl)
         logger.debug(f"Cache set: {key} (TTL: {ttl}s)")
     
+    @classmethod
+    def get_or_compute(
+        cls,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: int = 300,
+        wait_timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Get cached value, computing it at most once across concurrent callers
+        
+        On a miss only one thread per process runs `compute`; the others wait
+        for its result (bounded by wait_timeout, default
+        DASHBOARD_CACHE_WAIT_TIMEOUT) instead of recomputing. Errors from
+        `compute` are raised in every waiting caller and are not cached.
+        
+        Args:
+            key: Cache key
+            compute: Zero-argument callable producing the value
+            ttl: Time to live in seconds for the computed value
+            wait_timeout: Max seconds to wait for another caller's computation
+        
+        Returns:
+            Cached or freshly computed value
+        """
+        value = cls.get(key)
+        if value is not None:
+            return value
+        
+        def load():
+            # Another worker (shared backend) or a flight that just finished may have filled it
+            # (the miss that got us here is already counted)
+            value = cls.backend().get(key, count=False)
+            if value is None:
+                value = compute()
+                if value is not None:
+                    cls.set(key, value, ttl)
+            return value
+        
+        if wait_timeout is None:
+            wait_timeout = DashboardConfig.CACHE_WAIT_TIMEOUT
+        return cls._flights.do(key, load, timeout=wait_timeout)
+    
+    @classmethod
+    def get_or_refresh(
+        cls,
+        key: str,
+        compute: Callable[[], Any],
+        soft_ttl: float,
+        hard_ttl: float,
+        wait_timeout: Optional[float] = None,
+        soft_ttl_for: Optional[Callable[[Any], float]] = None,
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Stale-while-revalidate lookup
+        
+        - younger than soft_ttl: returned as `fresh`
+        - between soft_ttl and hard_ttl: returned immediately as `stale` and a
+          background refresh is scheduled
+        - missing or older than hard_ttl: computed in the foreground (coalesced
+          with concurrent callers) and returned as `miss`
+        
+        Args:
+            key: Cache key
+            compute: Zero-argument callable producing the value
+            soft_ttl: Seconds the value is considered fresh
+            hard_ttl: Seconds the value may be served at all
+            wait_timeout: Max seconds to wait for another caller's computation
+            soft_ttl_for: Fresh period for a computed value instead of soft_ttl
+                (e.g. shorter for partial results)
+        
+        Returns:
+            (value, meta) where meta has `status` (fresh/stale/miss),
+            `age` in seconds and `computed_at` (unix time)
+        """
+        hard_ttl = max(hard_ttl, soft_ttl)
+        
+        def load(force: bool = False) -> CachedPayload:
+            if not force:
+                # Another worker (shared backend) or a flight that just finished may have filled it
+                payload = cls.backend().get(key, count=False)
+                if isinstance(payload, CachedPayload) and payload.is_fresh(time.time()):
+                    return payload
+            data = compute()
+            computed_at = time.time()
+            fresh_for = min(soft_ttl_for(data), soft_ttl) if soft_ttl_for else soft_ttl
+            payload = CachedPayload(data, computed_at, computed_at + fresh_for)
+            if data is not None:
+                cls.set(key, payload, hard_ttl)
+            return payload
+        
+        now = time.time()
+        payload = cls.get(key)
+        if isinstance(payload, CachedPayload):
+            if payload.is_fresh(now):
+                return payload.data, cls._meta('fresh', payload, now)
+            cls._refresher.schedule(key, lambda: cls._flights.do(key, lambda: load(force=True)))
+            return payload.data, cls._meta('stale', payload, now)
+        
+        if wait_timeout is None:
+            wait_timeout = DashboardConfig.CACHE_WAIT_TIMEOUT
+        payload = cls._flights.do(key, load, timeout=wait_timeout)
+        return payload.data, cls._meta('miss', payload, time.time())
+    
+    @staticmethod
+    def _meta(status: str, payload: CachedPayload, now: float) -> Dict[str, Any]:
+        return {
+            'status': status,
+            'age': round(payload.age(now), 1),
+            'computed_at': payload.computed_at,
+        }
+    
+    @classmethod
+    def delete(cls, key: str) -> bool:
+        """Remove a single entry, returns True if it existed"""
+        return cls.backend().delete(key)
+    
     @classmethod
     def clear(cls, pattern: Optional[str] = None):
         """Clear cache entries matching pattern"""
+        count = cls.backend().clear(pattern)
         if pattern:
-            keys_to_delete = [k for k in cls._cache.keys() if pattern in k]
-            for k in keys_to_delete:
-                del cls._cache[k]
-                if k in cls._ttl:
-                    del cls._ttl[k]
-            logger.info(f"Cleared {len(keys_to_delete)} cache entries matching '{pattern}'")
+            logger.info(f"Cleared {count} cache entries matching '{pattern}'")
         else:
-            count = len(cls._cache)
-            cls._cache.clear()
-            cls._ttl.clear()
             logger.info(f"Cleared all {count} cache entries")
     
+    @classmethod
+    def purge_expired(cls) -> int:
+        """Drop every expired entry, returns number of entries removed"""
+        removed = cls.backend().purge_expired()
+        if removed:
+            logger.debug(f"Purged {removed} expired cache entries")
+        return removed
+    
+    @classmethod
+    def configure(cls, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        """Change cache budgets at runtime and evict down to them"""
+        cls.backend().configure(max_entries=max_entries, max_bytes=max_bytes)
+    
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current usage"""
+        stats = cls.backend().get_stats()
+        stats['single_flight'] = dict(cls._flights.stats, in_flight=cls._flights.in_flight())
+        stats['refresh'] = dict(cls._refresher.stats, pending=cls._refresher.pending())
+        return stats
+    
+    @classmethod
+    def reset_stats(cls):
+        """Reset hit/miss/eviction counters"""
+        cls.backend().reset_stats()
+    
     @classmethod
     def generate_key(cls, prefix: str, **kwargs) -> str:
         """Generate cache key from prefix and kwargs"""
@@ -62,20 +390,27 @@ class DashboardCache:
         return f"{prefix}:{key_hash}"
 
 
-def cached(ttl: int = 300, key_prefix: Optional[str] = None):
+def cached(ttl: int = 300, key_prefix: Optional[str] = None, sources: Optional[Iterable[str]] = None):
     """
     Decorator for caching function results
     
     Args:
         ttl: Time to live in seconds (default: 300 = 5 minutes)
         key_prefix: Optional prefix for cache key (default: function name)
+        sources: Data sources the result depends on; their current versions are
+            part of the key so syncs invalidate it (default: no versioning)
     """
+    sources = tuple(sources) if sources is not None else None
+    
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Generate cache key
             prefix = key_prefix or f"{func.__module__}.{func.__name__}"
-            cache_key = DashboardCache.generate_key(prefix, args=args, kwargs=kwargs)
+            key_data = {'args': args, 'kwargs': kwargs}
+            if sources is not None:
+                key_data['data_versions'] = get_data_versions(sources)
+            cache_key = DashboardCache.generate_key(prefix, **key_data)
             
             # Try to get from cache
             cached_value = DashboardCache.get(cache_key)
@@ -89,5 +424,3 @@ def cached(ttl: int = 300, key_prefix: Optional[str] = None):
         
         return wrapper
     return decorator
-
-
@@ -0,0 +1,580 @@
+"""
+Cache backends for dashboards
+Storage implementations behind DashboardCache: in-process memory, local SQLite file, Redis
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+import logging
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from .config import DashboardConfig
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+def serialize(value: Any) -> bytes:
+    """Serialize a dashboard payload for out-of-process storage"""
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def deserialize(data: bytes) -> Any:
+    """Inverse of serialize()"""
+    return pickle.loads(data)
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a value in bytes"""
+    try:
+        return len(serialize(value))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class CacheBackend(ABC):
+    """Base class for cache storage backends"""
+    
+    name = "base"
+    
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, int] = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'errors': 0,
+        }
+    
+    @abstractmethod
+    def get(self, key: str, count: bool = True) -> Optional[Any]:
+        """
+        Get value if present and not expired, None otherwise
+        
+        count=False leaves the hit/miss counters alone (re-checks of a key
+        whose miss was already counted)
+        """
+        pass
+    
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: int):
+        """Store value for ttl seconds"""
+        pass
+    
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Remove a single key, returns True if it existed"""
+        pass
+    
+    @abstractmethod
+    def clear(self, pattern: Optional[str] = None) -> int:
+        """Remove keys containing pattern (all keys if None), returns count"""
+        pass
+    
+    def purge_expired(self) -> int:
+        """Remove expired entries, returns count (no-op where storage expires itself)"""
+        return 0
+    
+    def configure(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        """Change size budgets (backends without local budgets ignore this)"""
+        pass
+    
+    def usage(self) -> Dict[str, Any]:
+        """Current entry count / size"""
+        return {}
+    
+    def _count(self, stat: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[stat] += n
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters plus current usage"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['backend'] = self.name
+        stats.update(self.usage())
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+    
+    def reset_stats(self):
+        """Reset counters"""
+        with self._stats_lock:
+            for k in self._stats:
+                self._stats[k] = 0
+
+
+class _CacheEntry:
+    """Cached value with its expiry time and estimated size"""
+    
+    __slots__ = ('value', 'expires_at', 'size')
+    
+    def __init__(self, value: Any, expires_at: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Per-process LRU cache with per-entry TTL
+    
+    Entries are kept in least-recently-used order and evicted when either the
+    entry budget or the memory budget is exceeded. Expired entries are dropped
+    on read and by a periodic sweep, so entries nobody reads again do not
+    linger.
+    """
+    
+    name = "memory"
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sweep_interval: Optional[int] = None,
+    ):
+        super().__init__()
+        self.max_entries = DashboardConfig.CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.max_bytes = DashboardConfig.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.sweep_interval = DashboardConfig.CACHE_SWEEP_INTERVAL if sweep_interval is None else sweep_interval
+        self._cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self._last_sweep = time.monotonic()
+    
+    def get(self, key: str, count: bool = True) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_sweep(now)
+            entry = self._cache.get(key)
+            if entry is None:
+                if count:
+                    self._count('misses')
+                return None
+            if now >= entry.expires_at:
+                # Expired, remove it
+                self._remove(key)
+                self._count('expirations')
+                if count:
+                    self._count('misses')
+                logger.debug(f"Cache expired: {key}")
+                return None
+            self._cache.move_to_end(key)
+            if count:
+                self._count('hits')
+            return entry.value
+    
+    def set(self, key: str, value: Any, ttl: int):
+        size = _estimate_size(value)
+        now = time.monotonic()
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes and size > self.max_bytes:
+                # Would evict everything else and still not fit
+                logger.warning(f"Cache value for {key} too large to cache ({size} bytes)")
+                return
+            self._cache[key] = _CacheEntry(value, now + ttl, size)
+            self._bytes += size
+            self._count('sets')
+            self._maybe_sweep(now)
+            self._evict()
+    
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._remove(key)
+    
+    def clear(self, pattern: Optional[str] = None) -> int:
+        with self._lock:
+            if pattern:
+                keys_to_delete = [k for k in self._cache.keys() if pattern in k]
+                for k in keys_to_delete:
+                    self._remove(k)
+                return len(keys_to_delete)
+            count = len(self._cache)
+            self._cache.clear()
+            self._bytes = 0
+            return count
+    
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._sweep(time.monotonic())
+    
+    def configure(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+    
+    def usage(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+    
+    def _remove(self, key: str) -> bool:
+        """Remove an entry and account for its size (lock must be held)"""
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        return True
+    
+    def _evict(self):
+        """Evict least recently used entries until within budget (lock must be held)"""
+        while self._cache and (
+            (self.max_entries and len(self._cache) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key, entry = self._cache.popitem(last=False)
+            self._bytes -= entry.size
+            self._count('evictions')
+            logger.debug(f"Cache evicted: {key}")
+    
+    def _maybe_sweep(self, now: float):
+        """Run the expiry sweep if the sweep interval has passed (lock must be held)"""
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+    
+    def _sweep(self, now: float) -> int:
+        """Remove all expired entries (lock must be held)"""
+        self._last_sweep = now
+        expired = [k for k, entry in self._cache.items() if now >= entry.expires_at]
+        for k in expired:
+            self._remove(k)
+        self._count('expirations', len(expired))
+        return len(expired)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache stored in a local SQLite file
+    
+    Shared by every worker process on the host and survives restarts without
+    needing a cache server. Values are pickled into a BLOB column; expiry uses
+    wall-clock time so entries written before a restart stay valid. The same
+    entry/byte budgets as the memory backend are enforced with LRU order kept
+    in an `accessed_at` column.
+    """
+    
+    name = "sqlite"
+    touch_interval = 1.0  # seconds between accessed_at updates for the same key
+    
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sweep_interval: Optional[int] = None,
+    ):
+        super().__init__()
+        self.db_path = str(db_path or DashboardConfig.CACHE_SQLITE_PATH)
+        self.max_entries = DashboardConfig.CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.max_bytes = DashboardConfig.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.sweep_interval = DashboardConfig.CACHE_SWEEP_INTERVAL if sweep_interval is None else sweep_interval
+        self._local = threading.local()
+        self._last_sweep = time.time()
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dashboard_cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_dashboard_cache_accessed ON dashboard_cache (accessed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_dashboard_cache_expires ON dashboard_cache (expires_at)")
+        conn.commit()
+    
+    def _conn(self) -> sqlite3.Connection:
+        """Per-thread connection (autocommit off, short busy timeout)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=DashboardConfig.DB_BUSY_TIMEOUT_MS / 1000)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def get(self, key: str, count: bool = True) -> Optional[Any]:
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM dashboard_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                if count:
+                    self._count('misses')
+                return None
+            if now >= row[1]:
+                conn.execute("DELETE FROM dashboard_cache WHERE key = ?", (key,))
+                conn.commit()
+                self._count('expirations')
+                if count:
+                    self._count('misses')
+                return None
+            if now - row[2] >= self.touch_interval:
+                # Coarse LRU touch keeps hot keys from turning every read into a write
+                conn.execute("UPDATE dashboard_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            value = deserialize(row[0])
+        except Exception as e:
+            logger.warning(f"SQLite cache read failed for {key}: {e}")
+            self._count('errors')
+            if count:
+                self._count('misses')
+            return None
+        if count:
+            self._count('hits')
+        return value
+    
+    def set(self, key: str, value: Any, ttl: int):
+        try:
+            data = serialize(value)
+        except Exception as e:
+            logger.warning(f"Cache value for {key} is not serializable: {e}")
+            self._count('errors')
+            return
+        size = len(data)
+        if self.max_bytes and size > self.max_bytes:
+            logger.warning(f"Cache value for {key} too large to cache ({size} bytes)")
+            self.delete(key)
+            return
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO dashboard_cache (key, value, expires_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(data), now + ttl, now, size),
+            )
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(conn, now)
+            self._evict(conn)
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"SQLite cache write failed for {key}: {e}")
+            self._count('errors')
+            return
+        self._count('sets')
+    
+    def delete(self, key: str) -> bool:
+        try:
+            conn = self._conn()
+            cursor = conn.execute("DELETE FROM dashboard_cache WHERE key = ?", (key,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache delete failed for {key}: {e}")
+            self._count('errors')
+            return False
+        return cursor.rowcount > 0
+    
+    def clear(self, pattern: Optional[str] = None) -> int:
+        try:
+            conn = self._conn()
+            if pattern:
+                cursor = conn.execute("DELETE FROM dashboard_cache WHERE instr(key, ?) > 0", (pattern,))
+            else:
+                cursor = conn.execute("DELETE FROM dashboard_cache")
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache clear failed: {e}")
+            self._count('errors')
+            return 0
+        return cursor.rowcount
+    
+    def purge_expired(self) -> int:
+        try:
+            conn = self._conn()
+            removed = self._sweep(conn, time.time())
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache purge failed: {e}")
+            self._count('errors')
+            return 0
+        return removed
+    
+    def configure(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        if max_entries is not None:
+            self.max_entries = max_entries
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        try:
+            conn = self._conn()
+            self._evict(conn)
+            conn.commit()
+        except sqlite3.Error as e:
+            # New limits apply from the next write
+            logger.warning(f"SQLite cache eviction after reconfigure failed: {e}")
+            self._count('errors')
+    
+    def usage(self) -> Dict[str, Any]:
+        try:
+            entries, total = self._conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM dashboard_cache"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, total = None, None
+        return {
+            'entries': entries,
+            'bytes': total,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'path': self.db_path,
+        }
+    
+    def _sweep(self, conn: sqlite3.Connection, now: float) -> int:
+        """Delete expired rows (caller commits)"""
+        self._last_sweep = now
+        removed = conn.execute("DELETE FROM dashboard_cache WHERE expires_at <= ?", (now,)).rowcount
+        self._count('expirations', removed)
+        return removed
+    
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete least recently used rows until within budget (caller commits)"""
+        if self.max_entries:
+            removed = conn.execute("""
+                DELETE FROM dashboard_cache WHERE key IN (
+                    SELECT key FROM dashboard_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,)).rowcount
+            self._count('evictions', removed)
+        if self.max_bytes:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM dashboard_cache").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                victims = []
+                for key, size in conn.execute("SELECT key, size FROM dashboard_cache ORDER BY accessed_at"):
+                    victims.append((key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                conn.executemany("DELETE FROM dashboard_cache WHERE key = ?", victims)
+                self._count('evictions', len(victims))
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache stored in Redis, shared by all workers and hosts
+    
+    Keys are namespaced with CACHE_KEY_PREFIX and expire through Redis TTLs.
+    Memory limits and eviction are left to the Redis server (maxmemory /
+    maxmemory-policy allkeys-lru). Connection errors degrade to cache misses
+    so dashboards keep rendering when Redis is down.
+    """
+    
+    name = "redis"
+    
+    def __init__(self, url: Optional[str] = None, namespace: Optional[str] = None, client: Any = None):
+        super().__init__()
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise ImportError("redis package is not installed")
+            client = redis.Redis.from_url(
+                url or DashboardConfig.CACHE_REDIS_URL,
+                socket_timeout=DashboardConfig.CACHE_REDIS_TIMEOUT,
+                socket_connect_timeout=DashboardConfig.CACHE_REDIS_TIMEOUT,
+            )
+            client.ping()
+        self.client = client
+        self.namespace = namespace if namespace is not None else DashboardConfig.CACHE_KEY_PREFIX
+    
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}{key}"
+    
+    def get(self, key: str, count: bool = True) -> Optional[Any]:
+        try:
+            data = self.client.get(self._key(key))
+            if data is None:
+                if count:
+                    self._count('misses')
+                return None
+            value = deserialize(data)
+        except Exception as e:
+            logger.warning(f"Redis cache read failed for {key}: {e}")
+            self._count('errors')
+            if count:
+                self._count('misses')
+            return None
+        if count:
+            self._count('hits')
+        return value
+    
+    def set(self, key: str, value: Any, ttl: int):
+        try:
+            self.client.set(self._key(key), serialize(value), ex=max(int(ttl), 1))
+        except Exception as e:
+            logger.warning(f"Redis cache write failed for {key}: {e}")
+            self._count('errors')
+            return
+        self._count('sets')
+    
+    def delete(self, key: str) -> bool:
+        try:
+            return bool(self.client.delete(self._key(key)))
+        except Exception as e:
+            logger.warning(f"Redis cache delete failed for {key}: {e}")
+            return False
+    
+    def clear(self, pattern: Optional[str] = None) -> int:
+        match = f"{self.namespace}*{pattern}*" if pattern else f"{self.namespace}*"
+        count = 0
+        try:
+            batch = []
+            for k in self.client.scan_iter(match=match, count=500):
+                batch.append(k)
+                if len(batch) >= 500:
+                    count += self.client.delete(*batch)
+                    batch = []
+            if batch:
+                count += self.client.delete(*batch)
+        except Exception as e:
+            logger.warning(f"Redis cache clear failed: {e}")
+        return count
+    
+    def usage(self) -> Dict[str, Any]:
+        try:
+            info = self.client.info('memory')
+            return {'used_memory': info.get('used_memory'), 'maxmemory': info.get('maxmemory')}
+        except Exception:
+            return {}
+
+
+def create_backend(name: Optional[str] = None) -> CacheBackend:
+    """
+    Build the configured cache backend
+    
+    Falls back to the in-process memory backend if the configured one cannot
+    be initialised (missing redis package, unreachable server, unwritable
+    cache file).
+    """
+    name = (name or DashboardConfig.CACHE_BACKEND).lower()
+    try:
+        if name == "redis":
+            return RedisCacheBackend()
+        if name == "sqlite":
+            return SQLiteCacheBackend()
+        if name != "memory":
+            logger.warning(f"Unknown cache backend '{name}', using memory")
+    except Exception as e:
+        logger.error(f"Could not initialise '{name}' cache backend, falling back to memory: {e}")
+    return MemoryCacheBackend()
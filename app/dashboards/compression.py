@@ -0,0 +1,183 @@
+"""
+Response Compression
+Negotiated gzip/brotli for text responses (dashboard HTML with inline map
+images, JSON APIs), with compressed bodies of identical payloads reused
+from a small in-process LRU
+"""
+import gzip
+import hashlib
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from flask import request
+from .config import DashboardConfig
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = frozenset({
+    'application/json',
+    'application/geo+json',
+    'application/javascript',
+    'application/x-ndjson',
+    'application/xml',
+    'image/svg+xml',
+})
+
+
+def _compressible(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+
+def _encodings() -> Tuple[str, ...]:
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=DashboardConfig.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=DashboardConfig.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressedCache:
+    """
+    LRU of compressed bodies keyed by encoding and a digest of the
+    uncompressed bytes, so repeated identical pages and API payloads are
+    compressed once. Bounded by total compressed size.
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple[str, bytes], bytes]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get_or_compress(self, data: bytes, encoding: str) -> bytes:
+        if self.max_bytes <= 0:
+            return compress(data, encoding)
+        key = (encoding, hashlib.blake2b(data, digest_size=16).digest())
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+            self.misses += 1
+        body = compress(data, encoding)
+        if len(body) > self.max_bytes // 4:
+            return body  # one page shouldn't flush the whole cache
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = body
+                self._size += len(body)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return body
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+compressed_cache = CompressedCache(DashboardConfig.COMPRESSION_CACHE_MB * 1024 * 1024)
+
+
+def _stream(iterable: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """
+    Compress a streamed body chunk by chunk, flushing after each one so
+    the client still receives every chunk (e.g. an NDJSON batch) as soon as
+    it is produced
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=DashboardConfig.COMPRESSION_BROTLI_QUALITY)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(DashboardConfig.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip header
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+    try:
+        for chunk in iterable:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield process(chunk) + flush()
+        yield finish()
+    finally:
+        close = getattr(iterable, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response):
+    """
+    after_request hook: compress a text response for clients that accept it
+    
+    Skipped for error/empty/304 responses, file downloads (passed through
+    unbuffered), bodies already encoded, `Cache-Control: no-transform` and
+    buffered bodies under COMPRESSION_MIN_SIZE.
+    """
+    if not DashboardConfig.COMPRESSION_ENABLED:
+        return response
+    if response.status_code < 200 or response.status_code >= 400 or response.status_code in (204, 206, 304):
+        return response
+    if request.method == 'HEAD':
+        return response
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if not _compressible(response.mimetype) or 'no-transform' in response.headers.get('Cache-Control', ''):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(_encodings())
+    if encoding is None:
+        return response
+    
+    if response.is_streamed:
+        response.response = _stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < DashboardConfig.COMPRESSION_MIN_SIZE:
+            return response
+        start = time.perf_counter()
+        body = compressed_cache.get_or_compress(data, encoding)
+        if len(body) >= len(data):
+            return response
+        response.set_data(body)
+        logger.debug(f"{request.path}: {len(data)} -> {len(body)} bytes ({encoding}, "
+                     f"{(time.perf_counter() - start) * 1000:.1f} ms)")
+    response.headers['Content-Encoding'] = encoding
+    
+    # A strong ETag names exact bytes; the encoded body is only equivalent
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Register response compression on app"""
+    app.after_request(compress_response)
+    logger.info(f"Response compression: enabled={DashboardConfig.COMPRESSION_ENABLED}, "
+                f"encodings={','.join(_encodings())}, min_size={DashboardConfig.COMPRESSION_MIN_SIZE}")
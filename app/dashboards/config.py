@@ -30,9 +30,116 @@ class DashboardConfig:
     # Cache settings
     CACHE_ENABLED = os.getenv("DASHBOARD_CACHE_ENABLED", "true").lower() == "true"
     CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "300"))
+    CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "2000"))
+    CACHE_MAX_BYTES = int(os.getenv("DASHBOARD_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    CACHE_SWEEP_INTERVAL = int(os.getenv("DASHBOARD_CACHE_SWEEP_INTERVAL", "60"))  # seconds
+    # Max seconds a request waits for another request computing the same dashboard data
+    CACHE_WAIT_TIMEOUT = float(os.getenv("DASHBOARD_CACHE_WAIT_TIMEOUT", "60"))
+    # Stale-while-revalidate: extra seconds past a dashboard's cache_ttl during which
+    # stale data is served while it is refreshed in the background
+    CACHE_STALE_TTL = int(os.getenv("DASHBOARD_CACHE_STALE_TTL", "900"))
+    CACHE_MAX_REFRESHES = int(os.getenv("DASHBOARD_CACHE_MAX_REFRESHES", "2"))
+    
+    # HTTP revalidation of dashboard pages: ETag/Last-Modified, 304 when nothing changed
+    HTTP_VALIDATORS_ENABLED = os.getenv("DASHBOARD_HTTP_VALIDATORS_ENABLED", "true").lower() == "true"
+    # Part of every ETag; bump on deploys that change rendering code (templates are tracked by mtime)
+    RENDER_VERSION = os.getenv("DASHBOARD_RENDER_VERSION", "1")
+    
+    # gzip/brotli (brotli when installed) for text responses of the whole app
+    COMPRESSION_ENABLED = os.getenv("DASHBOARD_COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("DASHBOARD_COMPRESSION_MIN_SIZE", "1024"))  # bytes
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("DASHBOARD_COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("DASHBOARD_COMPRESSION_BROTLI_QUALITY", "5"))
+    COMPRESSION_CACHE_MB = int(os.getenv("DASHBOARD_COMPRESSION_CACHE_MB", "32"))  # compressed bodies of repeated payloads
+    
+    # Cache backend: memory (per worker), sqlite (shared local file) or redis
+    CACHE_BACKEND = os.getenv("DASHBOARD_CACHE_BACKEND", "memory").lower()
+    CACHE_SQLITE_PATH = os.getenv(
+        "DASHBOARD_CACHE_SQLITE_PATH",
+        str(BASE_DIR / "cache" / "dashboard_cache.db")
+    )
+    CACHE_REDIS_URL = os.getenv(
+        "DASHBOARD_CACHE_REDIS_URL",
+        f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', '6379')}/0"
+    )
+    CACHE_REDIS_TIMEOUT = float(os.getenv("DASHBOARD_CACHE_REDIS_TIMEOUT", "2"))
+    CACHE_KEY_PREFIX = os.getenv("DASHBOARD_CACHE_KEY_PREFIX", "cfu:dashboard:")
+    
+    # Per-source data versions (bumped by syncs, part of every cache key)
+    DATA_VERSION_DB = os.getenv(
+        "DASHBOARD_DATA_VERSION_DB",
+        str(BASE_DIR / "cache" / "data_versions.db")
+    )
+    DATA_VERSION_CHECK_INTERVAL = float(os.getenv("DASHBOARD_DATA_VERSION_CHECK_INTERVAL", "2"))
+    
+    # Cache warm-up after syncs / at startup
+    PRELOAD_ENABLED = os.getenv("DASHBOARD_PRELOAD_ENABLED", "true").lower() == "true"
+    PRELOAD_ON_STARTUP = os.getenv("DASHBOARD_PRELOAD_ON_STARTUP", "true").lower() == "true"
+    PRELOAD_STARTUP_DELAY = int(os.getenv("DASHBOARD_PRELOAD_STARTUP_DELAY", "10"))  # seconds
+    PRELOAD_CONCURRENCY = int(os.getenv("DASHBOARD_PRELOAD_CONCURRENCY", "2"))
+    PRELOAD_PROVINCES = os.getenv("DASHBOARD_PRELOAD_PROVINCES", "true").lower() == "true"
+    PRELOAD_TOP_SCOPES = int(os.getenv("DASHBOARD_PRELOAD_TOP_SCOPES", "20"))
+    PRELOAD_LOG_DAYS = int(os.getenv("DASHBOARD_PRELOAD_LOG_DAYS", "7"))
+    PRELOAD_LOG_ROWS = int(os.getenv("DASHBOARD_PRELOAD_LOG_ROWS", "20000"))
+    # Dashboard views are counted in memory and written to the access log this often
+    PRELOAD_VIEW_FLUSH_INTERVAL = int(os.getenv("DASHBOARD_PRELOAD_VIEW_FLUSH_INTERVAL", "300"))  # seconds
+    PRELOAD_STATUS_JOBS = int(os.getenv("DASHBOARD_PRELOAD_STATUS_JOBS", "200"))
+    # Comma separated dashboard ids to warm; empty = every cached dashboard except real-time (LMS) ones
+    PRELOAD_DASHBOARDS = [d.strip() for d in os.getenv("DASHBOARD_PRELOAD_DASHBOARDS", "").split(",") if d.strip()]
+    
+    # Concurrent provider queries within one dashboard's get_data
+    PARALLEL_QUERIES_ENABLED = os.getenv("DASHBOARD_PARALLEL_QUERIES_ENABLED", "true").lower() == "true"
+    # Shared by all renders; with a single worker queries run sequentially
+    PARALLEL_QUERY_WORKERS = int(os.getenv("DASHBOARD_PARALLEL_QUERY_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PARALLEL_QUERY_TIMEOUT = float(os.getenv("DASHBOARD_PARALLEL_QUERY_TIMEOUT", "30"))  # seconds per query
+    PARTIAL_DATA_TTL = int(os.getenv("DASHBOARD_PARTIAL_DATA_TTL", "60"))  # seconds data with failed queries stays fresh
+    RENDER_TIMING_SAMPLES = int(os.getenv("DASHBOARD_RENDER_TIMING_SAMPLES", "200"))  # kept per dashboard and mode
+    
+    # Per-query profiling in DataProvider.execute_query (see /admin/data-sync/query-profile)
+    QUERY_PROFILING_ENABLED = os.getenv("DASHBOARD_QUERY_PROFILING_ENABLED", "false").lower() == "true"
+    SLOW_QUERY_MS = float(os.getenv("DASHBOARD_SLOW_QUERY_MS", "200"))  # slower queries get EXPLAIN QUERY PLAN
+    QUERY_LOG_SIZE = int(os.getenv("DASHBOARD_QUERY_LOG_SIZE", "500"))  # recent and slow queries kept (each)
+    
+    # Paged / streamed faculty lists (/api/dashboards/faculty-by-province/<code>/page and /stream)
+    FACULTY_PAGE_SIZE = int(os.getenv("DASHBOARD_FACULTY_PAGE_SIZE", "500"))
+    FACULTY_MAX_PAGE_SIZE = int(os.getenv("DASHBOARD_FACULTY_MAX_PAGE_SIZE", "5000"))
+    FACULTY_STREAM_BATCH = int(os.getenv("DASHBOARD_FACULTY_STREAM_BATCH", "1000"))  # rows per keyset query when streaming
+    
+    # Materialized aggregate tables in faculty_data.db (rebuilt after students/faculty syncs)
+    AGGREGATES_ENABLED = os.getenv("DASHBOARD_AGGREGATES_ENABLED", "true").lower() == "true"
+    
+    # In-process NumPy snapshot of Students for filtered group-bys (loaded after students syncs)
+    STUDENTS_SNAPSHOT_ENABLED = os.getenv("DASHBOARD_STUDENTS_SNAPSHOT_ENABLED", "false").lower() == "true"
+    STUDENTS_SNAPSHOT_MAX_MB = int(os.getenv("DASHBOARD_STUDENTS_SNAPSHOT_MAX_MB", "512"))  # 0 = no limit
+    
+    # SQLite connection pool settings (read-only connections for data providers)
+    DB_POOL_ENABLED = os.getenv("DASHBOARD_DB_POOL_ENABLED", "true").lower() == "true"
+    DB_POOL_WAL = os.getenv("DASHBOARD_DB_POOL_WAL", "true").lower() == "true"
+    DB_POOL_MAX_AGE = int(os.getenv("DASHBOARD_DB_POOL_MAX_AGE", "600"))  # seconds
+    DB_POOL_MAX_USES = int(os.getenv("DASHBOARD_DB_POOL_MAX_USES", "10000"))
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DASHBOARD_DB_BUSY_TIMEOUT_MS", "5000"))
+    DB_MMAP_SIZE = int(os.getenv("DASHBOARD_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+    DB_CACHE_SIZE_KB = int(os.getenv("DASHBOARD_DB_CACHE_SIZE_KB", str(64 * 1024)))
     
     # Shapefile path
     IRAN_SHAPEFILE = BASE_DIR / "data" / "iran_shapefile" / "gadm41_IRN_1.shp"
+    # Preprocessed province geometry (rebuilt when the shapefile or province table changes)
+    GEOMETRY_CACHE_PATH = os.getenv("DASHBOARD_GEOMETRY_CACHE_PATH", str(BASE_DIR / "cache" / "province_geometry.pkl"))
+    # Province pie maps drawn as one patch collection instead of an inset axes per province
+    MAP_BATCH_RENDER = os.getenv("DASHBOARD_MAP_BATCH_RENDER", "true").lower() == "true"
+    # Rendered map PNGs stored by content hash and served from /dashboards/images/<key>.png
+    MAP_IMAGE_CACHE_ENABLED = os.getenv("DASHBOARD_MAP_IMAGE_CACHE_ENABLED", "true").lower() == "true"
+    MAP_IMAGE_DIR = os.getenv("DASHBOARD_MAP_IMAGE_DIR", str(BASE_DIR / "cache" / "map_images"))
+    MAP_IMAGE_MAX_AGE_DAYS = float(os.getenv("DASHBOARD_MAP_IMAGE_MAX_AGE_DAYS", "7"))  # since last use
+    MAP_IMAGE_MAX_MB = int(os.getenv("DASHBOARD_MAP_IMAGE_MAX_MB", "200"))
+    MAP_IMAGE_GC_INTERVAL = int(os.getenv("DASHBOARD_MAP_IMAGE_GC_INTERVAL", "600"))  # seconds
+    # Map rendering in a pool of worker processes (off the request threads)
+    RENDER_POOL_ENABLED = os.getenv("DASHBOARD_RENDER_POOL_ENABLED", "true").lower() == "true"
+    RENDER_POOL_WORKERS = int(os.getenv("DASHBOARD_RENDER_POOL_WORKERS", "2"))
+    RENDER_QUEUE_MAX = int(os.getenv("DASHBOARD_RENDER_QUEUE_MAX", "16"))  # distinct jobs in flight
+    RENDER_WAIT_SECONDS = float(os.getenv("DASHBOARD_RENDER_WAIT_SECONDS", "20"))  # then serve a placeholder
+    RENDER_TIMEOUT = int(os.getenv("DASHBOARD_RENDER_TIMEOUT", "180"))  # seconds before a job is abandoned
+    RENDER_MAX_TASKS_PER_WORKER = int(os.getenv("DASHBOARD_RENDER_MAX_TASKS_PER_WORKER", "200"))
     
     # Province mappings
     _province_mappings = None
@@ -39,6 +39,29 @@ class UserContext:
         # Data access filters
         self.data_filters = self._build_data_filters()
     
+    @classmethod
+    def for_scope(
+        cls,
+        access_level: AccessLevel,
+        province_code: Optional[int] = None,
+        university_code: Optional[int] = None,
+        faculty_code: Optional[int] = None,
+    ) -> "UserContext":
+        """
+        Build a context for an organizational scope without a logged-in user
+        Used by background jobs (cache warm-up) that compute dashboards on nobody's behalf
+        """
+        context = cls.__new__(cls)
+        context.user = None
+        context.user_info = {}
+        context.logger = logging.getLogger("context.system")
+        context.province_code = province_code
+        context.university_code = university_code
+        context.faculty_code = faculty_code
+        context.access_level = access_level
+        context.data_filters = context._build_data_filters()
+        return context
+    
     def _get_province_code(self) -> Optional[int]:
         """Get user's province code from user model or session"""
         # Check if user model has province_code field
@@ -191,6 +214,26 @@ class UserContext:
         
         return []
     
+    def cache_scope(self) -> Dict[str, Any]:
+        """
+        Canonical data scope of this context, for cache keys
+        
+        Only what restricts the data is included (see _build_data_filters), not
+        who the user is: admin and central org users both see everything, and
+        codes the access level ignores (e.g. a central user's own province) are
+        dropped. Contexts with different restrictions always differ here.
+        """
+        if self.access_level in (AccessLevel.CENTRAL_ORG, AccessLevel.ADMIN):
+            return {'scope': 'national'}
+        
+        scope = 'faculty' if self.access_level == AccessLevel.FACULTY else 'province'
+        result = {'scope': scope}
+        for field in ('province_code', 'university_code', 'faculty_code'):
+            value = _normalize_code(self.data_filters.get(field))
+            if value is not None:
+                result[field] = value
+        return result
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert context to dictionary for template rendering"""
         return {
@@ -204,6 +247,62 @@ class UserContext:
         }
 
 
+# Filters holding a single organizational code / a list of codes
+CODE_FILTERS = ('province_code', 'university_code', 'faculty_code')
+CODE_LIST_FILTERS = ('province_codes', 'university_codes', 'faculty_codes')
+DATE_FILTERS = ('date_from', 'date_to')
+
+
+def _normalize_code(value: Any) -> Any:
+    """Codes arrive as int or str ("05", " 5"); compare them as ints"""
+    if value is None or value == '':
+        return None
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return value
+
+
+def _normalize_date(value: Any) -> Any:
+    """Zero-pad date parts (1402/1/5 -> 1402/01/05), keeping the separator"""
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    for separator in ('/', '-'):
+        parts = value.split(separator)
+        if len(parts) == 3 and all(part.isdigit() for part in parts):
+            return separator.join([parts[0].zfill(4), parts[1].zfill(2), parts[2].zfill(2)])
+    return value
+
+
+def normalize_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Canonical form of dashboard query filters
+    
+    Equivalent requests map to the same dict: empty values are dropped,
+    codes become ints, code lists are sorted and de-duplicated and dates
+    are zero-padded. The result is what dashboards should query with, so
+    requests sharing a cache entry also run the exact same queries.
+    """
+    result = {}
+    for key, value in filters.items():
+        if value is None or value == '' or value == []:
+            continue
+        if key in CODE_FILTERS:
+            value = _normalize_code(value)
+        elif key in CODE_LIST_FILTERS and isinstance(value, (list, tuple, set)):
+            codes = {_normalize_code(v) for v in value} - {None}
+            value = sorted(codes, key=lambda v: (isinstance(v, str), v))
+            if not value:
+                continue
+        elif key in DATE_FILTERS:
+            value = _normalize_date(value)
+        elif isinstance(value, str):
+            value = value.strip()
+        result[key] = value
+    return result
+
+
 def get_user_context(user: Optional[User] = None) -> UserContext:
     """Get user context from current session"""
     from flask_login import current_user
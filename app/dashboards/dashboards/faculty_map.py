@@ -4,13 +4,14 @@ Shows faculty distribution by province on a map
 """
 from ..base import BaseDashboard
 from ..data_providers.faculty import FacultyDataProvider
-from ..visualizations.maps import MapBuilder
+from ..visualizations.geometry import province_geometry_urls
+from ..visualizations.maps import MapBuilder, render_map_png
 from ..registry import DashboardRegistry
 from ..context import UserContext
+from ..map_images import map_image
 from flask import render_template, make_response
 from typing import Dict, Any
 from collections import defaultdict
-import base64
 
 
 def persian_sort_key(text: str) -> list:
@@ -78,7 +79,8 @@ class FacultyMapDashboard(BaseDashboard):
         )
         self.data_provider = FacultyDataProvider()
         self.map_builder = MapBuilder()
-        self.cache_ttl = 600  # 10 minutes
+        self.cache_ttl = 3600  # 1 hour - invalidated by faculty syncs via data versions
+        self.data_sources = ('faculty',)
     
     def get_data(self, context: UserContext, **kwargs) -> Dict[str, Any]:
         """Fetch faculty data by province with context filtering"""
@@ -146,21 +148,21 @@ class FacultyMapDashboard(BaseDashboard):
         }
     
     def render(self, data: Dict[str, Any], context: UserContext):
-        """Render map template with base64 encoded image"""
+        """Render map template with the map image (cached on disk by content)"""
         province_data = data['province_data']
         
-        # Create map with pie charts
-        img_bytesio = self.map_builder.create_province_map_with_pie_charts(
-            province_data=province_data,
-            title="توزیع اعضای هیات علمی به تفکیک جنسیت در هر استان",
-            colors=['#36A2EB', '#FF6384'],
-            legend_labels=['مرد', 'زن']
+        # Create map with pie charts (only when this data/style wasn't drawn before)
+        style = {
+            'title': "توزیع اعضای هیات علمی به تفکیک جنسیت در هر استان",
+            'colors': ['#36A2EB', '#FF6384'],
+            'legend_labels': ['مرد', 'زن'],
+        }
+        image = map_image(
+            self.dashboard_id,
+            {'province_data': province_data, 'geometry': self.map_builder.geometry.checksum, **style},
+            render_map_png, 'create_province_map_with_pie_charts', province_data=province_data, **style,
         )
         
-        # Convert to base64
-        img_bytesio.seek(0)
-        encoded_img = base64.b64encode(img_bytesio.read()).decode('utf-8')
-        
         # Get province coordinates for tooltip detection
         # We'll use centroid coordinates from shapefile
         province_coords = self.map_builder.get_province_centroids()
@@ -181,7 +183,13 @@ class FacultyMapDashboard(BaseDashboard):
         # Prepare template context
         template_context = self.get_template_context(data, context)
         template_context.update({
-            "image_data": encoded_img,
+            **image,
+            "vector_map": {
+                "geometry_urls": province_geometry_urls(),
+                **self.map_builder.create_province_map_data(
+                    province_data, ['1', '2'], style['legend_labels'], style['colors']
+                ),
+            },
             "table_data": data.get('table_data', []),
             "total_country": data.get('total_country', 0),
             "province_data_json": province_data_json
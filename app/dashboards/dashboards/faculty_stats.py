@@ -13,6 +13,20 @@ from typing import Dict, Any
 class FacultyStatsDashboard(BaseDashboard):
     """Dashboard for faculty statistics (d1)"""
     
+    # Shown for a chart whose query failed
+    EMPTY_CHART = {"labels": [], "counts": []}
+    EMPTY_DATA = {
+        "sex_data": EMPTY_CHART,
+        "markaz_data": {"labels": [], "male_counts": [], "female_counts": []},
+        "field_data": EMPTY_CHART,
+        "type_data": EMPTY_CHART,
+        "edugroup_data": EMPTY_CHART,
+        "grade_data": EMPTY_CHART,
+        "certificate_data": EMPTY_CHART,
+        "type_golestan_data": EMPTY_CHART,
+        "type_sex_data": {"inner_labels": [], "inner_data": [], "outer_labels": [], "outer_data": []},
+    }
+    
     def __init__(self):
         super().__init__(
             dashboard_id="d1",
@@ -20,23 +34,26 @@ class FacultyStatsDashboard(BaseDashboard):
             description="آمار تفصیلی اعضای هیئت علمی با فیلتر بر اساس سطح دسترسی - معماری جدید"
         )
         self.data_provider = FacultyDataProvider()
-        self.cache_ttl = 600  # 10 minutes
+        self.cache_ttl = 3600  # 1 hour - invalidated by faculty syncs via data versions
+        self.data_sources = ('faculty',)
     
     def get_data(self, context: UserContext, **kwargs) -> Dict[str, Any]:
         """Fetch faculty statistics with context-aware filtering"""
         filters = kwargs.get('filters', {})
         
-        return {
-            "sex_data": self.data_provider.get_faculty_by_sex(context, filters),
-            "markaz_data": self.data_provider.get_faculty_by_markaz(context, filters),
-            "field_data": self.data_provider.get_faculty_by_field(context, filters),
-            "type_data": self.data_provider.get_faculty_by_type(context, filters),
-            "edugroup_data": self.data_provider.get_faculty_by_edugroup(context, filters),
-            "grade_data": self.data_provider.get_faculty_by_grade(context, filters),
-            "certificate_data": self.data_provider.get_faculty_by_certificate(context, filters),
-            "type_golestan_data": self.data_provider.get_faculty_type_golestan(context, filters),
-            "type_sex_data": self.data_provider.get_faculty_by_type_and_sex(context, filters),
-        }
+        provider = self.data_provider
+        # Independent queries, run concurrently; a failing one shows an empty chart
+        return self.run_queries({
+            "sex_data": lambda: provider.get_faculty_by_sex(context, filters),
+            "markaz_data": lambda: provider.get_faculty_by_markaz(context, filters),
+            "field_data": lambda: provider.get_faculty_by_field(context, filters),
+            "type_data": lambda: provider.get_faculty_by_type(context, filters),
+            "edugroup_data": lambda: provider.get_faculty_by_edugroup(context, filters),
+            "grade_data": lambda: provider.get_faculty_by_grade(context, filters),
+            "certificate_data": lambda: provider.get_faculty_by_certificate(context, filters),
+            "type_golestan_data": lambda: provider.get_faculty_type_golestan(context, filters),
+            "type_sex_data": lambda: provider.get_faculty_by_type_and_sex(context, filters),
+        }, fallbacks=self.EMPTY_DATA)
     
     def render(self, data: Dict[str, Any], context: UserContext):
         """Render dashboard template"""
@@ -21,6 +21,8 @@ class LMSMonitoringDashboard(BaseDashboard):
         )
         self.data_provider = LMSDataProvider()
         self.cache_ttl = 60  # 1 minute (real-time data)
+        self.cache_hard_ttl = 600  # serve up to 10 minutes old while Zabbix data refreshes
+        self.data_sources = ('lms',)
     
     def get_data(self, context: UserContext, **kwargs) -> Dict[str, Any]:
         """Fetch LMS monitoring data"""
@@ -20,7 +20,8 @@ class StudentFacultyRatioDashboard(BaseDashboard):
             description="نمودار نسبت تعداد دانشجویان به اعضای هیئت علمی بر اساس مقطع تحصیلی"
         )
         self.data_provider = StudentsDataProvider()
-        self.cache_ttl = 600  # 10 minutes
+        self.cache_ttl = 3600  # 1 hour - invalidated by students/faculty syncs via data versions
+        self.data_sources = ('students', 'faculty')
     
     def get_data(self, context: UserContext, **kwargs) -> Dict[str, Any]:
         """Fetch student-faculty ratio data with context filtering"""
@@ -21,33 +21,15 @@ class StudentsDashboard(BaseDashboard):
             description="آمار تفصیلی دانشجو معلمان با فیلتر بر اساس سطح دسترسی - معماری جدید"
         )
         self.data_provider = StudentsDataProvider()
-        self.cache_ttl = 600  # 10 minutes
+        self.cache_ttl = 3600  # 1 hour - invalidated by students syncs via data versions
+        self.data_sources = ('students',)
     
     def get_data(self, context: UserContext, **kwargs) -> Dict[str, Any]:
         """Get all data for students dashboard"""
         filters = kwargs.get('filters', {})
         
-        return {
-            "gender_data": self.data_provider.get_gender_data(context, filters, year_404=False),
-            "gender_data_404": self.data_provider.get_gender_data(context, filters, year_404=True),
-            "vazeiyat_data": self.data_provider.get_vazeiyat_data(context, filters, year_404=False),
-            "vazeiyat_data_404": self.data_provider.get_vazeiyat_data(context, filters, year_404=True),
-            "province_vazeiyat_data": self.data_provider.get_province_vazeiyat_data(context, filters),
-            "course_data_kardani": self.data_provider.get_course_data_by_grade(context, filters, grade=1),
-            "course_data_napeyvaste": self.data_provider.get_course_data_by_grade(context, filters, grade=2),
-            "course_data_peyvaste": self.data_provider.get_course_data_by_grade(context, filters, grade=3),
-            "course_data_arshad": self.data_provider.get_course_data_by_grade(context, filters, grade=4),
-            "grade_data": self.data_provider.get_grade_data(context, filters),
-            "province_data": self.data_provider.get_province_data(context, filters),
-            "province_year_data": self.data_provider.get_province_year_data(context, filters),
-            "province_sex_data": self.data_provider.get_province_sex_data(context, filters),
-            "year_data": self.data_provider.get_year_data(context, filters),
-            "year_data_grade": self.data_provider.get_year_grade_data(context, filters),
-            "course_year_data_kardani": self.data_provider.get_course_year_data(context, filters, grade=1),
-            "course_year_data_karshenasi_napeyvaste": self.data_provider.get_course_year_data(context, filters, grade=2),
-            "course_year_data_karshenasi_peyvaste": self.data_provider.get_course_year_data(context, filters, grade=3),
-            "course_year_data_arshad": self.data_provider.get_course_year_data(context, filters, grade=4),
-        }
+        # One scan of Students, rolled up per chart
+        return self.data_provider.get_dashboard_data(context, filters)
     
     def render(self, data: Dict[str, Any], context: UserContext):
         """Render students dashboard template"""
@@ -0,0 +1,88 @@
+"""
+In-memory Aggregation Cube
+Answers many GROUP BY breakdowns from one fine-grained GROUP BY scan
+"""
+from collections import namedtuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def sql_sort_key(value: Any) -> Tuple:
+    """Sort key matching SQLite's default ordering (NULL < numbers < text < blobs)"""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, bytes(value))
+
+
+class AggregationCube:
+    """
+    Row counts grouped by every dimension any chart needs
+    
+    Built from `SELECT <dims>, COUNT(*) ... GROUP BY <dims>`; each chart's
+    breakdown is then a roll-up over the (small) cube instead of another scan
+    of the base table. Roll-ups return rows the way SQLite would: grouped
+    rows in ascending key order (see order_by_count for ORDER BY COUNT(*)).
+    """
+    
+    def __init__(self, dimensions: Sequence[str], rows: Iterable[Sequence[Any]]):
+        """
+        Args:
+            dimensions: Dimension names, in the order of the row columns
+            rows: (dim values..., count) tuples
+        """
+        self.dimensions = tuple(dimensions)
+        self.Row = namedtuple('CubeRow', self.dimensions + ('count',))
+        self.rows = [self.Row(*row) for row in rows]
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    @property
+    def total(self) -> int:
+        return sum(row.count for row in self.rows)
+    
+    def rollup(
+        self,
+        dimensions: Sequence[str],
+        where: Optional[Callable[[Any], bool]] = None,
+        sums: Optional[Dict[str, Callable[[Any], bool]]] = None,
+    ) -> List[tuple]:
+        """
+        Equivalent of `SELECT <dimensions>, COUNT(*)[, SUM(CASE ...)...] WHERE ... GROUP BY <dimensions>`
+        
+        Args:
+            dimensions: Dimensions to group by
+            where: Row predicate (cube rows are namedtuples)
+            sums: Extra columns counting only the rows matching each predicate
+        
+        Returns:
+            List of (key values..., count, sums...) tuples in group key order
+        """
+        sums = sums or {}
+        getters = [self.dimensions.index(name) for name in dimensions]
+        predicates = list(sums.values())
+        groups: Dict[tuple, List[int]] = {}
+        for row in self.rows:
+            if where is not None and not where(row):
+                continue
+            key = tuple(row[i] for i in getters)
+            totals = groups.get(key)
+            if totals is None:
+                totals = groups[key] = [0] * (1 + len(predicates))
+            totals[0] += row.count
+            for i, predicate in enumerate(predicates, 1):
+                if predicate(row):
+                    totals[i] += row.count
+        ordered = sorted(groups.items(), key=lambda item: tuple(sql_sort_key(v) for v in item[0]))
+        return [key + tuple(totals) for key, totals in ordered]
+    
+    @staticmethod
+    def order_by_count(rows: List[tuple], descending: bool = True) -> List[tuple]:
+        """ORDER BY COUNT(*) for rollup() output without sums (count is the last column)"""
+        # SQLite's sorter keeps ties in group key order ascending and reverses
+        # the whole sort for DESC; a stable sort (then reversed) does the same
+        ordered = sorted(rows, key=lambda row: row[-1])
+        return ordered[::-1] if descending else ordered
@@ -3,11 +3,21 @@ Base Data Provider
 All data providers should inherit from this class
 """
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 import sqlite3
-from typing import Dict, List, Any, Optional
+import sys
+import time
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 import logging
 from dashboards.config import DashboardConfig
 from dashboards.context import UserContext
+from .connection_pool import get_pool
+from .filters import (
+    CONTEXT_FILTERS, FilterError, TableColumns, cached_table_columns, compile_where, main_table, splice_where,
+    table_columns,
+)
+from .materialized import AGGREGATE_FILTERS, aggregate_is_current
+from .profiler import QueryProfiler
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +28,8 @@ class DataProvider(ABC):
     def __init__(self, db_path: Optional[str] = None):
         self.db_path = db_path or self.get_default_db_path()
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.use_pool = DashboardConfig.DB_POOL_ENABLED
+        self.use_aggregates = DashboardConfig.AGGREGATES_ENABLED
     
     @abstractmethod
     def get_default_db_path(self) -> str:
@@ -25,9 +37,44 @@ class DataProvider(ABC):
         pass
     
     def get_connection(self):
-        """Get database connection"""
+        """Get a new (unpooled) database connection - caller must close it"""
         return sqlite3.connect(self.db_path)
     
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for running read queries
+        Uses the per-thread read-only pool when enabled; the connection must not be closed
+        """
+        if self.use_pool:
+            with get_pool(self.db_path).connection() as conn:
+                yield conn
+        else:
+            conn = self.get_connection()
+            try:
+                yield conn
+            finally:
+                conn.close()
+    
+    def aggregate_table(self, name: str, context: Optional[UserContext], filters: Dict[str, Any]) -> Optional[str]:
+        """
+        Materialized aggregate table (see materialized.py) to query instead
+        of raw rows, or None if it can't answer this request exactly
+        
+        Covered requests have only province filters, no access restriction
+        from the context, and the table was built from the current data.
+        """
+        if not self.use_aggregates:
+            return None
+        if context is not None and any(
+            context.data_filters.get(field) for field in ('province_code', 'university_code', 'faculty_code')
+        ):
+            return None
+        if any(value for key, value in (filters or {}).items() if key not in AGGREGATE_FILTERS):
+            return None
+        with self.connection() as conn:
+            return name if aggregate_is_current(conn, name) else None
+    
     def execute_query(self, query: str, params: tuple = (), context: Optional[UserContext] = None) -> List[tuple]:
         """
         Execute SQL query and return results
@@ -45,14 +92,8 @@ class DataProvider(ABC):
         if context:
             query, params = self._apply_context_filters(query, params, context)
         
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            return results
-        finally:
-            conn.close()
+        with self.connection() as conn:
+            return self._fetchall(conn, conn.cursor(), query, params)
     
     def execute_query_dict(self, query: str, params: tuple = (), context: Optional[UserContext] = None) -> List[Dict]:
         """
@@ -71,126 +112,83 @@ class DataProvider(ABC):
         if context:
             query, params = self._apply_context_filters(query, params, context)
         
-        conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
-        try:
+        with self.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
+            cursor.row_factory = sqlite3.Row
+            rows = self._fetchall(conn, cursor, query, params)
             return [dict(row) for row in rows]
-        finally:
-            conn.close()
     
-    def _apply_context_filters(self, query: str, params: tuple, context: UserContext) -> tuple:
+    def _fetchall(self, conn, cursor, query: str, params: tuple) -> list:
+        """Run query on cursor, timing it when query profiling is enabled"""
+        if not DashboardConfig.QUERY_PROFILING_ENABLED:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        # Frame 2 is the provider method that called execute_query(_dict)
+        QueryProfiler.record(
+            self.__class__.__name__, query, params, time.perf_counter() - start, len(rows),
+            conn=conn, caller=sys._getframe(2),
+        )
+        return rows
+    
+    def table_columns(self, table: str) -> TableColumns:
+        """Column metadata of a table in this provider's database"""
+        cached = cached_table_columns(self.db_path, table)
+        if cached is not None:
+            return cached
+        with self.connection() as conn:
+            return table_columns(conn, self.db_path, table)
+    
+    def where_clause(self, table: str, filters: Optional[Dict[str, Any]], context: Optional[UserContext] = None,
+                     extra: Sequence[str] = (), existing_where: bool = False) -> Tuple[str, List[Any]]:
         """
-        Apply user context filters to SQL query
-        Override in subclasses for custom filtering logic
+        Build the WHERE clause for a query on table (see filters.compile_where)
+        
+        Request filters and the context's access restriction become one
+        parameterized clause on the table's own columns (faculty codes on
+        code_markaz/pardis_code, lists as IN, dates as ranges), so the query
+        must then be executed without context.
         
         Args:
-            query: Original SQL query
-            params: Original query parameters
-            context: UserContext with access filters
+            table: table (or aggregate table) the filters apply to
+            filters: request filters dictionary
+            context: UserContext whose access restriction is included
+            extra: constant SQL conditions to AND in
+            existing_where: whether the query already has a WHERE clause
         
         Returns:
-            Tuple of (modified_query, modified_params)
+            Tuple of (where_clause_string, params_list)
         """
-        # Default implementation: add WHERE clause if needed
-        filters = []
-        new_params = list(params)
-        
-        # Add province filter if user is restricted to a province
-        if context.data_filters.get('province_code'):
-            if 'WHERE' not in query.upper():
-                query += " WHERE "
-            else:
-                query += " AND "
-            query += "province_code = ?"
-            new_params.append(context.data_filters['province_code'])
-        
-        # Add faculty filter if user is restricted to a faculty
-        if context.data_filters.get('faculty_code'):
-            if 'WHERE' not in query.upper():
-                query += " WHERE "
-            else:
-                query += " AND "
-            # Try common faculty code column names
-            if 'code_markaz' in query.lower():
-                query += "code_markaz = ?"
-            elif 'faculty_code' in query.lower():
-                query += "faculty_code = ?"
-            else:
-                query += "code_markaz = ?"
-            new_params.append(context.data_filters['faculty_code'])
-        
-        return query, tuple(new_params)
+        return compile_where(self.table_columns(table), filters, context, extra, existing_where)
     
-    def build_where_clause(self, filters: Dict[str, Any], existing_where: bool = False) -> tuple:
+    def _apply_context_filters(self, query: str, params: tuple, context: UserContext) -> tuple:
         """
-        Build WHERE clause from filters dictionary
+        Apply user context filters to SQL query
+        Override in subclasses for custom filtering logic
+        
+        The restriction is compiled for the table of the query's top-level FROM
+        and ANDed into its WHERE ahead of GROUP BY/ORDER BY/LIMIT (providers
+        building their own WHERE pass the context to where_clause instead).
         
         Args:
-            filters: Dictionary of filter conditions
-            existing_where: Whether WHERE clause already exists in query
+            query: Original SQL query
+            params: Original query parameters
+            context: UserContext with access filters
         
         Returns:
-            Tuple of (where_clause_string, params_list)
+            Tuple of (modified_query, modified_params)
         """
-        conditions = []
-        params = []
-        
-        # Support both single province_code and list of province_codes
-        if filters.get('province_code'):
-            conditions.append("province_code = ?")
-            params.append(filters['province_code'])
-        elif filters.get('province_codes'):
-            # Support list of province codes (from filter_restrictions)
-            province_codes = filters['province_codes']
-            if isinstance(province_codes, list) and len(province_codes) > 0:
-                placeholders = ','.join(['?' for _ in province_codes])
-                conditions.append(f"province_code IN ({placeholders})")
-                params.extend(province_codes)
-        
-        # Support both single university_code and list of university_codes
-        if filters.get('university_code'):
-            conditions.append("university_code = ?")
-            params.append(filters['university_code'])
-        elif filters.get('university_codes'):
-            university_codes = filters['university_codes']
-            if isinstance(university_codes, list) and len(university_codes) > 0:
-                placeholders = ','.join(['?' for _ in university_codes])
-                conditions.append(f"university_code IN ({placeholders})")
-                params.extend(university_codes)
-        
-        # Support both single faculty_code and list of faculty_codes
-        if filters.get('faculty_code'):
-            # Try multiple column names
-            conditions.append("(code_markaz = ? OR faculty_code = ?)")
-            params.extend([filters['faculty_code'], filters['faculty_code']])
-        elif filters.get('faculty_codes'):
-            faculty_codes = filters['faculty_codes']
-            if isinstance(faculty_codes, list) and len(faculty_codes) > 0:
-                placeholders = ','.join(['?' for _ in faculty_codes])
-                conditions.append(f"(code_markaz IN ({placeholders}) OR faculty_code IN ({placeholders}))")
-                params.extend(faculty_codes)
-                params.extend(faculty_codes)  # Add twice for both OR conditions
-        
-        if filters.get('date_from'):
-            conditions.append("date >= ?")
-            params.append(filters['date_from'])
-        
-        if filters.get('date_to'):
-            conditions.append("date <= ?")
-            params.append(filters['date_to'])
-        
-        if not conditions:
-            return "", []
-        
-        where_clause = " AND ".join(conditions)
-        if existing_where:
-            where_clause = " AND " + where_clause
-        else:
-            where_clause = " WHERE " + where_clause
-        
-        return where_clause, params
-
-
+        table = main_table(query)
+        if table is None:
+            if any(context.data_filters.get(field) for field in CONTEXT_FILTERS):
+                raise FilterError("can't find the table to apply access restrictions to")
+            return query, params
+        
+        condition, context_params = self.where_clause(table, None, context)
+        if not condition:
+            return query, params
+        query, position = splice_where(query, condition[len(" WHERE "):])
+        params = tuple(params)
+        return query, params[:position] + tuple(context_params) + params[position:]
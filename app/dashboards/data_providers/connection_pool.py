@@ -0,0 +1,187 @@
+"""
+SQLite Connection Pool
+Reusable per-thread read-only connections tuned for analytical reads
+"""
+import os
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+from dashboards.config import DashboardConfig
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteConnectionPool:
+    """
+    Per-thread pool of read-only SQLite connections for one database file
+    
+    Every thread keeps at most one open connection to the database. The
+    connection is opened with `mode=ro`, tuned with read-oriented pragmas
+    (mmap, page cache, busy timeout, query_only) and reused across requests
+    until it gets too old, has served too many queries, hit an error or the
+    pool was invalidated (e.g. after a sync replaced the data).
+    """
+    
+    def __init__(
+        self,
+        db_path: str,
+        enable_wal: bool = False,
+        max_age: Optional[int] = None,
+        max_uses: Optional[int] = None,
+    ):
+        self.db_path = str(db_path)
+        self.enable_wal = enable_wal
+        self.max_age = max_age if max_age is not None else DashboardConfig.DB_POOL_MAX_AGE
+        self.max_uses = max_uses if max_uses is not None else DashboardConfig.DB_POOL_MAX_USES
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._wal_checked = False
+        self.stats = {'opened': 0, 'reused': 0, 'recycled': 0, 'discarded': 0}
+    
+    def _ensure_wal(self):
+        """Switch database to WAL once so readers never block the sync writer"""
+        if not self.enable_wal or self._wal_checked:
+            return
+        with self._lock:
+            if self._wal_checked:
+                return
+            self._wal_checked = True
+            if not os.path.exists(self.db_path):
+                return
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=DashboardConfig.DB_BUSY_TIMEOUT_MS / 1000)
+                try:
+                    mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+                    logger.info(f"Journal mode for {self.db_path}: {mode}")
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not enable WAL on {self.db_path}: {e}")
+    
+    def _open(self) -> sqlite3.Connection:
+        """Open a new tuned read-only connection"""
+        self._ensure_wal()
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            timeout=DashboardConfig.DB_BUSY_TIMEOUT_MS / 1000,
+            cached_statements=256,
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(DashboardConfig.DB_BUSY_TIMEOUT_MS)}")
+        conn.execute(f"PRAGMA mmap_size = {int(DashboardConfig.DB_MMAP_SIZE)}")
+        conn.execute(f"PRAGMA cache_size = -{int(DashboardConfig.DB_CACHE_SIZE_KB)}")
+        conn.execute("PRAGMA query_only = 1")
+        self.stats['opened'] += 1
+        return conn
+    
+    def _discard(self, slot: Dict):
+        """Close the connection held in a thread slot"""
+        try:
+            slot['conn'].close()
+        except Exception:
+            pass
+    
+    def acquire(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening or recycling it if needed"""
+        slot = getattr(self._local, 'slot', None)
+        now = time.monotonic()
+        
+        if slot is not None:
+            expired = (
+                slot['generation'] != self._generation
+                or now - slot['created_at'] > self.max_age
+                or slot['uses'] >= self.max_uses
+            )
+            if expired:
+                self._discard(slot)
+                self.stats['recycled'] += 1
+                slot = None
+            else:
+                slot['uses'] += 1
+                self.stats['reused'] += 1
+                return slot['conn']
+        
+        conn = self._open()
+        self._local.slot = {
+            'conn': conn,
+            'created_at': now,
+            'uses': 1,
+            'generation': self._generation,
+        }
+        return conn
+    
+    def release(self, conn: sqlite3.Connection, error: Optional[BaseException] = None):
+        """Return a connection; broken connections are dropped instead of reused"""
+        slot = getattr(self._local, 'slot', None)
+        if slot is None or slot['conn'] is not conn:
+            return
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                error = error or sqlite3.Error("rollback failed")
+        if error is not None and isinstance(error, sqlite3.Error):
+            self._discard(slot)
+            self._local.slot = None
+            self.stats['discarded'] += 1
+    
+    @contextmanager
+    def connection(self):
+        """Context manager borrowing this thread's pooled connection"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException as e:
+            self.release(conn, e)
+            raise
+        else:
+            self.release(conn)
+    
+    def invalidate(self):
+        """
+        Recycle all connections lazily
+        
+        Connections belong to their threads, so they are not closed here;
+        each thread reopens on its next acquire.
+        """
+        with self._lock:
+            self._generation += 1
+            self._wal_checked = False
+        logger.info(f"Connection pool for {self.db_path} invalidated (generation {self._generation})")
+
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> SQLiteConnectionPool:
+    """Get (or create) the shared pool for a database file"""
+    key = str(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = SQLiteConnectionPool(
+                    key,
+                    enable_wal=DashboardConfig.DB_POOL_WAL and key == str(DashboardConfig.FACULTY_DB),
+                )
+                _pools[key] = pool
+    return pool
+
+
+def invalidate_pools(db_path: Optional[str] = None):
+    """Recycle pooled connections for one database or all of them"""
+    with _pools_lock:
+        if db_path is None:
+            pools = list(_pools.values())
+        else:
+            pools = [_pools[str(db_path)]] if str(db_path) in _pools else []
+    for pool in pools:
+        pool.invalidate()
@@ -2,11 +2,69 @@
 Faculty Data Provider
 Provides faculty-related data with context-aware filtering
 """
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterator, Sequence, Tuple
 from collections import defaultdict
+import base64
+import json
 from .base import DataProvider
+from dashboards.cache import DashboardCache
 from dashboards.config import DashboardConfig
 from dashboards.context import UserContext
+from dashboards.data_version import DataVersions
+
+# Faculty list columns: API name -> (faculty column read, SQL expression);
+# a column the faculty table lacks (older syncs) reads as ''
+FACULTY_LIST_COLUMNS = {
+    'name': ('name', "COALESCE(name, '')"),
+    'family': ('family', "COALESCE(family, '')"),
+    'sex_label': ('sex', "CASE sex WHEN 1 THEN 'مرد' WHEN 2 THEN 'زن' ELSE 'نامشخص' END"),
+    'sex': ('sex', "sex"),
+    'field': ('field', "COALESCE(field, '')"),
+    'code': ('code', "COALESCE(code, '')"),
+    'mobile': ('mobile', "COALESCE(mobile, '')"),
+    'email': ('email', "COALESCE(email, '')"),
+    'markaz': ('markaz', "COALESCE(markaz, '')"),
+    'city': ('city', "COALESCE(city, '')"),
+    'scope': ('scope', "COALESCE(scope, '')"),
+    'employ_state': ('employ_state', "COALESCE(employ_state, '')"),
+    'estekhdamtype_title': ('estekhdamtype_title', "COALESCE(estekhdamtype_title, '')"),
+    'edugroup': ('edugroup', "COALESCE(edugroup, '')"),
+    'grade': ('grade', "COALESCE(grade, '')"),
+}
+
+# Sort key -> list columns ordered by; faculty.rowid is always appended so
+# every row has a unique keyset position
+FACULTY_LIST_SORTS = {
+    'name': ('name', 'family'),
+    'family': ('family', 'name'),
+    'code': ('code',),
+    'field': ('field', 'name', 'family'),
+    'edugroup': ('edugroup', 'name', 'family'),
+    'markaz': ('markaz', 'name', 'family'),
+    'city': ('city', 'name', 'family'),
+}
+
+
+def encode_cursor(sort: str, descending: bool, keys: Sequence[Any], position: int) -> str:
+    """Opaque page cursor: sort order, sort keys of the last row served and rows served so far"""
+    raw = json.dumps([sort, descending, list(keys), position], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool, width: int) -> Tuple[List[Any], int]:
+    """(sort keys, position) of a cursor from encode_cursor; ValueError if it isn't one for this order"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, cursor_descending, keys, position = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("invalid cursor") from e
+    if cursor_sort != sort or cursor_descending != descending:
+        raise ValueError("cursor belongs to a different sort order")
+    if (not isinstance(keys, list) or len(keys) != width or not isinstance(position, int)
+            or any(isinstance(key, (list, dict)) for key in keys)):
+        raise ValueError("invalid cursor")
+    return keys, position
+
 
 class FacultyDataProvider(DataProvider):
     """Data provider for faculty-related data"""
@@ -14,10 +72,31 @@ class FacultyDataProvider(DataProvider):
     def get_default_db_path(self) -> str:
         return DashboardConfig.FACULTY_DB
     
+    def _faculty_source(self, context: Optional[UserContext], filters: Dict) -> Tuple[str, str]:
+        """FROM clause and count expression for breakdowns of the faculty table"""
+        table = self.aggregate_table('agg_faculty', context, filters)
+        return (table, "SUM(n)") if table else ("faculty", "COUNT(*)")
+    
+    def _golestan_source(self, context: Optional[UserContext], filters: Dict) -> Tuple[str, str, str]:
+        """
+        FROM clause, count expression and the table filters apply to, for
+        breakdowns joining faculty_golestan
+        """
+        table = self.aggregate_table('agg_faculty_golestan', context, filters)
+        if table:
+            # Aliased so faculty_golestan.<column> references still resolve
+            return f"{table} AS faculty_golestan", "SUM(n)", table
+        return (
+            "faculty LEFT OUTER JOIN faculty_golestan ON (faculty.professorCode = faculty_golestan.professorCode)",
+            "COUNT(*)",
+            "faculty",
+        )
+    
     def get_faculty_by_sex(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, List]:
         """Get faculty statistics by gender"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters)
+        source, count = self._faculty_source(context, filters)
+        where_clause, params = self.where_clause(source, filters, context)
         
         query = f"""
             SELECT 
@@ -26,14 +105,14 @@ class FacultyDataProvider(DataProvider):
                     WHEN 2 THEN 'زن'
                     ELSE 'نامشخص'
                 END AS sex_label,
-                COUNT(*) as count
-            FROM faculty
+                {count} as count
+            FROM {source}
             {where_clause}
             GROUP BY sex
             ORDER BY count DESC
         """
         
-        results = self.execute_query(query, tuple(params), context)
+        results = self.execute_query(query, tuple(params))
         return {
             "labels": [row[0] for row in results],
             "counts": [row[1] for row in results]
@@ -42,7 +121,8 @@ class FacultyDataProvider(DataProvider):
     def get_faculty_by_markaz(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, List]:
         """Get faculty by center with gender breakdown"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters)
+        source, count = self._faculty_source(context, filters)
+        where_clause, params = self.where_clause(source, filters, context)
         
         query = f"""
             SELECT 
@@ -52,14 +132,14 @@ class FacultyDataProvider(DataProvider):
                     WHEN 2 THEN 'زن'
                     ELSE 'نامشخص'
                 END AS sex_label,
-                COUNT(*) AS count
-            FROM faculty f
+                {count} AS count
+            FROM {source} f
             {where_clause}
             GROUP BY f.code_markaz, f.sex
             ORDER BY f.markaz
         """
         
-        results = self.execute_query(query, tuple(params), context)
+        results = self.execute_query(query, tuple(params))
         
         # Process and group data
         grouped = {}
@@ -79,17 +159,18 @@ class FacultyDataProvider(DataProvider):
     def get_faculty_by_field(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, List]:
         """Get faculty by field"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters)
+        source, count = self._faculty_source(context, filters)
+        where_clause, params = self.where_clause(source, filters, context)
         
         query = f"""
-            SELECT field, COUNT(*) as count
-            FROM faculty
+            SELECT field, {count} as count
+            FROM {source}
             {where_clause}
             GROUP BY field
             ORDER BY count DESC
         """
         
-        results = self.execute_query(query, tuple(params), context)
+        results = self.execute_query(query, tuple(params))
         return {
             "labels": [row[0] or "نامشخص" for row in results],
             "counts": [row[1] for row in results]
@@ -98,17 +179,18 @@ class FacultyDataProvider(DataProvider):
     def get_faculty_by_type(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, List]:
         """Get faculty by employment type"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters)
+        source, count = self._faculty_source(context, filters)
+        where_clause, params = self.where_clause(source, filters, context)
         
         query = f"""
-            SELECT estekhdamtype_title, COUNT(*) as count
-            FROM faculty
+            SELECT estekhdamtype_title, {count} as count
+            FROM {source}
             {where_clause}
             GROUP BY estekhdamtype
             ORDER BY count DESC
         """
         
-        results = self.execute_query(query, tuple(params), context)
+        results = self.execute_query(query, tuple(params))
         return {
             "labels": [row[0] or "نامشخص" for row in results],
             "counts": [row[1] for row in results]
@@ -117,20 +199,21 @@ class FacultyDataProvider(DataProvider):
     def get_faculty_by_province(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[int, Dict[str, int]]:
         """Get faculty by province with gender breakdown"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=True)
+        source, count = self._faculty_source(context, filters)
+        where_clause, params = self.where_clause(source, filters, context, existing_where=True)
         
         query = f"""
             SELECT 
                 province_code,
                 CASE sex WHEN 1 THEN '1' WHEN 2 THEN '2' END AS sex,
-                COUNT(*) AS count
-            FROM faculty
+                {count} AS count
+            FROM {source}
             WHERE sex IN (1, 2)
             {where_clause}
             GROUP BY province_code, sex
         """
         
-        results = self.execute_query(query, tuple(params), context)
+        results = self.execute_query(query, tuple(params))
         
         province_data = {}
         for province_code, sex, count in results:
@@ -176,7 +259,7 @@ class FacultyDataProvider(DataProvider):
         filters = filters or {}
         filters['province_code'] = province_code
         
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
+        where_clause, params = self.where_clause('faculty', filters, context)
         
         # Use COALESCE for optional columns that might not exist
         query = f"""
@@ -202,7 +285,7 @@ class FacultyDataProvider(DataProvider):
         """
         
         try:
-            results = self.execute_query(query, tuple(params), context)
+            results = self.execute_query(query, tuple(params))
         except Exception as e:
             # If query fails, try without optional columns
             self.logger.warning(f"Query with all columns failed: {e}. Trying simplified query...")
@@ -227,7 +310,7 @@ class FacultyDataProvider(DataProvider):
                 {where_clause}
                 ORDER BY name, family
             """
-            results = self.execute_query(query, tuple(params), context)
+            results = self.execute_query(query, tuple(params))
         
         faculty_list = []
         for idx, row in enumerate(results, 1):
@@ -257,10 +340,187 @@ class FacultyDataProvider(DataProvider):
         
         return faculty_list
     
+    def _faculty_list_plan(
+        self,
+        province_code: int,
+        context: Optional[UserContext],
+        filters: Optional[Dict],
+        sort: str,
+        columns: Optional[Sequence[str]],
+    ) -> Dict[str, Any]:
+        """Validated columns, SELECT/sort expressions and WHERE clause of a faculty list"""
+        if sort not in FACULTY_LIST_SORTS:
+            raise ValueError(f"unknown sort: {sort}")
+        columns = list(columns) if columns else list(FACULTY_LIST_COLUMNS)
+        unknown = [name for name in columns if name not in FACULTY_LIST_COLUMNS]
+        if unknown:
+            raise ValueError(f"unknown columns: {', '.join(unknown)}")
+        
+        table = self.table_columns('faculty')
+        
+        def expression(name: str) -> str:
+            column, sql = FACULTY_LIST_COLUMNS[name]
+            return sql if column in table.columns else "''"
+        
+        filters = dict(filters or {}, province_code=province_code)
+        where_clause, params = self.where_clause('faculty', filters, context)
+        return {
+            'sort': sort,
+            'columns': columns,
+            'select': [expression(name) for name in columns],
+            'keys': [expression(name) for name in FACULTY_LIST_SORTS[sort]] + ['faculty.rowid'],
+            'where': where_clause,
+            'params': params,
+        }
+    
+    def _faculty_list_rows(
+        self, plan: Dict[str, Any], descending: bool, after: Optional[List[Any]], limit: int
+    ) -> List[Tuple[Dict[str, Any], List[Any]]]:
+        """
+        Up to limit rows following the keyset position `after` (from the
+        start if None), as (row dict, sort keys) pairs
+        """
+        keys = plan['keys']
+        where_clause, params = plan['where'], list(plan['params'])
+        if after is not None:
+            # Row-value comparison: one index-friendly range instead of OFFSET
+            where_clause += (
+                f"{' AND' if where_clause else ' WHERE'} ({', '.join(keys)}) "
+                f"{'<' if descending else '>'} ({', '.join('?' * len(keys))})"
+            )
+            params.extend(after)
+        direction = 'DESC' if descending else 'ASC'
+        query = f"""
+            SELECT {', '.join(plan['select'] + keys)}
+            FROM faculty
+            {where_clause}
+            ORDER BY {', '.join(f'{key} {direction}' for key in keys)}
+            LIMIT ?
+        """
+        width = len(plan['columns'])
+        results = self.execute_query(query, tuple(params) + (limit,))
+        return [(dict(zip(plan['columns'], row[:width])), list(row[width:])) for row in results]
+    
+    def count_faculty_list(
+        self, province_code: int, context: Optional[UserContext] = None, filters: Optional[Dict] = None
+    ) -> int:
+        """
+        Number of faculty members in a province list
+        
+        Counted from agg_faculty when it covers the request and cached per
+        faculty data version, so paging doesn't recount the table.
+        """
+        filters = dict(filters or {}, province_code=province_code)
+        restriction = context.data_filters if context is not None else {}
+        key = (
+            f"faculty_list_count:{self.db_path}:{DataVersions.get('faculty')}:"
+            f"{json.dumps(filters, sort_keys=True, default=str)}:{json.dumps(restriction, sort_keys=True, default=str)}"
+        )
+        
+        def compute():
+            source, count = self._faculty_source(context, filters)
+            where_clause, params = self.where_clause(source, filters, context)
+            return self.execute_query(f"SELECT {count} FROM {source}{where_clause}", tuple(params))[0][0] or 0
+        
+        return DashboardCache.get_or_compute(key, compute, ttl=DashboardConfig.CACHE_TTL)
+    
+    def get_faculty_page(
+        self,
+        province_code: int,
+        context: Optional[UserContext] = None,
+        filters: Optional[Dict] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort: str = 'name',
+        descending: bool = False,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        One keyset-paginated page of a province's faculty list
+        
+        Args:
+            province_code: province to list
+            context: UserContext whose access restriction applies
+            filters: extra request filters
+            limit: page size (default DASHBOARD_FACULTY_PAGE_SIZE, capped at
+                DASHBOARD_FACULTY_MAX_PAGE_SIZE)
+            cursor: next_cursor of the previous page (None = first page)
+            sort: key of FACULTY_LIST_SORTS
+            descending: sort direction
+            columns: FACULTY_LIST_COLUMNS to return (default all)
+        
+        Returns:
+            Dict with faculty (row dicts with row_num), count (whole list),
+            next_cursor (None on the last page), sort, order and limit
+        
+        Raises:
+            ValueError: unknown sort/columns or a cursor from another sort order
+        """
+        if limit is None:
+            limit = DashboardConfig.FACULTY_PAGE_SIZE
+        limit = max(1, min(int(limit), DashboardConfig.FACULTY_MAX_PAGE_SIZE))
+        plan = self._faculty_list_plan(province_code, context, filters, sort, columns)
+        after, position = None, 0
+        if cursor:
+            after, position = decode_cursor(cursor, sort, descending, len(plan['keys']))
+        
+        # One extra row tells whether there is a next page
+        rows = self._faculty_list_rows(plan, descending, after, limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        faculty = [{'row_num': row_num, **row} for row_num, (row, _) in enumerate(rows, position + 1)]
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor(sort, descending, rows[-1][1], position + len(rows))
+        
+        return {
+            'faculty': faculty,
+            'count': self.count_faculty_list(province_code, context, filters),
+            'next_cursor': next_cursor,
+            'sort': sort,
+            'order': 'desc' if descending else 'asc',
+            'limit': limit,
+        }
+    
+    def iter_faculty_list(
+        self,
+        province_code: int,
+        context: Optional[UserContext] = None,
+        filters: Optional[Dict] = None,
+        sort: str = 'name',
+        descending: bool = False,
+        columns: Optional[Sequence[str]] = None,
+        batch_size: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a province's faculty list row by row (for NDJSON responses)
+        
+        Arguments are validated before returning; rows are then read in
+        keyset batches of DASHBOARD_FACULTY_STREAM_BATCH, each its own short
+        query, so a slow client never holds a read transaction open.
+        """
+        plan = self._faculty_list_plan(province_code, context, filters, sort, columns)
+        batch_size = max(1, batch_size or DashboardConfig.FACULTY_STREAM_BATCH)
+        
+        def rows():
+            after = None
+            row_num = 0
+            while True:
+                batch = self._faculty_list_rows(plan, descending, after, batch_size)
+                for row, _ in batch:
+                    row_num += 1
+                    yield {'row_num': row_num, **row}
+                if len(batch) < batch_size:
+                    return
+                after = batch[-1][1]
+        
+        return rows()
+    
     def get_faculty_by_type_and_sex(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, Any]:
         """Get faculty by employment type and sex (for nested pie chart)"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters)
+        source, count = self._faculty_source(context, filters)
+        where_clause, params = self.where_clause(source, filters, context)
         
         query = f"""
             SELECT estekhdamtype_title,
@@ -269,14 +529,14 @@ class FacultyDataProvider(DataProvider):
                     WHEN 2 THEN 'زن'
                     ELSE 'نامشخص'
                 END AS sex_label,
-                COUNT(*) AS count
-            FROM faculty
+                {count} AS count
+            FROM {source}
             {where_clause}
             GROUP BY estekhdamtype_title, sex
             ORDER BY estekhdamtype_title, sex
         """
         
-        results = self.execute_query(query, tuple(params), context)
+        results = self.execute_query(query, tuple(params))
         
         # Structure for nested pie chart
         grouped_data = defaultdict(lambda: defaultdict(int))
@@ -314,76 +574,22 @@ class FacultyDataProvider(DataProvider):
     def get_faculty_by_edugroup(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, List]:
         """Get faculty by education group"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters)
-        
-        # Build WHERE clause - handle context filters that might be added by execute_query
-        # We need to add conditions for NULL check, but execute_query might add WHERE clause
-        # So we'll use a subquery or handle it differently
-        
-        # Start with base WHERE conditions
-        base_conditions = ["faculty_golestan.group_title IS NOT NULL", "faculty_golestan.group_title != ''"]
-        base_where = " AND ".join(base_conditions)
-        
-        # Combine with user filters
-        if where_clause:
-            # Remove WHERE keyword if present and combine
-            if where_clause.strip().upper().startswith('WHERE'):
-                where_clause = where_clause[5:].strip()
-            combined_where = f"WHERE {where_clause} AND {base_where}"
-        else:
-            combined_where = f"WHERE {base_where}"
+        source, count, table = self._golestan_source(context, filters)
         
-        query = f"""
-            SELECT group_title, COUNT(*) as count
-            FROM faculty 
-            LEFT OUTER JOIN faculty_golestan ON (faculty.professorCode = faculty_golestan.professorCode)
-            {combined_where}
-            GROUP BY group_title
-            HAVING COUNT(*) > 0 AND group_title IS NOT NULL
-            ORDER BY count DESC
-        """
+        # Group title conditions plus user filters and access restriction
+        base_conditions = ("faculty_golestan.group_title IS NOT NULL", "faculty_golestan.group_title != ''")
         
         try:
-            # Execute query directly without context to avoid double WHERE clause
-            # We'll handle context filters manually if needed
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Apply context filters manually if needed
-            if context:
-                context_conditions = []
-                context_params = list(params)
-                
-                if context.data_filters.get('province_code'):
-                    context_conditions.append("faculty.province_code = ?")
-                    context_params.append(context.data_filters['province_code'])
-                
-                if context.data_filters.get('faculty_code'):
-                    context_conditions.append("faculty.code_markaz = ?")
-                    context_params.append(context.data_filters['faculty_code'])
-                
-                if context_conditions:
-                    # Add context conditions to WHERE clause
-                    if 'WHERE' in combined_where.upper():
-                        combined_where += " AND " + " AND ".join(context_conditions)
-                    else:
-                        combined_where = "WHERE " + " AND ".join(context_conditions)
-                    params = tuple(context_params)
-            
-            # Rebuild query with context filters
+            where_clause, params = self.where_clause(table, filters, context, extra=base_conditions)
             query = f"""
-                SELECT group_title, COUNT(*) as count
-                FROM faculty 
-                LEFT OUTER JOIN faculty_golestan ON (faculty.professorCode = faculty_golestan.professorCode)
-                {combined_where}
+                SELECT group_title, {count} as count
+                FROM {source}
+                {where_clause}
                 GROUP BY group_title
-                HAVING COUNT(*) > 0 AND group_title IS NOT NULL
+                HAVING {count} > 0 AND group_title IS NOT NULL
                 ORDER BY count DESC
             """
-            
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            conn.close()
+            results = self.execute_query(query, tuple(params))
             
             # Filter out None and empty values
             labels = []
@@ -405,8 +611,6 @@ class FacultyDataProvider(DataProvider):
             }
         except Exception as e:
             self.logger.error(f"Error in get_faculty_by_edugroup: {e}", exc_info=True)
-            if 'conn' in locals():
-                conn.close()
             return {
                 "labels": [],
                 "counts": []
@@ -415,18 +619,18 @@ class FacultyDataProvider(DataProvider):
     def get_faculty_by_grade(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, List]:
         """Get faculty by grade"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters)
+        source, count, table = self._golestan_source(context, filters)
+        where_clause, params = self.where_clause(table, filters, context)
         
         query = f"""
-            SELECT faculty_golestan.grade, COUNT(*) as count
-            FROM faculty 
-            LEFT OUTER JOIN faculty_golestan ON (faculty.professorCode = faculty_golestan.professorCode)
+            SELECT faculty_golestan.grade, {count} as count
+            FROM {source}
             {where_clause}
             GROUP BY faculty_golestan.grade
             ORDER BY count DESC
         """
         
-        results = self.execute_query(query, tuple(params), context)
+        results = self.execute_query(query, tuple(params))
         return {
             "labels": [row[0] or "نامشخص" for row in results],
             "counts": [row[1] for row in results]
@@ -435,18 +639,18 @@ class FacultyDataProvider(DataProvider):
     def get_faculty_by_certificate(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, List]:
         """Get faculty by last certificate"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters)
+        source, count, table = self._golestan_source(context, filters)
+        where_clause, params = self.where_clause(table, filters, context)
         
         query = f"""
-            SELECT faculty_golestan.last_certificate, COUNT(*) as count
-            FROM faculty 
-            LEFT OUTER JOIN faculty_golestan ON (faculty.professorCode = faculty_golestan.professorCode)
+            SELECT faculty_golestan.last_certificate, {count} as count
+            FROM {source}
             {where_clause}
             GROUP BY faculty_golestan.last_certificate
             ORDER BY count DESC
         """
         
-        results = self.execute_query(query, tuple(params), context)
+        results = self.execute_query(query, tuple(params))
         return {
             "labels": [row[0] or "نامشخص" for row in results],
             "counts": [row[1] for row in results]
@@ -455,18 +659,18 @@ class FacultyDataProvider(DataProvider):
     def get_faculty_type_golestan(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, List]:
         """Get faculty by Golestan employment type"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters)
+        source, count, table = self._golestan_source(context, filters)
+        where_clause, params = self.where_clause(table, filters, context)
         
         query = f"""
-            SELECT faculty_golestan.estekhdamtype_golestan, COUNT(*) as count
-            FROM faculty 
-            LEFT OUTER JOIN faculty_golestan ON (faculty.professorCode = faculty_golestan.professorCode)
+            SELECT faculty_golestan.estekhdamtype_golestan, {count} as count
+            FROM {source}
             {where_clause}
             GROUP BY faculty_golestan.estekhdamtype_golestan
             ORDER BY count DESC
         """
         
-        results = self.execute_query(query, tuple(params), context)
+        results = self.execute_query(query, tuple(params))
         return {
             "labels": [row[0] or "نامشخص" for row in results],
             "counts": [row[1] for row in results]
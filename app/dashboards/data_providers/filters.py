@@ -0,0 +1,246 @@
+"""
+Filter Compiler
+Turns request filters and UserContext access restrictions into one
+parameterized WHERE clause for a specific table, using that table's own
+columns so every predicate can use an index
+"""
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from dashboards.context import UserContext
+
+
+class FilterError(ValueError):
+    """A filter or access restriction can't be expressed on the queried table"""
+
+
+# Filter field -> candidate columns, first one the table has wins
+# (Students.code_Markaz, faculty.code_markaz and pardis.pardis_code all hold the
+# faculty/pardis code; column names match case-insensitively like SQLite's)
+FILTER_COLUMNS = {
+    'province_code': ('province_code',),
+    'university_code': ('university_code',),
+    'faculty_code': ('code_markaz', 'faculty_code', 'pardis_code'),
+    'date': ('date',),
+}
+
+# Request filter key -> (field, operator); '=' keys take one value, 'IN' keys a list
+REQUEST_FILTERS = (
+    ('province_code', 'province_code', '='),
+    ('province_codes', 'province_code', 'IN'),
+    ('university_code', 'university_code', '='),
+    ('university_codes', 'university_code', 'IN'),
+    ('faculty_code', 'faculty_code', '='),
+    ('faculty_codes', 'faculty_code', 'IN'),
+    ('date_from', 'date', '>='),
+    ('date_to', 'date', '<='),
+)
+
+# Singular keys win over their list form, as in the original build_where_clause
+_SUPERSEDED_BY = {'province_codes': 'province_code', 'university_codes': 'university_code',
+                  'faculty_codes': 'faculty_code'}
+
+# UserContext.data_filters keys that restrict rows
+CONTEXT_FILTERS = ('province_code', 'university_code', 'faculty_code')
+
+# Tables not partitioned by organization (system monitoring, reference data):
+# access restrictions don't apply
+UNSCOPED_TABLES = {'monitor_data', 'province'}
+
+
+class TableColumns:
+    """Declared columns of one table: lower-cased name -> (name, declared type)"""
+    
+    def __init__(self, table: str, columns: Dict[str, Tuple[str, str]]):
+        self.table = table
+        self.columns = columns
+    
+    def column_for(self, field: str) -> Optional[str]:
+        for candidate in FILTER_COLUMNS.get(field, (field,)):
+            if candidate in self.columns:
+                return self.columns[candidate][0]
+        return None
+    
+    def coerce(self, column: str, value: Any) -> Any:
+        """
+        Bind value with the column's type so the comparison needs no affinity
+        conversion: numeric text for INTEGER columns, numbers for TEXT columns
+        """
+        declared = self.columns[column.lower()][1].upper()
+        if 'INT' in declared and isinstance(value, str):
+            try:
+                return int(value.strip())
+            except ValueError:
+                return value
+        if ('TEXT' in declared or 'CHAR' in declared) and isinstance(value, int) and not isinstance(value, bool):
+            return str(value)
+        return value
+
+
+_tables: Dict[Tuple[str, str], TableColumns] = {}
+_tables_lock = threading.Lock()
+
+
+def cached_table_columns(db_path: str, table: str) -> Optional[TableColumns]:
+    with _tables_lock:
+        return _tables.get((db_path, table.lower()))
+
+
+def table_columns(conn: sqlite3.Connection, db_path: str, table: str) -> TableColumns:
+    """Column metadata of table (cached per database until clear_table_cache)"""
+    cached = cached_table_columns(db_path, table)
+    if cached is not None:
+        return cached
+    rows = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+    info = TableColumns(table, {row[1].lower(): (row[1], row[2] or '') for row in rows})
+    if rows:
+        # Missing tables aren't cached: a sync may create them
+        with _tables_lock:
+            _tables[(db_path, table.lower())] = info
+    return info
+
+
+def clear_table_cache():
+    """Forget column metadata (after syncs/migrations change a schema)"""
+    with _tables_lock:
+        _tables.clear()
+
+
+def _values(value: Any) -> List[Any]:
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def filter_predicates(table: TableColumns, filters: Optional[Dict[str, Any]],
+                      context: Optional[UserContext] = None) -> List[Tuple[str, str, List[Any]]]:
+    """
+    (column, operator, values) predicates for request filters plus the
+    context's access restriction on table
+    
+    Raises FilterError when a requested filter, or an access restriction on
+    an organization-scoped table, has no column in the table - dropping it
+    would return rows the request (or the user) must not see.
+    """
+    filters = filters or {}
+    wanted: List[Tuple[str, str, List[Any], str]] = []
+    for key, field, operator in REQUEST_FILTERS:
+        value = filters.get(key)
+        if not value or (key in _SUPERSEDED_BY and filters.get(_SUPERSEDED_BY[key])):
+            continue
+        if operator == 'IN' and not isinstance(value, list):
+            continue
+        wanted.append((field, operator, _values(value), key))
+    if context is not None and table.table.lower() not in UNSCOPED_TABLES:
+        for field in CONTEXT_FILTERS:
+            value = context.data_filters.get(field)
+            if value:
+                wanted.append((field, '=', [value], f"access restriction {field}"))
+    
+    predicates: List[Tuple[str, str, List[Any]]] = []
+    for field, operator, values, source in wanted:
+        column = table.column_for(field)
+        if column is None:
+            raise FilterError(f"{table.table} has no column for {source}")
+        values = [table.coerce(column, value) for value in values]
+        if operator == 'IN' and len(values) == 1:
+            operator = '='
+        predicate = (column, operator, values)
+        if predicate not in predicates:  # e.g. a province filter repeating the user's own province
+            predicates.append(predicate)
+    return predicates
+
+
+@lru_cache(maxsize=1024)
+def _where_sql(shape: Tuple[Tuple[str, str, int], ...], extra: Tuple[str, ...], existing_where: bool) -> str:
+    """WHERE clause text for one filter shape (columns, operators, list sizes)"""
+    conditions = list(extra)
+    for column, operator, count in shape:
+        if operator == 'IN':
+            conditions.append(f"{column} IN ({', '.join('?' * count)})")
+        else:
+            conditions.append(f"{column} {operator} ?")
+    if not conditions:
+        return ""
+    return (" AND " if existing_where else " WHERE ") + " AND ".join(conditions)
+
+
+def compile_where(table: TableColumns, filters: Optional[Dict[str, Any]], context: Optional[UserContext] = None,
+                  extra: Sequence[str] = (), existing_where: bool = False) -> Tuple[str, List[Any]]:
+    """
+    WHERE clause and parameters for filters and context on table
+    
+    Args:
+        table: column metadata of the queried table
+        filters: request filters (province_code(s), university_code(s), faculty_code(s), date_from/to)
+        context: UserContext whose access restriction is added
+        extra: constant SQL conditions ANDed in first (no parameters)
+        existing_where: the query already has a WHERE; return " AND ..." instead
+    
+    Returns:
+        (" WHERE ..." or " AND ..." or "", params); the clause text is cached per
+        filter shape, so equal shapes share one SQL string (and sqlite3's
+        statement cache entry)
+    """
+    predicates = filter_predicates(table, filters, context)
+    shape = tuple((column, operator, len(values)) for column, operator, values in predicates)
+    params = [value for _, _, values in predicates for value in values]
+    return _where_sql(shape, tuple(extra), existing_where), params
+
+
+_CLAUSE_TOKENS = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|[()]"
+    r"|\b(?:FROM|WHERE|GROUP\s+BY|HAVING|WINDOW|ORDER\s+BY|LIMIT|UNION|INTERSECT|EXCEPT)\b",
+    re.IGNORECASE,
+)
+_PLACEHOLDERS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\?")
+_AFTER_WHERE = ('GROUP', 'HAVING', 'WINDOW', 'ORDER', 'LIMIT')
+_COMPOUND = ('UNION', 'INTERSECT', 'EXCEPT')
+
+
+def main_table(query: str) -> Optional[str]:
+    """Table named by the top-level FROM of a SELECT (None for subqueries)"""
+    for match, word in _top_level_clauses(query):
+        if word == 'FROM':
+            table = re.match(r'\s*"?(\w+)"?', query[match.end():])
+            return table.group(1) if table else None
+    return None
+
+
+def _top_level_clauses(query: str):
+    depth = 0
+    for match in _CLAUSE_TOKENS.finditer(query):
+        token = match.group(0)
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0 and token[0] not in "'\"":
+            yield match, token.split()[0].upper()
+
+
+def splice_where(query: str, condition: str) -> Tuple[str, int]:
+    """
+    AND condition into the top-level WHERE of a SELECT, before any
+    GROUP BY/HAVING/ORDER BY/LIMIT (adding the WHERE if there is none)
+    
+    Returns:
+        (new query, number of ? placeholders before the condition - where its
+        parameters go in the parameter list)
+    """
+    where = None
+    end = len(query)
+    for match, word in _top_level_clauses(query):
+        if word in _COMPOUND:
+            raise FilterError("can't add access restrictions to a compound SELECT")
+        if word == 'WHERE' and where is None:
+            where = match
+        elif word in _AFTER_WHERE:
+            end = match.start()
+            break
+    position = sum(1 for match in _PLACEHOLDERS.finditer(query, 0, end) if match.group(0) == '?')
+    head, tail = query[:end].rstrip(), query[end:]
+    if where is not None:
+        existing = query[where.end():end].strip()
+        return f"{query[:where.start()]}WHERE ({existing}) AND {condition}\n{tail}", position
+    return f"{head} WHERE {condition}\n{tail}", position
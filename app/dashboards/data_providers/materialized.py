@@ -0,0 +1,257 @@
+"""
+Materialized Aggregates
+Pre-aggregated summary tables in faculty_data.db, rebuilt after each
+students/faculty sync and read by data providers instead of raw rows
+"""
+import logging
+import random
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from dashboards.config import DashboardConfig
+from dashboards.data_version import DataVersions
+
+logger = logging.getLogger(__name__)
+
+# Filters aggregate tables can answer (everything else goes to the raw tables)
+AGGREGATE_FILTERS = ('province_code', 'province_codes')
+
+META_TABLE = 'agg_meta'
+
+# name -> source (data version), FROM clause and columns as
+# (column, expression, (table, column) it is copied from or None if computed)
+AGGREGATES: Dict[str, Dict[str, Any]] = {
+    'agg_students': {
+        'source': 'students',
+        'from': 'Students',
+        'columns': [
+            ('sex', 'sex', ('Students', 'sex')),
+            ('vazeiyat', 'vazeiyat', ('Students', 'vazeiyat')),
+            ('province', 'province', ('Students', 'province')),
+            ('province_trim', 'trim(province)', None),
+            ('course_name', 'course_name', ('Students', 'course_name')),
+            ('gradname', 'gradname', ('Students', 'gradname')),
+            ('grade_key', 'CASE WHEN grade = 1 THEN 1 WHEN grade = 2 THEN 2 '
+                          'WHEN grade = 3 THEN 3 WHEN grade = 4 THEN 4 ELSE 0 END', None),
+            ('student_prefix', 'SUBSTR(studentnum, 1, 3)', None),
+            ('term_year', 'substr(term, 1, 3)', None),
+            ('province_code', 'province_code', ('Students', 'province_code')),
+        ],
+    },
+    'agg_faculty': {
+        'source': 'faculty',
+        'from': 'faculty',
+        'columns': [
+            ('province_code', 'province_code', ('faculty', 'province_code')),
+            ('code_markaz', 'code_markaz', ('faculty', 'code_markaz')),
+            ('markaz', 'markaz', ('faculty', 'markaz')),
+            ('sex', 'sex', ('faculty', 'sex')),
+            ('field', 'field', ('faculty', 'field')),
+            ('estekhdamtype', 'estekhdamtype', ('faculty', 'estekhdamtype')),
+            ('estekhdamtype_title', 'estekhdamtype_title', ('faculty', 'estekhdamtype_title')),
+        ],
+    },
+    'agg_faculty_golestan': {
+        'source': 'faculty',
+        'from': 'faculty LEFT OUTER JOIN faculty_golestan ON (faculty.professorCode = faculty_golestan.professorCode)',
+        'columns': [
+            ('province_code', 'faculty.province_code', ('faculty', 'province_code')),
+            ('group_title', 'faculty_golestan.group_title', ('faculty_golestan', 'group_title')),
+            ('grade', 'faculty_golestan.grade', ('faculty_golestan', 'grade')),
+            ('last_certificate', 'faculty_golestan.last_certificate', ('faculty_golestan', 'last_certificate')),
+            ('estekhdamtype_golestan', 'faculty_golestan.estekhdamtype_golestan',
+             ('faculty_golestan', 'estekhdamtype_golestan')),
+        ],
+    },
+}
+
+
+def aggregate_is_current(conn: sqlite3.Connection, name: str) -> bool:
+    """Whether `name` was built from the current version of its source data"""
+    try:
+        row = conn.execute(
+            f"SELECT source, data_version FROM {META_TABLE} WHERE name = ?", (name,)
+        ).fetchone()
+    except sqlite3.Error:
+        return False  # never built
+    return row is not None and row[1] == DataVersions.get(row[0])
+
+
+def _column_types(conn: sqlite3.Connection, table: str) -> Dict[str, str]:
+    return {row[1].lower(): row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _build(conn: sqlite3.Connection, name: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Build one aggregate table and record it in agg_meta (single transaction)"""
+    version = DataVersions.get(spec['source'])
+    start = time.perf_counter()
+    types = {}
+    definitions = []
+    for column, _, copied_from in spec['columns']:
+        # Copied columns keep the raw column's declared type (same affinity, so
+        # filters and GROUP BY compare exactly as on the raw table); computed
+        # ones are untyped and store the expression's value as is
+        declared = ''
+        if copied_from:
+            table, source_column = copied_from
+            if table not in types:
+                types[table] = _column_types(conn, table)
+            declared = types[table].get(source_column.lower(), '')
+        definitions.append(f"{column} {declared}".strip())
+    expressions = ", ".join(expression for _, expression, _ in spec['columns'])
+    columns = ", ".join(column for column, _, _ in spec['columns'])
+    
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {name}_new")
+        conn.execute(f"CREATE TABLE {name}_new ({', '.join(definitions)}, n INTEGER NOT NULL)")
+        conn.execute(f"""
+            INSERT INTO {name}_new ({columns}, n)
+            SELECT {expressions}, COUNT(*)
+            FROM {spec['from']}
+            GROUP BY {expressions}
+        """)
+        conn.execute(f"DROP TABLE IF EXISTS {name}")
+        conn.execute(f"ALTER TABLE {name}_new RENAME TO {name}")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_province_code ON {name} (province_code)")
+        rows, source_rows = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(n), 0) FROM {name}").fetchone()
+        seconds = round(time.perf_counter() - start, 3)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {META_TABLE} (
+                name TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                data_version INTEGER NOT NULL,
+                rows INTEGER,
+                source_rows INTEGER,
+                built_at REAL,
+                seconds REAL
+            )
+        """)
+        conn.execute(
+            f"INSERT OR REPLACE INTO {META_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (name, spec['source'], version, rows, source_rows, time.time(), seconds),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return {'name': name, 'rows': rows, 'source_rows': source_rows, 'seconds': seconds, 'data_version': version}
+
+
+def rebuild_aggregates(db_path: Optional[str] = None, sources: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    (Re)build aggregate tables
+    
+    Each table is swapped in atomically and stamped with its source's current
+    data version; providers only read tables whose stamp matches, so call
+    this after bumping the data version of a sync.
+    
+    Args:
+        db_path: Database path (default DashboardConfig.FACULTY_DB)
+        sources: Only rebuild tables of these data sources (default all)
+    
+    Returns:
+        One dict per table built (name, rows, source_rows, seconds, data_version)
+    """
+    db_path = db_path or DashboardConfig.FACULTY_DB
+    sources = set(sources) if sources is not None else None
+    built = []
+    conn = sqlite3.connect(db_path, timeout=DashboardConfig.DB_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    try:
+        for name, spec in AGGREGATES.items():
+            if sources is not None and spec['source'] not in sources:
+                continue
+            result = _build(conn, name, spec)
+            logger.info(
+                f"Built {name}: {result['rows']:,} rows from {result['source_rows']:,} in {result['seconds']}s"
+            )
+            built.append(result)
+    finally:
+        conn.close()
+    return built
+
+
+def aggregate_status(db_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """agg_meta rows plus whether each table is current"""
+    db_path = db_path or DashboardConfig.FACULTY_DB
+    conn = sqlite3.connect(db_path)
+    try:
+        try:
+            rows = conn.execute(
+                f"SELECT name, source, data_version, rows, source_rows, built_at, seconds FROM {META_TABLE}"
+            ).fetchall()
+        except sqlite3.Error:
+            rows = []
+        built = {row[0]: row for row in rows}
+        result = []
+        for name, spec in AGGREGATES.items():
+            row = built.get(name)
+            result.append({
+                'name': name,
+                'source': spec['source'],
+                'built': row is not None,
+                'current': row is not None and aggregate_is_current(conn, name),
+                'data_version': row[2] if row else None,
+                'rows': row[3] if row else None,
+                'source_rows': row[4] if row else None,
+                'built_at': row[5] if row else None,
+                'seconds': row[6] if row else None,
+            })
+        return result
+    finally:
+        conn.close()
+
+
+def _faculty_checks() -> Dict[str, Callable]:
+    from .faculty import FacultyDataProvider
+    names = [
+        'get_faculty_by_sex', 'get_faculty_by_markaz', 'get_faculty_by_field', 'get_faculty_by_type',
+        'get_faculty_by_type_and_sex', 'get_faculty_by_province', 'get_faculty_by_edugroup',
+        'get_faculty_by_grade', 'get_faculty_by_certificate', 'get_faculty_type_golestan',
+    ]
+    return {name: getattr(FacultyDataProvider, name) for name in names}
+
+
+def check_aggregates(db_path: Optional[str] = None, province_codes: Optional[Iterable[int]] = None) -> List[str]:
+    """
+    Compare provider results from aggregate tables with raw-table queries
+    
+    Args:
+        db_path: Database path (default DashboardConfig.FACULTY_DB)
+        province_codes: Provinces to check filtered results for (default all in the data)
+    
+    Returns:
+        Problems found (empty list = consistent)
+    """
+    from .faculty import FacultyDataProvider
+    from .students import StudentsDataProvider
+    
+    db_path = db_path or DashboardConfig.FACULTY_DB
+    problems = [
+        f"{status['name']}: {'stale' if status['built'] else 'not built'}"
+        for status in aggregate_status(db_path) if not status['current']
+    ]
+    if problems:
+        return problems
+    
+    students = StudentsDataProvider(db_path=db_path)
+    faculty = FacultyDataProvider(db_path=db_path)
+    if province_codes is None:
+        rows = faculty.execute_query("SELECT DISTINCT province_code FROM agg_students WHERE province_code IS NOT NULL")
+        province_codes = sorted(row[0] for row in rows)
+    filter_sets = [{}] + [{'province_code': code} for code in province_codes]
+    
+    checks = [('StudentsDataProvider.get_dashboard_data', students, StudentsDataProvider.get_dashboard_data)]
+    checks += [(f"FacultyDataProvider.{name}", faculty, method) for name, method in _faculty_checks().items()]
+    
+    for label, provider, method in checks:
+        for filters in filter_sets:
+            results = []
+            for use_aggregates in (False, True):
+                provider.use_aggregates = use_aggregates
+                # province_vazeiyat_data picks random colors
+                random.seed(0)
+                results.append(method(provider, None, dict(filters)))
+            if results[0] != results[1]:
+                problems.append(f"{label} differs for filters {filters}")
+    return problems
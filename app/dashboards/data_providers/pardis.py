@@ -23,7 +23,7 @@ class PardisDataProvider(DataProvider):
             e.g., {1: {1: 5, 2: 3, 3: 2}}  # province 1 has 5 pardis, 3 markaz, 2 daneshkade
         """
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters)
+        where_clause, params = self.where_clause('pardis', filters, context)
         
         query = f"""
             SELECT province_code, type, COUNT(*) as cnt
@@ -32,7 +32,7 @@ class PardisDataProvider(DataProvider):
             GROUP BY province_code, type
         """
         
-        results = self.execute_query(query, tuple(params), context)
+        results = self.execute_query(query, tuple(params))
         
         province_data = defaultdict(lambda: {1: 0, 2: 0, 3: 0, 4: 0})
         for province_code, type_id, count in results:
@@ -0,0 +1,138 @@
+"""
+Query Profiler
+Opt-in per-query timing for DataProvider.execute_query: duration, row count,
+calling provider method and, for slow queries, EXPLAIN QUERY PLAN
+"""
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from dashboards.config import DashboardConfig
+
+MAX_SQL_CHARS = 4000
+MAX_PARAMS_CHARS = 500
+
+
+def _collapse(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _caller_name(frame) -> str:
+    """'Class.method' (or function name) of the frame that issued the query"""
+    if frame is None:
+        return '?'
+    code = frame.f_code
+    return getattr(code, 'co_qualname', code.co_name)
+
+
+def explain_query_plan(conn: sqlite3.Connection, query: str, params: tuple = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN rows as indented lines (nesting follows the plan tree)"""
+    depth: Dict[int, int] = {}
+    lines = []
+    for node_id, parent, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall():
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+class QueryProfiler:
+    """
+    Bounded logs of recent and of slow queries, plus per-method totals
+    
+    Nothing is recorded unless DashboardConfig.QUERY_PROFILING_ENABLED; the
+    providers check the flag before timing, so disabled cost is one
+    attribute lookup per query.
+    """
+    
+    _lock = threading.Lock()
+    _recent: Deque[Dict[str, Any]] = deque(maxlen=DashboardConfig.QUERY_LOG_SIZE)
+    # Kept apart so a burst of fast queries doesn't push slow ones out
+    _slow: Deque[Dict[str, Any]] = deque(maxlen=DashboardConfig.QUERY_LOG_SIZE)
+    _methods: Dict[str, Dict[str, float]] = {}
+    
+    @classmethod
+    def record(cls, provider: str, query: str, params: tuple, seconds: float, rows: int,
+               conn: Optional[sqlite3.Connection] = None, caller=None):
+        """
+        Record one executed query
+        
+        Args:
+            provider: provider class name
+            query: SQL as executed (after context filters)
+            params: query parameters
+            seconds: execute + fetch wall time
+            rows: rows returned
+            conn: connection the query ran on (for EXPLAIN QUERY PLAN of slow queries)
+            caller: frame of the provider method that issued the query
+        """
+        method = _caller_name(caller)
+        if '.' not in method:
+            # Module-level helper running a provider's query
+            method = f"{provider}:{method}"
+        ms = seconds * 1000
+        slow = ms >= DashboardConfig.SLOW_QUERY_MS
+        plan = None
+        if slow and conn is not None:
+            try:
+                plan = explain_query_plan(conn, query, params)
+            except sqlite3.Error as e:
+                plan = [f"EXPLAIN failed: {e}"]
+        
+        now = time.time()
+        entry = {
+            'at': now,
+            'time': time.strftime("%H:%M:%S", time.localtime(now)),
+            'method': method,
+            'ms': round(ms, 2),
+            'rows': rows,
+            'slow': slow,
+            'sql': _collapse(query)[:MAX_SQL_CHARS],
+            'params': repr(tuple(params))[:MAX_PARAMS_CHARS],
+            'plan': plan,
+        }
+        with cls._lock:
+            cls._recent.append(entry)
+            if slow:
+                cls._slow.append(entry)
+            stats = cls._methods.setdefault(method, {'count': 0, 'slow': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0})
+            stats['count'] += 1
+            stats['slow'] += slow
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+            stats['rows'] += rows
+    
+    @classmethod
+    def entries(cls, slow_only: bool = False) -> List[Dict[str, Any]]:
+        """Logged queries, newest first"""
+        with cls._lock:
+            log = list(cls._slow if slow_only else cls._recent)
+        log.reverse()
+        return log
+    
+    @classmethod
+    def summary(cls) -> List[Dict[str, Any]]:
+        """Per-method totals since the last reset, slowest total first"""
+        with cls._lock:
+            methods = {method: dict(stats) for method, stats in cls._methods.items()}
+        result = []
+        for method, stats in methods.items():
+            result.append({
+                'method': method,
+                'count': stats['count'],
+                'slow': stats['slow'],
+                'rows': stats['rows'],
+                'total_ms': round(stats['total_ms'], 1),
+                'avg_ms': round(stats['total_ms'] / stats['count'], 2),
+                'max_ms': round(stats['max_ms'], 2),
+            })
+        result.sort(key=lambda stats: stats['total_ms'], reverse=True)
+        return result
+    
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._recent.clear()
+            cls._slow.clear()
+            cls._methods.clear()
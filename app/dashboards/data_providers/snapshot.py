@@ -0,0 +1,301 @@
+"""
+Students Columnar Snapshot
+In-process, dictionary-encoded NumPy copy of the Students columns dashboards
+group by, so filtered group-bys don't go back to SQLite
+"""
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from dashboards.config import DashboardConfig
+from dashboards.context import UserContext
+from dashboards.data_providers.filters import CONTEXT_FILTERS
+from dashboards.data_version import DataVersions
+
+try:
+    import numpy as np
+except ImportError:  # optional: providers fall back to SQL
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Request filters the snapshot can't answer (columns it doesn't
+# hold); requests using them go to SQL unchanged
+SQL_ONLY_FILTERS = ('university_code', 'university_codes', 'faculty_code', 'faculty_codes', 'date_from', 'date_to')
+
+# Context access restrictions the snapshot applies, and the column each
+# compares; a context restricted any other way goes to SQL
+SNAPSHOT_CONTEXT_COLUMNS = {'province_code': 'province_code', 'faculty_code': 'code_markaz'}
+
+# Loaded in one pass over Students; derived values are computed by SQLite
+# so grouping matches the SQL queries exactly
+LOAD_BATCH = 100_000
+
+
+class StudentsSnapshot:
+    """
+    Dictionary-encoded columns of Students
+    
+    Every column is a NumPy array of codes into that column's list of
+    distinct values (`values[column][code]`). Group-bys combine the codes of
+    the grouped columns into one integer key per row and count keys.
+    """
+    
+    def __init__(self, columns: Dict[str, Any], values: Dict[str, List[Any]], rows: int,
+                 data_version: int, db_path: str, load_seconds: float = 0.0):
+        self.columns = columns
+        self.values = values
+        self.rows = rows
+        self.data_version = data_version
+        self.db_path = db_path
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+        # value -> code, for translating filters
+        self._codes = {name: {value: code for code, value in enumerate(vals)} for name, vals in values.items()}
+    
+    @classmethod
+    def load(cls, db_path: str, expressions: Sequence[Tuple[str, str]]) -> 'StudentsSnapshot':
+        """
+        Read Students into a snapshot
+        
+        Args:
+            db_path: faculty_data.db path
+            expressions: (column name, SQL expression) pairs to load
+        """
+        if np is None:
+            raise RuntimeError("numpy is not installed")
+        start = time.perf_counter()
+        # Stamp before reading: a sync finishing mid-load makes the snapshot stale, not wrong
+        data_version = DataVersions.get('students')
+        names = [name for name, _ in expressions]
+        lookups: List[Dict[Any, int]] = [{} for _ in names]
+        chunks: List[List[Any]] = [[] for _ in names]
+        rows = 0
+        
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=DashboardConfig.DB_BUSY_TIMEOUT_MS / 1000)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(sql for _, sql in expressions)} FROM Students")
+            while True:
+                batch = cursor.fetchmany(LOAD_BATCH)
+                if not batch:
+                    break
+                rows += len(batch)
+                for i, column in enumerate(zip(*batch)):
+                    lookup = lookups[i]
+                    chunks[i].append(np.fromiter(
+                        (lookup.setdefault(value, len(lookup)) for value in column),
+                        dtype=np.int32, count=len(batch),
+                    ))
+        finally:
+            conn.close()
+        
+        columns = {}
+        values = {}
+        for name, lookup, parts in zip(names, lookups, chunks):
+            codes = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32)
+            columns[name] = codes.astype(np.min_scalar_type(max(len(lookup) - 1, 0)))
+            values[name] = list(lookup)
+        return cls(columns, values, rows, data_version, db_path, round(time.perf_counter() - start, 3))
+    
+    def memory_bytes(self) -> int:
+        """Approximate memory held: code arrays plus the distinct values"""
+        total = sum(codes.nbytes for codes in self.columns.values())
+        for vals in self.values.values():
+            total += sys.getsizeof(vals) + sum(sys.getsizeof(value) for value in vals)
+        return total
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            'rows': self.rows,
+            'data_version': self.data_version,
+            'current': self.data_version == DataVersions.get('students'),
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'memory_bytes': self.memory_bytes(),
+            'columns': {name: len(vals) for name, vals in self.values.items()},
+        }
+    
+    def _match(self, column: str, wanted: Sequence[Any]):
+        """Row mask of `column IN (wanted)` (SQL equality on the stored values)"""
+        codes = [self._codes[column][value] for value in wanted if value in self._codes[column]]
+        return np.isin(self.columns[column], np.array(codes, dtype=self.columns[column].dtype))
+    
+    @staticmethod
+    def answers(filters: Optional[Dict[str, Any]], context: Optional[UserContext] = None) -> bool:
+        """Whether the snapshot holds every column these filters and the context's restriction compare"""
+        if any((filters or {}).get(key) for key in SQL_ONLY_FILTERS):
+            return False
+        if context is None:
+            return True
+        return not any(context.data_filters.get(field) for field in CONTEXT_FILTERS
+                       if field not in SNAPSHOT_CONTEXT_COLUMNS)
+    
+    def mask(self, filters: Optional[Dict[str, Any]], context: Optional[UserContext] = None):
+        """
+        Row mask for request filters plus the context's access restriction
+        (None = all rows); check answers(filters, context) first
+        
+        Mirrors DataProvider.where_clause on Students: province_code/
+        province_codes on province_code, a context province on province_code
+        and a context faculty on code_Markaz.
+        """
+        filters = filters or {}
+        conditions: List[Tuple[str, List[Any]]] = []
+        if filters.get('province_code'):
+            conditions.append(('province_code', [filters['province_code']]))
+        elif isinstance(filters.get('province_codes'), list) and filters['province_codes']:
+            conditions.append(('province_code', list(filters['province_codes'])))
+        if context is not None:
+            for field, column in SNAPSHOT_CONTEXT_COLUMNS.items():
+                if context.data_filters.get(field):
+                    conditions.append((column, [context.data_filters[field]]))
+        
+        result = None
+        for column, wanted in conditions:
+            match = self._match(column, _sql_equal_candidates(wanted))
+            result = match if result is None else (result & match)
+        return result
+    
+    def group_count(self, dimensions: Sequence[str], mask=None) -> List[tuple]:
+        """
+        `SELECT <dimensions>, COUNT(*) ... GROUP BY <dimensions>` over the
+        masked rows, as (values..., count) tuples in no particular order
+        """
+        sizes = [max(len(self.values[name]), 1) for name in dimensions]
+        selected = [self.columns[name] if mask is None else self.columns[name][mask] for name in dimensions]
+        combinations = 1
+        for size in sizes:
+            combinations *= size
+        if combinations >= 2 ** 62:
+            # Key would overflow int64: group the code tuples directly
+            stacked = np.stack([codes.astype(np.int64) for codes in selected], axis=1)
+            groups, counts = np.unique(stacked, axis=0, return_counts=True)
+            columns = [[self.values[name][code] for code in groups[:, i].tolist()] for i, name in enumerate(dimensions)]
+            return [tuple(row) + (count,) for row, count in zip(zip(*columns), counts.tolist())]
+        
+        # Mixed-radix key: one integer per combination of codes
+        key = np.zeros(len(selected[0]) if selected else 0, dtype=np.int64)
+        for codes, size in zip(selected, sizes):
+            key = key * size + codes
+        if combinations <= max(4 * len(key), 1 << 20):
+            counts = np.bincount(key, minlength=combinations)
+            keys = np.flatnonzero(counts)
+            counts = counts[keys]
+        else:
+            keys, counts = np.unique(key, return_counts=True)
+        
+        decoded = []
+        for size in reversed(sizes):
+            keys, codes = np.divmod(keys, size)
+            decoded.append(codes)
+        decoded.reverse()
+        columns = [
+            [self.values[name][code] for code in codes.tolist()]
+            for name, codes in zip(dimensions, decoded)
+        ]
+        return [tuple(row) + (count,) for row, count in zip(zip(*columns), counts.tolist())]
+
+
+def _sql_equal_candidates(values: Sequence[Any]) -> List[Any]:
+    """
+    Stored values a parameter is SQL-equal to on an INTEGER column: numeric
+    text parameters compare as numbers (column affinity), so '5' matches 5
+    """
+    candidates = []
+    for value in values:
+        candidates.append(value)
+        if isinstance(value, str):
+            try:
+                candidates.append(int(value.strip()))
+            except ValueError:
+                pass
+    return candidates
+
+
+_snapshots: Dict[str, StudentsSnapshot] = {}
+_loading: Dict[str, threading.Thread] = {}
+_lock = threading.Lock()
+
+
+def _too_large(snapshot: StudentsSnapshot) -> bool:
+    limit = DashboardConfig.STUDENTS_SNAPSHOT_MAX_MB * 1024 * 1024
+    return limit > 0 and snapshot.memory_bytes() > limit
+
+
+def load_snapshot(db_path: str, expressions: Sequence[Tuple[str, str]]) -> Optional[StudentsSnapshot]:
+    """Load and install the snapshot for db_path now (e.g. right after a sync)"""
+    snapshot = StudentsSnapshot.load(db_path, expressions)
+    if _too_large(snapshot):
+        logger.warning(
+            f"Students snapshot of {db_path} needs {snapshot.memory_bytes() / 1e6:.0f} MB, over "
+            f"DASHBOARD_STUDENTS_SNAPSHOT_MAX_MB; serving Students from SQL"
+        )
+        with _lock:
+            _snapshots.pop(db_path, None)
+        return None
+    with _lock:
+        _snapshots[db_path] = snapshot
+    logger.info(
+        f"Loaded students snapshot: {snapshot.rows:,} rows, {snapshot.memory_bytes() / 1e6:.1f} MB "
+        f"in {snapshot.load_seconds}s (data version {snapshot.data_version})"
+    )
+    return snapshot
+
+
+def get_snapshot(db_path: str, expressions: Sequence[Tuple[str, str]]) -> Optional[StudentsSnapshot]:
+    """
+    Current snapshot for db_path, or None (use SQL)
+    
+    A missing or stale snapshot is (re)loaded in the background; requests
+    use SQL until it is ready.
+    """
+    if not DashboardConfig.STUDENTS_SNAPSHOT_ENABLED or np is None:
+        return None
+    with _lock:
+        snapshot = _snapshots.get(db_path)
+        if snapshot is not None and snapshot.data_version == DataVersions.get('students'):
+            return snapshot
+        loader = _loading.get(db_path)
+        if loader is None or not loader.is_alive():
+            loader = threading.Thread(
+                target=_background_load, args=(db_path, list(expressions)),
+                name="students-snapshot", daemon=True,
+            )
+            _loading[db_path] = loader
+            loader.start()
+    return None
+
+
+def _background_load(db_path: str, expressions: List[Tuple[str, str]]):
+    try:
+        load_snapshot(db_path, expressions)
+    except Exception as e:
+        logger.warning(f"Could not load students snapshot of {db_path}: {e}", exc_info=True)
+
+
+def wait_for_snapshot_load(db_path: str, timeout: Optional[float] = None):
+    """Block until a background load of db_path finishes (tests, scripts)"""
+    with _lock:
+        loader = _loading.get(db_path)
+    if loader is not None:
+        loader.join(timeout)
+
+
+def drop_snapshots():
+    with _lock:
+        _snapshots.clear()
+
+
+def snapshot_status() -> Dict[str, Any]:
+    """Loaded snapshots (for admin pages)"""
+    with _lock:
+        snapshots = dict(_snapshots)
+        loading = [path for path, thread in _loading.items() if thread.is_alive()]
+    return {
+        'enabled': DashboardConfig.STUDENTS_SNAPSHOT_ENABLED and np is not None,
+        'max_mb': DashboardConfig.STUDENTS_SNAPSHOT_MAX_MB,
+        'snapshots': {path: snapshot.status() for path, snapshot in snapshots.items()},
+        'loading': loading,
+    }
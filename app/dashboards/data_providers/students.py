@@ -2,13 +2,16 @@
 Students Data Provider
 Provides student-related data with context-aware filtering
 """
-from typing import Dict, List, Optional, Set, Any
+from typing import Dict, List, Optional, Set, Any, Tuple
 from collections import defaultdict
 import locale
 import random
+from .aggregation import AggregationCube, sql_sort_key
 from .base import DataProvider
+from .snapshot import StudentsSnapshot, get_snapshot, load_snapshot
 from dashboards.config import DashboardConfig
 from dashboards.context import UserContext
+from dashboards.data_version import DataVersions
 
 # Persian sort order
 persian_order = 'اآبپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی'
@@ -19,9 +22,31 @@ def persian_sort_key(word):
 class StudentsDataProvider(DataProvider):
     """Data provider for student-related data"""
     
+    # (db_path, students data version) -> whether Students has the derived columns
+    _derived_columns: Dict[Tuple[str, int], bool] = {}
+    
     def get_default_db_path(self) -> str:
         return DashboardConfig.FACULTY_DB
     
+    def year_columns(self) -> Tuple[str, str]:
+        """
+        Expressions for a student's entrance year and term year
+        
+        The indexed entrance_year/term_year columns when Students has them
+        (migrations/add_students_derived_columns.py), else the SUBSTR
+        expressions they are derived from. Re-checked on every new students
+        data version.
+        """
+        key = (self.db_path, DataVersions.get('students'))
+        present = self._derived_columns.get(key)
+        if present is None:
+            with self.connection() as conn:
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(Students)")}
+            present = self._derived_columns[key] = {'entrance_year', 'term_year'} <= columns
+        if present:
+            return 'entrance_year', 'term_year'
+        return 'SUBSTR(studentnum, 1, 3)', 'substr(term, 1, 3)'
+    
     def get_students_by_grade_and_year(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, Any]:
         """
         Get students grouped by grade and entrance year
@@ -30,26 +55,16 @@ class StudentsDataProvider(DataProvider):
             Dict with labels (years) and datasets (one per grade)
         """
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
         
-        # Build base WHERE conditions for students
-        base_conditions = [
+        # Base WHERE conditions for students, combined with filters
+        base_conditions = (
             "degsdate IS NOT NULL",
             "LENGTH(degsdate) >= 4",
             "studentnum IS NOT NULL",
             "LENGTH(studentnum) >= 4",
-            "gradname IS NOT NULL"
-        ]
-        
-        # Combine base conditions with filters
-        all_conditions = base_conditions.copy()
-        if where_clause:
-            # Remove "WHERE " prefix if exists
-            filter_conditions = where_clause.replace("WHERE ", "").strip()
-            if filter_conditions:
-                all_conditions.append(filter_conditions)
-        
-        students_where = "WHERE " + " AND ".join(all_conditions) if all_conditions else ""
+            "gradname IS NOT NULL",
+        )
+        students_where, params = self.where_clause('Students', filters, context, extra=base_conditions)
         
         # Get all distinct grades
         query_grades = f"""
@@ -57,18 +72,19 @@ class StudentsDataProvider(DataProvider):
             FROM Students 
             {students_where}
         """
-        grades = [row[0] for row in self.execute_query(query_grades, tuple(params), context)]
+        grades = [row[0] for row in self.execute_query(query_grades, tuple(params))]
         
         # Get total faculty count for ratio calculation
         # Build faculty query with same filters
-        faculty_where, faculty_params = self.build_where_clause(filters, existing_where=False)
+        faculty_where, faculty_params = self.where_clause('faculty', filters, context)
         query_faculty = f"SELECT COUNT(*) FROM faculty{faculty_where}"
-        total_faculty_result = self.execute_query(query_faculty, tuple(faculty_params), context)
+        total_faculty_result = self.execute_query(query_faculty, tuple(faculty_params))
         total_faculty = total_faculty_result[0][0] if total_faculty_result else 0
         
         # Get students per year per grade
+        entrance_year, _ = self.year_columns()
         query = f"""
-            SELECT SUBSTR(studentnum, 0, 4) AS entrance_year,
+            SELECT {entrance_year} AS entrance_year,
                    gradname,
                    COUNT(*) AS student_count
             FROM Students
@@ -77,7 +93,7 @@ class StudentsDataProvider(DataProvider):
             ORDER BY entrance_year
         """
         
-        results = self.execute_query(query, tuple(params), context)
+        results = self.execute_query(query, tuple(params))
         
         # Structure: {grade: {year: count}}
         grade_data = {}
@@ -116,22 +132,18 @@ class StudentsDataProvider(DataProvider):
     def get_gender_data(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None, year_404: bool = False) -> Dict[str, Any]:
         """Get gender distribution data"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
-        
         conditions = []
-        if where_clause:
-            conditions.append(where_clause.replace("WHERE ", ""))
         if year_404:
-            conditions.append("SUBSTR(studentnum, 1, 3) = '404'")
-        
-        if conditions:
-            final_where = "WHERE " + " AND ".join(conditions)
-        else:
-            final_where = ""
+            entrance_year, _ = self.year_columns()
+            conditions.append(f"{entrance_year} = '404'")
+        final_where, params = self.where_clause('Students', filters, context, extra=conditions)
         
         query = f"SELECT sex, COUNT(*) as count FROM Students {final_where} GROUP BY sex"
-        results = self.execute_query(query, tuple(params), context)
-        
+        results = self.execute_query(query, tuple(params))
+        return self._gender_result(results)
+    
+    @staticmethod
+    def _gender_result(results: List[tuple]) -> Dict[str, Any]:
         return {
             "labels": [row[0].strip() if row[0] else "نامشخص" for row in results],
             "counts": [row[1] for row in results]
@@ -140,22 +152,18 @@ class StudentsDataProvider(DataProvider):
     def get_vazeiyat_data(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None, year_404: bool = False) -> Dict[str, Any]:
         """Get vazeiyat (status) distribution data"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
-        
         conditions = []
-        if where_clause:
-            conditions.append(where_clause.replace("WHERE ", ""))
         if year_404:
-            conditions.append("SUBSTR(studentnum, 1, 3) = '404'")
-        
-        if conditions:
-            final_where = "WHERE " + " AND ".join(conditions)
-        else:
-            final_where = ""
+            entrance_year, _ = self.year_columns()
+            conditions.append(f"{entrance_year} = '404'")
+        final_where, params = self.where_clause('Students', filters, context, extra=conditions)
         
         query = f"SELECT vazeiyat, COUNT(*) FROM Students {final_where} GROUP BY vazeiyat ORDER BY COUNT(*) DESC"
-        results = self.execute_query(query, tuple(params), context)
-        
+        results = self.execute_query(query, tuple(params))
+        return self._vazeiyat_result(results)
+    
+    @staticmethod
+    def _vazeiyat_result(results: List[tuple]) -> Dict[str, Any]:
         return {
             "labels": [row[0] if row[0] else "نامشخص" for row in results],
             "counts": [row[1] for row in results]
@@ -164,11 +172,14 @@ class StudentsDataProvider(DataProvider):
     def get_province_vazeiyat_data(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, Any]:
         """Get province and vazeiyat distribution data"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
+        where_clause, params = self.where_clause('Students', filters, context)
         
         query = f"SELECT trim(province), vazeiyat, COUNT(*) FROM Students {where_clause} GROUP BY province, vazeiyat ORDER BY trim(province)"
-        results = self.execute_query(query, tuple(params), context)
-        
+        results = self.execute_query(query, tuple(params))
+        return self._province_vazeiyat_result(results)
+    
+    @staticmethod
+    def _province_vazeiyat_result(results: List[tuple]) -> Dict[str, Any]:
         province_vazeiyat = defaultdict(lambda: defaultdict(int))
         for province, vazeiyat, count in results:
             province_vazeiyat[province or "نامشخص"][vazeiyat or "نامشخص"] = count
@@ -192,22 +203,15 @@ class StudentsDataProvider(DataProvider):
     def get_course_data_by_grade(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None, grade: Optional[int] = None) -> Dict[str, Any]:
         """Get course distribution data by grade"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
-        
-        conditions = []
-        if where_clause:
-            conditions.append(where_clause.replace("WHERE ", ""))
-        if grade:
-            conditions.append(f"grade={grade}")
-        
-        if conditions:
-            final_where = "WHERE " + " AND ".join(conditions)
-        else:
-            final_where = ""
+        conditions = [f"grade={int(grade)}"] if grade else []
+        final_where, params = self.where_clause('Students', filters, context, extra=conditions)
         
         query = f"SELECT course_name, COUNT(*) as count FROM Students {final_where} GROUP BY course_name ORDER BY count DESC"
-        results = self.execute_query(query, tuple(params), context)
-        
+        results = self.execute_query(query, tuple(params))
+        return self._labels_counts_result(results)
+    
+    @staticmethod
+    def _labels_counts_result(results: List[tuple]) -> Dict[str, Any]:
         return {
             "labels": [row[0] for row in results],
             "counts": [row[1] for row in results]
@@ -216,43 +220,39 @@ class StudentsDataProvider(DataProvider):
     def get_grade_data(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, Any]:
         """Get grade distribution data"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
+        where_clause, params = self.where_clause('Students', filters, context)
         
         query = f"SELECT gradname, COUNT(*) as count FROM Students {where_clause} GROUP BY gradname"
-        results = self.execute_query(query, tuple(params), context)
-        
-        return {
-            "labels": [row[0] for row in results],
-            "counts": [row[1] for row in results]
-        }
+        results = self.execute_query(query, tuple(params))
+        return self._labels_counts_result(results)
     
     def get_province_data(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, Any]:
         """Get province distribution data"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
+        where_clause, params = self.where_clause('Students', filters, context)
         
         query = f"SELECT province, COUNT(*) as count FROM Students {where_clause} GROUP BY province ORDER BY province"
-        results = self.execute_query(query, tuple(params), context)
-        
-        return {
-            "labels": [row[0] for row in results],
-            "counts": [row[1] for row in results]
-        }
+        results = self.execute_query(query, tuple(params))
+        return self._labels_counts_result(results)
     
     def get_province_year_data(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, Any]:
         """Get province and year distribution data"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
+        where_clause, params = self.where_clause('Students', filters, context)
         
+        _, term_year = self.year_columns()
         query = f"""
-            SELECT substr(term, 1, 3) AS year, province, COUNT(*) AS count
+            SELECT {term_year} AS year, province, COUNT(*) AS count
             FROM Students
             {where_clause}
             GROUP BY year, province
             ORDER BY province, year
         """
-        results = self.execute_query(query, tuple(params), context)
-        
+        results = self.execute_query(query, tuple(params))
+        return self._province_year_result(results)
+    
+    @staticmethod
+    def _province_year_result(results: List[tuple]) -> Dict[str, Any]:
         provinces = sorted(set(row[1] for row in results))
         years = sorted(set(row[0] for row in results))
         
@@ -270,7 +270,7 @@ class StudentsDataProvider(DataProvider):
     def get_province_sex_data(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, Any]:
         """Get province and sex distribution data"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
+        where_clause, params = self.where_clause('Students', filters, context)
         
         query = f"""
             SELECT sex, province, COUNT(*) AS count
@@ -279,8 +279,11 @@ class StudentsDataProvider(DataProvider):
             GROUP BY sex, province
             ORDER BY province, sex
         """
-        results = self.execute_query(query, tuple(params), context)
-        
+        results = self.execute_query(query, tuple(params))
+        return self._province_sex_result(results)
+    
+    @staticmethod
+    def _province_sex_result(results: List[tuple]) -> Dict[str, Any]:
         provinces = sorted(set(row[1] for row in results))
         sex_list = sorted(set(row[0] for row in results))
         
@@ -298,10 +301,11 @@ class StudentsDataProvider(DataProvider):
     def get_year_data(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, Any]:
         """Get entry year distribution data by sex"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
+        where_clause, params = self.where_clause('Students', filters, context)
         
+        entrance_year, _ = self.year_columns()
         query = f"""
-            SELECT SUBSTR(studentnum, 1, 3) as prefix,
+            SELECT {entrance_year} as prefix,
                    COUNT(*) as total,
                    SUM(CASE WHEN sex LIKE '%آقا%' THEN 1 ELSE 0 END) as male,
                    SUM(CASE WHEN sex LIKE '%خانم%' THEN 1 ELSE 0 END) as female
@@ -310,8 +314,11 @@ class StudentsDataProvider(DataProvider):
             GROUP BY prefix
             ORDER BY prefix
         """
-        results = self.execute_query(query, tuple(params), context)
-        
+        results = self.execute_query(query, tuple(params))
+        return self._year_result(results)
+    
+    @staticmethod
+    def _year_result(results: List[tuple]) -> Dict[str, Any]:
         return {
             "labels": [str(1400 + int(row[0]) - 400) for row in results],
             "total": [row[1] for row in results],
@@ -322,10 +329,11 @@ class StudentsDataProvider(DataProvider):
     def get_year_grade_data(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, Any]:
         """Get entry year distribution data by grade"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
+        where_clause, params = self.where_clause('Students', filters, context)
         
+        entrance_year, _ = self.year_columns()
         query = f"""
-            SELECT SUBSTR(studentnum, 1, 3) as prefix,
+            SELECT {entrance_year} as prefix,
                    SUM(CASE WHEN grade = 1 THEN 1 ELSE 0 END) as kardani,
                    SUM(CASE WHEN grade = 2 THEN 1 ELSE 0 END) as napeyvaste,
                    SUM(CASE WHEN grade = 3 THEN 1 ELSE 0 END) as peyvaste,
@@ -335,8 +343,11 @@ class StudentsDataProvider(DataProvider):
             GROUP BY prefix
             ORDER BY prefix
         """
-        results = self.execute_query(query, tuple(params), context)
-        
+        results = self.execute_query(query, tuple(params))
+        return self._year_grade_result(results)
+    
+    @staticmethod
+    def _year_grade_result(results: List[tuple]) -> Dict[str, Any]:
         return {
             "labels": [str(1400 + int(row[0]) - 400) for row in results],
             "kardani": [row[1] for row in results],
@@ -348,29 +359,23 @@ class StudentsDataProvider(DataProvider):
     def get_course_year_data(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None, grade: Optional[int] = None) -> Dict[str, Any]:
         """Get course and year distribution data"""
         filters = filters or {}
-        where_clause, params = self.build_where_clause(filters, existing_where=False)
-        
         # Add grade condition to where clause
-        conditions = []
-        if where_clause:
-            conditions.append(where_clause.replace("WHERE ", ""))
-        if grade:
-            conditions.append(f"grade={grade}")
-        
-        if conditions:
-            final_where = "WHERE " + " AND ".join(conditions)
-        else:
-            final_where = ""
+        conditions = [f"grade={int(grade)}"] if grade else []
+        final_where, params = self.where_clause('Students', filters, context, extra=conditions)
         
+        entrance_year, _ = self.year_columns()
         query = f"""
-            SELECT SUBSTR(studentnum, 1, 3) as prefix, course_name, COUNT(*) as count
+            SELECT {entrance_year} as prefix, course_name, COUNT(*) as count
             FROM Students
             {final_where}
             GROUP BY prefix, course_name
             ORDER BY count
         """
-        results = self.execute_query(query, tuple(params), context)
-        
+        results = self.execute_query(query, tuple(params))
+        return self._course_year_result(results)
+    
+    @staticmethod
+    def _course_year_result(results: List[tuple]) -> Dict[str, Any]:
         course_years = {}
         all_years = set()
         
@@ -392,4 +397,139 @@ class StudentsDataProvider(DataProvider):
                 } for course in course_years
             ]
         }
-
+    
+    
+    # Dimensions of the students cube, in SELECT order
+    CUBE_DIMENSIONS = (
+        'sex', 'vazeiyat', 'province', 'province_trim', 'course_name',
+        'gradname', 'grade_key', 'student_prefix', 'term_year',
+    )
+    
+    # `grade = N` as evaluated by SQLite (grade is TEXT; 0 = none of 1-4)
+    GRADE_KEY_SQL = ("CASE WHEN grade = 1 THEN 1 WHEN grade = 2 THEN 2 "
+                     "WHEN grade = 3 THEN 3 WHEN grade = 4 THEN 4 ELSE 0 END")
+    
+    def snapshot_expressions(self) -> List[tuple]:
+        """(column, SQL expression) pairs the students snapshot holds: cube dimensions plus filter columns"""
+        entrance_year, term_year = self.year_columns()
+        expressions = {
+            'province_trim': 'trim(province)',
+            'grade_key': self.GRADE_KEY_SQL,
+            'student_prefix': entrance_year,
+            'term_year': term_year,
+        }
+        columns = [(name, expressions.get(name, name)) for name in self.CUBE_DIMENSIONS]
+        return columns + [('province_code', 'province_code'), ('code_markaz', 'code_Markaz')]
+    
+    def students_snapshot(self, filters: Optional[Dict] = None,
+                          context: Optional[UserContext] = None) -> Optional[StudentsSnapshot]:
+        """Current in-memory snapshot able to answer `filters` for `context`, or None (use SQL)"""
+        if not StudentsSnapshot.answers(filters, context):
+            return None
+        return get_snapshot(self.db_path, self.snapshot_expressions())
+    
+    def load_snapshot(self) -> Optional[StudentsSnapshot]:
+        """(Re)load the in-memory snapshot now, e.g. right after a students sync"""
+        return load_snapshot(self.db_path, self.snapshot_expressions())
+    
+    def get_students_cube(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> AggregationCube:
+        """
+        Student counts grouped by every dimension StudentsDashboard charts use
+        
+        One scan of Students replaces the per-chart GROUP BY queries; grade_key
+        evaluates `grade = N` in SQL so roll-ups match the per-chart WHERE exactly.
+        Reads the agg_students table instead when it covers the request, else
+        the in-memory snapshot when one is loaded.
+        """
+        filters = filters or {}
+        table = self.aggregate_table('agg_students', context, filters)
+        if table:
+            where_clause, params = self.where_clause(table, filters, context)
+            dimensions = ", ".join(self.CUBE_DIMENSIONS)
+            query = f"""
+                SELECT {dimensions}, SUM(n)
+                FROM {table}
+                {where_clause}
+                GROUP BY {dimensions}
+            """
+            return AggregationCube(self.CUBE_DIMENSIONS, self.execute_query(query, tuple(params)))
+        
+        snapshot = self.students_snapshot(filters, context)
+        if snapshot is not None:
+            rows = snapshot.group_count(self.CUBE_DIMENSIONS, snapshot.mask(filters, context))
+            return AggregationCube(self.CUBE_DIMENSIONS, rows)
+        
+        where_clause, params = self.where_clause('Students', filters, context)
+        entrance_year, term_year = self.year_columns()
+        query = f"""
+            SELECT sex, vazeiyat, province, trim(province), course_name, gradname,
+                   {self.GRADE_KEY_SQL} AS grade_key,
+                   {entrance_year} AS student_prefix,
+                   {term_year} AS term_year,
+                   COUNT(*)
+            FROM Students
+            {where_clause}
+            GROUP BY sex, vazeiyat, province, course_name, gradname, grade_key, student_prefix, term_year
+        """
+        results = self.execute_query(query, tuple(params))
+        return AggregationCube(self.CUBE_DIMENSIONS, results)
+    
+    def get_dashboard_data(self, context: Optional[UserContext] = None, filters: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        All StudentsDashboard chart data from a single scan of Students
+        
+        Produces exactly what the individual get_*_data methods return (same
+        formatting helpers, rows rolled up in the order SQLite returns them).
+        """
+        cube = self.get_students_cube(context, filters)
+        is_404 = lambda row: row.student_prefix == '404'
+        is_grade = lambda grade: (lambda row: row.grade_key == grade)
+        
+        def course_by_grade(grade):
+            rows = cube.rollup(['course_name'], where=is_grade(grade))
+            return self._labels_counts_result(cube.order_by_count(rows))
+        
+        def course_year(grade):
+            rows = cube.rollup(['student_prefix', 'course_name'], where=is_grade(grade))
+            return self._course_year_result(cube.order_by_count(rows, descending=False))
+        
+        # GROUP BY province, vazeiyat ORDER BY trim(province)
+        province_vazeiyat = [
+            (province_trim, vazeiyat, count)
+            for _, province_trim, vazeiyat, count in sorted(
+                cube.rollup(['province', 'province_trim', 'vazeiyat']),
+                key=lambda row: sql_sort_key(row[1]),
+            )
+        ]
+        year_grade = cube.rollup(['student_prefix'], sums={
+            grade: is_grade(grade) for grade in (1, 2, 3, 4)
+        })
+        
+        return {
+            "gender_data": self._gender_result(cube.rollup(['sex'])),
+            "gender_data_404": self._gender_result(cube.rollup(['sex'], where=is_404)),
+            "vazeiyat_data": self._vazeiyat_result(cube.order_by_count(cube.rollup(['vazeiyat']))),
+            "vazeiyat_data_404": self._vazeiyat_result(cube.order_by_count(cube.rollup(['vazeiyat'], where=is_404))),
+            "province_vazeiyat_data": self._province_vazeiyat_result(province_vazeiyat),
+            "course_data_kardani": course_by_grade(1),
+            "course_data_napeyvaste": course_by_grade(2),
+            "course_data_peyvaste": course_by_grade(3),
+            "course_data_arshad": course_by_grade(4),
+            "grade_data": self._labels_counts_result(cube.rollup(['gradname'])),
+            "province_data": self._labels_counts_result(cube.rollup(['province'])),
+            "province_year_data": self._province_year_result(
+                [(year, province, count) for province, year, count in cube.rollup(['province', 'term_year'])]
+            ),
+            "province_sex_data": self._province_sex_result(
+                [(sex, province, count) for province, sex, count in cube.rollup(['province', 'sex'])]
+            ),
+            "year_data": self._year_result(cube.rollup(['student_prefix'], sums={
+                'male': lambda row: row.sex is not None and 'آقا' in str(row.sex),
+                'female': lambda row: row.sex is not None and 'خانم' in str(row.sex),
+            })),
+            "year_data_grade": self._year_grade_result([(row[0],) + tuple(row[2:]) for row in year_grade]),
+            "course_year_data_kardani": course_year(1),
+            "course_year_data_karshenasi_napeyvaste": course_year(2),
+            "course_year_data_karshenasi_peyvaste": course_year(3),
+            "course_year_data_arshad": course_year(4),
+        }
@@ -0,0 +1,142 @@
+"""
+Data Versions
+Per-source generation counters bumped by syncs and baked into cache keys
+"""
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from .config import DashboardConfig
+
+logger = logging.getLogger(__name__)
+
+# Data sources dashboards can depend on
+DATA_SOURCES = ('faculty', 'students', 'lms', 'pardis')
+
+
+class DataVersions:
+    """
+    Generation counter per data source
+    
+    Counters live in a small SQLite file so a bump in the worker that ran a
+    sync is seen by every other worker. Reads are served from an in-process
+    snapshot refreshed at most every DATA_VERSION_CHECK_INTERVAL seconds;
+    bumps in this process are visible immediately.
+    """
+    
+    _lock = threading.Lock()
+    _versions: Dict[str, int] = {}
+    _loaded_at: float = 0.0
+    _initialized_path: Optional[str] = None
+    
+    db_path: str = DashboardConfig.DATA_VERSION_DB
+    check_interval: float = DashboardConfig.DATA_VERSION_CHECK_INTERVAL
+    
+    @classmethod
+    def _connect(cls) -> sqlite3.Connection:
+        initialize = cls._initialized_path != cls.db_path
+        if initialize:
+            Path(cls.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(cls.db_path, timeout=DashboardConfig.DB_BUSY_TIMEOUT_MS / 1000)
+        if initialize:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    source TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL
+                )
+            """)
+            conn.commit()
+            cls._initialized_path = cls.db_path
+        return conn
+    
+    @classmethod
+    def _load(cls) -> Dict[str, int]:
+        """Read all counters from storage (lock must be held)"""
+        try:
+            conn = cls._connect()
+            try:
+                rows = conn.execute("SELECT source, version FROM data_versions").fetchall()
+            finally:
+                conn.close()
+            cls._versions = {source: version for source, version in rows}
+        except sqlite3.Error as e:
+            # Keep serving the last known versions
+            logger.warning(f"Could not read data versions from {cls.db_path}: {e}")
+        cls._loaded_at = time.monotonic()
+        return cls._versions
+    
+    @classmethod
+    def all(cls) -> Dict[str, int]:
+        """Current version of every known source"""
+        with cls._lock:
+            if time.monotonic() - cls._loaded_at >= cls.check_interval:
+                cls._load()
+            versions = {source: 0 for source in DATA_SOURCES}
+            versions.update(cls._versions)
+            return versions
+    
+    @classmethod
+    def get(cls, source: str) -> int:
+        """Current version of one source (0 if never bumped)"""
+        return cls.all().get(source, 0)
+    
+    @classmethod
+    def snapshot(cls, sources: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Versions of the given sources, for use in cache keys
+        
+        Args:
+            sources: Source names; None means every source
+        
+        Returns:
+            Dict of source -> version, sorted by source name
+        """
+        versions = cls.all()
+        names = sorted(versions) if sources is None else sorted(set(sources))
+        return {name: versions.get(name, 0) for name in names}
+    
+    @classmethod
+    def bump(cls, source: str) -> int:
+        """
+        Increment a source's version after its data changed
+        
+        Returns:
+            The new version
+        """
+        with cls._lock:
+            conn = cls._connect()
+            try:
+                conn.execute(
+                    "INSERT INTO data_versions (source, version, updated_at) VALUES (?, 1, ?) "
+                    "ON CONFLICT(source) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at",
+                    (source, time.time()),
+                )
+                conn.commit()
+                version = conn.execute(
+                    "SELECT version FROM data_versions WHERE source = ?", (source,)
+                ).fetchone()[0]
+            finally:
+                conn.close()
+            cls._load()
+        logger.info(f"Data version for '{source}' bumped to {version}")
+        return version
+    
+    @classmethod
+    def reset_local(cls):
+        """Forget the in-process snapshot so the next read goes to storage"""
+        with cls._lock:
+            cls._versions = {}
+            cls._loaded_at = 0.0
+
+
+def get_data_versions(sources: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Versions of the given sources (all if None)"""
+    return DataVersions.snapshot(sources)
+
+
+def bump_data_version(source: str) -> int:
+    """Mark a source's data as changed, invalidating cache keys that include it"""
+    return DataVersions.bump(source)
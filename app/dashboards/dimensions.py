@@ -0,0 +1,253 @@
+"""
+Dimension Catalog
+Provinces, universities, faculties (pardis) and terms for filter dropdowns,
+read once per data version and held in memory, so the dropdown APIs answer
+without querying faculty_data.db
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from dashboards.cache import SingleFlight
+from dashboards.config import DashboardConfig
+from dashboards.context import UserContext
+from dashboards.data_version import DataVersions
+
+logger = logging.getLogger(__name__)
+
+# Syncs of these sources change the catalog
+CATALOG_SOURCES = ('faculty', 'students')
+
+# Fields dimension rows can be narrowed by (access restrictions and request values)
+SCOPE_FIELDS = ('province_code', 'university_code', 'faculty_code')
+
+# Distinct scoped responses memoized per catalog
+MAX_MEMOIZED_RESPONSES = 4096
+
+
+def _candidates(values: Sequence[Any]) -> Tuple[Any, ...]:
+    """Values plus the integers of numeric strings (codes from user info are often text)"""
+    candidates = list(values)
+    for value in values:
+        if isinstance(value, str) and value.strip().isdigit():
+            candidates.append(int(value))
+    return tuple(candidates)
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set:
+    return {row[1].lower() for row in conn.execute(f'PRAGMA table_info("{table}")')}
+
+
+def _rows(conn: sqlite3.Connection, query: str, fields: Sequence[str]) -> List[Dict[str, Any]]:
+    return [dict(zip(fields, row)) for row in conn.execute(query)]
+
+
+def _read_provinces(conn: sqlite3.Connection) -> Tuple[List[Dict[str, Any]], Tuple[str, ...]]:
+    if not _columns(conn, 'province'):
+        return [], ()
+    rows = _rows(conn, """
+        SELECT province_code, province_name FROM province
+        WHERE province_code IS NOT NULL
+        ORDER BY province_name
+    """, ('code', 'name'))
+    for row in rows:
+        row['province_code'] = row['code']
+    return rows, ('province_code',)
+
+
+def _read_universities(conn: sqlite3.Connection) -> Tuple[List[Dict[str, Any]], Tuple[str, ...]]:
+    # The university table when it has rows, else universities named in faculty
+    for table in ('university', 'faculty'):
+        columns = _columns(conn, table)
+        if not {'university_code', 'university_name'} <= columns:
+            continue
+        scoped = 'province_code' in columns
+        rows = _rows(conn, f"""
+            SELECT DISTINCT university_code, university_name{', province_code' if scoped else ''}
+            FROM {table}
+            WHERE university_code IS NOT NULL
+            ORDER BY university_name
+        """, ('code', 'name', 'province_code'))
+        if rows:
+            for row in rows:
+                row['university_code'] = row['code']
+            return rows, ('university_code', 'province_code') if scoped else ('university_code',)
+    return [], ()
+
+
+def _read_faculties(conn: sqlite3.Connection) -> Tuple[List[Dict[str, Any]], Tuple[str, ...]]:
+    columns = _columns(conn, 'faculty')
+    if not {'code_markaz', 'markaz'} <= columns:
+        return [], ()
+    scope = ['province_code', 'university_code']
+    scope = [field for field in scope if field in columns]
+    rows = _rows(conn, f"""
+        SELECT DISTINCT code_markaz, markaz{''.join(', ' + field for field in scope)}
+        FROM faculty
+        WHERE code_markaz IS NOT NULL
+        ORDER BY markaz
+    """, ['code', 'name'] + scope)
+    for row in rows:
+        row['faculty_code'] = row['code']
+    return rows, tuple(scope) + ('faculty_code',)
+
+
+def _read_terms(conn: sqlite3.Connection) -> Tuple[List[Dict[str, Any]], Tuple[str, ...]]:
+    # Academic terms are the same for every scope
+    if 'term' not in _columns(conn, 'Students'):
+        return [], ()
+    rows = _rows(conn, """
+        SELECT DISTINCT term, term FROM Students
+        WHERE term IS NOT NULL AND term != ''
+        ORDER BY term DESC
+    """, ('code', 'name'))
+    return rows, ()
+
+
+DIMENSIONS = {
+    'provinces': _read_provinces,
+    'universities': _read_universities,
+    'faculties': _read_faculties,
+    'terms': _read_terms,
+}
+
+
+class DimensionCatalog:
+    """
+    All dimensions of one faculty_data.db at one data version
+    
+    Rows are {"code", "name"} plus the scope fields they can be narrowed by.
+    Each distinct (dimension, scope) answer is computed once and kept with
+    its ETag, so repeat requests are a dictionary lookup.
+    """
+    
+    def __init__(self, dimensions: Dict[str, List[Dict[str, Any]]], scopes: Dict[str, Tuple[str, ...]],
+                 versions: Dict[str, int], load_seconds: float = 0.0):
+        self.dimensions = dimensions
+        self.scopes = scopes
+        self.versions = versions
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+        content = json.dumps(dimensions, sort_keys=True, ensure_ascii=False, default=str)
+        self.etag = hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+        self._responses: Dict[tuple, Tuple[List[Dict[str, Any]], str]] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def load(cls, db_path: str) -> 'DimensionCatalog':
+        start = time.perf_counter()
+        # Stamp before reading: a sync finishing mid-load makes the catalog stale, not wrong
+        versions = DataVersions.snapshot(CATALOG_SOURCES)
+        dimensions, scopes = {}, {}
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=DashboardConfig.DB_BUSY_TIMEOUT_MS / 1000)
+        try:
+            for name, read in DIMENSIONS.items():
+                dimensions[name], scopes[name] = read(conn)
+        finally:
+            conn.close()
+        return cls(dimensions, scopes, versions, round(time.perf_counter() - start, 3))
+    
+    def lookup(self, name: str, context: Optional[UserContext] = None,
+               **narrow: Optional[Sequence[Any]]) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        ({"code", "name"} items, ETag) of a dimension within the context's
+        access restriction, optionally narrowed further by request values
+        
+        Restrictions and request values apply on the fields the dimension
+        carries: a faculty-level user sees the universities of their
+        province (the restriction's province_code), terms are never narrowed.
+        
+        Args:
+            name: key of DIMENSIONS
+            context: UserContext whose access restriction always applies
+            narrow: scope field -> allowed values (None = no narrowing)
+        """
+        scope_fields = self.scopes[name]
+        restriction = context.data_filters if context is not None else {}
+        scope = []
+        for field in SCOPE_FIELDS:
+            allowed = restriction.get(field)
+            if allowed and field in scope_fields:
+                scope.append((field, _candidates((allowed,))))
+            values = narrow.get(field)
+            if values is not None and field in scope_fields:
+                scope.append((field, _candidates(values)))
+        key = (name, tuple(scope))
+        
+        with self._lock:
+            cached = self._responses.get(key)
+        if cached is not None:
+            return cached
+        
+        items, seen = [], set()
+        for row in self.dimensions[name]:
+            if all(row.get(field) in values for field, values in scope):
+                item = (row['code'], row['name'])
+                if item not in seen:  # DISTINCT over extra scope columns repeats a code/name
+                    seen.add(item)
+                    items.append({"code": row['code'], "name": row['name']})
+        scope_tag = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:8]
+        result = (items, f"{self.etag}-{scope_tag}")
+        with self._lock:
+            if len(self._responses) >= MAX_MEMOIZED_RESPONSES:
+                self._responses.clear()
+            self._responses[key] = result
+        return result
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            'etag': self.etag,
+            'versions': self.versions,
+            'current': self.versions == DataVersions.snapshot(CATALOG_SOURCES),
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'rows': {name: len(rows) for name, rows in self.dimensions.items()},
+        }
+
+
+_catalogs: Dict[str, DimensionCatalog] = {}
+_lock = threading.Lock()
+_flights = SingleFlight()
+
+
+def load_catalog(db_path: Optional[str] = None) -> DimensionCatalog:
+    """Read and install the catalog of db_path now (e.g. right after a sync)"""
+    db_path = db_path or DashboardConfig.FACULTY_DB
+    catalog = DimensionCatalog.load(db_path)
+    with _lock:
+        _catalogs[db_path] = catalog
+    logger.info(
+        f"Loaded dimension catalog in {catalog.load_seconds}s: "
+        + ", ".join(f"{name}={len(rows)}" for name, rows in catalog.dimensions.items())
+    )
+    return catalog
+
+
+def get_catalog(db_path: Optional[str] = None) -> DimensionCatalog:
+    """
+    Current catalog of db_path, (re)loading it once - concurrent callers
+    wait for the same load - when missing or its data version changed
+    
+    If a reload fails the previous catalog keeps being served.
+    """
+    db_path = db_path or DashboardConfig.FACULTY_DB
+    with _lock:
+        catalog = _catalogs.get(db_path)
+    if catalog is not None and catalog.versions == DataVersions.snapshot(CATALOG_SOURCES):
+        return catalog
+    try:
+        return _flights.do(f"dimensions:{db_path}", lambda: load_catalog(db_path),
+                           timeout=DashboardConfig.CACHE_WAIT_TIMEOUT)
+    except Exception as e:
+        if catalog is None:
+            raise
+        logger.warning(f"Could not reload dimension catalog of {db_path}, serving the previous one: {e}")
+        return catalog
+
+
+def drop_catalogs():
+    with _lock:
+        _catalogs.clear()
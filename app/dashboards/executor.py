@@ -0,0 +1,191 @@
+"""
+Parallel Query Executor
+Runs a dashboard's independent provider queries concurrently on a shared
+bounded thread pool and keeps per-dashboard render timings
+"""
+import copy
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+from flask import current_app, has_app_context
+from .config import DashboardConfig
+
+logger = logging.getLogger(__name__)
+
+# Key under which get_data results list the queries that failed (name -> error)
+QUERY_ERRORS_KEY = 'query_errors'
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_worker = threading.local()
+_tracking = threading.local()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=max(1, DashboardConfig.PARALLEL_QUERY_WORKERS),
+                thread_name_prefix="dashboard-query",
+            )
+        return _pool
+
+
+def shutdown_pool(wait: bool = False):
+    """Stop the shared pool (a new one is created on next use)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+def _run_in_worker(fn: Callable[[], Any], app) -> Any:
+    _worker.active = True
+    try:
+        if app is None:
+            return fn()
+        with app.app_context():
+            return fn()
+    finally:
+        _worker.active = False
+
+
+class QueryMode:
+    """How one get_data's queries actually ran (see track_query_mode)"""
+    
+    def __init__(self):
+        self.mode = 'sequential'
+
+
+@contextmanager
+def track_query_mode() -> Iterator[QueryMode]:
+    """
+    Record the mode run_queries uses in this thread: 'parallel' if any call
+    ran its queries on the pool, else 'sequential' (also when get_data never
+    calls run_queries)
+    """
+    tracker = QueryMode()
+    previous = getattr(_tracking, 'current', None)
+    _tracking.current = tracker
+    try:
+        yield tracker
+    finally:
+        _tracking.current = previous
+
+
+def run_queries(
+    queries: Dict[str, Callable[[], Any]],
+    fallbacks: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+    parallel: Optional[bool] = None,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Evaluate independent zero-argument queries, concurrently when enabled
+    
+    A query that raises or is still running after `timeout` seconds (counted
+    from submission) gets its fallback value instead, so one failing chart
+    doesn't take the others down. Timed-out queries are abandoned, not
+    interrupted; their worker is busy until they finish.
+    
+    Args:
+        queries: name -> callable returning that part of the data
+        fallbacks: name -> value used when the query fails (default None)
+        timeout: Per-query timeout in seconds (default PARALLEL_QUERY_TIMEOUT)
+        parallel: Override DashboardConfig.PARALLEL_QUERIES_ENABLED (and the
+            sequential fallback for a single worker)
+    
+    Returns:
+        (results in the order of `queries`, name -> error message for failed ones)
+    """
+    fallbacks = fallbacks or {}
+    if timeout is None:
+        timeout = DashboardConfig.PARALLEL_QUERY_TIMEOUT
+    if parallel is None:
+        parallel = DashboardConfig.PARALLEL_QUERIES_ENABLED and DashboardConfig.PARALLEL_QUERY_WORKERS > 1
+    # Queries submitted from a pool worker could wait on each other forever
+    if getattr(_worker, 'active', False) or len(queries) < 2:
+        parallel = False
+    tracker = getattr(_tracking, 'current', None)
+    if tracker is not None and parallel:
+        tracker.mode = 'parallel'
+    
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    
+    def failed(name: str, message: str):
+        errors[name] = message
+        results[name] = copy.deepcopy(fallbacks.get(name))
+    
+    if not parallel:
+        for name, fn in queries.items():
+            try:
+                results[name] = fn()
+            except Exception as e:
+                logger.error(f"Query {name} failed: {e}", exc_info=True)
+                failed(name, str(e))
+        return results, errors
+    
+    app = current_app._get_current_object() if has_app_context() else None
+    pool = _get_pool()
+    deadline = time.monotonic() + timeout
+    futures = {name: pool.submit(_run_in_worker, fn, app) for name, fn in queries.items()}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()
+            logger.error(f"Query {name} timed out after {timeout}s")
+            failed(name, f"timed out after {timeout}s")
+        except Exception as e:
+            logger.error(f"Query {name} failed: {e}", exc_info=True)
+            failed(name, str(e))
+    return results, errors
+
+
+class RenderTimings:
+    """
+    Recent get_data wall times per dashboard, split by execution mode
+    (parallel/sequential) so both can be compared on the same server
+    """
+    
+    _lock = threading.Lock()
+    _samples: Dict[Tuple[str, str], Deque[float]] = defaultdict(
+        lambda: deque(maxlen=DashboardConfig.RENDER_TIMING_SAMPLES)
+    )
+    
+    @classmethod
+    def record(cls, dashboard_id: str, seconds: float, mode: str):
+        """mode: how the queries actually ran (QueryMode.mode)"""
+        with cls._lock:
+            cls._samples[(dashboard_id, mode)].append(seconds)
+    
+    @classmethod
+    def summary(cls) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """dashboard_id -> mode -> count/last/avg/p50/p95/max (milliseconds)"""
+        with cls._lock:
+            samples = {key: list(values) for key, values in cls._samples.items() if values}
+        result: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (dashboard_id, mode), recorded in sorted(samples.items()):
+            last = recorded[-1]
+            values = sorted(recorded)
+            result.setdefault(dashboard_id, {})[mode] = {
+                'count': len(values),
+                'last_ms': round(last * 1000, 1),
+                'avg_ms': round(sum(values) / len(values) * 1000, 1),
+                'p50_ms': round(values[len(values) // 2] * 1000, 1),
+                'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+                'max_ms': round(values[-1] * 1000, 1),
+            }
+        return result
+    
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._samples.clear()
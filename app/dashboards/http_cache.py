@@ -0,0 +1,104 @@
+"""
+HTTP Validators for Dashboard Pages
+ETag/Last-Modified for rendered dashboards, so a browser revalidating an
+unchanged page gets a 304 instead of a re-render
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from flask import current_app, g, has_request_context, make_response, request
+from .config import DashboardConfig
+
+# Responses whose URL names their exact content never need revalidation
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+_templates_lock = threading.Lock()
+_templates_checked: Dict[str, float] = {}
+_templates_mtime: Dict[str, float] = {}
+
+
+def templates_mtime(folder: Optional[str] = None) -> float:
+    """
+    Latest modification time of any file under the template folder (edits
+    from the admin template editor included), rescanned at most every
+    DATA_VERSION_CHECK_INTERVAL seconds
+    """
+    if folder is None:
+        folder = os.path.join(current_app.root_path, current_app.template_folder or 'templates')
+    now = time.monotonic()
+    with _templates_lock:
+        if now - _templates_checked.get(folder, float('-inf')) < DashboardConfig.DATA_VERSION_CHECK_INTERVAL:
+            return _templates_mtime[folder]
+    latest = 0.0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+            except OSError:
+                pass  # removed while scanning
+    with _templates_lock:
+        _templates_checked[folder] = now
+        _templates_mtime[folder] = latest
+    return latest
+
+
+def dashboard_etag(cache_key: str, computed_at: float, private: Dict[str, Any], template_version: float) -> str:
+    """
+    Validator of one rendered dashboard page
+    
+    Args:
+        cache_key: dashboard data cache key (dashboard, data scope, filters, data versions)
+        computed_at: when the cached data was computed (changes on TTL refreshes)
+        private: per-user parts of the page (user, accessible dashboards, host)
+        template_version: templates_mtime()
+    """
+    parts = [DashboardConfig.RENDER_VERSION, cache_key, computed_at, template_version, private]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:32]
+
+
+def not_modified(etag: str) -> bool:
+    """
+    Whether the request's If-None-Match already holds etag
+    
+    If-Modified-Since alone is never honoured: a date can't tell one user's
+    page from another's in a shared browser.
+    """
+    return has_request_context() and request.if_none_match.contains_weak(etag)
+
+
+def skip_validators():
+    """
+    Keep this request's page out of revalidation: it shows something a
+    reload must replace (a map still rendering), so it stays no-store
+    """
+    if has_request_context():
+        g.skip_validators = True
+
+
+def validators_skipped() -> bool:
+    return has_request_context() and g.get('skip_validators', False)
+
+
+def set_validators(response, etag: str, last_modified: float):
+    """
+    Replace a page's no-store headers with revalidation ones
+    
+    `private` keeps the gateway and other shared caches from storing the
+    page; `no-cache` makes the browser ask (and get a 304) every time.
+    """
+    response.set_etag(etag, weak=True)
+    response.last_modified = datetime.fromtimestamp(last_modified, tz=timezone.utc)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers.pop('Pragma', None)
+    response.headers.pop('Expires', None)
+    response.vary.add('Cookie')
+    return response
+
+
+def not_modified_response(etag: str, last_modified: float):
+    """Empty 304 carrying the same validators as the full page"""
+    return set_validators(make_response('', 304), etag, last_modified)
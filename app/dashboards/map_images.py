@@ -0,0 +1,222 @@
+"""
+Map Image Cache
+Rendered map PNGs stored on disk under a hash of everything drawn into them,
+served from /dashboards/images/<key>.png with immutable caching, so pages
+reference an image instead of re-rendering and inlining it every time.
+Missing images are drawn by the render pool's worker processes.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+import jdatetime
+from flask import abort, send_file, url_for
+from .cache import SingleFlight
+from .config import DashboardConfig
+from .http_cache import IMMUTABLE_CACHE_CONTROL, skip_validators
+from .render_pool import RenderQueueFull, render_pool
+
+logger = logging.getLogger(__name__)
+
+_KEY_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+_flights = SingleFlight()
+_gc_lock = threading.Lock()
+_last_gc = 0.0
+
+
+def image_key(name: str, inputs: Dict[str, Any]) -> str:
+    """
+    Content address of a map image
+    
+    Args:
+        name: which map (dashboard id)
+        inputs: everything the image is drawn from - data, style, geometry
+    
+    Maps carry today's (Jalali) date, so the date is part of every key.
+    """
+    parts = {
+        'name': name,
+        'render_version': DashboardConfig.RENDER_VERSION,
+        'date': jdatetime.date.today().strftime('%Y/%m/%d'),
+        'inputs': inputs,
+    }
+    encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def image_path(key: str) -> Optional[str]:
+    """File of a stored image, or None for a malformed key"""
+    if not _KEY_PATTERN.fullmatch(key or ''):
+        return None
+    return os.path.join(DashboardConfig.MAP_IMAGE_DIR, f"{key}.png")
+
+
+def _write(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def get_or_render(key: str, render: Callable[[], bytes]) -> str:
+    """
+    Path of the image stored under key, rendering and storing it first if
+    it isn't there (concurrent requests for the same key render once)
+    """
+    path = image_path(key)
+    if _touch(path):
+        return path
+    
+    def store():
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            _write(path, render())
+            logger.info(f"Map image {key[:12]} rendered in {time.perf_counter() - start:.2f}s")
+            collect_garbage()
+        return path
+    
+    return _flights.do(f"map_image:{key}", store, timeout=DashboardConfig.CACHE_WAIT_TIMEOUT)
+
+
+def _touch(path: str) -> bool:
+    """Whether the image at path exists, refreshing its age (counted from the last use)"""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _store(key: str, data: bytes) -> str:
+    path = image_path(key)
+    _write(path, data)
+    collect_garbage()
+    return path
+
+
+def render_in_pool(key: str, render: Callable[..., bytes], *args, **kwargs) -> bool:
+    """
+    Make sure the image of key gets stored, rendering it as
+    render(*args, **kwargs) in the render pool; waits up to
+    RENDER_WAIT_SECONDS and returns whether the image is stored by then
+    (False also when the pool's queue is full)
+    """
+    if _touch(image_path(key)):
+        return True
+    try:
+        job = render_pool.submit(key, render, *args, on_result=lambda data: _store(key, data), **kwargs)
+    except RenderQueueFull as e:
+        logger.warning(f"Map image {key[:12]} not queued: {e}")
+        return False
+    try:
+        job.result(timeout=DashboardConfig.RENDER_WAIT_SECONDS)
+        return True
+    except FutureTimeout:
+        return False
+
+
+def collect_garbage(force: bool = False) -> int:
+    """
+    Delete images unused for MAP_IMAGE_MAX_AGE_DAYS, then the least recently
+    used ones until the directory is under MAP_IMAGE_MAX_MB
+    
+    Runs at most every MAP_IMAGE_GC_INTERVAL seconds unless forced.
+    Returns the number of files removed.
+    """
+    global _last_gc
+    with _gc_lock:
+        now = time.time()
+        if not force and now - _last_gc < DashboardConfig.MAP_IMAGE_GC_INTERVAL:
+            return 0
+        _last_gc = now
+    
+    directory = DashboardConfig.MAP_IMAGE_DIR
+    max_age = DashboardConfig.MAP_IMAGE_MAX_AGE_DAYS * 86400
+    files = []
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        stale_tmp = entry.name.endswith('.tmp') and now - stat.st_mtime > 3600
+        if stale_tmp or (entry.name.endswith('.png') and now - stat.st_mtime > max_age):
+            removed += _remove(entry.path)
+        elif entry.name.endswith('.png'):
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    
+    total = sum(size for _, size, _ in files)
+    max_bytes = DashboardConfig.MAP_IMAGE_MAX_MB * 1024 * 1024
+    files.sort()
+    while files and total > max_bytes:
+        _, size, path = files.pop(0)
+        removed += _remove(path)
+        total -= size
+    if removed:
+        logger.info(f"Map image cache: removed {removed} images, {len(files)} kept ({total / 1e6:.1f} MB)")
+    return removed
+
+
+def _remove(path: str) -> int:
+    try:
+        os.remove(path)
+        return 1
+    except FileNotFoundError:
+        return 0
+
+
+def map_image(name: str, inputs: Dict[str, Any], render: Callable[..., bytes], *args, **kwargs) -> Dict[str, Any]:
+    """
+    Template variables for a rendered map: `image_url` of the cached image
+    (with `image_pending` set while the render pool is still drawing it), or
+    `image_data` (inline base64, as before the cache) when the cache is
+    disabled or can't be written
+    
+    render(*args, **kwargs) returns the PNG; it runs in a worker process
+    when RENDER_POOL_ENABLED, so it must be a module-level function.
+    """
+    if DashboardConfig.MAP_IMAGE_CACHE_ENABLED:
+        key = image_key(name, inputs)
+        try:
+            if DashboardConfig.RENDER_POOL_ENABLED:
+                ready = render_in_pool(key, render, *args, **kwargs)
+            else:
+                ready = bool(get_or_render(key, lambda: render(*args, **kwargs)))
+            image = {'image_url': url_for('dashboard.map_image', key=key)}
+            if not ready:
+                image['image_pending'] = True
+                # The placeholder reloads the page if the render was dropped
+                skip_validators()
+            return image
+        except OSError as e:
+            logger.warning(f"Map image cache unavailable, inlining {name} map: {e}")
+    return {'image_data': base64.b64encode(render(*args, **kwargs)).decode('utf-8')}
+
+
+def send_image(key: str):
+    """Response with the stored image of key (404 if unknown or collected)"""
+    path = image_path(key)
+    if path is None or not os.path.isfile(path):
+        abort(404)  # also while still rendering: pending pages retry the URL
+    response = send_file(path, mimetype='image/png', conditional=True, etag=key)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
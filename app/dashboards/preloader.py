@@ -0,0 +1,421 @@
+"""
+Dashboard Pre-loader
+Warms dashboard caches for the most common scopes after syncs and at startup
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from flask import current_app, has_app_context
+from .config import DashboardConfig
+from .context import AccessLevel, UserContext
+
+logger = logging.getLogger(__name__)
+
+# A warm-up job: (dashboard_id, access level, province_code, faculty_code)
+WarmupJob = Tuple[str, AccessLevel, Optional[int], Optional[int]]
+
+_status_lock = threading.Lock()
+_status: Dict[str, Any] = {
+    'state': 'idle',          # idle / running / done
+    'trigger': None,          # startup / sync:<source> / manual
+    'started_at': None,
+    'finished_at': None,
+    'duration': None,
+    'total': 0,
+    'completed': 0,
+    'failed': 0,
+    'current': None,
+    'jobs': [],               # last run's jobs with timing
+}
+_rerun: Optional[Tuple[str, Optional[List[str]], Optional[int]]] = None
+_app = None
+
+# Dashboard views not yet written to the access log:
+# (user_id, dashboard_id, access level, province_code, faculty_code) -> count
+_views_lock = threading.Lock()
+_view_counts: Counter = Counter()
+_view_flusher: Optional[threading.Thread] = None
+
+
+def get_warmup_status() -> Dict[str, Any]:
+    """Snapshot of the current/last warm-up run (for admin pages)"""
+    with _status_lock:
+        status = dict(_status)
+        status['jobs'] = list(_status['jobs'])
+        status['rerun_pending'] = _rerun is not None
+    if status['state'] == 'running' and status['started_at']:
+        status['elapsed'] = round(time.time() - status['started_at'], 1)
+    return status
+
+
+def _update_status(**kwargs):
+    with _status_lock:
+        _status.update(kwargs)
+
+
+def _dashboards_for_sources(sources: Optional[List[str]]) -> List[Any]:
+    """Registered dashboards worth warming, optionally only those reading `sources`"""
+    from .registry import DashboardRegistry
+    if not DashboardRegistry.list_all():
+        from . import dashboards  # noqa: F401 - registers all dashboards
+    
+    allowed = DashboardConfig.PRELOAD_DASHBOARDS
+    result = []
+    for dashboard in DashboardRegistry.list_all():
+        if not dashboard.cache_enabled:
+            continue
+        if allowed and dashboard.dashboard_id not in allowed:
+            continue
+        deps = dashboard.data_sources
+        if not allowed and deps is not None and 'lms' in deps:
+            # Real-time dashboards refresh themselves every minute anyway
+            continue
+        if sources is not None and deps is not None and not set(deps) & set(sources):
+            continue
+        result.append(dashboard)
+    return result
+
+
+def _province_codes() -> List[int]:
+    """Province codes for every province in DashboardConfig.get_province_mappings"""
+    from .data_providers.faculty import FacultyDataProvider
+    
+    try:
+        names = FacultyDataProvider().get_province_names()
+    except Exception as e:
+        logger.warning(f"Could not load province names for warm-up: {e}")
+        return []
+    
+    mapped = {name.strip() for name in DashboardConfig.get_province_mappings()}
+    codes = [code for code, name in names.items() if name and name.strip() in mapped]
+    return sorted(codes or names.keys())
+
+
+def record_view(user_id: int, dashboard_id: str, access_level: str,
+                province_code: Optional[int], faculty_code: Optional[int]):
+    """
+    Count a dashboard view for the top-scopes warm-up list
+    
+    Only an in-memory counter is touched here; a background thread writes
+    the counts to the access log every PRELOAD_VIEW_FLUSH_INTERVAL seconds
+    (one row per user and scope), so views cost the request no database write.
+    """
+    global _view_flusher
+    with _views_lock:
+        _view_counts[(user_id, dashboard_id, access_level, province_code, faculty_code)] += 1
+        if _view_flusher is not None or not has_app_context():
+            return
+        app = current_app._get_current_object()
+        _view_flusher = threading.Thread(target=_flush_views_periodically, args=(app,),
+                                         name="dashboard-view-flush", daemon=True)
+    _view_flusher.start()
+    atexit.register(_flush_views_in, app)
+
+
+def _flush_views_periodically(app):
+    while True:
+        time.sleep(DashboardConfig.PRELOAD_VIEW_FLUSH_INTERVAL)
+        _flush_views_in(app)
+
+
+def _flush_views_in(app):
+    with app.app_context():
+        flush_view_counts()
+
+
+def flush_view_counts() -> int:
+    """Write the counted views to the access log (app context needed); returns the rows written"""
+    global _view_counts
+    with _views_lock:
+        counts, _view_counts = _view_counts, Counter()
+    if not counts:
+        return 0
+    try:
+        _write_views(counts)
+    except Exception as e:
+        logger.warning(f"Could not write dashboard views to the access log: {e}")
+        with _views_lock:
+            _view_counts.update(counts)  # retried on the next flush
+        return 0
+    return len(counts)
+
+
+def _write_views(counts: Counter):
+    from admin_models import AccessLog
+    from extensions import db
+    try:
+        db.session.add_all([
+            AccessLog(
+                user_id=user_id,
+                action='view_dashboard',
+                resource_type='dashboard',
+                resource_id=dashboard_id,
+                details={
+                    'access_level': access_level,
+                    'province_code': province_code,
+                    'faculty_code': faculty_code,
+                    'views': views,
+                },
+            )
+            for (user_id, dashboard_id, access_level, province_code, faculty_code), views in counts.items()
+        ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _top_requested_scopes(limit: int) -> List[Tuple[str, str, Optional[int], Optional[int]]]:
+    """Most viewed (dashboard, access level, province, faculty) combos from access logs"""
+    if limit <= 0 or not has_app_context():
+        return []
+    try:
+        from admin_models import AccessLog
+        since = datetime.utcnow() - timedelta(days=DashboardConfig.PRELOAD_LOG_DAYS)
+        rows = (
+            AccessLog.query
+            .with_entities(AccessLog.resource_id, AccessLog.details)
+            .filter(AccessLog.action == 'view_dashboard', AccessLog.created_at >= since)
+            .order_by(AccessLog.id.desc())
+            .limit(DashboardConfig.PRELOAD_LOG_ROWS)
+            .all()
+        )
+    except Exception as e:
+        logger.warning(f"Could not read access logs for warm-up: {e}")
+        return []
+    
+    counts = Counter()
+    for dashboard_id, details in rows:
+        details = details or {}
+        if not dashboard_id or not details.get('access_level'):
+            continue
+        scope = (dashboard_id, details['access_level'], details.get('province_code'), details.get('faculty_code'))
+        counts[scope] += details.get('views', 1)
+    return [scope for scope, _ in counts.most_common(limit)]
+
+
+def build_warmup_jobs(sources: Optional[List[str]] = None) -> List[WarmupJob]:
+    """
+    Jobs for a warm-up run: national view, every province and the most
+    requested scopes from the access logs, for each dashboard to warm
+    
+    Args:
+        sources: Only warm dashboards reading these data sources (None = all)
+    """
+    dashboards = _dashboards_for_sources(sources)
+    if not dashboards:
+        return []
+    
+    jobs: List[WarmupJob] = []
+    seen = set()
+    
+    def add(dashboard_id, level, province_code=None, faculty_code=None):
+        job = (dashboard_id, level, province_code, faculty_code)
+        if job not in seen:
+            seen.add(job)
+            jobs.append(job)
+    
+    dashboard_ids = [d.dashboard_id for d in dashboards]
+    
+    # 1. National view (shared by admin and central org users)
+    for dashboard_id in dashboard_ids:
+        add(dashboard_id, AccessLevel.CENTRAL_ORG)
+    
+    # 2. Most requested scopes
+    for dashboard_id, level, province_code, faculty_code in _top_requested_scopes(DashboardConfig.PRELOAD_TOP_SCOPES):
+        if dashboard_id in dashboard_ids:
+            try:
+                level = AccessLevel(level)
+            except ValueError:
+                continue
+            if level == AccessLevel.ADMIN:
+                level = AccessLevel.CENTRAL_ORG
+            add(dashboard_id, level, province_code, faculty_code)
+    
+    # 3. Every province
+    if DashboardConfig.PRELOAD_PROVINCES:
+        for province_code in _province_codes():
+            for dashboard_id in dashboard_ids:
+                add(dashboard_id, AccessLevel.PROVINCE_UNIVERSITY, province_code)
+    
+    return jobs
+
+
+def _run_job(job: WarmupJob) -> Dict[str, Any]:
+    """Compute (or confirm cached) one dashboard payload"""
+    from .registry import DashboardRegistry
+    
+    dashboard_id, level, province_code, faculty_code = job
+    dashboard = DashboardRegistry.get(dashboard_id)
+    context = UserContext.for_scope(level, province_code=province_code, faculty_code=faculty_code)
+    requested = {}
+    if province_code is not None:
+        requested['province_code'] = province_code
+    if faculty_code is not None:
+        requested['faculty_code'] = faculty_code
+    filters = context.apply_filters(requested)
+    
+    start = time.perf_counter()
+    _, meta = dashboard.get_data_with_meta(context, filters)
+    return {
+        'dashboard_id': dashboard_id,
+        'access_level': level.value,
+        'province_code': province_code,
+        'faculty_code': faculty_code,
+        'seconds': round(time.perf_counter() - start, 2),
+        'cache': meta['status'],
+        'status': 'ok',
+    }
+
+
+def warm_up(
+    trigger: str = 'manual',
+    sources: Optional[List[str]] = None,
+    sync_id: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    jobs: Optional[List[WarmupJob]] = None,
+    log: Optional[Callable[[str, str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Run a warm-up pass synchronously
+    
+    Args:
+        trigger: What started the run (shown in admin pages)
+        sources: Only warm dashboards reading these sources (None = all)
+        sync_id: DataSync id whose progress log should show warm-up messages
+        max_workers: Concurrent dashboard computations (default PRELOAD_CONCURRENCY)
+        jobs: Explicit job list (default build_warmup_jobs(sources))
+        log: Optional callback(message, level) for progress messages
+    
+    Returns:
+        Final status dict
+    """
+    if log is None:
+        log = _sync_log(sync_id)
+    
+    if jobs is None:
+        jobs = build_warmup_jobs(sources)
+    started = time.time()
+    _update_status(
+        state='running', trigger=trigger, started_at=started, finished_at=None,
+        duration=None, total=len(jobs), completed=0, failed=0, current=None, jobs=[],
+    )
+    log(f"پیش‌گرم‌سازی کش داشبوردها شروع شد ({len(jobs)} مورد)", 'info')
+    logger.info(f"Dashboard warm-up ({trigger}) started: {len(jobs)} jobs")
+    
+    workers = max(1, max_workers or DashboardConfig.PRELOAD_CONCURRENCY)
+    completed = failed = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dashboard-warmup") as executor:
+        futures = {executor.submit(_run_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+                completed += 1
+            except Exception as e:
+                failed += 1
+                result = {
+                    'dashboard_id': job[0],
+                    'access_level': job[1].value,
+                    'province_code': job[2],
+                    'faculty_code': job[3],
+                    'status': 'failed',
+                    'error': str(e)[:200],
+                }
+                logger.warning(f"Warm-up failed for {job[0]} ({job[1].value}, {job[2]}): {e}")
+            with _status_lock:
+                _status['completed'] = completed
+                _status['failed'] = failed
+                _status['current'] = f"{job[0]} / {job[1].value} / {job[2] or '-'}"
+                _status['jobs'].append(result)
+                del _status['jobs'][:-DashboardConfig.PRELOAD_STATUS_JOBS]
+    
+    duration = round(time.time() - started, 1)
+    _update_status(state='done', finished_at=time.time(), duration=duration, current=None)
+    level = 'success' if not failed else 'error'
+    log(f"پیش‌گرم‌سازی کش داشبوردها پایان یافت: {completed} موفق، {failed} ناموفق در {duration} ثانیه", level)
+    logger.info(f"Dashboard warm-up ({trigger}) finished in {duration}s: {completed} ok, {failed} failed")
+    return get_warmup_status()
+
+
+def _sync_log(sync_id: Optional[int]) -> Callable[[str, str], None]:
+    """Progress logger writing into a sync's progress log when there is one"""
+    def log(message: str, level: str = 'info'):
+        if sync_id is None:
+            return
+        try:
+            from admin.sync_progress import add_sync_log
+            add_sync_log(sync_id, message, level)
+        except Exception:
+            pass
+    return log
+
+
+def trigger_warmup(trigger: str, sources: Optional[List[str]] = None, sync_id: Optional[int] = None) -> bool:
+    """
+    Start a warm-up pass in a background thread
+    
+    If a pass is already running, one more pass is queued to start when it
+    finishes (further triggers are merged into that one).
+    
+    Returns:
+        True if a new pass was started, False if it was queued
+    """
+    global _rerun
+    if not DashboardConfig.PRELOAD_ENABLED:
+        return False
+    
+    with _status_lock:
+        if _status['state'] == 'running':
+            if _rerun is None:
+                _rerun = (trigger, sources, sync_id)
+            else:
+                merged = None if _rerun[1] is None or sources is None else sorted(set(_rerun[1]) | set(sources))
+                _rerun = (trigger, merged, sync_id)
+            return False
+        _status['state'] = 'running'
+    
+    app = current_app._get_current_object() if has_app_context() else _app
+    
+    def run():
+        global _rerun
+        next_run = (trigger, sources, sync_id)
+        while next_run is not None:
+            try:
+                if app is not None:
+                    with app.app_context():
+                        warm_up(*next_run)
+                else:
+                    warm_up(*next_run)
+            except Exception as e:
+                logger.error(f"Dashboard warm-up failed: {e}", exc_info=True)
+                _update_status(state='done', finished_at=time.time())
+            with _status_lock:
+                next_run, _rerun = _rerun, None
+                if next_run is not None:
+                    _status['state'] = 'running'
+    
+    threading.Thread(target=run, name="dashboard-warmup", daemon=True).start()
+    return True
+
+
+def start_preloader():
+    """Warm caches in the background at application startup"""
+    global _app
+    if has_app_context():
+        _app = current_app._get_current_object()
+    if not DashboardConfig.PRELOAD_ENABLED or not DashboardConfig.PRELOAD_ON_STARTUP:
+        logger.info("Dashboard startup warm-up disabled")
+        return
+    
+    def delayed():
+        # Let the app finish booting before hitting the database
+        time.sleep(DashboardConfig.PRELOAD_STARTUP_DELAY)
+        trigger_warmup('startup')
+    
+    threading.Thread(target=delayed, name="dashboard-warmup-startup", daemon=True).start()
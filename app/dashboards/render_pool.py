@@ -0,0 +1,183 @@
+"""
+Map Render Pool
+Matplotlib map rendering in a bounded pool of worker processes, so renders
+don't run in request threads or contend for pyplot's global state there.
+Identical jobs in flight (same image key) are rendered once, the number of
+distinct jobs in flight is capped, and a job that outlives RENDER_TIMEOUT is
+abandoned and its workers replaced.
+"""
+import atexit
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, Dict, Optional, Tuple
+from .config import DashboardConfig
+
+logger = logging.getLogger(__name__)
+
+
+class RenderQueueFull(Exception):
+    """More distinct render jobs in flight than RENDER_QUEUE_MAX"""
+
+
+class RenderTimeout(Exception):
+    """A render job ran longer than RENDER_TIMEOUT"""
+
+
+def _init_worker(config: Dict[str, Any]):
+    """
+    Worker processes start fresh (spawn): apply the parent's dashboard config
+    
+    Spawn also imports the parent's entry script in every worker, as
+    __mp_main__; app.py skips its startup jobs under that name.
+    """
+    for name, value in config.items():
+        setattr(DashboardConfig, name, value)
+
+
+def _settle(setter: Callable, value):
+    try:
+        setter(value)
+    except InvalidStateError:  # already expired
+        pass
+
+
+class RenderPool:
+    """
+    Worker processes (multiprocessing spawn context, started on first use)
+    running picklable render functions, with jobs keyed for de-duplication
+    
+    submit() returns a concurrent.futures.Future, so callers choose how long
+    to wait for it.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._jobs: Dict[str, Tuple[Future, float, Any]] = {}
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.expired = 0
+    
+    def _get_pool(self):
+        if self._pool is None:
+            config = {name: value for name, value in vars(DashboardConfig).items() if name.isupper()}
+            self._pool = multiprocessing.get_context('spawn').Pool(
+                processes=DashboardConfig.RENDER_POOL_WORKERS,
+                initializer=_init_worker,
+                initargs=(config,),
+                maxtasksperchild=DashboardConfig.RENDER_MAX_TASKS_PER_WORKER or None,
+            )
+            logger.info(f"Render pool started with {DashboardConfig.RENDER_POOL_WORKERS} worker processes")
+        return self._pool
+    
+    def submit(self, key: str, fn: Callable, *args, on_result: Optional[Callable] = None, **kwargs) -> Future:
+        """
+        Run fn(*args, **kwargs) in a worker, or join the job already in
+        flight under key
+        
+        on_result (if given) runs in this process on the worker's result
+        before the future completes; its return value is the future's result.
+        
+        Raises:
+            RenderQueueFull: RENDER_QUEUE_MAX distinct jobs are in flight
+        """
+        with self._lock:
+            abandoned = self._expire()
+            job = self._jobs.get(key)
+            if job is not None:
+                self.deduplicated += 1
+            elif len(self._jobs) >= DashboardConfig.RENDER_QUEUE_MAX:
+                self.rejected += 1
+            else:
+                job = self._start(key, fn, args, kwargs, on_result)
+        # Terminating waits for the pool's result thread, which may be waiting for the lock
+        for pool in abandoned:
+            pool.terminate()
+        if job is None:
+            raise RenderQueueFull(f"{DashboardConfig.RENDER_QUEUE_MAX} render jobs in flight")
+        return job[0]
+    
+    def _start(self, key: str, fn: Callable, args: tuple, kwargs: dict,
+               on_result: Optional[Callable]) -> Tuple[Future, float, Any]:
+        """Queue a new job (lock held)"""
+        future = Future()
+        future.set_running_or_notify_cancel()
+        pool = self._get_pool()
+        job = self._jobs[key] = (future, time.monotonic(), pool)
+        self.submitted += 1
+        pool.apply_async(
+            fn, args, kwargs,
+            callback=lambda result: self._finish(key, future, result, None, on_result),
+            error_callback=lambda error: self._finish(key, future, None, error, on_result),
+        )
+        return job
+    
+    def _finish(self, key: str, future: Future, result, error: Optional[BaseException],
+                on_result: Optional[Callable]):
+        """Pool result thread: complete a job (its key stays taken until on_result has run)"""
+        if error is None and on_result is not None and not future.done():
+            try:
+                result = on_result(result)
+            except Exception as e:
+                error = e
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job[0] is future:
+                del self._jobs[key]
+        if error is None:
+            _settle(future.set_result, result)
+        else:
+            _settle(future.set_exception, error)
+    
+    def _expire(self) -> list:
+        """
+        Fail jobs running longer than RENDER_TIMEOUT (lock held). A running
+        task can't be cancelled on its own, so its pool is returned for the
+        caller to terminate (a new one starts on the next submit) and the
+        pool's other jobs fail with it.
+        """
+        now = time.monotonic()
+        expired = [key for key, (_, started, _) in self._jobs.items()
+                   if now - started > DashboardConfig.RENDER_TIMEOUT]
+        if not expired:
+            return []
+        pools = {self._jobs[key][2] for key in expired}
+        for key, (future, _, pool) in list(self._jobs.items()):
+            if pool in pools:
+                del self._jobs[key]
+                _settle(future.set_exception, RenderTimeout(f"render job {key[:12]} abandoned"))
+        self.expired += len(expired)
+        logger.warning(f"Render pool: {len(expired)} jobs exceeded {DashboardConfig.RENDER_TIMEOUT}s, restarting workers")
+        if self._pool in pools:
+            self._pool = None
+        return list(pools)
+    
+    def shutdown(self):
+        """Terminate the workers; jobs in flight fail"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            jobs, self._jobs = self._jobs, {}
+        for future, _, _ in jobs.values():
+            _settle(future.set_exception, RenderTimeout("render pool shut down"))
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'running': self._pool is not None,
+                'in_flight': len(self._jobs),
+                'submitted': self.submitted,
+                'deduplicated': self.deduplicated,
+                'rejected': self.rejected,
+                'expired': self.expired,
+            }
+
+
+render_pool = RenderPool()
+atexit.register(render_pool.shutdown)
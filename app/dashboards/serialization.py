@@ -0,0 +1,48 @@
+"""
+JSON Serialization
+Fast JSON encoding of dashboard data for the data API (msgspec)
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional
+import msgspec
+
+
+def _default(obj: Any) -> Any:
+    """Values get_data may hold that JSON has no type for"""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, 'tolist'):  # NumPy scalars and arrays
+        return obj.tolist()
+    return str(obj)
+
+
+_encoder = msgspec.json.Encoder(enc_hook=_default, decimal_format='number')
+
+
+def encode_json(obj: Any) -> bytes:
+    """
+    UTF-8 JSON of obj (non-ASCII text unescaped, int dict keys as strings,
+    like json.dumps(obj, ensure_ascii=False))
+    """
+    return _encoder.encode(obj)
+
+
+def select_fields(data: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """
+    Top-level keys of data named in fields (all of data if None)
+    
+    Raises:
+        KeyError: a field data doesn't have
+    """
+    if fields is None:
+        return data
+    fields = list(fields)
+    missing = [field for field in fields if field not in data]
+    if missing:
+        raise KeyError(', '.join(missing))
+    return {field: data[field] for field in fields}
@@ -6,6 +6,7 @@ import arabic_reshaper
 from bidi.algorithm import get_display
 import jdatetime
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, Union
 
 def get_color_for_key(key: str) -> str:
@@ -17,11 +18,16 @@ def reshape_rtl(text: str) -> str:
     """Reshape Persian text for RTL display."""
     if not text:
         return ""
+    return _reshape_rtl(str(text))
+
+@lru_cache(maxsize=4096)
+def _reshape_rtl(text: str) -> str:
+    # Labels repeat across renders (province names, legends); reshape each once
     try:
-        reshaped = arabic_reshaper.reshape(str(text))
+        reshaped = arabic_reshaper.reshape(text)
         return get_display(reshaped)
     except Exception:
-        return str(text)
+        return text
 
 def to_jalali(dt: Union[datetime, str]) -> str:
     """Convert datetime to Jalali string."""
@@ -0,0 +1,395 @@
+"""
+Province Geometry Store
+Province outlines from the Iran shapefile, their centroids and bounding
+boxes, a normalized name -> province_code index and simplified GeoJSON for
+the interactive maps, preprocessed once into a binary cache file (validated
+against the shapefile and province table checksum) and loaded once per process
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import shapely
+from flask import url_for
+from dashboards.config import DashboardConfig
+from dashboards.serialization import encode_json
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored layout or the name matching changes
+GEOMETRY_CACHE_VERSION = 2
+
+# Simplification tolerance (shapefile units, degrees) of each GeoJSON level
+SIMPLIFY_TOLERANCES = {
+    'low': 0.05,
+    'medium': 0.01,
+    'high': 0.002,
+}
+GEOJSON_PRECISION = 4  # decimal places of GeoJSON coordinates (~10 m)
+
+SHAPEFILE_PARTS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+
+# Persian province names -> shapefile NAME_1 (in addition to province_mappings.json)
+PROVINCE_ALIASES = {
+    "آذربايجان شرقي": "east azarbaijan",
+    "آذربايجان غربي": "west azarbaijan",
+    "اردبيل": "ardebil",
+    "اصفهان": "esfahan",
+    "البرز": "alborz",
+    "ايلام": "ilam",
+    "بوشهر": "bushehr",
+    "تهران": "tehran",
+    "چهارمحال بختياري": "chahar mahall and bakhtiari",
+    "خراسان جنوبي": "south khorasan",
+    "خراسان رضوي": "razavi khorasan",
+    "خراسان شمالي": "north khorasan",
+    "خوزستان": "khuzestan",
+    "زنجان": "zanjan",
+    "سمنان": "semnan",
+    "سيستان وبلوچستان": "sistan and baluchestan",
+    "فارس": "fars",
+    "قزوين": "qazvin",
+    "قم": "qom",
+    "كردستان": "kordestan",
+    "كرمان": "kerman",
+    "كرمانشاه": "kermanshah",
+    "كهگيلويه و بويراحمد": "kohgiluyeh and buyer ahmad",
+    "گلستان": "golestan",
+    "لرستان": "lorestan",
+    "مازندران": "mazandaran",
+    "مركزي": "markazi",
+    "هرمزگان": "hormozgan",
+    "همدان": "hamadan",
+    "يزد": "yazd",
+    "گيلان": "gilan",
+}
+
+_ARABIC_LETTERS = str.maketrans({'ي': 'ی', 'ك': 'ک', 'ة': 'ه', '‌': ' '})
+
+
+def normalize_name(name: str) -> str:
+    """
+    Matching key of a province name: Arabic yeh/kaf folded to Persian,
+    case and all whitespace/ZWNJ dropped ("سیستان وبلوچستان" and
+    "سيستان و بلوچستان" share a key)
+    """
+    return ''.join(str(name).translate(_ARABIC_LETTERS).lower().split())
+
+
+def source_checksum(shapefile_path: str, provinces: Sequence[Tuple[int, str]]) -> str:
+    """Checksum of everything a store is built from"""
+    digest = hashlib.sha256(f"v{GEOMETRY_CACHE_VERSION}".encode('utf-8'))
+    base = os.path.splitext(shapefile_path)[0]
+    for suffix in SHAPEFILE_PARTS:
+        path = base + suffix
+        if not os.path.exists(path):
+            continue
+        digest.update(suffix.encode('utf-8'))
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    digest.update(json.dumps([list(provinces), _aliases()], ensure_ascii=False, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _aliases() -> Dict[str, str]:
+    aliases = {normalize_name(k): v.strip().lower() for k, v in PROVINCE_ALIASES.items()}
+    aliases.update({normalize_name(k): v.strip().lower() for k, v in DashboardConfig.get_province_mappings().items()})
+    return aliases
+
+
+def read_provinces(db_path: str) -> List[Tuple[int, str]]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return [tuple(row) for row in conn.execute(
+            "SELECT province_code, province_name FROM province ORDER BY province_name"
+        )]
+    finally:
+        conn.close()
+
+
+class GeometryStore:
+    """
+    Preprocessed provinces of one shapefile
+    
+    Shapes keep the shapefile's order; `codes[i]` is the province_code of
+    shape i (None when no province matched it).
+    """
+    
+    def __init__(self, checksum: str, names: List[str], codes: List[Optional[int]], geometries: np.ndarray,
+                 centroids: np.ndarray, bounds: np.ndarray, crs: Optional[str],
+                 name_index: Dict[str, int], province_names: Dict[int, str],
+                 geojson: Optional[Dict[str, bytes]] = None):
+        self.checksum = checksum
+        self.names = names
+        self.codes = codes
+        self.geometries = geometries
+        self.centroids = centroids
+        self.bounds = bounds
+        self.total_bounds = np.array([
+            bounds[:, 0].min(), bounds[:, 1].min(), bounds[:, 2].max(), bounds[:, 3].max(),
+        ]) if len(bounds) else np.zeros(4)
+        self.crs = crs
+        self.name_index = name_index
+        self.province_names = province_names
+        self.load_seconds = None
+        self._gdf = None
+        self._gdf_lock = threading.Lock()
+        self._geojson = dict(geojson or {})
+        self._geojson_lock = threading.Lock()
+    
+    @classmethod
+    def build(cls, shapefile_path: str, provinces: Sequence[Tuple[int, str]],
+              checksum: Optional[str] = None) -> 'GeometryStore':
+        """Read the shapefile and match its provinces to province codes"""
+        import geopandas as gpd
+        gdf = gpd.read_file(shapefile_path)[['NAME_1', 'geometry']]
+        names = [str(name).strip() for name in gdf['NAME_1']]
+        geometries = np.asarray(gdf.geometry.values, dtype=object)
+        
+        # Province table names -> shapefile-style names -> codes (table order, as MapBuilder did)
+        aliases = _aliases()
+        mapped_codes = {}
+        for code, name in provinces:
+            mapped_codes[aliases.get(normalize_name(name), str(name).strip().lower())] = code
+        
+        codes = []
+        for name in names:
+            shape_name = name.lower()
+            code = mapped_codes.get(shape_name)
+            if code is None:
+                for mapped_name, mapped_code in mapped_codes.items():
+                    if mapped_name in shape_name or shape_name in mapped_name:
+                        code = mapped_code
+                        break
+            codes.append(code)
+        
+        name_index = {}
+        for key, target in aliases.items():
+            if target in mapped_codes:
+                name_index[key] = mapped_codes[target]
+        for code, name in provinces:
+            name_index[normalize_name(name)] = code
+        for name, code in zip(names, codes):
+            if code is not None:
+                name_index[normalize_name(name)] = code
+        
+        unmatched = [name for name, code in zip(names, codes) if code is None]
+        logger.info(f"Province geometry: {len(names) - len(unmatched)} of {len(names)} shapefile provinces mapped")
+        if unmatched:
+            logger.warning(f"Unmatched shapefile provinces: {unmatched[:10]}")
+        
+        centroids = shapely.get_coordinates(shapely.centroid(geometries)) if len(geometries) else np.zeros((0, 2))
+        store = cls(
+            checksum=checksum or source_checksum(shapefile_path, provinces),
+            names=names,
+            codes=codes,
+            geometries=geometries,
+            centroids=centroids,
+            bounds=shapely.bounds(geometries) if len(geometries) else np.zeros((0, 4)),
+            crs=gdf.crs.to_wkt() if gdf.crs is not None else None,
+            name_index=name_index,
+            province_names={code: name for code, name in provinces},
+        )
+        for level in SIMPLIFY_TOLERANCES:
+            store.geojson(level)  # stored with the rest
+        return store
+    
+    def save(self, path: str):
+        """Write the store to path atomically"""
+        payload = {
+            'version': GEOMETRY_CACHE_VERSION,
+            'checksum': self.checksum,
+            'names': self.names,
+            'codes': self.codes,
+            'wkb': shapely.to_wkb(self.geometries),
+            'centroids': self.centroids,
+            'bounds': self.bounds,
+            'crs': self.crs,
+            'name_index': self.name_index,
+            'province_names': self.province_names,
+            'geojson': self._geojson,
+        }
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    @classmethod
+    def load(cls, path: str, checksum: str) -> Optional['GeometryStore']:
+        """The store saved at path, or None if missing, unreadable or built from other sources"""
+        try:
+            with open(path, 'rb') as f:
+                payload = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Unreadable geometry cache {path}: {e}")
+            return None
+        if payload.get('version') != GEOMETRY_CACHE_VERSION or payload.get('checksum') != checksum:
+            return None
+        return cls(
+            checksum=checksum,
+            names=payload['names'],
+            codes=payload['codes'],
+            geometries=shapely.from_wkb(payload['wkb']),
+            centroids=payload['centroids'],
+            bounds=payload['bounds'],
+            crs=payload['crs'],
+            name_index=payload['name_index'],
+            province_names=payload['province_names'],
+            geojson=payload['geojson'],
+        )
+    
+    def code_for(self, name: str) -> Optional[int]:
+        """province_code of a Persian or shapefile province name"""
+        return self.name_index.get(normalize_name(name))
+    
+    def shape_codes(self) -> Dict[str, int]:
+        """Lowercased shapefile name -> province_code"""
+        return {name.lower(): code for name, code in zip(self.names, self.codes) if code is not None}
+    
+    def normalized_centroids(self) -> Dict[int, Dict[str, float]]:
+        """Centroid of each province as 0-1 screen coordinates (top-left origin)"""
+        min_x, min_y, max_x, max_y = self.total_bounds
+        centroids = {}
+        for code, (x, y) in zip(self.codes, self.centroids):
+            if code:
+                centroids[code] = {
+                    'x': float((x - min_x) / (max_x - min_x)),
+                    'y': float(1 - (y - min_y) / (max_y - min_y)),
+                }
+        return centroids
+    
+    def geojson(self, level: str) -> bytes:
+        """
+        Province outlines simplified to SIMPLIFY_TOLERANCES[level], as a
+        GeoJSON FeatureCollection (UTF-8 bytes); feature properties are
+        province_code (null if unmatched), name (Persian), name_en, centroid
+        
+        Raises:
+            KeyError: unknown level
+        """
+        tolerance = SIMPLIFY_TOLERANCES[level]
+        with self._geojson_lock:
+            data = self._geojson.get(level)
+            if data is None:
+                data = self._geojson[level] = self._simplified_geojson(tolerance)
+            return data
+    
+    def _simplified_geojson(self, tolerance: float) -> bytes:
+        # Each province is simplified on its own: borders are shared only approximately
+        simplified = shapely.simplify(self.geometries, tolerance, preserve_topology=True)
+        simplified = shapely.transform(simplified, lambda coords: np.round(coords, GEOJSON_PRECISION))
+        features = []
+        for name, code, shape, (x, y) in zip(self.names, self.codes, simplified, self.centroids):
+            if shape is None or shape.is_empty:
+                continue
+            features.append({
+                'type': 'Feature',
+                'properties': {
+                    'province_code': code,
+                    'name': self.province_names.get(code, name),
+                    'name_en': name,
+                    'centroid': [round(float(x), GEOJSON_PRECISION), round(float(y), GEOJSON_PRECISION)],
+                },
+                'geometry': json.loads(shapely.to_geojson(shape)),
+            })
+        return encode_json({
+            'type': 'FeatureCollection',
+            'bbox': [round(float(v), GEOJSON_PRECISION) for v in self.total_bounds],
+            'features': features,
+        })
+    
+    def geodataframe(self):
+        """
+        Shared GeoDataFrame of the provinces (NAME_1, NAME_1_normalized,
+        province_code, geometry) for plotting; copy it before modifying
+        """
+        with self._gdf_lock:
+            if self._gdf is None:
+                import geopandas as gpd
+                import pandas as pd
+                self._gdf = gpd.GeoDataFrame({
+                    'NAME_1': self.names,
+                    'NAME_1_normalized': [name.lower() for name in self.names],
+                    'province_code': pd.Series(self.codes, dtype=object),
+                }, geometry=list(self.geometries), crs=self.crs)
+            return self._gdf
+
+
+def load_geometry_store(shapefile_path: str, db_path: str, cache_path: Optional[str]) -> GeometryStore:
+    """
+    Store of shapefile_path from cache_path when its checksum still matches,
+    else built from the shapefile and written back to cache_path
+    """
+    start = time.perf_counter()
+    provinces = read_provinces(db_path)
+    checksum = source_checksum(shapefile_path, provinces)
+    store = GeometryStore.load(cache_path, checksum) if cache_path else None
+    if store is None:
+        store = GeometryStore.build(shapefile_path, provinces, checksum)
+        if cache_path:
+            try:
+                store.save(cache_path)
+            except OSError as e:
+                logger.warning(f"Could not write geometry cache {cache_path}: {e}")
+        source = 'shapefile'
+    else:
+        source = 'cache'
+    store.load_seconds = round(time.perf_counter() - start, 4)
+    logger.info(f"Province geometry loaded from {source} in {store.load_seconds}s ({len(store.names)} shapes)")
+    return store
+
+
+_lock = threading.Lock()
+_stores: Dict[Tuple[str, str], GeometryStore] = {}
+
+
+def get_geometry_store(shapefile_path: Optional[str] = None, db_path: Optional[str] = None) -> GeometryStore:
+    """The process-wide store of a shapefile, loaded on first use"""
+    shapefile_path = shapefile_path or str(DashboardConfig.IRAN_SHAPEFILE)
+    db_path = db_path or DashboardConfig.FACULTY_DB
+    key = (shapefile_path, db_path)
+    with _lock:
+        store = _stores.get(key)
+        if store is None:
+            cache_path = DashboardConfig.GEOMETRY_CACHE_PATH
+            if cache_path and shapefile_path != str(DashboardConfig.IRAN_SHAPEFILE):
+                # One cache file per shapefile
+                suffix = hashlib.sha256(shapefile_path.encode('utf-8')).hexdigest()[:12]
+                cache_path = f"{os.path.splitext(cache_path)[0]}_{suffix}.pkl"
+            store = _stores[key] = load_geometry_store(shapefile_path, db_path, cache_path)
+        return store
+
+
+def province_geometry_urls() -> Dict[str, str]:
+    """
+    URL of each simplified province GeoJSON level, versioned by the geometry
+    checksum so browsers may cache them for good
+    """
+    version = get_geometry_store().checksum[:16]
+    return {
+        level: url_for('dashboard_api.get_province_geometry', level=level, v=version)
+        for level in SIMPLIFY_TOLERANCES
+    }
+
+
+def drop_geometry_stores():
+    with _lock:
+        _stores.clear()
+
@@ -7,139 +7,56 @@ Reusable components for creating geographic maps
 import matplotlib
 matplotlib.use('Agg')
 
-import geopandas as gpd
+import logging
+from functools import lru_cache
 import matplotlib.pyplot as plt
-import pandas as pd
 import numpy as np
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-from matplotlib.patches import Patch
+from matplotlib.collections import PatchCollection
+from matplotlib.patches import Patch, Wedge
+from matplotlib.transforms import Bbox
 import matplotlib.font_manager as font_manager
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from dashboards.config import DashboardConfig
 from dashboards.utils import reshape_rtl
+from dashboards.visualizations.geometry import get_geometry_store
 import jdatetime
 import io
 from flask import send_file
 
+# Pies as _draw_pie_insets draws them: each pie is autoscaled (with the axes
+# margins, equal aspect) into a 0.95in x 1.65in inset centred on the centroid
+PIE_BOX_IN = (0.95, 1.65)
+PIE_EXPLODE = 0.1
+PIE_PCT_DISTANCE = 0.6
+PIE_ZORDER = 6  # inset axes were drawn over the legend (zorder 5) and title
+
+
+@lru_cache(maxsize=1)
+def vazir_font() -> Optional[font_manager.FontProperties]:
+    """Vazir font for map titles, loaded once per process"""
+    font_path = str(DashboardConfig.BASE_DIR / 'static' / 'fonts' / 'Vazir.ttf')
+    try:
+        return font_manager.FontProperties(fname=font_path)
+    except Exception:
+        return None
+
+
 class MapBuilder:
     """Builder for geographic maps with pie charts"""
     
     def __init__(self, shapefile_path: Optional[str] = None):
         self.shapefile_path = shapefile_path or str(DashboardConfig.IRAN_SHAPEFILE)
-        self.iran_gdf = None
-        self.province_map = None
-        self.province_map_dict = None
-        self.province_name_dict = None
-        self._load_shapefile()
-        self._load_province_mapping()
+        # Preprocessed once per process (see geometry.py); no shapefile read here
+        self.geometry = get_geometry_store(self.shapefile_path)
+        self.province_map_dict = self.geometry.shape_codes()
+        self.province_name_dict = dict(self.geometry.province_names)
     
-    def _load_shapefile(self):
-        """Load Iran shapefile"""
-        self.iran_gdf = gpd.read_file(self.shapefile_path)[['NAME_1', 'geometry']]
-        self.iran_gdf['NAME_1'] = self.iran_gdf['NAME_1'].str.strip()
-        self.iran_gdf['NAME_1_normalized'] = self.iran_gdf['NAME_1'].str.lower()
-    
-    def _load_province_mapping(self):
-        """Load province mapping from database"""
-        import sqlite3
-        conn = sqlite3.connect(DashboardConfig.FACULTY_DB)
-        self.province_map = pd.read_sql_query(
-            "SELECT province_code, province_name FROM province ORDER BY province_name",
-            conn
-        )
-        conn.close()
-        
-        self.province_map['province_name_normalized'] = (
-            self.province_map['province_name'].str.strip().str.lower()
-        )
-        
-        # Extended manual mapping (from working dashboard.py code)
-        # Persian → English normalized names
-        manual_mapping2 = {
-            "آذربايجان شرقي": "east azarbaijan",
-            "آذربايجان غربي": "west azarbaijan",
-            "اردبيل": "ardebil",
-            "اصفهان": "esfahan",
-            "البرز": "alborz",
-            "ايلام": "ilam",
-            "بوشهر": "bushehr",
-            "تهران": "tehran",
-            "چهارمحال بختياري": "chahar mahall and bakhtiari",
-            "خراسان جنوبي": "south khorasan",
-            "خراسان رضوي": "razavi khorasan",
-            "خراسان شمالي": "north khorasan",
-            "خوزستان": "khuzestan",
-            "زنجان": "zanjan",
-            "سمنان": "semnan",
-            "سيستان وبلوچستان": "sistan and baluchestan",
-            "فارس": "fars",
-            "قزوين": "qazvin",
-            "قم": "qom",
-            "كردستان": "kordestan",
-            "كرمان": "kerman",
-            "كرمانشاه": "kermanshah",
-            "كهگيلويه و بويراحمد": "kohgiluyeh and buyer ahmad",
-            "گلستان": "golestan",
-            "لرستان": "lorestan",
-            "مازندران": "mazandaran",
-            "مركزي": "markazi",
-            "هرمزگان": "hormozgan",
-            "همدان": "hamadan",
-            "يزد": "yazd",
-            "گيلان": "gilan",
-            # Additional variations
-            "آذربایجان شرقی": "east azarbaijan",
-            "آذربایجان غربی": "west azarbaijan",
-            "چهارمحال بختیاری": "chahar mahall and bakhtiari",
-            "سیستان وبلوچستان": "sistan and baluchestan",
-            "کردستان": "kordestan",
-            "کرمان": "kerman",
-            "کرمانشاه": "kermanshah",
-            "کهگیلویه و بویراحمد": "kohgiluyeh and buyer ahmad",
-            "مرکزی": "markazi",
-        }
-        
-        # Normalize the mapping dict (lowercase keys)
-        manual_mapping_normalized = {k.strip().lower(): v.lower() for k, v in manual_mapping2.items()}
-        
-        # Apply the mapping to province names
-        self.province_map['province_name_mapped'] = self.province_map['province_name_normalized'].map(
-            lambda x: manual_mapping_normalized.get(x, x)  # fallback to original if no match
-        )
-        
-        # Create mapping from mapped names to province codes
-        province_map_dict = dict(zip(self.province_map['province_name_mapped'], self.province_map['province_code']))
-        
-        # Create mapping from shapefile names to province codes
-        province_map_normalized = {}
-        for shape_name in self.iran_gdf['NAME_1_normalized']:
-            # Direct match
-            province_code = province_map_dict.get(shape_name)
-            
-            # If not found, try substring matching
-            if province_code is None:
-                for mapped_name, code in province_map_dict.items():
-                    if mapped_name in shape_name or shape_name in mapped_name:
-                        province_code = code
-                        break
-            
-            if province_code is not None:
-                province_map_normalized[shape_name] = province_code
-        
-        self.province_map_dict = province_map_normalized
-        self.province_name_dict = dict(
-            zip(self.province_map['province_code'], self.province_map['province_name'])
-        )
-        
-        # Log mapping statistics
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Province mapping: {len(province_map_normalized)} provinces mapped out of {len(self.iran_gdf)} shapefile provinces")
-        logger.info(f"Database has {len(self.province_map)} provinces")
-        if len(province_map_normalized) < len(self.iran_gdf):
-            unmatched = set(self.iran_gdf['NAME_1_normalized']) - set(province_map_normalized.keys())
-            logger.warning(f"Unmatched shapefile provinces: {list(unmatched)[:10]}")
+    @property
+    def iran_gdf(self):
+        """Province GeoDataFrame, built (and geopandas imported) on the first render"""
+        return self.geometry.geodataframe()
     
     def create_province_map_with_pie_charts(
         self,
@@ -171,10 +88,63 @@ class MapBuilder:
         fig, ax = plt.subplots(figsize=figsize)
         self.iran_gdf.plot(ax=ax, color='#eee', edgecolor='#ccc')
         # Reduce margins to minimize empty space
-        ax.set_xlim(self.iran_gdf.total_bounds[0], self.iran_gdf.total_bounds[2])
-        ax.set_ylim(self.iran_gdf.total_bounds[1], self.iran_gdf.total_bounds[3])
+        min_x, min_y, max_x, max_y = self.geometry.total_bounds
+        ax.set_xlim(min_x, max_x)
+        ax.set_ylim(min_y, max_y)
+        ax.axis('off')
+        
+        if DashboardConfig.MAP_BATCH_RENDER:
+            self._draw_pie_collection(fig, ax, province_data, colors)
+        else:
+            self._draw_pie_insets(ax, province_data, colors)
+        
+        # Add legend
+        patches = [Patch(color=colors[i], label=reshape_rtl(label)) 
+                  for i, label in enumerate(legend_labels)]
+        ax.legend(
+            handles=patches,
+            loc='lower center',
+            bbox_to_anchor=(0.5, 0.02),
+            ncol=len(legend_labels),
+            frameon=True
+        )
+        
+        # Add title
+        font_prop = vazir_font()
+        
+        ax.set_title(reshape_rtl(title), fontproperties=font_prop, fontsize=24)
+        
+        today_shamsi = jdatetime.date.today().strftime('%Y/%m/%d')
+        ax.text(
+            0.5, 0.97,
+            reshape_rtl(f"تاریخ: {today_shamsi}"),
+            transform=ax.transAxes,
+            ha='center',
+            fontsize=28,
+            fontproperties=font_prop
+        )
         ax.axis('off')
         
+        # Apply tight layout before saving to minimize empty space
+        # Use try-except to handle cases where tight_layout might not work with certain axes
+        try:
+            plt.tight_layout(pad=1.0)
+        except (UserWarning, ValueError, Exception) as e:
+            # If tight_layout fails, just continue without it
+            # Import logger if not already available
+            import logging
+            logging.getLogger(__name__).warning(f"Could not apply tight_layout: {e}")
+            pass
+        
+        # Convert to BytesIO with tight bounding box to remove empty space
+        img = io.BytesIO()
+        fig.savefig(img, format='png', bbox_inches='tight', pad_inches=0.2, dpi=100)
+        img.seek(0)
+        plt.close(fig)
+        return img
+    
+    def _draw_pie_insets(self, ax, province_data: Dict[int, Dict[str, int]], colors: List[str]):
+        """One inset_axes pie per province (DASHBOARD_MAP_BATCH_RENDER=false)"""
         # Log input data
         import logging
         logger = logging.getLogger(__name__)
@@ -200,19 +170,11 @@ class MapBuilder:
         for idx, row in self.iran_gdf.iterrows():
             province_name_norm = row['NAME_1_normalized']
             province_name_original = row['NAME_1']
-            province_code = self.province_map_dict.get(province_name_norm)
+            province_code = self.geometry.codes[idx]  # close matches resolved when the store was built
             
             if province_code is None:
                 unmatched_provinces.append(f"{province_name_original} (normalized: {province_name_norm})")
-                # Try to find a close match
-                for mapped_name, code in self.province_map_dict.items():
-                    if province_name_norm in mapped_name or mapped_name in province_name_norm:
-                        province_code = code
-                        logger.debug(f"Found close match for {province_name_original}: {mapped_name} -> {code}")
-                        break
-                
-                if province_code is None:
-                    continue  # Skip provinces without mapping
+                continue  # Skip provinces without mapping
             
             # Log Esfahan mapping specifically
             # if province_code == 4 or 'esfahan' in province_name_norm:
@@ -243,7 +205,7 @@ class MapBuilder:
                 continue
             
             matched_provinces += 1
-            centroid = row['geometry'].centroid
+            centroid_x, centroid_y = self.geometry.centroids[idx]
             try:
                 # Verify values before rendering (especially for Esfahan)
                 if province_code == 4:
@@ -254,7 +216,7 @@ class MapBuilder:
                     width=0.95,
                     height=1.65,
                     loc='center',
-                    bbox_to_anchor=(centroid.x, centroid.y),
+                    bbox_to_anchor=(centroid_x, centroid_y),
                     bbox_transform=ax.transData,
                     borderpad=15
                 )
@@ -296,76 +258,180 @@ class MapBuilder:
             logger.warning(f"Unmatched provinces: {unmatched_provinces}")
         if provinces_without_data:
             logger.info(f"Provinces without data: {provinces_without_data}")
+    
+    def _draw_pie_collection(self, fig, ax, province_data: Dict[int, Dict[str, int]], colors: List[str]):
+        """
+        All provinces' pies as one PatchCollection on the map axes
         
-        # Add legend
-        patches = [Patch(color=colors[i], label=reshape_rtl(label)) 
-                  for i, label in enumerate(legend_labels)]
-        ax.legend(
-            handles=patches,
-            loc='lower center',
-            bbox_to_anchor=(0.5, 0.02),
-            ncol=len(legend_labels),
-            frameon=True
-        )
+        Draws what _draw_pie_insets does without an axes per province: each
+        pie gets the size and position its inset axes would give it (sized in
+        inches, placed at the centroid through offsets in data coordinates)
+        and is stacked above the legend and title as the inset axes were.
+        """
+        margins = (1 + 2 * plt.rcParams['axes.xmargin'], 1 + 2 * plt.rcParams['axes.ymargin'])
+        wedges, facecolors, offsets = [], [], []
+        drawn = 0
+        for (x, y), province_code in zip(self.geometry.centroids, self.geometry.codes):
+            if province_code is None:
+                continue
+            data = province_data.get(province_code, {})
+            values = [int(data.get('1', 0)), int(data.get('2', 0))]
+            total = sum(values)
+            if total == 0:
+                continue
+            drawn += 1
+            
+            # Wedges of a unit pie, as Axes.pie lays them out
+            pie = []
+            theta = 90.0
+            for i, value in enumerate(values):
+                sweep = 360.0 * value / total
+                middle = np.deg2rad(theta + sweep / 2)
+                direction = np.array([np.cos(middle), np.sin(middle)])
+                center = direction * (PIE_EXPLODE if i == 0 else 0)
+                pie.append((center, theta, theta + sweep, center + PIE_PCT_DISTANCE * direction, value))
+                theta += sweep
+            
+            # The inset's autoscale: wedge extents plus margins, fitted into the box
+            extents = Bbox.union([Wedge(center, 1, theta1, theta2).get_path().get_extents()
+                                  for center, theta1, theta2, _, _ in pie])
+            scale = min(PIE_BOX_IN[0] / (extents.width * margins[0]), PIE_BOX_IN[1] / (extents.height * margins[1]))
+            middle = np.array([(extents.x0 + extents.x1) / 2, (extents.y0 + extents.y1) / 2])
+            
+            for i, (center, theta1, theta2, text_at, value) in enumerate(pie):
+                wedges.append(Wedge(tuple((center - middle) * scale), scale, theta1, theta2))
+                facecolors.append(colors[i % len(colors)])
+                offsets.append((x, y))
+                ax.annotate(
+                    f'{round(100 * value / total)}%',
+                    xy=(x, y),
+                    xytext=tuple((text_at - middle) * scale * 72),
+                    textcoords='offset points',
+                    ha='center',
+                    va='center',
+                    fontsize=16,
+                    fontweight='bold',
+                    annotation_clip=False,
+                    zorder=PIE_ZORDER + 1,
+                )
+        if wedges:
+            pies = PatchCollection(
+                wedges,
+                facecolors=facecolors,
+                edgecolors='none',
+                offsets=offsets,
+                offset_transform=ax.transData,
+                transform=fig.dpi_scale_trans,
+                zorder=PIE_ZORDER,
+                clip_on=False,
+            )
+            ax.add_collection(pies, autolim=False)
+        logging.getLogger(__name__).info(f"Map rendering: {drawn} province pies drawn as one collection")
+    
+    def create_pardis_map(self, province_data: Dict[int, Dict[int, int]]) -> io.BytesIO:
+        """
+        Create map with a pie of pardis/markaz/daneshkade counts per province (d3)
         
-        # Add title
-        font_path = str(DashboardConfig.BASE_DIR / 'static' / 'fonts' / 'Vazir.ttf')
-        try:
-            font_prop = font_manager.FontProperties(fname=font_path)
-        except:
-            font_prop = None
+        Args:
+            province_data: Dict mapping province_code to {type_code: count}
         
-        ax.set_title(reshape_rtl(title), fontproperties=font_prop, fontsize=24)
+        Returns:
+            BytesIO object containing PNG image
+        """
+        fig, ax = plt.subplots(figsize=(9, 8))
+        self.iran_gdf.plot(ax=ax, color="#f9f9f9", edgecolor="#aaa")
+        ax.set_axis_off()
         
         today_shamsi = jdatetime.date.today().strftime('%Y/%m/%d')
-        ax.text(
-            0.5, 0.97,
-            reshape_rtl(f"تاریخ: {today_shamsi}"),
-            transform=ax.transAxes,
-            ha='center',
-            fontsize=28,
-            fontproperties=font_prop
-        )
-        ax.axis('off')
+        ax.text(0.5, 0.97, reshape_rtl(f"تاریخ: {today_shamsi}"),
+                transform=ax.transAxes, ha='center', fontsize=13, fontproperties=vazir_font())
         
-        # Apply tight layout before saving to minimize empty space
-        # Use try-except to handle cases where tight_layout might not work with certain axes
-        try:
-            plt.tight_layout(pad=1.0)
-        except (UserWarning, ValueError, Exception) as e:
-            # If tight_layout fails, just continue without it
-            # Import logger if not already available
-            import logging
-            logging.getLogger(__name__).warning(f"Could not apply tight_layout: {e}")
-            pass
+        # Add pie charts
+        for idx, province_code in enumerate(self.geometry.codes):
+            if not province_code:
+                continue
+            
+            counts = province_data.get(province_code, {})
+            values = [counts.get(1, 0), counts.get(2, 0), counts.get(3, 0), counts.get(4, 0)]
+            
+            if sum(values) == 0:
+                continue
+            
+            centroid_x, centroid_y = self.geometry.centroids[idx]
+            ax_inset = inset_axes(
+                ax, width=0.4, height=0.4, loc='center',
+                bbox_to_anchor=(centroid_x, centroid_y),
+                bbox_transform=ax.transData, borderpad=0.1
+            )
+            ax_inset.pie(
+                [x for x in values if x != 0],
+                labels=[x for x in values if x != 0],
+                startangle=90,
+                colors=['#66c2a5', '#fc8d62', '#8da0cb', '#e78ac3']
+            )
+            ax_inset.set_aspect("equal")
+        
+        # Add legend
+        patches = [
+            Patch(color='#66c2a5', label=reshape_rtl('پردیس')),
+            Patch(color='#fc8d62', label=reshape_rtl('مرکز')),
+            Patch(color='#8da0cb', label=reshape_rtl('دانشکده')),
+        ]
+        ax.legend(handles=patches, loc='lower center', ncol=4,
+                 bbox_to_anchor=(0.5, -0.05), frameon=False)
         
-        # Convert to BytesIO with tight bounding box to remove empty space
         img = io.BytesIO()
-        fig.savefig(img, format='png', bbox_inches='tight', pad_inches=0.2, dpi=100)
+        FigureCanvas(fig).print_png(img)
         img.seek(0)
         plt.close(fig)
         return img
     
+    def province_geojson(self, level: str = 'medium') -> bytes:
+        """
+        Simplified province outlines for the interactive (vector) map,
+        precomputed per level (see geometry.SIMPLIFY_TOLERANCES)
+        """
+        return self.geometry.geojson(level)
+    
+    def create_province_map_data(
+        self,
+        province_data: Dict[int, Dict],
+        series_keys: List,
+        legend_labels: List[str],
+        colors: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Per-province values for the interactive map, matched to the GeoJSON
+        features by province_code
+        
+        Args:
+            province_data: Dict mapping province_code to {series_key: count}
+            series_keys: keys of the pie segments in each province's dict, in order
+            legend_labels: label of each segment
+            colors: color of each segment
+        
+        Returns:
+            {'series': [{'label', 'color'}], 'provinces': {code: {'name', 'values', 'total'}}}
+        """
+        provinces = {}
+        for province_code, counts in province_data.items():
+            values = [int(counts.get(key, 0)) for key in series_keys]
+            provinces[province_code] = {
+                'name': self.province_name_dict.get(province_code, str(province_code)),
+                'values': values,
+                'total': sum(values),
+            }
+        return {
+            'series': [{'label': label, 'color': color} for label, color in zip(legend_labels, colors)],
+            'provinces': provinces,
+        }
+    
     def get_province_centroids(self) -> Dict[int, Dict[str, float]]:
         """
         Get centroid coordinates for each province (normalized 0-1)
         Returns dict mapping province_code to {'x': float, 'y': float}
         """
-        centroids = {}
-        for idx, row in self.iran_gdf.iterrows():
-            province_name_norm = row['NAME_1_normalized']
-            province_code = self.province_map_dict.get(province_name_norm)
-            if province_code:
-                centroid = row['geometry'].centroid
-                # Get bounds for normalization
-                bounds = self.iran_gdf.total_bounds
-                # Normalize coordinates (0-1)
-                x_norm = (centroid.x - bounds[0]) / (bounds[2] - bounds[0])
-                y_norm = (centroid.y - bounds[1]) / (bounds[3] - bounds[1])
-                # Invert y for screen coordinates (top-left origin)
-                y_norm = 1 - y_norm
-                centroids[province_code] = {'x': x_norm, 'y': y_norm}
-        return centroids
+        return self.geometry.normalized_centroids()
     
     def create_province_table_data(
         self,
@@ -473,3 +539,10 @@ class MapBuilder:
         return table_data
 
 
+def render_map_png(method: str, **kwargs) -> bytes:
+    """
+    PNG bytes of a MapBuilder map, e.g. render_map_png('create_pardis_map', province_data=...)
+    
+    Module-level (picklable by name) so render pool worker processes can run it.
+    """
+    return getattr(MapBuilder(), method)(**kwargs).getvalue()
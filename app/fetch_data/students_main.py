@@ -1,7 +1,13 @@
+import os
+import sys
 import requests
 import sqlite3
 import time
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations.add_students_derived_columns import add_derived_columns
+
 # --- Configuration ---
 LOGIN_URL = "https://api.cfu.ac.ir/Login"
 STUDENTS_URL = "https://api.cfu.ac.ir/API/Golestan/Students_2"
@@ -73,16 +79,24 @@ def insert_students(cursor, students):
     for student in students:
         try:
             student['province_code']=student['provinceCode']
+            # Named columns (the live table's column order differs from
+            # create_students_table); entrance_year/term_year are derived here
+            # exactly as migrations/add_students_derived_columns.py backfills them
             cursor.execute("""
-            INSERT OR IGNORE INTO Students VALUES (
+            INSERT OR IGNORE INTO Students (
+                studentnum, firstname, familyname, firstnameeng, familynameeng,
+                fathername, codvaziayat, vazeiyat, birthdate, birthplace,
+                city, address, phonenum, email, sex, course, course_name,
+                grade, gradname, degsdate, last_degree, uniname,
+                sub_uniname, sub_num, code_Markaz, province, term, province_code,
+                entrance_year, term_year
+            ) VALUES (
                 :studentnum, :firstname, :familyname, :firstnameeng, :familynameeng,
                 :fathername, :codvaziayat, :vazeiyat, :birthdate, :birthplace,
                 :city, :address, :phonenum, :email, :sex, :course, :course_name,
                 :grade, :gradname, :degsdate, :last_degree, :uniname,
-                :sub_uniname, :sub_num,
-                :code_Markaz, 
-                :province, 
-                :term, :province_code
+                :sub_uniname, :sub_num, :code_Markaz, :province, :term, :province_code,
+                SUBSTR(:studentnum, 1, 3), SUBSTR(:term, 1, 3)
             )
             """, student)
         except Exception as e:
@@ -126,6 +140,8 @@ def main():
 
     # Prepare DB
     # create_students_table(cursor)
+    add_derived_columns(conn)
+    conn.commit()
 
     # Login
     token = get_token()
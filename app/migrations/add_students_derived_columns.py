@@ -0,0 +1,108 @@
+"""
+Migration: add indexed derived columns to the Students table in faculty_data.db
+Run this script to add entrance_year and term_year (the 3-digit year prefixes
+of studentnum and term that dashboards group and filter by), backfill them for
+existing rows and create the indexes dashboard queries use
+
+students_main.py calls add_derived_columns() before each import, so new rows
+get the columns filled on insert.
+"""
+import sqlite3
+import os
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+DB_PATH = os.getenv("FACULTY_DB_PATH", os.path.join(BASE_DIR, 'fetch_data', 'faculty_data.db'))
+
+# column -> (declared type, expression it is derived from)
+DERIVED_COLUMNS = {
+    'entrance_year': ('TEXT', 'SUBSTR(studentnum, 1, 3)'),
+    'term_year': ('TEXT', 'SUBSTR(term, 1, 3)'),
+}
+
+# index -> columns; entrance year and term year lead so WHERE/GROUP BY on them
+# is an index search/scan, the trailing columns make the chart queries covering
+DERIVED_INDEXES = {
+    'idx_students_entrance_year': ('entrance_year', 'sex', 'vazeiyat', 'grade', 'province_code'),
+    'idx_students_grade_entrance_year': ('grade', 'entrance_year', 'course_name'),
+    'idx_students_term_year': ('term_year', 'province'),
+    # code_Markaz is the student's pardis code
+    'idx_students_code_markaz': ('code_Markaz',),
+}
+
+
+def add_derived_columns(conn):
+    """
+    Add missing derived columns, fill rows whose values are missing or stale
+    and create missing indexes (idempotent; does nothing without a Students table)
+    
+    Returns:
+        Dict with the columns added, rows updated and indexes created
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(Students)")
+    columns = [row[1] for row in cursor.fetchall()]
+    result = {'columns_added': [], 'rows_updated': 0, 'indexes_created': []}
+    if not columns:
+        return result
+    
+    for column, (declared, _) in DERIVED_COLUMNS.items():
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE Students ADD COLUMN {column} {declared}")
+            result['columns_added'].append(column)
+    
+    assignments = ", ".join(f"{column} = {expression}" for column, (_, expression) in DERIVED_COLUMNS.items())
+    stale = " OR ".join(f"{column} IS NOT {expression}" for column, (_, expression) in DERIVED_COLUMNS.items())
+    cursor.execute(f"UPDATE Students SET {assignments} WHERE {stale}")
+    result['rows_updated'] = cursor.rowcount
+    
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='Students'")
+    indexes = {row[0] for row in cursor.fetchall()}
+    for index, index_columns in DERIVED_INDEXES.items():
+        if index not in indexes:
+            cursor.execute(f"CREATE INDEX {index} ON Students ({', '.join(index_columns)})")
+            result['indexes_created'].append(index)
+    if result['indexes_created']:
+        cursor.execute("ANALYZE Students")
+    return result
+
+
+def migrate(db_path=None):
+    db_path = db_path or DB_PATH
+    print(f"Starting migration: add derived columns to Students in {db_path}...")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='Students'")
+        if not cursor.fetchone():
+            print("[SKIP] Students table does not exist. Run a students sync first.")
+            return
+        
+        result = add_derived_columns(conn)
+        conn.commit()
+        
+        for column in DERIVED_COLUMNS:
+            if column in result['columns_added']:
+                print(f"[OK] Added {column} column")
+            else:
+                print(f"[SKIP] {column} column already exists")
+        print(f"[OK] Backfilled {result['rows_updated']} rows")
+        for index in DERIVED_INDEXES:
+            if index in result['indexes_created']:
+                print(f"[OK] Created {index}")
+            else:
+                print(f"[SKIP] {index} already exists")
+        
+        print("\n[SUCCESS] Migration completed successfully!")
+        print("  - Dashboards pick the columns up on the next students data version;")
+        print("    run scripts/bump_data_version.py students to switch right away")
+    
+    except Exception as e:
+        conn.rollback()
+        print(f"\n[ERROR] Migration failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,101 @@
+"""
+Benchmark: response size and compression CPU cost per dashboard payload
+
+Builds a synthetic faculty_data.db and measures, for each payload, the
+uncompressed size and the size and time of gzip (and brotli when
+installed), plus the time of a repeat served from the compressed-body
+cache:
+  - d2-style map page: inline base64 PNG of per-province pie charts and the
+    table/tooltip JSON
+  - StudentsDashboard chart data (d2/d8 JSON blobs)
+  - a full page of the faculty list (/faculty-by-province/<code>/page)
+Saved dashboard pages (e.g. `curl ... > d2.html`) can be passed as extra
+arguments to measure real ones.
+
+Usage:
+    python scripts/benchmark_compression.py [students] [repeats] [page.html ...]
+"""
+import base64
+import io
+import os
+import sys
+import tempfile
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from scripts.synthetic_data import create_faculty_db
+from dashboards.config import DashboardConfig
+from dashboards.data_providers.faculty import FacultyDataProvider
+from dashboards.data_providers.students import StudentsDataProvider
+from dashboards import compression
+from dashboards.serialization import encode_json
+
+
+def map_page(province_data) -> bytes:
+    """Page shaped like the map dashboards: one PNG of 31 pies plus tooltip JSON"""
+    fig, ax = plt.subplots(figsize=(12, 10), dpi=100)
+    for i, (code, counts) in enumerate(sorted(province_data.items())):
+        x, y = 44 + (i % 6) * 3, 26 + (i // 6) * 3
+        ax.pie([counts.get('1', 0) or 1, counts.get('2', 0) or 1], center=(x, y), radius=1.2,
+               colors=['#36A2EB', '#FF6384'], frame=True)
+    ax.set_xlim(42, 64)
+    ax.set_ylim(24, 42)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight')
+    plt.close(fig)
+    image = base64.b64encode(buf.getvalue()).decode('ascii')
+    tooltips = encode_json({code: {'name': f'استان {code}', **counts} for code, counts in province_data.items()})
+    return (f'<html dir="rtl"><body><img src="data:image/png;base64,{image}">'
+            f'<script>const provinces = {tooltips.decode("utf-8")};</script></body></html>').encode('utf-8')
+
+
+def timed(func, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return result, statistics.median(samples) * 1000
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    pages = sys.argv[3:]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "faculty_data.db")
+        print(f"Generating {students:,} synthetic students...")
+        create_faculty_db(db_path, students=students, faculty=students // 10)
+        
+        faculty = FacultyDataProvider(db_path=db_path)
+        payloads = {
+            "map page": map_page(faculty.get_faculty_by_province()),
+            "students charts": encode_json(StudentsDataProvider(db_path=db_path).get_dashboard_data(None, {})),
+            "faculty list": encode_json(faculty.get_faculty_page(3, limit=DashboardConfig.FACULTY_MAX_PAGE_SIZE)),
+        }
+        for path in pages:
+            with open(path, 'rb') as f:
+                payloads[os.path.basename(path)] = f.read()
+        
+        encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+        print(f"\nCompression ({repeats} runs, median):")
+        for label, data in payloads.items():
+            line = f"  {label:<16} {len(data) / 1024:8.1f} KB"
+            for encoding in encodings:
+                body, ms = timed(lambda: compression.compress(data, encoding), repeats)
+                compression.compressed_cache.get_or_compress(data, encoding)
+                _, cached_ms = timed(lambda: compression.compressed_cache.get_or_compress(data, encoding), repeats)
+                line += (f"   {encoding}: {len(body) / 1024:7.1f} KB ({len(body) / len(data):4.0%})"
+                         f" {ms:6.2f} ms, cached {cached_ms:5.2f} ms")
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
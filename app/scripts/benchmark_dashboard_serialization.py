@@ -0,0 +1,73 @@
+"""
+Benchmark: dashboard data serialization, per-key json.dumps vs encode_json
+
+Builds a synthetic faculty_data.db, computes the largest payloads the
+dashboards serialize (the StudentsDashboard chart data and a full page of
+the faculty list) and times three ways of turning each into JSON:
+  - per-key json.dumps, as StudentsDashboard.render does for its template
+  - one json.dumps of the whole payload
+  - encode_json (msgspec), as the /api/dashboards/v1 data API does
+
+Usage:
+    python scripts/benchmark_dashboard_serialization.py [students] [faculty] [repeats]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.synthetic_data import create_faculty_db
+from dashboards.config import DashboardConfig
+from dashboards.data_providers.faculty import FacultyDataProvider
+from dashboards.data_providers.students import StudentsDataProvider
+from dashboards import serialization
+
+
+def per_key(data):
+    return {key: json.dumps(value, ensure_ascii=False) for key, value in data.items()}
+
+
+def whole(data):
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def timed(func, data, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(data)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    faculty = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "faculty_data.db")
+        print(f"Generating {students:,} synthetic students, {faculty:,} faculty...")
+        create_faculty_db(db_path, students=students, faculty=faculty)
+        
+        payloads = {
+            "students charts": StudentsDataProvider(db_path=db_path).get_dashboard_data(None, {}),
+            "faculty list": FacultyDataProvider(db_path=db_path).get_faculty_page(
+                3, limit=DashboardConfig.FACULTY_MAX_PAGE_SIZE,
+            ),
+        }
+        print(f"\nSerialization ({repeats} runs, median):")
+        for label, data in payloads.items():
+            size = len(serialization.encode_json(data)) / 1024
+            print(f"  {label:<16} {size:8.1f} KB   "
+                  f"per-key json.dumps: {timed(per_key, data, repeats):7.2f} ms   "
+                  f"json.dumps: {timed(whole, data, repeats):7.2f} ms   "
+                  f"encode_json: {timed(serialization.encode_json, data, repeats):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: per-render SQLite connection overhead with and without the connection pool
+
+Builds a synthetic Students table (default 300,000 rows), then runs the same
+provider calls that StudentsDashboard.get_data issues for one render:
+  - once with a fresh sqlite3.connect per query (old behaviour)
+  - once with the per-thread read-only pool
+
+Usage:
+    python scripts/benchmark_db_pool.py [rows] [renders]
+"""
+import os
+import sys
+import tempfile
+import time
+import sqlite3
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.synthetic_data import create_faculty_db
+from dashboards.data_providers.students import StudentsDataProvider
+from dashboards.data_providers.connection_pool import SQLiteConnectionPool
+
+
+def students_render(provider: StudentsDataProvider):
+    """Same provider calls as StudentsDashboard.get_data"""
+    filters = {}
+    provider.get_gender_data(None, filters, year_404=False)
+    provider.get_gender_data(None, filters, year_404=True)
+    provider.get_vazeiyat_data(None, filters, year_404=False)
+    provider.get_vazeiyat_data(None, filters, year_404=True)
+    provider.get_province_vazeiyat_data(None, filters)
+    for grade in (1, 2, 3, 4):
+        provider.get_course_data_by_grade(None, filters, grade=grade)
+    provider.get_grade_data(None, filters)
+    provider.get_province_data(None, filters)
+    provider.get_province_year_data(None, filters)
+    provider.get_province_sex_data(None, filters)
+    provider.get_year_data(None, filters)
+    provider.get_year_grade_data(None, filters)
+    for grade in (1, 2, 3, 4):
+        provider.get_course_year_data(None, filters, grade=grade)
+
+
+def time_connection_overhead(db_path: str, queries: int = 19, rounds: int = 200):
+    """Cost of obtaining connections for one render, isolated from query work"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _ in range(queries):
+            conn = sqlite3.connect(db_path)
+            conn.execute("SELECT 1").fetchone()
+            conn.close()
+    unpooled = (time.perf_counter() - start) / rounds
+    
+    pool = SQLiteConnectionPool(db_path, enable_wal=True)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _ in range(queries):
+            with pool.connection() as conn:
+                conn.execute("SELECT 1").fetchone()
+    pooled = (time.perf_counter() - start) / rounds
+    return unpooled, pooled
+
+
+def time_renders(provider: StudentsDataProvider, renders: int):
+    samples = []
+    for _ in range(renders):
+        start = time.perf_counter()
+        students_render(provider)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    renders = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "faculty_data.db")
+        print(f"Generating {rows:,} synthetic students...")
+        create_faculty_db(db_path, students=rows)
+        
+        unpooled, pooled = time_connection_overhead(db_path)
+        print("\nConnection overhead per render (19 connections, SELECT 1):")
+        print(f"  new connection per query : {unpooled * 1000:8.2f} ms")
+        print(f"  pooled connection        : {pooled * 1000:8.2f} ms")
+        
+        provider = StudentsDataProvider(db_path=db_path)
+        provider.use_pool = False
+        students_render(provider)  # warm OS page cache
+        before = time_renders(provider, renders)
+        
+        provider.use_pool = True
+        students_render(provider)
+        after = time_renders(provider, renders)
+        
+        print(f"\nFull students render ({renders} renders, median):")
+        print(f"  new connection per query : {statistics.median(before) * 1000:8.1f} ms")
+        print(f"  pooled connection        : {statistics.median(after) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: year-prefix Students queries on SUBSTR expressions vs the indexed
+derived columns (migrations/add_students_derived_columns.py)
+
+Builds a synthetic Students table (default 1,000,000 rows), then for each
+StudentsDataProvider query that filters or groups by entrance/term year
+prints the EXPLAIN QUERY PLAN and median latency:
+  - before the migration (SUBSTR(studentnum, 1, 3), substr(term, 1, 3))
+  - after it (entrance_year, term_year and their indexes)
+
+Usage:
+    python scripts/benchmark_derived_columns.py [rows] [runs]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import sqlite3
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.synthetic_data import create_faculty_db
+from dashboards.data_providers.students import StudentsDataProvider
+from migrations.add_students_derived_columns import migrate
+
+# label -> provider call
+QUERIES = {
+    'gender 404': lambda p: p.get_gender_data(None, {}, year_404=True),
+    'vazeiyat 404': lambda p: p.get_vazeiyat_data(None, {}, year_404=True),
+    'year by sex': lambda p: p.get_year_data(None, {}),
+    'year by grade': lambda p: p.get_year_grade_data(None, {}),
+    'course/year grade 2': lambda p: p.get_course_year_data(None, {}, grade=2),
+    'province/term year': lambda p: p.get_province_year_data(None, {}),
+    'gender 404 province 3': lambda p: p.get_gender_data(None, {'province_code': 3}, year_404=True),
+}
+
+# Pardis lookup (code_Markaz index); not a provider query
+PARDIS_QUERY = "SELECT COUNT(*) FROM Students WHERE code_Markaz = 305"
+
+
+def capture_sql(provider: StudentsDataProvider, call):
+    """The (query, params) a provider call executes"""
+    queries = []
+    execute_query = StudentsDataProvider.execute_query
+    
+    def recording_execute_query(query, params=(), context=None):
+        queries.append((query, params))
+        return execute_query(provider, query, params, context)
+    
+    provider.execute_query = recording_execute_query
+    try:
+        call(provider)
+    finally:
+        del provider.execute_query
+    return queries[-1]
+
+
+def query_plan(db_path: str, query: str, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+    finally:
+        conn.close()
+
+
+def time_call(call, runs: int):
+    call()  # warm OS page cache
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def measure(db_path: str, provider: StudentsDataProvider, runs: int):
+    results = {}
+    for label, call in QUERIES.items():
+        query, params = capture_sql(provider, call)
+        results[label] = (query_plan(db_path, query, params), time_call(lambda: call(provider), runs))
+    
+    conn = sqlite3.connect(db_path)
+    try:
+        results['pardis lookup'] = (
+            query_plan(db_path, PARDIS_QUERY),
+            time_call(lambda: conn.execute(PARDIS_QUERY).fetchall(), runs),
+        )
+    finally:
+        conn.close()
+    return results
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "faculty_data.db")
+        print(f"Generating {rows:,} synthetic students...")
+        create_faculty_db(db_path, students=rows, faculty=100)
+        
+        provider = StudentsDataProvider(db_path=db_path)
+        provider.use_pool = False
+        provider.use_aggregates = False
+        before = measure(db_path, provider, runs)
+        
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate(db_path)
+        print(f"Migration (add columns, backfill, index): {time.perf_counter() - start:.1f} s")
+        StudentsDataProvider._derived_columns.clear()
+        after = measure(db_path, provider, runs)
+        
+        for label in before:
+            print(f"\n{label}")
+            for name, (plan, seconds) in (('SUBSTR', before[label]), ('derived', after[label])):
+                print(f"  {name:8s} {seconds * 1000:8.1f} ms")
+                for step in plan:
+                    print(f"           {step}")
+        
+        print(f"\nMedian of {runs} runs:")
+        print(f"  {'query':24s} {'SUBSTR':>10s} {'derived':>10s} {'speedup':>8s}")
+        for label in before:
+            old, new = before[label][1], after[label][1]
+            print(f"  {label:24s} {old * 1000:8.1f}ms {new * 1000:8.1f}ms {old / new:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
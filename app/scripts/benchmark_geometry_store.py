@@ -0,0 +1,91 @@
+"""
+Benchmark: map dashboard startup, shapefile read vs the geometry store
+
+Times what MapBuilder did in its constructor before the geometry store
+(geopandas read of the shapefile, province table read, name matching with
+substring fallback, per-shape centroids) against loading the preprocessed
+store from its cache file, and reports the geopandas import a fresh worker
+no longer pays at startup (MapBuilder now defers it to the first render). Uses the configured shapefile and faculty_data.db
+when given, else a synthetic shapefile and DB.
+
+Usage:
+    python scripts/benchmark_geometry_store.py [repeats] [shapefile db]
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geopandas as gpd
+import pandas as pd
+
+from scripts.synthetic_data import create_faculty_db, create_province_shapefile
+from dashboards.visualizations.geometry import PROVINCE_ALIASES, load_geometry_store
+
+
+def shapefile_load(shapefile_path: str, db_path: str):
+    """The pre-store MapBuilder constructor plus get_province_centroids"""
+    iran_gdf = gpd.read_file(shapefile_path)[['NAME_1', 'geometry']]
+    iran_gdf['NAME_1'] = iran_gdf['NAME_1'].str.strip()
+    iran_gdf['NAME_1_normalized'] = iran_gdf['NAME_1'].str.lower()
+    conn = sqlite3.connect(db_path)
+    province_map = pd.read_sql_query("SELECT province_code, province_name FROM province ORDER BY province_name", conn)
+    conn.close()
+    aliases = {k.strip().lower(): v.lower() for k, v in PROVINCE_ALIASES.items()}
+    mapped = province_map['province_name'].str.strip().str.lower().map(lambda x: aliases.get(x, x))
+    province_map_dict = dict(zip(mapped, province_map['province_code']))
+    codes = {}
+    for shape_name in iran_gdf['NAME_1_normalized']:
+        code = province_map_dict.get(shape_name)
+        if code is None:
+            for mapped_name, mapped_code in province_map_dict.items():
+                if mapped_name in shape_name or shape_name in mapped_name:
+                    code = mapped_code
+                    break
+        codes[shape_name] = code
+    return [row['geometry'].centroid for _, row in iran_gdf.iterrows()]
+
+
+def timed(func, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        if len(sys.argv) > 3:
+            shapefile_path, db_path = sys.argv[2], sys.argv[3]
+        else:
+            print("Generating synthetic shapefile and faculty_data.db...")
+            shapefile_path = create_province_shapefile(os.path.join(tmp, "provinces.shp"))
+            db_path = create_faculty_db(os.path.join(tmp, "faculty_data.db"), students=100, faculty=100)
+        cache_path = os.path.join(tmp, "province_geometry.pkl")
+        
+        build = timed(lambda: load_geometry_store(shapefile_path, db_path, None), repeats)
+        load_geometry_store(shapefile_path, db_path, cache_path)
+        cached = timed(lambda: load_geometry_store(shapefile_path, db_path, cache_path), repeats)
+        before = timed(lambda: shapefile_load(shapefile_path, db_path), repeats)
+        print(f"\nMap dashboard geometry load ({repeats} runs, median; "
+              f"shapefile {os.path.getsize(shapefile_path) / 1024:.0f} KB, cache {os.path.getsize(cache_path) / 1024:.0f} KB):")
+        print(f"  shapefile read + name matching (before): {before:8.1f} ms")
+        print(f"  store built from shapefile:              {build:8.1f} ms")
+        print(f"  store from cache (after):                {cached:8.1f} ms")
+    
+    code = "import time; start = time.perf_counter(); import geopandas; print((time.perf_counter() - start) * 1000)"
+    seconds = float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+    print(f"  geopandas import (deferred to first render): {seconds:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
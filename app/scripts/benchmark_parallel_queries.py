@@ -0,0 +1,80 @@
+"""
+Benchmark: FacultyStatsDashboard (d1) data with sequential vs concurrent provider queries
+
+Builds a synthetic faculty_data.db (default 200,000 faculty rows), then
+times the nine provider calls FacultyStatsDashboard.get_data makes:
+  - one after another (DASHBOARD_PARALLEL_QUERIES_ENABLED=false)
+  - on the shared query pool (default)
+Aggregate tables are bypassed so every call queries the raw tables.
+
+Usage:
+    python scripts/benchmark_parallel_queries.py [faculty_rows] [renders] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.synthetic_data import create_faculty_db
+from dashboards import executor
+from dashboards.config import DashboardConfig
+from dashboards.data_providers.faculty import FacultyDataProvider
+
+
+def faculty_queries(provider: FacultyDataProvider):
+    """Same provider calls as FacultyStatsDashboard.get_data"""
+    filters = {}
+    return {
+        "sex_data": lambda: provider.get_faculty_by_sex(None, filters),
+        "markaz_data": lambda: provider.get_faculty_by_markaz(None, filters),
+        "field_data": lambda: provider.get_faculty_by_field(None, filters),
+        "type_data": lambda: provider.get_faculty_by_type(None, filters),
+        "edugroup_data": lambda: provider.get_faculty_by_edugroup(None, filters),
+        "grade_data": lambda: provider.get_faculty_by_grade(None, filters),
+        "certificate_data": lambda: provider.get_faculty_by_certificate(None, filters),
+        "type_golestan_data": lambda: provider.get_faculty_type_golestan(None, filters),
+        "type_sex_data": lambda: provider.get_faculty_by_type_and_sex(None, filters),
+    }
+
+
+def time_renders(provider: FacultyDataProvider, renders: int, parallel: bool):
+    executor.run_queries(faculty_queries(provider), parallel=parallel)  # warm page cache / pool
+    samples = []
+    for _ in range(renders):
+        start = time.perf_counter()
+        _, errors = executor.run_queries(faculty_queries(provider), parallel=parallel)
+        samples.append(time.perf_counter() - start)
+        if errors:
+            print(f"  failed queries: {errors}")
+    return samples
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    renders = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    if len(sys.argv) > 3:
+        DashboardConfig.PARALLEL_QUERY_WORKERS = int(sys.argv[3])
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "faculty_data.db")
+        print(f"Generating {rows:,} synthetic faculty...")
+        create_faculty_db(db_path, students=1000, faculty=rows)
+        
+        provider = FacultyDataProvider(db_path=db_path)
+        provider.use_aggregates = False
+        
+        sequential = time_renders(provider, renders, parallel=False)
+        parallel = time_renders(provider, renders, parallel=True)
+        executor.shutdown_pool(wait=True)
+        
+        print(f"\nd1 get_data, 9 queries ({renders} renders, median):")
+        print(f"  sequential                : {statistics.median(sequential) * 1000:8.1f} ms")
+        print(f"  parallel ({DashboardConfig.PARALLEL_QUERY_WORKERS} workers)      : "
+              f"{statistics.median(parallel) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: province pie map rendering, inset axes vs one patch collection
+
+Renders MapBuilder.create_province_map_with_pie_charts (the d2 map, default
+15x26 figure) with an inset_axes pie per province
+(DASHBOARD_MAP_BATCH_RENDER=false) and with all pies in one PatchCollection,
+and reports how far apart the two images are (RMS of the pixel difference).
+Uses the given shapefile and faculty_data.db, else a synthetic shapefile.
+
+Usage:
+    python scripts/benchmark_pie_map.py [repeats] [shapefile db]
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matplotlib.testing.compare import calculate_rms
+from matplotlib.image import imread
+
+from scripts.synthetic_data import create_faculty_db, create_province_shapefile
+from dashboards.config import DashboardConfig
+from dashboards.visualizations.maps import MapBuilder
+
+
+def render(builder: MapBuilder, province_data, batch: bool, repeats: int):
+    DashboardConfig.MAP_BATCH_RENDER = batch
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        image = builder.create_province_map_with_pie_charts(province_data, "توزیع اعضای هیات علمی")
+        samples.append(time.perf_counter() - start)
+    return image, statistics.median(samples) * 1000
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    logging.disable(logging.WARNING)  # the inset path logs per province
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        if len(sys.argv) > 3:
+            shapefile_path, DashboardConfig.FACULTY_DB = sys.argv[2], sys.argv[3]
+        else:
+            print("Generating synthetic shapefile and faculty_data.db...")
+            shapefile_path = create_province_shapefile(os.path.join(tmp, "provinces.shp"))
+            DashboardConfig.FACULTY_DB = create_faculty_db(os.path.join(tmp, "faculty_data.db"), students=100, faculty=100)
+        DashboardConfig.GEOMETRY_CACHE_PATH = os.path.join(tmp, "province_geometry.pkl")
+        builder = MapBuilder(shapefile_path)
+        
+        rng = random.Random(1)
+        province_data = {code: {'1': rng.randint(50, 3000), '2': rng.randint(50, 3000)}
+                         for code in builder.geometry.codes if code is not None}
+        render(builder, province_data, True, 1)  # warm up fonts and geometry
+        
+        insets, inset_ms = render(builder, province_data, False, repeats)
+        batched, batch_ms = render(builder, province_data, True, repeats)
+        rms = calculate_rms(imread(insets), imread(batched)) * 255
+        print(f"\nPie map render ({len(province_data)} provinces, {repeats} runs, median):")
+        print(f"  inset axes per province: {inset_ms:8.1f} ms")
+        print(f"  one patch collection:    {batch_ms:8.1f} ms")
+        print(f"  image difference (RMS):  {rms:8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: overhead of query profiling in DataProvider.execute_query
+
+Builds a small synthetic faculty_data.db and runs a trivial query (worst
+case for relative overhead) and a typical chart query many times:
+  - on a pooled connection directly (no execute_query)
+  - through execute_query with profiling disabled (default)
+  - through execute_query with profiling enabled
+and prints the per-call time of each.
+
+Usage:
+    python scripts/benchmark_query_profiler.py [calls]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.synthetic_data import create_faculty_db
+from dashboards.config import DashboardConfig
+from dashboards.data_providers.faculty import FacultyDataProvider
+from dashboards.data_providers.profiler import QueryProfiler
+
+QUERIES = {
+    "SELECT 1": "SELECT 1",
+    "faculty by sex": "SELECT sex, COUNT(*) FROM faculty WHERE province_code = 3 GROUP BY sex",
+}
+
+
+def per_call_us(run, calls: int) -> float:
+    run()
+    start = time.perf_counter()
+    for _ in range(calls):
+        run()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "faculty_data.db")
+        create_faculty_db(db_path, students=100, faculty=2000)
+        provider = FacultyDataProvider(db_path=db_path)
+        
+        print(f"Per-call time ({calls:,} calls, microseconds):")
+        print(f"  {'query':<16} {'direct':>9} {'disabled':>9} {'enabled':>9}")
+        for label, sql in QUERIES.items():
+            def direct():
+                with provider.connection() as conn:
+                    conn.execute(sql).fetchall()
+            
+            DashboardConfig.QUERY_PROFILING_ENABLED = False
+            raw = per_call_us(direct, calls)
+            disabled = per_call_us(lambda: provider.execute_query(sql), calls)
+            DashboardConfig.QUERY_PROFILING_ENABLED = True
+            enabled = per_call_us(lambda: provider.execute_query(sql), calls)
+            DashboardConfig.QUERY_PROFILING_ENABLED = False
+            QueryProfiler.reset()
+            print(f"  {label:<16} {raw:9.1f} {disabled:9.1f} {enabled:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
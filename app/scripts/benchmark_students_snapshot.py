@@ -0,0 +1,68 @@
+"""
+Benchmark: StudentsDashboard cube from SQL vs the in-memory Students snapshot
+
+Builds a synthetic faculty_data.db (default 1,000,000 students), loads the
+snapshot, then times get_students_cube for an unfiltered request and a
+province-filtered one:
+  - from SQLite (DASHBOARD_STUDENTS_SNAPSHOT_ENABLED=false)
+  - from the snapshot
+Aggregate tables are bypassed so the SQL path scans Students.
+
+Usage:
+    python scripts/benchmark_students_snapshot.py [rows] [repeats]
+"""
+import os
+import sys
+import tempfile
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.synthetic_data import create_faculty_db
+from dashboards.config import DashboardConfig
+from dashboards.data_providers.students import StudentsDataProvider
+
+
+def time_cube(provider: StudentsDataProvider, filters, repeats: int, snapshot: bool):
+    DashboardConfig.STUDENTS_SNAPSHOT_ENABLED = snapshot
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        provider.get_students_cube(None, dict(filters))
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "faculty_data.db")
+        print(f"Generating {rows:,} synthetic students...")
+        create_faculty_db(db_path, students=rows, faculty=100)
+        
+        provider = StudentsDataProvider(db_path=db_path)
+        provider.use_aggregates = False
+        DashboardConfig.STUDENTS_SNAPSHOT_ENABLED = True
+        snapshot = provider.load_snapshot()
+        if snapshot is None:
+            print("Snapshot not loaded (numpy missing or over DASHBOARD_STUDENTS_SNAPSHOT_MAX_MB)")
+            return
+        print(f"Snapshot: {snapshot.rows:,} rows, {snapshot.memory_bytes() / 1e6:.1f} MB, "
+              f"loaded in {snapshot.load_seconds}s")
+        
+        requests = {
+            "all students": {},
+            "one province": {'province_code': 3},
+        }
+        print(f"\nget_students_cube ({repeats} runs, median):")
+        for label, filters in requests.items():
+            sql = time_cube(provider, filters, repeats, snapshot=False)
+            memory = time_cube(provider, filters, repeats, snapshot=True)
+            print(f"  {label:<14} SQL: {sql:8.1f} ms   snapshot: {memory:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
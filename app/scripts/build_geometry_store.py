@@ -0,0 +1,60 @@
+"""
+Script to preprocess the province shapefile into the geometry cache used by
+the map dashboards (MapBuilder, d3, the interactive map GeoJSON levels)
+
+Dashboards rebuild the cache themselves when it is missing or stale (the
+shapefile or province table changed); run this at deploy time so the first
+request of each worker doesn't pay for reading the shapefile.
+
+Usage:
+    python scripts/build_geometry_store.py
+    python scripts/build_geometry_store.py --check     # is the cache current?
+    python scripts/build_geometry_store.py --shapefile path/to/provinces.shp --db path/to/faculty_data.db
+"""
+import os
+import sys
+import time
+
+# Add parent directory to path to import dashboards
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dashboards.config import DashboardConfig
+from dashboards.visualizations.geometry import SIMPLIFY_TOLERANCES, GeometryStore, read_provinces, source_checksum
+
+
+def option(args, name, default):
+    if name in args:
+        return args[args.index(name) + 1]
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    shapefile_path = option(args, "--shapefile", str(DashboardConfig.IRAN_SHAPEFILE))
+    db_path = option(args, "--db", DashboardConfig.FACULTY_DB)
+    cache_path = option(args, "--cache", DashboardConfig.GEOMETRY_CACHE_PATH)
+    
+    provinces = read_provinces(db_path)
+    checksum = source_checksum(shapefile_path, provinces)
+    if "--check" in args:
+        if GeometryStore.load(cache_path, checksum) is None:
+            print(f"{cache_path} is missing or STALE")
+            sys.exit(1)
+        print(f"{cache_path} is current ({checksum[:12]})")
+        return
+    
+    start = time.perf_counter()
+    store = GeometryStore.build(shapefile_path, provinces, checksum)
+    store.save(cache_path)
+    mapped = sum(code is not None for code in store.codes)
+    print(f"{cache_path}: {len(store.names)} shapes ({mapped} mapped to provinces), "
+          f"{os.path.getsize(cache_path) / 1024:.0f} KB in {time.perf_counter() - start:.2f}s")
+    for level, tolerance in SIMPLIFY_TOLERANCES.items():
+        print(f"  GeoJSON {level} (tolerance {tolerance}): {len(store.geojson(level)) / 1024:.0f} KB")
+    unmatched = [name for name, code in zip(store.names, store.codes) if code is None]
+    if unmatched:
+        print(f"Unmatched shapefile provinces: {', '.join(unmatched)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Script to mark a data source as changed outside the regular syncs
+(e.g. after editing the pardis table by hand) so dashboards reading it
+stop serving cached data
+
+Usage:
+    python scripts/bump_data_version.py pardis
+    python scripts/bump_data_version.py --list
+"""
+import os
+import sys
+
+# Add parent directory to path to import dashboards
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dashboards.data_version import DATA_SOURCES, DataVersions
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] == "--list":
+        for source, version in DataVersions.all().items():
+            print(f"{source:10s} {version}")
+        return
+    
+    source = sys.argv[1]
+    if source not in DATA_SOURCES:
+        print(f"Unknown data source '{source}'. Known sources: {', '.join(DATA_SOURCES)}")
+        sys.exit(1)
+    version = DataVersions.bump(source)
+    print(f"{source} is now at version {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Script to rebuild the materialized aggregate tables in faculty_data.db
+and/or check them against raw-table queries
+
+Syncs rebuild these automatically; use this after loading data by hand or
+to verify the tables.
+
+Usage:
+    python scripts/rebuild_aggregates.py                   # rebuild all
+    python scripts/rebuild_aggregates.py students          # rebuild one source's tables
+    python scripts/rebuild_aggregates.py --check           # compare with raw queries
+    python scripts/rebuild_aggregates.py --status
+    python scripts/rebuild_aggregates.py --db path/to/faculty_data.db --check
+"""
+import logging
+import os
+import sys
+from datetime import datetime
+
+# Add parent directory to path to import dashboards
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dashboards.data_providers.materialized import (
+    AGGREGATES, aggregate_status, check_aggregates, rebuild_aggregates,
+)
+
+
+def print_status(db_path):
+    for status in aggregate_status(db_path):
+        if not status['built']:
+            print(f"{status['name']:24s} not built")
+            continue
+        built_at = datetime.fromtimestamp(status['built_at']).strftime('%Y-%m-%d %H:%M:%S')
+        print(
+            f"{status['name']:24s} {'current' if status['current'] else 'STALE':8s} "
+            f"v{status['data_version']}  {status['rows']:,} rows from {status['source_rows']:,}  "
+            f"built {built_at} in {status['seconds']}s"
+        )
+
+
+def main():
+    args = sys.argv[1:]
+    db_path = None
+    if "--db" in args:
+        index = args.index("--db")
+        db_path = args[index + 1]
+        del args[index:index + 2]
+    
+    if "--status" in args:
+        print_status(db_path)
+        return
+    
+    if "--check" in args:
+        # Providers log per-query details; only the comparison matters here
+        logging.disable(logging.CRITICAL)
+        problems = check_aggregates(db_path)
+        if problems:
+            print("Aggregate tables are NOT consistent with raw tables:")
+            for problem in problems:
+                print(f"  - {problem}")
+            sys.exit(1)
+        print("Aggregate tables match raw-table queries")
+        return
+    
+    known = {spec['source'] for spec in AGGREGATES.values()}
+    sources = [arg for arg in args if not arg.startswith("--")] or None
+    for source in sources or []:
+        if source not in known:
+            print(f"Unknown source '{source}'. Sources with aggregates: {', '.join(sorted(known))}")
+            sys.exit(1)
+    
+    for result in rebuild_aggregates(db_path, sources=sources):
+        print(
+            f"{result['name']:24s} {result['rows']:,} rows from {result['source_rows']:,} "
+            f"in {result['seconds']}s (data version {result['data_version']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
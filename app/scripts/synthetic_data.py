@@ -0,0 +1,166 @@
+"""
+Synthetic faculty_data.db generator for benchmarks and tests
+Creates Students, faculty, faculty_golestan and province tables with realistic shapes,
+and a province shapefile shaped like gadm41_IRN_1
+"""
+import os
+import random
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROVINCES = [
+    (1, "تهران"), (2, "اصفهان"), (3, "فارس"), (4, "خراسان رضوی"), (5, "آذربایجان شرقی"),
+    (6, "مازندران"), (7, "گیلان"), (8, "کرمان"), (9, "خوزستان"), (10, "همدان"),
+    (11, "یزد"), (12, "قم"), (13, "لرستان"), (14, "البرز"), (15, "زنجان"),
+]
+# GADM NAME_1 of PROVINCES, plus shapes no province row matches
+SHAPE_NAMES = [
+    "Tehran", "Esfahan", "Fars", "Razavi Khorasan", "East Azarbaijan", "Mazandaran", "Gilan", "Kerman",
+    "Khuzestan", "Hamadan", "Yazd", "Qom", "Lorestan", "Alborz", "Zanjan", "Semnan", "Bushehr",
+]
+SEXES = ["آقا", "خانم", " آقا", "خانم "]
+GRADES = [("1", "کاردانی"), ("2", "کارشناسی ناپیوسته"), ("3", "کارشناسی پیوسته"), ("4", "کارشناسی ارشد")]
+VAZEIYAT = ["مشغول به تحصیل", "فارغ التحصیل", "انصرافی", "مرخصی", "اخراجی", None]
+COURSES = [f"رشته {i}" for i in range(1, 41)]
+ENTRANCE_YEARS = ["400", "401", "402", "403", "404"]
+
+STUDENTS_DDL = """
+    CREATE TABLE Students (
+        studentnum TEXT PRIMARY KEY,
+        firstname TEXT,
+        familyname TEXT,
+        sex TEXT,
+        course TEXT,
+        course_name TEXT,
+        grade TEXT,
+        gradname TEXT,
+        degsdate TEXT,
+        vazeiyat TEXT,
+        sub_num TEXT,
+        code_Markaz INTEGER,
+        province TEXT,
+        term TEXT,
+        province_code INTEGER)
+"""
+
+
+def create_faculty_db(db_path: str, students: int = 300_000, faculty: int = 20_000, seed: int = 42):
+    """Create (or replace) a synthetic faculty_data.db at db_path"""
+    rng = random.Random(seed)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    
+    cur.execute("CREATE TABLE province (province_code INTEGER PRIMARY KEY, province_name TEXT)")
+    cur.executemany("INSERT INTO province VALUES (?, ?)", PROVINCES)
+    
+    cur.execute(STUDENTS_DDL)
+    rows = []
+    for i in range(students):
+        province_code, province = rng.choice(PROVINCES)
+        if rng.random() < 0.02:
+            province = province + " "
+        grade, gradname = rng.choice(GRADES)
+        year = rng.choice(ENTRANCE_YEARS)
+        rows.append((
+            f"{year}{i:07d}",
+            "نام",
+            "خانوادگی",
+            rng.choice(SEXES),
+            str(rng.randint(1, 40)),
+            rng.choice(COURSES),
+            grade,
+            gradname,
+            f"14{year[1:]}/07/01",
+            rng.choice(VAZEIYAT),
+            str(rng.randint(1, 9)),
+            province_code * 100 + rng.randint(1, 12),
+            province,
+            f"{year}{rng.randint(1, 3)}",
+            province_code,
+        ))
+        if len(rows) >= 50_000:
+            cur.executemany("INSERT INTO Students VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+            rows = []
+    if rows:
+        cur.executemany("INSERT INTO Students VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+    
+    cur.execute("""
+        CREATE TABLE faculty (
+            id INTEGER PRIMARY KEY,
+            professorCode TEXT,
+            name TEXT,
+            family TEXT,
+            field TEXT,
+            code TEXT,
+            mobile TEXT,
+            email TEXT,
+            code_markaz INTEGER,
+            markaz TEXT,
+            city TEXT,
+            sex INTEGER,
+            scope TEXT,
+            employ_state TEXT,
+            estekhdamtype INTEGER,
+            estekhdamtype_title TEXT,
+            province_code INTEGER)
+    """)
+    cur.execute("""
+        CREATE TABLE faculty_golestan (
+            professorCode TEXT,
+            group_title TEXT,
+            grade TEXT,
+            last_certificate TEXT,
+            estekhdamtype_golestan TEXT)
+    """)
+    faculty_rows = []
+    golestan_rows = []
+    for i in range(faculty):
+        province_code, province = rng.choice(PROVINCES)
+        code_markaz = province_code * 100 + rng.randint(1, 12)
+        estekhdam = rng.randint(1, 4)
+        faculty_rows.append((
+            i + 1, f"P{i}", f"نام{i % 97}", f"خانواده{i % 89}", rng.choice(COURSES), str(i),
+            "0912", f"f{i}@cfu.ac.ir", code_markaz, f"پردیس {code_markaz}", province,
+            rng.choice([1, 2, 2, 1, None]), province, "شاغل", estekhdam, f"نوع {estekhdam}", province_code,
+        ))
+        golestan_rows.append((
+            f"P{i}", rng.choice(["گروه علوم", "گروه ریاضی", "گروه ادبیات", "", None]),
+            rng.choice(["استادیار", "مربی", "دانشیار"]), rng.choice(["دکتری", "ارشد"]), rng.choice(["رسمی", "پیمانی"]),
+        ))
+    cur.executemany(f"INSERT INTO faculty VALUES ({','.join('?' * 17)})", faculty_rows)
+    cur.executemany("INSERT INTO faculty_golestan VALUES (?,?,?,?,?)", golestan_rows)
+    
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def create_province_shapefile(shp_path: str, vertices: int = 4000):
+    """
+    Write a shapefile of SHAPE_NAMES (NAME_1) as star-shaped polygons on a
+    grid at shp_path; vertices per polygon sets the file size (the real
+    shapefile is a few MB)
+    """
+    import math
+    import geopandas as gpd
+    from shapely.geometry import Polygon
+    shapes = []
+    for i, name in enumerate(SHAPE_NAMES):
+        cx, cy = 44 + (i % 6) * 3.5, 26 + (i // 6) * 4.5
+        shapes.append(Polygon([
+            (cx + (1.4 + 0.2 * math.sin(7 * a)) * math.cos(a), cy + (1.4 + 0.2 * math.sin(7 * a)) * math.sin(a))
+            for a in (2 * math.pi * k / vertices for k in range(vertices))
+        ]))
+    gpd.GeoDataFrame({'NAME_1': SHAPE_NAMES}, geometry=shapes, crs="EPSG:4326").to_file(shp_path)
+    return shp_path
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "synthetic_faculty_data.db"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 300_000
+    create_faculty_db(target, students=count)
+    print(f"Created {target} with {count:,} students")
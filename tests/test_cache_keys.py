@@ -0,0 +1,113 @@
+"""
+Unit tests for context-normalized dashboard cache keys
+"""
+import unittest
+from dashboards.base import BaseDashboard
+from dashboards.context import AccessLevel, UserContext, normalize_filters
+
+
+class KeyDashboard(BaseDashboard):
+    """Dashboard used only to build cache keys"""
+    
+    def __init__(self):
+        super().__init__("key_test", "Keys")
+        self.data_sources = ('students',)
+    
+    def get_data(self, context, **kwargs):
+        return {}
+    
+    def render(self, data, context):
+        return data
+
+
+def key_for(context, requested=None):
+    """Cache key for a request, the way handle_request builds it"""
+    dashboard = KeyDashboard()
+    return dashboard._generate_cache_key(context, context.apply_filters(requested or {}))
+
+
+class TestCacheKeyScope(unittest.TestCase):
+    """Equivalent users share keys; different scopes never do"""
+    
+    def test_admin_and_central_share_national_key(self):
+        """Admin and central org users see the same data"""
+        admin = UserContext.for_scope(AccessLevel.ADMIN)
+        central = UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+        self.assertEqual(key_for(admin), key_for(central))
+        self.assertEqual(key_for(admin, {'province_code': 3}), key_for(central, {'province_code': 3}))
+    
+    def test_central_users_own_codes_ignored(self):
+        """A central user's home province/faculty does not restrict their data"""
+        plain = UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+        located = UserContext.for_scope(AccessLevel.CENTRAL_ORG, province_code=7, faculty_code=1234)
+        self.assertEqual(key_for(plain), key_for(located))
+    
+    def test_central_filters_still_distinguish(self):
+        """Requested filters are part of the scope"""
+        central = UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+        self.assertNotEqual(key_for(central), key_for(central, {'province_code': 3}))
+        self.assertNotEqual(key_for(central, {'province_code': 3}), key_for(central, {'province_code': 4}))
+    
+    def test_province_users_share_per_province(self):
+        """Users of one province share an entry whatever their own faculty"""
+        a = UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=3, faculty_code=1001)
+        b = UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=3, faculty_code=2002)
+        other = UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=4)
+        self.assertEqual(key_for(a), key_for(b))
+        self.assertNotEqual(key_for(a), key_for(other))
+    
+    def test_province_user_cannot_widen_scope(self):
+        """Requesting another province does not reach that province's entry"""
+        province = UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=3)
+        central = UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+        self.assertNotEqual(key_for(province, {'province_code': 4}), key_for(central, {'province_code': 4}))
+        self.assertNotEqual(key_for(province), key_for(central))
+    
+    def test_faculty_users_isolated(self):
+        """Faculty users share per faculty and never with province or national scopes"""
+        a = UserContext.for_scope(AccessLevel.FACULTY, province_code=3, faculty_code=1001)
+        b = UserContext.for_scope(AccessLevel.FACULTY, province_code=3, faculty_code=1001)
+        other = UserContext.for_scope(AccessLevel.FACULTY, province_code=3, faculty_code=1002)
+        province = UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=3)
+        central = UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+        self.assertEqual(key_for(a), key_for(b))
+        self.assertNotEqual(key_for(a), key_for(other))
+        self.assertNotEqual(key_for(a), key_for(province, {'faculty_code': 1001}))
+        self.assertNotEqual(key_for(a), key_for(central, {'province_code': 3, 'faculty_code': 1001}))
+    
+    def test_all_levels_distinct(self):
+        """Each non-equivalent access level gets its own key"""
+        contexts = [
+            UserContext.for_scope(AccessLevel.CENTRAL_ORG),
+            UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=3),
+            UserContext.for_scope(AccessLevel.FACULTY, province_code=3, faculty_code=1001),
+        ]
+        keys = {key_for(context) for context in contexts}
+        self.assertEqual(len(keys), len(contexts))
+
+
+class TestNormalizeFilters(unittest.TestCase):
+    """Test canonical filter values"""
+    
+    def test_equivalent_filters_share_key(self):
+        central = UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+        self.assertEqual(
+            key_for(central, {'province_code': '03', 'date_from': '1402/1/5', 'faculty_code': None}),
+            key_for(central, {'province_code': 3, 'date_from': '1402/01/05'}),
+        )
+    
+    def test_normalization(self):
+        self.assertEqual(
+            normalize_filters({
+                'province_code': ' 5 ',
+                'faculty_codes': [3, '1', 3],
+                'date_to': '1402-2-1',
+                'time_range': ' 1d ',
+                'university_code': '',
+            }),
+            {'province_code': 5, 'faculty_codes': [1, 3], 'date_to': '1402-02-01', 'time_range': '1d'},
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Unit tests for negotiated response compression
+"""
+import gzip
+import json
+import unittest
+import zlib
+from flask import Flask, Response, jsonify, make_response, stream_with_context
+from dashboards import compression
+from dashboards.config import DashboardConfig
+
+PAGE = "<html><body>" + "<p>دانشکده فنی</p>" * 500 + "</body></html>"
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self._enabled = DashboardConfig.COMPRESSION_ENABLED
+        DashboardConfig.COMPRESSION_ENABLED = True
+        compression.compressed_cache.clear()
+        self.batches = []
+        
+        app = Flask(__name__)
+        compression.init_compression(app)
+        
+        @app.route('/page')
+        def page():
+            response = make_response(PAGE)
+            response.set_etag('page-1')
+            return response
+        
+        @app.route('/small')
+        def small():
+            return jsonify(ok=True)
+        
+        @app.route('/data')
+        def data():
+            return jsonify(rows=[{"code": i, "name": "استاد"} for i in range(300)])
+        
+        @app.route('/missing')
+        def missing():
+            return make_response(PAGE, 404)
+        
+        @app.route('/png')
+        def png():
+            return Response(b'\x89PNG' + bytes(5000), mimetype='image/png')
+        
+        @app.route('/stream')
+        def stream():
+            def generate():
+                for batch in range(3):
+                    self.batches.append(batch)
+                    yield json.dumps({"batch": batch}) + "\n"
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        self.client = app.test_client()
+    
+    def tearDown(self):
+        DashboardConfig.COMPRESSION_ENABLED = self._enabled
+    
+    def get(self, path, encoding='gzip'):
+        return self.client.get(path, headers={'Accept-Encoding': encoding} if encoding else {})
+    
+    def test_negotiation(self):
+        response = self.get('/page')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.get_data()).decode('utf-8'), PAGE)
+        self.assertLess(int(response.headers['Content-Length']), len(PAGE.encode('utf-8')) // 5)
+        self.assertEqual(response.headers['ETag'], 'W/"page-1"')
+        
+        response = self.get('/page', encoding=None)
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.get_data(as_text=True), PAGE)
+        self.assertNotIn('Content-Encoding', self.get('/page', encoding='gzip;q=0').headers)
+        
+        self.assertEqual(json.loads(gzip.decompress(self.get('/data').get_data()))['rows'][299]['code'], 299)
+        self.assertNotIn('Content-Encoding', self.get('/small').headers)
+        self.assertNotIn('Content-Encoding', self.get('/png').headers)
+        
+        missing = self.get('/missing')
+        self.assertEqual(missing.status_code, 404)
+        self.assertNotIn('Content-Encoding', missing.headers)
+        self.assertEqual(missing.get_data(as_text=True), PAGE)
+        
+        DashboardConfig.COMPRESSION_ENABLED = False
+        self.assertNotIn('Content-Encoding', self.get('/page').headers)
+    
+    def test_identical_payloads_compressed_once(self):
+        first = self.get('/page').get_data()
+        second = self.get('/page').get_data()
+        self.assertEqual(first, second)
+        stats = compression.compressed_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+    
+    def test_streamed_chunks_stay_decodable(self):
+        response = self.client.get('/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        decoder = zlib.decompressobj(31)
+        chunks = response.response
+        # Each flushed chunk decodes to its whole line before the next batch is produced
+        self.assertEqual(decoder.decompress(next(chunks)), b'{"batch": 0}\n')
+        self.assertEqual(self.batches, [0])
+        rest = b''.join(decoder.decompress(chunk) for chunk in chunks)
+        self.assertEqual(rest, b'{"batch": 1}\n{"batch": 2}\n')
+        self.assertTrue(decoder.eof)
+        response.close()
+    
+    @unittest.skipIf(compression.brotli is None, "brotli not installed")
+    def test_brotli_preferred(self):
+        response = self.get('/page', encoding='gzip, br')
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.get_data()).decode('utf-8'), PAGE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Unit tests for the SQLite connection pool used by data providers
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from dashboards.data_providers.connection_pool import SQLiteConnectionPool
+
+
+class TestSQLiteConnectionPool(unittest.TestCase):
+    """Test SQLiteConnectionPool"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'faculty_data.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE faculty (id INTEGER PRIMARY KEY, sex INTEGER)")
+        conn.executemany("INSERT INTO faculty (sex) VALUES (?)", [(1,), (2,), (1,)])
+        conn.commit()
+        conn.close()
+        self.pool = SQLiteConnectionPool(self.db_path, enable_wal=True)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_connection_reused_within_thread(self):
+        """Same thread gets the same connection back"""
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            count = second.execute("SELECT COUNT(*) FROM faculty").fetchone()[0]
+        self.assertIs(first, second)
+        self.assertEqual(count, 3)
+        self.assertEqual(self.pool.stats['opened'], 1)
+    
+    def test_connections_are_per_thread(self):
+        """Each thread opens its own connection"""
+        seen = []
+        
+        def worker():
+            with self.pool.connection() as conn:
+                seen.append(id(conn))
+        
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.pool.stats['opened'], 3)
+    
+    def test_connections_are_read_only(self):
+        """Pooled connections refuse writes"""
+        with self.assertRaises(sqlite3.OperationalError):
+            with self.pool.connection() as conn:
+                conn.execute("INSERT INTO faculty (sex) VALUES (1)")
+    
+    def test_error_discards_connection(self):
+        """A connection that raised a database error is not reused"""
+        with self.assertRaises(sqlite3.OperationalError):
+            with self.pool.connection() as conn:
+                conn.execute("SELECT * FROM missing_table")
+        with self.pool.connection() as fresh:
+            pass
+        self.assertIsNot(conn, fresh)
+        self.assertEqual(self.pool.stats['discarded'], 1)
+    
+    def test_invalidate_recycles_connection(self):
+        """Invalidated pool reopens on next acquire"""
+        with self.pool.connection() as first:
+            pass
+        self.pool.invalidate()
+        with self.pool.connection() as second:
+            pass
+        self.assertIsNot(first, second)
+        self.assertEqual(self.pool.stats['recycled'], 1)
+    
+    def test_wal_enabled(self):
+        """Database is switched to WAL on first open"""
+        with self.pool.connection():
+            pass
+        conn = sqlite3.connect(self.db_path)
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+        self.assertEqual(mode, 'wal')
+
+
+if __name__ == '__main__':
+    unittest.main()
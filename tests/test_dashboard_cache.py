@@ -0,0 +1,215 @@
+"""
+Unit tests for the dashboard cache
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from dashboards.cache import DashboardCache, cached
+from dashboards.cache_backends import MemoryCacheBackend, SQLiteCacheBackend, create_backend
+
+
+class TestDashboardCache(unittest.TestCase):
+    """Test DashboardCache LRU/TTL behaviour"""
+    
+    def setUp(self):
+        self._previous = DashboardCache._backend
+        DashboardCache.set_backend(MemoryCacheBackend())
+    
+    def tearDown(self):
+        DashboardCache.set_backend(self._previous)
+    
+    def test_get_set_and_stats(self):
+        """Hits and misses are counted"""
+        self.assertIsNone(DashboardCache.get("dashboard:d1:a"))
+        DashboardCache.set("dashboard:d1:a", {"x": 1}, ttl=60)
+        self.assertEqual(DashboardCache.get("dashboard:d1:a"), {"x": 1})
+        stats = DashboardCache.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+        self.assertGreater(stats['bytes'], 0)
+    
+    def test_coalesced_misses_counted_once(self):
+        """The re-check inside a computation doesn't count its miss again"""
+        for key in ("a", "b", "c"):
+            DashboardCache.get_or_compute(key, lambda: 1, ttl=60)
+            DashboardCache.get_or_compute(key, lambda: 1, ttl=60)
+        DashboardCache.get_or_refresh("d", lambda: 1, soft_ttl=60, hard_ttl=120)
+        DashboardCache.get_or_refresh("d", lambda: 1, soft_ttl=60, hard_ttl=120)
+        stats = DashboardCache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (4, 4))
+        self.assertEqual(stats['hit_rate'], 0.5)
+    
+    def test_ttl_expiry(self):
+        """Expired entries are not returned"""
+        DashboardCache.set("k", "v", ttl=0)
+        self.assertIsNone(DashboardCache.get("k"))
+        self.assertEqual(DashboardCache.get_stats()['expirations'], 1)
+    
+    def test_purge_expired(self):
+        """Expired entries are removed without being read"""
+        DashboardCache.set("old", "v", ttl=0)
+        DashboardCache.set("new", "v", ttl=60)
+        self.assertEqual(DashboardCache.purge_expired(), 1)
+        self.assertEqual(DashboardCache.get_stats()['entries'], 1)
+    
+    def test_lru_eviction_by_entries(self):
+        """Least recently used entry is evicted first"""
+        DashboardCache.configure(max_entries=2)
+        DashboardCache.set("a", 1, ttl=60)
+        DashboardCache.set("b", 2, ttl=60)
+        DashboardCache.get("a")
+        DashboardCache.set("c", 3, ttl=60)
+        self.assertEqual(DashboardCache.get("a"), 1)
+        self.assertIsNone(DashboardCache.get("b"))
+        self.assertEqual(DashboardCache.get("c"), 3)
+        self.assertEqual(DashboardCache.get_stats()['evictions'], 1)
+    
+    def test_eviction_by_bytes(self):
+        """Memory budget is enforced"""
+        DashboardCache.configure(max_entries=0, max_bytes=5000)
+        for i in range(10):
+            DashboardCache.set(f"k{i}", "x" * 1000, ttl=60)
+        stats = DashboardCache.get_stats()
+        self.assertLessEqual(stats['bytes'], 5000)
+        self.assertLess(stats['entries'], 10)
+        self.assertIsNotNone(DashboardCache.get("k9"))
+    
+    def test_oversized_value_not_cached(self):
+        """A value larger than the whole budget is skipped"""
+        DashboardCache.configure(max_bytes=100)
+        DashboardCache.set("big", "x" * 1000, ttl=60)
+        self.assertIsNone(DashboardCache.get("big"))
+    
+    def test_clear_pattern(self):
+        """Pattern clear only removes matching keys"""
+        DashboardCache.set("dashboard:d1:a", 1, ttl=60)
+        DashboardCache.set("dashboard:d2:a", 2, ttl=60)
+        DashboardCache.clear(pattern="d1")
+        self.assertIsNone(DashboardCache.get("dashboard:d1:a"))
+        self.assertEqual(DashboardCache.get("dashboard:d2:a"), 2)
+    
+    def test_thread_safety(self):
+        """Concurrent writers keep size accounting consistent"""
+        DashboardCache.configure(max_entries=50)
+        
+        def worker(n):
+            for i in range(200):
+                DashboardCache.set(f"t{n}:{i % 70}", i, ttl=60)
+                DashboardCache.get(f"t{n}:{(i * 7) % 70}")
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = DashboardCache.get_stats()
+        self.assertLessEqual(stats['entries'], 50)
+        self.assertEqual(stats['bytes'], sum(e.size for e in DashboardCache.backend()._cache.values()))
+    
+    def test_cached_decorator(self):
+        """cached() decorator still memoizes results"""
+        calls = []
+        
+        @cached(ttl=60, key_prefix="test_cached")
+        def compute(x):
+            calls.append(x)
+            return x * 2
+        
+        self.assertEqual(compute(3), 6)
+        self.assertEqual(compute(3), 6)
+        self.assertEqual(calls, [3])
+
+
+
+class TestSQLiteCacheBackend(unittest.TestCase):
+    """Test the shared-file cache backend"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache', 'dashboard_cache.db')
+        self.backend = SQLiteCacheBackend(self.path, max_entries=100, max_bytes=10 * 1024 * 1024)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_roundtrip_serialization(self):
+        """Dashboard payloads survive pickling"""
+        payload = {'labels': ['تهران', 'فارس'], 'counts': [1, 2], 'nested': {'x': (1, 2)}}
+        self.backend.set("dashboard:d1:a", payload, ttl=60)
+        self.assertEqual(self.backend.get("dashboard:d1:a"), payload)
+    
+    def test_persists_across_instances(self):
+        """A new backend on the same file (restart / other worker) sees entries"""
+        self.backend.set("k", [1, 2, 3], ttl=60)
+        other = SQLiteCacheBackend(self.path)
+        self.assertEqual(other.get("k"), [1, 2, 3])
+    
+    def test_expiry(self):
+        """Expired rows are not returned"""
+        self.backend.set("k", "v", ttl=0)
+        self.assertIsNone(self.backend.get("k"))
+        self.backend.set("old", "v", ttl=0)
+        self.assertEqual(self.backend.purge_expired(), 1)
+    
+    def test_lru_eviction(self):
+        """Entry budget evicts least recently used rows"""
+        self.backend.configure(max_entries=2)
+        self.backend.touch_interval = 0
+        self.backend.set("a", 1, ttl=60)
+        self.backend.set("b", 2, ttl=60)
+        self.backend.get("a")
+        self.backend.set("c", 3, ttl=60)
+        self.assertIsNone(self.backend.get("b"))
+        self.assertEqual(self.backend.get("a"), 1)
+        self.assertEqual(self.backend.get_stats()['entries'], 2)
+    
+    def test_byte_budget(self):
+        """Byte budget is enforced"""
+        self.backend.configure(max_bytes=5000)
+        for i in range(10):
+            self.backend.set(f"k{i}", "x" * 1000, ttl=60)
+        self.assertLessEqual(self.backend.get_stats()['bytes'], 5000)
+        self.assertIsNotNone(self.backend.get("k9"))
+    
+    def test_clear_pattern(self):
+        """Pattern clear only removes matching keys"""
+        self.backend.set("dashboard:d1:a", 1, ttl=60)
+        self.backend.set("dashboard:d2:a", 2, ttl=60)
+        self.assertEqual(self.backend.clear("d1"), 1)
+        self.assertEqual(self.backend.get("dashboard:d2:a"), 2)
+    
+    def test_database_errors_degrade(self):
+        """A broken cache file is logged and counted, never raised"""
+        self.backend.set("k", 1, ttl=60)
+        conn = sqlite3.connect(self.path)
+        conn.execute("DROP TABLE dashboard_cache")
+        conn.close()
+        with self.assertLogs('dashboards.cache_backends', level='WARNING'):
+            self.assertFalse(self.backend.delete("k"))
+            self.assertEqual(self.backend.clear(), 0)
+            self.assertEqual(self.backend.purge_expired(), 0)
+            self.backend.configure(max_entries=1)
+        self.assertEqual(self.backend.max_entries, 1)
+        self.assertEqual(self.backend.get_stats()['errors'], 4)
+    
+    def test_dashboard_cache_facade(self):
+        """DashboardCache works unchanged on top of the SQLite backend"""
+        previous = DashboardCache._backend
+        DashboardCache.set_backend(self.backend)
+        try:
+            DashboardCache.set("dashboard:d1:x", {"a": 1}, 60)
+            self.assertEqual(DashboardCache.get("dashboard:d1:x"), {"a": 1})
+            self.assertEqual(DashboardCache.get_stats()['backend'], 'sqlite')
+        finally:
+            DashboardCache.set_backend(previous)
+    
+    def test_unavailable_backend_falls_back_to_memory(self):
+        """Unknown or unreachable backends fall back to memory"""
+        self.assertIsInstance(create_backend("nonexistent"), MemoryCacheBackend)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Unit tests for the versioned dashboard data API and its JSON encoder
+"""
+import json
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from flask import Flask
+from flask_login import LoginManager
+from dashboards import api as api_module
+from dashboards import serialization
+from dashboards.base import BaseDashboard
+from dashboards.cache import DashboardCache
+from dashboards.cache_backends import MemoryCacheBackend
+from dashboards.context import AccessLevel, UserContext
+from dashboards.data_version import DataVersions
+from dashboards.registry import DashboardRegistry
+
+
+class ChartsDashboard(BaseDashboard):
+    """Dashboard whose data has the shapes real ones return"""
+    
+    def __init__(self):
+        super().__init__("data_api_test", "Data API")
+        self.calls = 0
+    
+    def get_data(self, context, **kwargs):
+        self.calls += 1
+        return {
+            "province_data": {3: {'1': 10, '2': 12}, 4: {'1': 1, '2': 0}},
+            "gender_data": [["زن", 5], ["مرد", 7]],
+            "filters_seen": kwargs,
+        }
+    
+    def render(self, data, context):
+        return data
+    
+    def check_access(self, context):
+        return context.access_level in (AccessLevel.ADMIN, AccessLevel.PROVINCE_UNIVERSITY)
+
+
+class TestDashboardDataApi(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self._version_db = DataVersions.db_path
+        DataVersions.db_path = os.path.join(self.tmp.name, 'data_versions.db')
+        DataVersions.reset_local()
+        self._previous = DashboardCache._backend
+        DashboardCache.set_backend(MemoryCacheBackend())
+        self.dashboard = ChartsDashboard()
+        DashboardRegistry._dashboards[self.dashboard.dashboard_id] = self.dashboard
+        self.context = UserContext.for_scope(AccessLevel.ADMIN)
+        self._get_user_context = api_module.get_user_context
+        api_module.get_user_context = lambda: self.context
+        
+        app = Flask(__name__)
+        app.config['LOGIN_DISABLED'] = True
+        LoginManager(app)
+        app.register_blueprint(api_module.api_bp)
+        self.client = app.test_client()
+    
+    def tearDown(self):
+        api_module.get_user_context = self._get_user_context
+        DashboardRegistry._dashboards.pop(self.dashboard.dashboard_id, None)
+        DashboardCache.set_backend(self._previous)
+        DataVersions.db_path = self._version_db
+        DataVersions.reset_local()
+        self.tmp.cleanup()
+    
+    def test_data_and_fields(self):
+        response = self.client.get('/api/dashboards/v1/data_api_test/data?province_code=3')
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.get_data())
+        self.assertEqual(body['api_version'], 1)
+        self.assertEqual(body['data']['province_data'], {'3': {'1': 10, '2': 12}, '4': {'1': 1, '2': 0}})
+        self.assertEqual(body['data']['filters_seen'], {'province_code': 3})
+        self.assertEqual(body['meta']['cache'], 'miss')
+        self.assertIn('زن', response.get_data(as_text=True))  # not \u-escaped
+        
+        response = self.client.get('/api/dashboards/v1/data_api_test/data?province_code=3&fields=gender_data')
+        self.assertEqual(list(json.loads(response.get_data())['data']), ['gender_data'])
+        self.assertEqual(json.loads(response.get_data())['meta']['cache'], 'fresh')
+        self.assertEqual(self.dashboard.calls, 1)
+        
+        response = self.client.get('/api/dashboards/v1/data_api_test/data?fields=gender_data,nope')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/dashboards/v1/data_api_test/data?province_code=x').status_code, 400)
+        self.assertEqual(self.client.get('/api/dashboards/v1/missing/data').status_code, 404)
+    
+    def test_scope_and_revalidation(self):
+        self.context = UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=5)
+        response = self.client.get('/api/dashboards/v1/data_api_test/data?province_code=3')
+        self.assertEqual(json.loads(response.get_data())['filters'], {'province_code': 5})
+        etag = response.headers['ETag']
+        response = self.client.get('/api/dashboards/v1/data_api_test/data?province_code=3', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/api/dashboards/v1/data_api_test/data?fields=gender_data', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        
+        self.context = UserContext.for_scope(AccessLevel.FACULTY, province_code=5, faculty_code=501)
+        self.assertEqual(self.client.get('/api/dashboards/v1/data_api_test/data').status_code, 403)
+    
+    def test_encoder_matches_json(self):
+        value = {1: [Decimal('2.5'), 'استان', None], 'set': {7}, 'nested': {'a': (1, 2)}}
+        expected = {'1': [2.5, 'استان', None], 'set': [7], 'nested': {'a': [1, 2]}}
+        self.assertEqual(json.loads(serialization.encode_json(value)), expected)
+        self.assertEqual(serialization.encode_json(value).decode('utf-8'), json.dumps(
+            expected, ensure_ascii=False, separators=(',', ':'),
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Unit tests for data-version driven cache invalidation
+"""
+import os
+import tempfile
+import unittest
+from dashboards.base import BaseDashboard
+from dashboards.cache import DashboardCache, cached
+from dashboards.cache_backends import MemoryCacheBackend
+from dashboards.context import AccessLevel, UserContext
+from dashboards.data_version import DataVersions, bump_data_version, get_data_versions
+
+
+class SourceDashboard(BaseDashboard):
+    """Dashboard reading a configurable set of sources"""
+    
+    def __init__(self, dashboard_id, sources):
+        super().__init__(dashboard_id, dashboard_id)
+        self.data_sources = sources
+        self.calls = 0
+    
+    def get_data(self, context, **kwargs):
+        self.calls += 1
+        return {"calls": self.calls}
+    
+    def render(self, data, context):
+        return data
+
+
+class TestDataVersions(unittest.TestCase):
+    """Test DataVersions counters and cache key integration"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self._db_path = DataVersions.db_path
+        DataVersions.db_path = os.path.join(self.tmp.name, 'data_versions.db')
+        DataVersions.reset_local()
+        self._previous = DashboardCache._backend
+        DashboardCache.set_backend(MemoryCacheBackend())
+        self.context = UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+    
+    def tearDown(self):
+        DashboardCache.set_backend(self._previous)
+        DataVersions.db_path = self._db_path
+        DataVersions.reset_local()
+        self.tmp.cleanup()
+    
+    def test_bump_increments(self):
+        """Bumping a source only changes that source"""
+        self.assertEqual(get_data_versions(['students', 'faculty']), {'faculty': 0, 'students': 0})
+        self.assertEqual(bump_data_version('students'), 1)
+        self.assertEqual(bump_data_version('students'), 2)
+        self.assertEqual(get_data_versions(['students', 'faculty']), {'faculty': 0, 'students': 2})
+    
+    def test_bump_visible_to_other_processes(self):
+        """Versions are read back from storage, not just process memory"""
+        bump_data_version('faculty')
+        DataVersions.reset_local()
+        self.assertEqual(DataVersions.get('faculty'), 1)
+    
+    def test_sync_invalidates_only_dependent_dashboards(self):
+        """A students bump recomputes students dashboards, faculty ones stay cached"""
+        students = SourceDashboard("students_t", ('students',))
+        faculty = SourceDashboard("faculty_t", ('faculty',))
+        for dashboard in (students, faculty):
+            dashboard.get_cached_data(self.context, {})
+            dashboard.get_cached_data(self.context, {})
+        self.assertEqual((students.calls, faculty.calls), (1, 1))
+        
+        bump_data_version('students')
+        students.get_cached_data(self.context, {})
+        faculty.get_cached_data(self.context, {})
+        self.assertEqual((students.calls, faculty.calls), (2, 1))
+    
+    def test_dashboard_without_sources_depends_on_all(self):
+        """data_sources=None is invalidated by any source"""
+        dashboard = SourceDashboard("any_t", None)
+        dashboard.get_cached_data(self.context, {})
+        bump_data_version('lms')
+        dashboard.get_cached_data(self.context, {})
+        self.assertEqual(dashboard.calls, 2)
+    
+    def test_cached_decorator_sources(self):
+        """cached(sources=...) keys include the source versions"""
+        calls = []
+        
+        @cached(ttl=60, key_prefix="test_versioned", sources=['pardis'])
+        def compute():
+            calls.append(1)
+            return len(calls)
+        
+        self.assertEqual(compute(), 1)
+        self.assertEqual(compute(), 1)
+        bump_data_version('pardis')
+        self.assertEqual(compute(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
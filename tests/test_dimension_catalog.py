@@ -0,0 +1,129 @@
+"""
+Unit tests for the in-memory dimension catalog behind the filter dropdown APIs
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+from flask import Flask
+from flask_login import LoginManager
+from dashboards import api as api_module
+from dashboards import dimensions
+from dashboards.config import DashboardConfig
+from dashboards.context import AccessLevel, UserContext
+from dashboards.data_version import DataVersions
+from scripts.synthetic_data import create_faculty_db
+
+
+class TestDimensionCatalog(unittest.TestCase):
+    """Catalog lookups must match the dropdown queries they replace"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmp.name, 'faculty_data.db')
+        create_faculty_db(cls.db_path, students=500, faculty=600, seed=4)
+        conn = sqlite3.connect(cls.db_path)
+        conn.executescript("""
+            CREATE TABLE university (university_code INTEGER, university_name TEXT, province_code INTEGER);
+            INSERT INTO university VALUES (10, 'دانشگاه الف', 3), (11, 'دانشگاه ب', 3), (20, 'دانشگاه ج', 4);
+        """)
+        conn.commit()
+        conn.close()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+    
+    def setUp(self):
+        self._version_db = DataVersions.db_path
+        DataVersions.db_path = os.path.join(self.tmp.name, 'data_versions.db')
+        DataVersions.reset_local()
+        dimensions.drop_catalogs()
+        self.catalog = dimensions.get_catalog(self.db_path)
+    
+    def tearDown(self):
+        dimensions.drop_catalogs()
+        DataVersions.db_path = self._version_db
+        DataVersions.reset_local()
+    
+    def sql(self, query, params=()):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return [{"code": row[0], "name": row[1]} for row in conn.execute(query, params)]
+        finally:
+            conn.close()
+    
+    def test_matches_dropdown_queries(self):
+        items, _ = self.catalog.lookup('provinces')
+        self.assertEqual(items, self.sql("SELECT province_code, province_name FROM province ORDER BY province_name"))
+        items, _ = self.catalog.lookup('faculties', province_code=[3])
+        self.assertEqual(items, self.sql(
+            "SELECT DISTINCT code_markaz, markaz FROM faculty WHERE code_markaz IS NOT NULL "
+            "AND province_code = ? ORDER BY markaz", (3,),
+        ))
+        items, _ = self.catalog.lookup('universities', province_code=[3])
+        self.assertEqual([item['code'] for item in items], [10, 11])
+        items, _ = self.catalog.lookup('terms')
+        self.assertEqual(items, self.sql(
+            "SELECT DISTINCT term, term FROM Students WHERE term IS NOT NULL AND term != '' ORDER BY term DESC"
+        ))
+    
+    def test_access_restriction_always_applies(self):
+        province = UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code='3')
+        items, _ = self.catalog.lookup('provinces', province)
+        self.assertEqual([item['code'] for item in items], [3])
+        # A request value can narrow the list but never widen it past the restriction
+        items, _ = self.catalog.lookup('faculties', province, province_code=[4])
+        self.assertEqual(items, [])
+        items, _ = self.catalog.lookup('universities', province)
+        self.assertEqual([item['code'] for item in items], [10, 11])
+        
+        faculty = UserContext.for_scope(AccessLevel.FACULTY, province_code=3, faculty_code=305)
+        items, _ = self.catalog.lookup('faculties', faculty)
+        self.assertEqual([item['code'] for item in items], [305])
+        items, _ = self.catalog.lookup('universities', faculty)
+        self.assertEqual([item['code'] for item in items], [10, 11])
+        self.assertEqual(self.catalog.lookup('terms', faculty), self.catalog.lookup('terms'))
+    
+    def test_etags_and_reload(self):
+        items, etag = self.catalog.lookup('faculties', province_code=[3])
+        self.assertIs(self.catalog.lookup('faculties', province_code=[3])[0], items)
+        self.assertNotEqual(self.catalog.lookup('faculties', province_code=[4])[1], etag)
+        self.assertIs(dimensions.get_catalog(self.db_path), self.catalog)
+        
+        # A sync of a catalog source reloads it; unchanged data keeps its ETags
+        DataVersions.bump('faculty')
+        reloaded = dimensions.get_catalog(self.db_path)
+        self.assertIsNot(reloaded, self.catalog)
+        self.assertEqual(reloaded.lookup('faculties', province_code=[3])[1], etag)
+        DataVersions.bump('lms')
+        self.assertIs(dimensions.get_catalog(self.db_path), reloaded)
+    
+    def test_api_conditional_get(self):
+        app = Flask(__name__)
+        app.config['LOGIN_DISABLED'] = True
+        LoginManager(app)
+        app.register_blueprint(api_module.api_bp)
+        get_user_context = api_module.get_user_context
+        faculty_db = DashboardConfig.FACULTY_DB
+        api_module.get_user_context = lambda: UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=3)
+        DashboardConfig.FACULTY_DB = self.db_path
+        try:
+            client = app.test_client()
+            response = client.get('/api/dashboards/faculties?province_code=3')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['faculties'], self.catalog.lookup('faculties', province_code=[3])[0])
+            etag = response.headers['ETag']
+            response = client.get('/api/dashboards/faculties?province_code=3', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            response = client.get('/api/dashboards/provinces', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.get_json()['provinces']), 1)
+        finally:
+            api_module.get_user_context = get_user_context
+            DashboardConfig.FACULTY_DB = faculty_db
+
+
+if __name__ == '__main__':
+    unittest.main()
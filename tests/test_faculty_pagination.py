@@ -0,0 +1,138 @@
+"""
+Unit tests for the keyset-paginated and streamed faculty list
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+from dashboards.cache import DashboardCache
+from dashboards.cache_backends import MemoryCacheBackend
+from dashboards.context import AccessLevel, UserContext
+from dashboards.data_providers import filters as filters_module
+from dashboards.data_providers.faculty import FacultyDataProvider, encode_cursor
+from dashboards.data_providers.materialized import rebuild_aggregates
+from dashboards.data_version import DataVersions
+from scripts.synthetic_data import create_faculty_db
+
+
+class TestFacultyPagination(unittest.TestCase):
+    """Pages and streams must reproduce the full sorted list exactly once"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmp.name, 'faculty_data.db')
+        create_faculty_db(cls.db_path, students=100, faculty=2000, seed=5)
+        conn = sqlite3.connect(cls.db_path)
+        # NULL and duplicate sort keys: ties must be broken by rowid, not skipped
+        conn.executemany(
+            "INSERT INTO faculty (name, family, markaz, sex, province_code, code_markaz) VALUES (?, ?, ?, ?, ?, ?)",
+            [(None, None, None, 1, 3, 305), ('نام1', 'خانواده1', None, 2, 3, 305)] * 3,
+        )
+        conn.commit()
+        conn.close()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+    
+    def setUp(self):
+        self._version_db = DataVersions.db_path
+        DataVersions.db_path = os.path.join(self.tmp.name, 'data_versions.db')
+        DataVersions.reset_local()
+        self._cache_backend = DashboardCache._backend
+        DashboardCache.set_backend(MemoryCacheBackend())
+        filters_module.clear_table_cache()
+        self.provider = FacultyDataProvider(db_path=self.db_path)
+        self.provider.use_pool = False
+    
+    def tearDown(self):
+        DashboardCache.set_backend(self._cache_backend)
+        DataVersions.db_path = self._version_db
+        DataVersions.reset_local()
+    
+    def expected(self, province_code, order_by, faculty_code=None):
+        """(name, family, code) of the province's rows, as the list returns them"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            where, params = "province_code = ?", [province_code]
+            if faculty_code is not None:
+                where, params = where + " AND code_markaz = ?", params + [faculty_code]
+            return conn.execute(
+                f"SELECT COALESCE(name, ''), COALESCE(family, ''), COALESCE(code, '') FROM faculty "
+                f"WHERE {where} ORDER BY {order_by}", params,
+            ).fetchall()
+        finally:
+            conn.close()
+    
+    def all_pages(self, province_code, context=None, **kwargs):
+        rows, cursor, pages = [], None, 0
+        while True:
+            page = self.provider.get_faculty_page(province_code, context, cursor=cursor, **kwargs)
+            rows.extend(page['faculty'])
+            pages += 1
+            cursor = page['next_cursor']
+            if cursor is None:
+                return rows, page, pages
+    
+    def test_pages_cover_list_in_order(self):
+        rows, last, pages = self.all_pages(3, limit=7)
+        expected = self.expected(3, "COALESCE(name, ''), COALESCE(family, ''), rowid")
+        self.assertEqual([(row['name'], row['family'], row['code']) for row in rows], expected)
+        self.assertEqual(pages, -(-len(expected) // 7))
+        self.assertEqual([row['row_num'] for row in rows], list(range(1, len(rows) + 1)))
+        self.assertEqual(last['count'], len(expected))
+    
+    def test_descending_sort_and_columns(self):
+        rows, _, _ = self.all_pages(3, limit=50, sort='markaz', descending=True, columns=['markaz', 'name', 'code'])
+        self.assertEqual(set(rows[0]), {'row_num', 'markaz', 'name', 'code'})
+        keys = [(row['markaz'], row['name']) for row in rows]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertEqual(len(rows), len(self.expected(3, "rowid")))
+        codes = [row['code'] for row in rows if row['code']]
+        self.assertEqual(len(codes), len(set(codes)))
+    
+    def test_context_restriction_and_count(self):
+        context = UserContext.for_scope(AccessLevel.FACULTY, province_code=3, faculty_code=305)
+        rows, last, _ = self.all_pages(3, context, limit=2)
+        expected = self.expected(3, "rowid", faculty_code=305)
+        self.assertEqual(len(rows), len(expected))
+        self.assertEqual(last['count'], len(expected))
+        self.assertTrue(all(row['markaz'] in ('', 'پردیس 305') for row in rows))
+    
+    def test_count_from_aggregate_is_cached(self):
+        rebuild_aggregates(self.db_path, sources=['faculty'])
+        queries = []
+        execute_query = self.provider.execute_query
+        self.provider.execute_query = lambda query, *args: queries.append(query) or execute_query(query, *args)
+        total = len(self.expected(3, "rowid"))
+        self.assertEqual(self.provider.count_faculty_list(3), total)
+        self.assertIn('agg_faculty', queries[0])
+        self.assertEqual(self.provider.count_faculty_list(3), total)
+        self.assertEqual(len(queries), 1)
+        
+        DataVersions.bump('faculty')
+        self.assertEqual(self.provider.count_faculty_list(3), total)
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('agg_faculty', queries[1])  # aggregate is stale now
+    
+    def test_stream_matches_pages(self):
+        rows, _, _ = self.all_pages(3, limit=100, sort='family')
+        streamed = list(self.provider.iter_faculty_list(3, sort='family', batch_size=9))
+        self.assertEqual(streamed, rows)
+    
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self.provider.get_faculty_page(3, sort='mobile')
+        with self.assertRaises(ValueError):
+            self.provider.iter_faculty_list(3, columns=['name', 'password'])
+        with self.assertRaises(ValueError):
+            self.provider.get_faculty_page(3, cursor='not a cursor')
+        with self.assertRaises(ValueError):
+            self.provider.get_faculty_page(3, cursor=encode_cursor('name', True, ['', '', 1], 10))
+        with self.assertRaises(ValueError):
+            self.provider.get_faculty_page(3, cursor=encode_cursor('name', False, ['', 1], 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+Unit tests for the table-aware filter compiler
+"""
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from dashboards.context import AccessLevel, UserContext
+from dashboards.data_providers import filters as filters_module
+from dashboards.data_providers.faculty import FacultyDataProvider
+from dashboards.data_providers.filters import FilterError, splice_where
+from dashboards.data_providers.students import StudentsDataProvider
+from migrations.add_students_derived_columns import add_derived_columns
+from scripts.synthetic_data import create_faculty_db
+
+
+CONTEXTS = {
+    AccessLevel.ADMIN: UserContext.for_scope(AccessLevel.ADMIN, province_code=3),
+    AccessLevel.CENTRAL_ORG: UserContext.for_scope(AccessLevel.CENTRAL_ORG, province_code=3),
+    AccessLevel.PROVINCE_UNIVERSITY: UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=3),
+    AccessLevel.FACULTY: UserContext.for_scope(AccessLevel.FACULTY, province_code=3, faculty_code=305),
+}
+
+
+class TestFilterCompiler(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmp.name, 'faculty_data.db')
+        create_faculty_db(cls.db_path, students=3000, faculty=3000, seed=8)
+        conn = sqlite3.connect(cls.db_path)
+        with redirect_stdout(io.StringIO()):
+            add_derived_columns(conn)
+        conn.executescript("""
+            CREATE INDEX idx_faculty_province_code ON faculty (province_code);
+            CREATE INDEX idx_faculty_code_markaz ON faculty (code_markaz);
+            CREATE INDEX idx_students_province_code ON Students (province_code);
+            CREATE TABLE monitor_data (url TEXT, timestamp TEXT, key TEXT, value INTEGER);
+            CREATE TABLE events (id INTEGER PRIMARY KEY, date TEXT, province_code INTEGER);
+            CREATE INDEX idx_events_date ON events (date);
+            ANALYZE;
+        """)
+        conn.commit()
+        conn.close()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+    
+    def setUp(self):
+        filters_module.clear_table_cache()
+        self.faculty = FacultyDataProvider(db_path=self.db_path)
+        self.faculty.use_aggregates = False
+        self.students = StudentsDataProvider(db_path=self.db_path)
+        self.students.use_aggregates = False
+    
+    def plan(self, query, params):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+        finally:
+            conn.close()
+    
+    def test_access_levels_on_faculty(self):
+        expected = {
+            AccessLevel.ADMIN: ("", []),
+            AccessLevel.CENTRAL_ORG: ("", []),
+            AccessLevel.PROVINCE_UNIVERSITY: (" WHERE province_code = ?", [3]),
+            AccessLevel.FACULTY: (" WHERE province_code = ? AND code_markaz = ?", [3, 305]),
+        }
+        for level, context in CONTEXTS.items():
+            where, params = self.faculty.where_clause('faculty', {}, context)
+            self.assertEqual((where, params), expected[level], level)
+            plan = self.plan(f"SELECT sex, COUNT(*) FROM faculty{where} GROUP BY sex", params)
+            if params:
+                self.assertRegex(plan, r"SEARCH faculty USING (COVERING )?INDEX idx_faculty_", level)
+            else:
+                self.assertIn("SCAN faculty", plan, level)
+    
+    def test_access_levels_on_students(self):
+        where, params = self.students.where_clause('Students', {}, CONTEXTS[AccessLevel.FACULTY])
+        # Students spells the column code_Markaz
+        self.assertEqual(where, " WHERE province_code = ? AND code_Markaz = ?")
+        self.assertEqual(params, [3, 305])
+        self.assertRegex(
+            self.plan(f"SELECT COUNT(*) FROM Students{where}", params),
+            r"SEARCH Students USING (COVERING )?INDEX idx_students_(province_code|code_markaz)",
+        )
+        
+        where, params = self.students.where_clause('Students', {}, CONTEXTS[AccessLevel.PROVINCE_UNIVERSITY])
+        self.assertEqual(where, " WHERE province_code = ?")
+        self.assertRegex(
+            self.plan(f"SELECT sex, COUNT(*) FROM Students{where} GROUP BY sex", params),
+            r"SEARCH Students USING (COVERING )?INDEX idx_students_province_code \(province_code=\?\)",
+        )
+    
+    def test_request_filters(self):
+        where, params = self.faculty.where_clause('faculty', {'province_codes': [1, '2', 3]})
+        self.assertEqual(where, " WHERE province_code IN (?, ?, ?)")
+        self.assertEqual(params, [1, 2, 3])  # typed for the INTEGER column
+        
+        where, params = self.faculty.where_clause('faculty', {'province_codes': [4], 'faculty_code': '401'})
+        # One table column instead of the old code_markaz/faculty_code OR chain
+        self.assertEqual(where, " WHERE province_code = ? AND code_markaz = ?")
+        self.assertEqual(params, [4, 401])
+        
+        where, params = self.faculty.where_clause(
+            'events', {'date_from': '1403/01/01', 'date_to': '1403/12/29'}, existing_where=True,
+        )
+        self.assertEqual(where, " AND date >= ? AND date <= ?")
+        plan = self.plan(f"SELECT COUNT(*) FROM events WHERE id > 0{where}", params)
+        self.assertRegex(plan, r"SEARCH events USING (COVERING )?INDEX idx_events_date \(date>\? AND date<\?\)")
+        
+        where, params = self.students.where_clause('Students', {'province_code': 3}, CONTEXTS[AccessLevel.PROVINCE_UNIVERSITY],
+                                                   extra=("grade=1",))
+        # The filter repeating the user's own province is compiled once
+        self.assertEqual(where, " WHERE grade=1 AND province_code = ?")
+        self.assertEqual(params, [3])
+    
+    def test_missing_columns(self):
+        with self.assertRaises(FilterError):
+            self.faculty.where_clause('faculty', {'university_code': 5})
+        with self.assertRaises(FilterError):
+            self.faculty.where_clause('events', {}, CONTEXTS[AccessLevel.FACULTY])
+        # Unscoped tables ignore access restrictions
+        self.assertEqual(self.faculty.where_clause('monitor_data', {}, CONTEXTS[AccessLevel.FACULTY]), ("", []))
+    
+    def test_statements_cached_per_shape(self):
+        first, _ = self.faculty.where_clause('faculty', {'province_codes': [1, 2]})
+        second, params = self.faculty.where_clause('faculty', {'province_codes': [7, 8]})
+        self.assertIs(first, second)
+        self.assertEqual(params, [7, 8])
+        third, _ = self.faculty.where_clause('faculty', {'province_codes': [1, 2, 3]})
+        self.assertIsNot(first, third)
+    
+    def test_splice_where(self):
+        query, position = splice_where(
+            "SELECT a, COUNT(*) FROM t WHERE a = ? OR b = 'x GROUP BY' GROUP BY a HAVING COUNT(*) > ? LIMIT ?", "c = ?",
+        )
+        self.assertEqual(
+            query, "SELECT a, COUNT(*) FROM t WHERE (a = ? OR b = 'x GROUP BY') AND c = ?\nGROUP BY a HAVING COUNT(*) > ? LIMIT ?",
+        )
+        self.assertEqual(position, 1)
+        query, position = splice_where("SELECT x FROM (SELECT x FROM t WHERE y = ? GROUP BY x) ORDER BY x", "z = ?")
+        self.assertEqual(query, "SELECT x FROM (SELECT x FROM t WHERE y = ? GROUP BY x) WHERE z = ?\nORDER BY x")
+        self.assertEqual(position, 1)
+        with self.assertRaises(FilterError):
+            splice_where("SELECT a FROM t UNION SELECT a FROM u", "c = ?")
+    
+    def test_context_on_raw_query(self):
+        context = CONTEXTS[AccessLevel.PROVINCE_UNIVERSITY]
+        rows = self.faculty.execute_query(
+            "SELECT sex, COUNT(*) FROM faculty WHERE sex = ? OR sex = ? GROUP BY sex ORDER BY sex LIMIT ?", (1, 2, 5), context,
+        )
+        expected = self.faculty.execute_query(
+            "SELECT sex, COUNT(*) FROM faculty WHERE (sex = 1 OR sex = 2) AND province_code = 3 GROUP BY sex ORDER BY sex",
+        )
+        self.assertEqual(rows, expected)
+    
+    def test_provider_results_respect_context(self):
+        """Restricted contexts return the same as the equivalent request filters"""
+        province = CONTEXTS[AccessLevel.PROVINCE_UNIVERSITY]
+        for method in ('get_faculty_by_sex', 'get_faculty_by_markaz', 'get_faculty_by_grade', 'get_faculty_by_edugroup'):
+            restricted = getattr(self.faculty, method)(province, {})
+            self.assertEqual(restricted, getattr(self.faculty, method)(None, {'province_code': 3}), method)
+            self.assertNotEqual(restricted, getattr(self.faculty, method)(None, {}), method)
+        
+        faculty = CONTEXTS[AccessLevel.FACULTY]
+        self.assertEqual(
+            sum(self.students.get_gender_data(faculty, {})['counts']),
+            self.students.execute_query("SELECT COUNT(*) FROM Students WHERE province_code = 3 AND code_Markaz = 305")[0][0],
+        )
+    
+    def test_edugroup_with_filters(self):
+        # Used to lose the WHERE keyword (where_clause[5:]) and return no groups
+        data = self.faculty.get_faculty_by_edugroup(None, {'province_code': 3})
+        self.assertTrue(data['labels'])
+        expected = self.faculty.execute_query("""
+            SELECT COUNT(*) FROM faculty JOIN faculty_golestan USING (professorCode)
+            WHERE province_code = 3 AND group_title != ''
+        """)[0][0]
+        self.assertEqual(sum(data['counts']), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Unit tests for the preprocessed province geometry store behind the map dashboards
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+import geopandas as gpd
+from dashboards.config import DashboardConfig
+from dashboards.visualizations import geometry
+from dashboards.visualizations.geometry import GeometryStore, get_geometry_store
+from dashboards.visualizations.maps import MapBuilder
+from scripts.synthetic_data import PROVINCES, SHAPE_NAMES, create_faculty_db, create_province_shapefile
+
+
+class TestGeometryStore(unittest.TestCase):
+    """The store must match what MapBuilder computed from the shapefile"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.shapefile = create_province_shapefile(os.path.join(cls.tmp.name, 'provinces.shp'), vertices=200)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+    
+    def setUp(self):
+        self.db_path = create_faculty_db(os.path.join(self.tmp.name, 'faculty_data.db'), students=10, faculty=10)
+        self.cache_path = os.path.join(self.tmp.name, 'province_geometry.pkl')
+        if os.path.exists(self.cache_path):
+            os.remove(self.cache_path)
+        self._config = (DashboardConfig.GEOMETRY_CACHE_PATH, DashboardConfig.IRAN_SHAPEFILE, DashboardConfig.FACULTY_DB)
+        DashboardConfig.GEOMETRY_CACHE_PATH = self.cache_path
+        DashboardConfig.IRAN_SHAPEFILE = self.shapefile
+        DashboardConfig.FACULTY_DB = self.db_path
+        geometry.drop_geometry_stores()
+    
+    def tearDown(self):
+        geometry.drop_geometry_stores()
+        DashboardConfig.GEOMETRY_CACHE_PATH, DashboardConfig.IRAN_SHAPEFILE, DashboardConfig.FACULTY_DB = self._config
+    
+    def test_codes_centroids_and_names(self):
+        store = get_geometry_store()
+        codes = {name: code for code, name in PROVINCES}
+        english = dict(zip(SHAPE_NAMES, [codes[name] for _, name in PROVINCES] + [None, None]))
+        self.assertEqual(dict(zip(store.names, store.codes)), english)
+        
+        gdf = gpd.read_file(self.shapefile)
+        for (x, y), shape in zip(store.centroids, gdf.geometry):
+            self.assertAlmostEqual(x, shape.centroid.x)
+            self.assertAlmostEqual(y, shape.centroid.y)
+        self.assertEqual(list(store.total_bounds), list(gdf.total_bounds))
+        
+        # Persian, Arabic-letter and shapefile spellings all resolve
+        self.assertEqual(store.code_for('خراسان رضوی'), 4)
+        self.assertEqual(store.code_for(' خراسان  رضوي'), 4)
+        self.assertEqual(store.code_for('Razavi Khorasan'), 4)
+        self.assertIsNone(store.code_for('Semnan'))
+    
+    def test_cache_reused_until_sources_change(self):
+        first = get_geometry_store()
+        self.assertIs(get_geometry_store(), first)
+        self.assertTrue(os.path.exists(self.cache_path))
+        
+        geometry.drop_geometry_stores()
+        with mock.patch.object(GeometryStore, 'build', side_effect=AssertionError("shapefile read")):
+            cached = get_geometry_store()
+        self.assertEqual(cached.codes, first.codes)
+        self.assertEqual(cached.name_index, first.name_index)
+        self.assertEqual(list(cached.geometries), list(first.geometries))
+        
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO province VALUES (16, 'سمنان')")
+        conn.commit()
+        conn.close()
+        geometry.drop_geometry_stores()
+        rebuilt = get_geometry_store()
+        self.assertEqual(rebuilt.codes[SHAPE_NAMES.index('Semnan')], 16)
+        self.assertNotEqual(rebuilt.checksum, first.checksum)
+    
+    def test_map_builder(self):
+        builder = MapBuilder()
+        store = get_geometry_store()
+        self.assertIs(builder.geometry, store)
+        self.assertEqual(builder.province_map_dict['razavi khorasan'], 4)
+        bounds = store.total_bounds
+        centroids = builder.get_province_centroids()
+        self.assertEqual(len(centroids), len(PROVINCES))
+        x, y = store.centroids[0]
+        self.assertAlmostEqual(centroids[1]['x'], (x - bounds[0]) / (bounds[2] - bounds[0]))
+        self.assertAlmostEqual(centroids[1]['y'], 1 - (y - bounds[1]) / (bounds[3] - bounds[1]))
+        
+        image = builder.create_province_map_with_pie_charts({1: {'1': 3, '2': 1}, 4: {'1': 1, '2': 1}}, "نقشه", figsize=(4, 4))
+        self.assertEqual(image.read(4), b'\x89PNG')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Unit tests for ETag/Last-Modified revalidation of dashboard pages
+"""
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from flask import Blueprint, Flask, make_response
+from dashboards import map_images
+from dashboards.base import BaseDashboard
+from dashboards.cache import DashboardCache
+from dashboards.cache_backends import MemoryCacheBackend
+from dashboards.config import DashboardConfig
+from dashboards.context import AccessLevel, UserContext
+from dashboards.data_version import DataVersions
+
+
+class PageDashboard(BaseDashboard):
+    """Dashboard counting its renders"""
+    
+    def __init__(self):
+        super().__init__("http_validator_test", "HTTP")
+        self.data_sources = ('faculty',)
+        self.renders = 0
+    
+    def get_data(self, context, **kwargs):
+        return {"faculty": DataVersions.get('faculty')}
+    
+    def render(self, data, context):
+        self.renders += 1
+        return self.add_no_cache_headers(make_response(f"<p>{data['faculty']}</p>"))
+
+
+class MapPageDashboard(PageDashboard):
+    """Dashboard whose map image may still be rendering"""
+    
+    def render(self, data, context):
+        self.renders += 1
+        image = map_images.map_image('http_validator_test', {'faculty': data['faculty']}, lambda: b'')
+        return self.add_no_cache_headers(make_response(f"<img src=\"{image['image_url']}\">"))
+
+
+def user_context(user_id):
+    context = UserContext.for_scope(AccessLevel.ADMIN)
+    context.user = SimpleNamespace(id=user_id)
+    return context
+
+
+class TestHttpValidators(unittest.TestCase):
+    """Unchanged pages revalidate with 304 without rendering, never across users"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.template = os.path.join(self.tmp.name, 'templates', 'page.html')
+        os.makedirs(os.path.dirname(self.template))
+        with open(self.template, 'w') as f:
+            f.write("<p>{{ value }}</p>")
+        self.app = Flask(__name__, root_path=self.tmp.name)
+        
+        self._previous = DashboardCache._backend
+        DashboardCache.set_backend(MemoryCacheBackend())
+        self._version_db = DataVersions.db_path
+        DataVersions.db_path = os.path.join(self.tmp.name, 'data_versions.db')
+        DataVersions.reset_local()
+        self._enabled = DashboardConfig.HTTP_VALIDATORS_ENABLED
+        self._interval = DashboardConfig.DATA_VERSION_CHECK_INTERVAL
+        DashboardConfig.HTTP_VALIDATORS_ENABLED = True
+        DashboardConfig.DATA_VERSION_CHECK_INTERVAL = 0
+        self.dashboard = PageDashboard()
+    
+    def tearDown(self):
+        DashboardCache.set_backend(self._previous)
+        DataVersions.db_path = self._version_db
+        DataVersions.reset_local()
+        DashboardConfig.HTTP_VALIDATORS_ENABLED = self._enabled
+        DashboardConfig.DATA_VERSION_CHECK_INTERVAL = self._interval
+        self.tmp.cleanup()
+    
+    def request(self, etag=None, user_id=1):
+        headers = {'If-None-Match': etag} if etag else {}
+        with self.app.test_request_context('/dashboards/http_validator_test', headers=headers):
+            return self.dashboard.handle_request(user_context=user_context(user_id))
+    
+    def test_revalidation(self):
+        response = self.request()
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+        self.assertIn('Cookie', response.headers['Vary'])
+        self.assertIsNotNone(response.last_modified)
+        self.assertNotIn('Pragma', response.headers)
+        
+        response = self.request(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(self.dashboard.renders, 1)
+    
+    def test_other_user_never_gets_304(self):
+        etag = self.request(user_id=1).headers['ETag']
+        response = self.request(etag, user_id=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+    
+    def test_data_and_template_changes(self):
+        etag = self.request().headers['ETag']
+        DataVersions.bump('faculty')
+        response = self.request(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(), b'<p>1</p>')
+        
+        etag = response.headers['ETag']
+        later = time.time() + 10
+        os.utime(self.template, (later, later))
+        self.assertEqual(self.request(etag).status_code, 200)
+    
+    def test_pending_map_page_is_not_revalidated(self):
+        # A dropped render (queue full) must be retried when the placeholder reloads
+        bp = Blueprint('dashboard', __name__)
+        bp.add_url_rule('/images/<key>.png', 'map_image', map_images.send_image)
+        self.app.register_blueprint(bp)
+        self.dashboard = MapPageDashboard()
+        config = (DashboardConfig.MAP_IMAGE_CACHE_ENABLED, DashboardConfig.RENDER_POOL_ENABLED)
+        DashboardConfig.MAP_IMAGE_CACHE_ENABLED = DashboardConfig.RENDER_POOL_ENABLED = True
+        self.addCleanup(setattr, DashboardConfig, 'MAP_IMAGE_CACHE_ENABLED', config[0])
+        self.addCleanup(setattr, DashboardConfig, 'RENDER_POOL_ENABLED', config[1])
+        
+        with mock.patch.object(map_images, 'render_in_pool', return_value=False):
+            pending = self.request()
+            self.assertNotIn('ETag', pending.headers)
+            self.assertIn('no-store', pending.headers['Cache-Control'])
+            self.assertEqual(self.request().status_code, 200)  # the reload renders, and asks for the map again
+            self.assertEqual(self.dashboard.renders, 2)
+        
+        with mock.patch.object(map_images, 'render_in_pool', return_value=True):
+            etag = self.request().headers['ETag']
+            self.assertEqual(self.request(etag).status_code, 304)
+    
+    def test_uncached_or_disabled_pages_are_not_stored(self):
+        self.dashboard.cache_enabled = False
+        response = self.request()
+        self.assertNotIn('ETag', response.headers)
+        self.assertIn('no-store', response.headers['Cache-Control'])
+        
+        self.dashboard.cache_enabled = True
+        DashboardConfig.HTTP_VALIDATORS_ENABLED = False
+        response = self.request()
+        self.assertNotIn('ETag', response.headers)
+        self.assertIn('no-store', response.headers['Cache-Control'])
+
+
+if __name__ == '__main__':
+    unittest.main()
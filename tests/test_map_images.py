@@ -0,0 +1,97 @@
+"""
+Unit tests for the content-addressed map image cache
+"""
+import os
+import tempfile
+import time
+import unittest
+from flask import Blueprint, Flask
+from dashboards import map_images
+from dashboards.config import DashboardConfig
+from dashboards.http_cache import IMMUTABLE_CACHE_CONTROL
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(2000)
+
+
+class TestMapImages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self._config = (DashboardConfig.MAP_IMAGE_DIR, DashboardConfig.MAP_IMAGE_CACHE_ENABLED,
+                        DashboardConfig.MAP_IMAGE_MAX_AGE_DAYS, DashboardConfig.MAP_IMAGE_MAX_MB,
+                        DashboardConfig.RENDER_POOL_ENABLED)
+        DashboardConfig.MAP_IMAGE_DIR = self.tmp.name
+        DashboardConfig.MAP_IMAGE_CACHE_ENABLED = True
+        DashboardConfig.RENDER_POOL_ENABLED = False  # rendered in-thread (see test_render_pool)
+        self.renders = 0
+        
+        app = Flask(__name__)
+        bp = Blueprint('dashboard', __name__, url_prefix='/dashboards')
+        bp.add_url_rule('/images/<key>.png', 'map_image', map_images.send_image)
+        app.register_blueprint(bp)
+        self.app = app
+        self.client = app.test_client()
+    
+    def tearDown(self):
+        (DashboardConfig.MAP_IMAGE_DIR, DashboardConfig.MAP_IMAGE_CACHE_ENABLED,
+         DashboardConfig.MAP_IMAGE_MAX_AGE_DAYS, DashboardConfig.MAP_IMAGE_MAX_MB,
+         DashboardConfig.RENDER_POOL_ENABLED) = self._config
+        self.tmp.cleanup()
+    
+    def render(self):
+        self.renders += 1
+        return PNG
+    
+    def test_key_follows_content(self):
+        inputs = {'province_data': {1: {'1': 3, '2': 1}}, 'colors': ['#36A2EB', '#FF6384']}
+        key = map_images.image_key('d2', inputs)
+        self.assertEqual(key, map_images.image_key('d2', {'colors': ['#36A2EB', '#FF6384'], 'province_data': {1: {'1': 3, '2': 1}}}))
+        self.assertNotEqual(key, map_images.image_key('d3', inputs))
+        self.assertNotEqual(key, map_images.image_key('d2', {**inputs, 'province_data': {1: {'1': 3, '2': 2}}}))
+        self.assertEqual(map_images.image_path(key), os.path.join(self.tmp.name, f"{key}.png"))
+        self.assertIsNone(map_images.image_path('../../etc/passwd'))
+    
+    def test_rendered_once_and_served_immutable(self):
+        with self.app.test_request_context():
+            first = map_images.map_image('d2', {'total': 5}, self.render)
+            second = map_images.map_image('d2', {'total': 5}, self.render)
+        self.assertEqual(first, second)
+        self.assertEqual(self.renders, 1)
+        
+        response = self.client.get(first['image_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/png')
+        self.assertEqual(response.get_data(), PNG)
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        response.close()
+        
+        self.assertEqual(self.client.get('/dashboards/images/' + '0' * 64 + '.png').status_code, 404)
+        self.assertEqual(self.client.get('/dashboards/images/not-a-key.png').status_code, 404)
+        
+        DashboardConfig.MAP_IMAGE_CACHE_ENABLED = False
+        with self.app.test_request_context():
+            inline = map_images.map_image('d2', {'total': 5}, self.render)
+        self.assertEqual(set(inline), {'image_data'})
+        self.assertEqual(self.renders, 2)
+    
+    def test_garbage_collection(self):
+        now = time.time()
+        keys = [map_images.image_key('d2', {'n': n}) for n in range(4)]
+        for age_days, key in zip((10, 3, 2, 1), keys):
+            map_images.get_or_render(key, lambda: bytes(600 * 1024))
+            os.utime(map_images.image_path(key), (now - age_days * 86400,) * 2)
+        
+        # Unused for more than a week, then least recently used beyond 1 MB
+        DashboardConfig.MAP_IMAGE_MAX_AGE_DAYS = 7
+        DashboardConfig.MAP_IMAGE_MAX_MB = 1
+        self.assertEqual(map_images.collect_garbage(force=True), 3)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), [f"{keys[3]}.png"])
+        
+        # A hit refreshes an image's age
+        map_images.get_or_render(keys[3], self.render)
+        self.assertEqual(self.renders, 0)
+        self.assertGreater(os.path.getmtime(map_images.image_path(keys[3])), now - 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Unit tests for materialized aggregate tables
+"""
+import os
+import random
+import tempfile
+import unittest
+from dashboards.context import AccessLevel, UserContext
+from dashboards.data_providers.faculty import FacultyDataProvider
+from dashboards.data_providers.materialized import aggregate_status, check_aggregates, rebuild_aggregates
+from dashboards.data_providers.students import StudentsDataProvider
+from dashboards.data_version import DataVersions
+from scripts.synthetic_data import create_faculty_db
+
+
+class TestMaterializedAggregates(unittest.TestCase):
+    """Test building, using and checking aggregate tables"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmp.name, 'faculty_data.db')
+        create_faculty_db(cls.db_path, students=6000, faculty=800, seed=11)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+    
+    def setUp(self):
+        self._version_db = DataVersions.db_path
+        DataVersions.db_path = os.path.join(self.tmp.name, 'data_versions.db')
+        DataVersions.reset_local()
+        rebuild_aggregates(self.db_path)
+        self.students = StudentsDataProvider(db_path=self.db_path)
+        self.faculty = FacultyDataProvider(db_path=self.db_path)
+        for provider in (self.students, self.faculty):
+            provider.use_pool = False
+            provider.use_aggregates = True
+        self.queries = []
+        self._spy(self.students)
+        self._spy(self.faculty)
+    
+    def tearDown(self):
+        DataVersions.db_path = self._version_db
+        DataVersions.reset_local()
+    
+    def _spy(self, provider):
+        execute_query = provider.execute_query
+        
+        def spy(query, params=(), context=None):
+            self.queries.append(query)
+            return execute_query(query, params, context)
+        
+        provider.execute_query = spy
+    
+    def test_tables_built_and_current(self):
+        status = {s['name']: s for s in aggregate_status(self.db_path)}
+        self.assertTrue(all(s['current'] for s in status.values()))
+        self.assertEqual(status['agg_students']['source_rows'], 6000)
+        self.assertLess(status['agg_faculty_golestan']['rows'], 800)
+    
+    def test_consistent_with_raw_tables(self):
+        self.assertEqual(check_aggregates(self.db_path, province_codes=[1, 7]), [])
+    
+    def test_covered_request_reads_aggregate(self):
+        random.seed(0)
+        data = self.students.get_dashboard_data(None, {'province_code': 2})
+        self.faculty.get_faculty_by_sex(None, {})
+        self.assertIn('agg_students', self.queries[0])
+        self.assertIn('agg_faculty', self.queries[1])
+        self.students.use_aggregates = False
+        random.seed(0)
+        self.assertEqual(self.students.get_dashboard_data(None, {'province_code': 2}), data)
+    
+    def test_uncovered_requests_read_raw_tables(self):
+        restricted = UserContext.for_scope(AccessLevel.FACULTY, province_code=2, faculty_code=201)
+        self.assertIsNone(self.students.aggregate_table('agg_students', restricted, {}))
+        self.assertIsNone(self.students.aggregate_table('agg_students', None, {'date_from': '1402/01/01'}))
+        national = UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+        self.assertEqual(self.students.aggregate_table('agg_students', national, {'province_codes': [1, 2]}), 'agg_students')
+    
+    def test_stale_after_version_bump(self):
+        """A sync bumping the version makes providers fall back until rebuilt"""
+        DataVersions.bump('students')
+        self.assertIsNone(self.students.aggregate_table('agg_students', None, {}))
+        self.assertEqual(self.faculty.aggregate_table('agg_faculty', None, {}), 'agg_faculty')
+        self.assertEqual(check_aggregates(self.db_path), ['agg_students: stale'])
+        rebuild_aggregates(self.db_path, sources=['students'])
+        self.assertEqual(self.students.aggregate_table('agg_students', None, {}), 'agg_students')
+
+
+if __name__ == '__main__':
+    unittest.main()
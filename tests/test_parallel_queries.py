@@ -0,0 +1,188 @@
+"""
+Unit tests for concurrent provider queries in dashboard get_data
+"""
+import os
+import tempfile
+import threading
+import time
+import unittest
+from dashboards import executor
+from dashboards.base import BaseDashboard
+from dashboards.cache import DashboardCache
+from dashboards.cache_backends import MemoryCacheBackend
+from dashboards.config import DashboardConfig
+from dashboards.context import AccessLevel, UserContext
+from dashboards.data_providers.faculty import FacultyDataProvider
+from dashboards.executor import QUERY_ERRORS_KEY, RenderTimings, run_queries
+from scripts.synthetic_data import create_faculty_db
+
+
+class FacultyChartsDashboard(BaseDashboard):
+    """Declares faculty chart queries like FacultyStatsDashboard"""
+    
+    def __init__(self, provider):
+        super().__init__("parallel_test", "Parallel")
+        self.data_provider = provider
+        self.cache_ttl = 600
+    
+    def get_data(self, context, **kwargs):
+        filters = kwargs.get('filters', {})
+        provider = self.data_provider
+        return self.run_queries({
+            "sex_data": lambda: provider.get_faculty_by_sex(context, filters),
+            "field_data": lambda: provider.get_faculty_by_field(context, filters),
+            "type_data": lambda: provider.get_faculty_by_type(context, filters),
+            "grade_data": lambda: provider.get_faculty_by_grade(context, filters),
+            "type_sex_data": lambda: provider.get_faculty_by_type_and_sex(context, filters),
+        }, fallbacks={"sex_data": {"labels": [], "counts": []}})
+    
+    def render(self, data, context):
+        return data
+
+
+class TestRunQueries(unittest.TestCase):
+    """Test the executor itself"""
+    
+    def setUp(self):
+        self._workers = DashboardConfig.PARALLEL_QUERY_WORKERS
+        DashboardConfig.PARALLEL_QUERY_WORKERS = 4
+        executor.shutdown_pool(wait=True)
+    
+    def tearDown(self):
+        DashboardConfig.PARALLEL_QUERY_WORKERS = self._workers
+        executor.shutdown_pool(wait=True)
+    
+    def test_queries_run_concurrently(self):
+        # Only passes if all three are running at the same time
+        barrier = threading.Barrier(3, timeout=5)
+        queries = {name: (lambda name=name: (barrier.wait(), name)[1]) for name in ('a', 'b', 'c')}
+        results, errors = run_queries(queries, parallel=True)
+        self.assertEqual(results, {'a': 'a', 'b': 'b', 'c': 'c'})
+        self.assertEqual(list(results), ['a', 'b', 'c'])
+        self.assertEqual(errors, {})
+    
+    def test_failure_is_isolated(self):
+        def broken():
+            raise RuntimeError("no such table: faculty_golestan")
+        
+        for parallel in (True, False):
+            fallback = {"labels": [], "counts": []}
+            results, errors = run_queries(
+                {'ok': lambda: 1, 'broken': broken, 'other': lambda: 2},
+                fallbacks={'broken': fallback},
+                parallel=parallel,
+            )
+            self.assertEqual(results, {'ok': 1, 'broken': fallback, 'other': 2})
+            self.assertIsNot(results['broken'], fallback)
+            self.assertEqual(list(errors), ['broken'])
+            self.assertIn("faculty_golestan", errors['broken'])
+    
+    def test_timeout(self):
+        release = threading.Event()
+        start = time.monotonic()
+        try:
+            results, errors = run_queries(
+                {'slow': lambda: release.wait(5) and 'late', 'fast': lambda: 'ok'},
+                fallbacks={'slow': []},
+                timeout=0.2,
+                parallel=True,
+            )
+        finally:
+            release.set()
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(results, {'slow': [], 'fast': 'ok'})
+        self.assertIn('timed out', errors['slow'])
+    
+    def test_nested_calls_run_inline(self):
+        """Queries started from a pool worker don't wait on the (busy) pool"""
+        def outer():
+            results, _ = run_queries({'x': lambda: threading.current_thread().name, 'y': lambda: 1}, parallel=True)
+            return results['x'] == threading.current_thread().name
+        
+        results, errors = run_queries({'outer': outer, 'other': lambda: True}, parallel=True)
+        self.assertEqual(results, {'outer': True, 'other': True})
+
+
+class TestParallelDashboard(unittest.TestCase):
+    """Test BaseDashboard.run_queries with real provider queries"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmp.name, 'faculty_data.db')
+        create_faculty_db(cls.db_path, students=100, faculty=3000, seed=5)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+    
+    def setUp(self):
+        self._backend = DashboardCache.backend()
+        DashboardCache.set_backend(MemoryCacheBackend())
+        self._parallel = DashboardConfig.PARALLEL_QUERIES_ENABLED
+        self._workers = DashboardConfig.PARALLEL_QUERY_WORKERS
+        DashboardConfig.PARALLEL_QUERY_WORKERS = 4
+        executor.shutdown_pool(wait=True)
+        RenderTimings.reset()
+        self.provider = FacultyDataProvider(db_path=self.db_path)
+        self.provider.use_aggregates = False
+        self.dashboard = FacultyChartsDashboard(self.provider)
+        self.context = UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+    
+    def tearDown(self):
+        DashboardConfig.PARALLEL_QUERIES_ENABLED = self._parallel
+        DashboardConfig.PARALLEL_QUERY_WORKERS = self._workers
+        DashboardCache.set_backend(self._backend)
+        RenderTimings.reset()
+        executor.shutdown_pool(wait=True)
+    
+    def test_parallel_matches_sequential(self):
+        DashboardConfig.PARALLEL_QUERIES_ENABLED = False
+        sequential = self.dashboard.get_data(self.context, filters={})
+        DashboardConfig.PARALLEL_QUERIES_ENABLED = True
+        parallel = self.dashboard.get_data(self.context, filters={})
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(list(parallel), list(sequential))
+        self.assertNotIn(QUERY_ERRORS_KEY, parallel)
+    
+    def test_failing_chart_gets_fallback(self):
+        def broken(context=None, filters=None):
+            raise RuntimeError("database is locked")
+        
+        self.provider.get_faculty_by_sex = broken
+        data = self.dashboard.get_data(self.context, filters={})
+        self.assertEqual(data["sex_data"], {"labels": [], "counts": []})
+        self.assertTrue(data["field_data"]["labels"])
+        self.assertEqual(data[QUERY_ERRORS_KEY], {"sex_data": "database is locked"})
+    
+    def test_partial_data_cached_briefly(self):
+        self.provider.get_faculty_by_grade = lambda context=None, filters=None: 1 / 0
+        data, meta = self.dashboard.get_data_with_meta(self.context, {})
+        self.assertIn("grade_data", data[QUERY_ERRORS_KEY])
+        cached = DashboardCache.get(self.dashboard._generate_cache_key(self.context, {}))
+        fresh_for = cached.soft_expires_at - cached.computed_at
+        self.assertAlmostEqual(fresh_for, DashboardConfig.PARTIAL_DATA_TTL, delta=1)
+    
+    def test_render_time_recorded(self):
+        DashboardConfig.PARALLEL_QUERIES_ENABLED = True
+        self.dashboard.get_data_with_meta(self.context, {})
+        DashboardConfig.PARALLEL_QUERIES_ENABLED = False
+        self.dashboard.get_data_with_meta(self.context, {'province_code': 2})
+        timings = RenderTimings.summary()["parallel_test"]
+        self.assertEqual(timings["parallel"]["count"], 1)
+        self.assertEqual(timings["sequential"]["count"], 1)
+        self.assertGreater(timings["parallel"]["last_ms"], 0)
+    
+    def test_render_mode_is_what_ran(self):
+        # Parallel enabled, but get_data makes a single provider call
+        DashboardConfig.PARALLEL_QUERIES_ENABLED = True
+        provider = self.dashboard.data_provider
+        dashboard = FacultyChartsDashboard(provider)
+        dashboard.dashboard_id = "direct_test"
+        dashboard.get_data = lambda context, **kwargs: {"sex_data": provider.get_faculty_by_sex(context, {})}
+        dashboard.get_data_with_meta(self.context, {})
+        self.assertEqual(set(RenderTimings.summary()["direct_test"]), {"sequential"})
+
+
+if __name__ == '__main__':
+    unittest.main()
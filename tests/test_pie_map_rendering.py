@@ -0,0 +1,52 @@
+"""
+Image-diff test of the batched province pie map against the inset-axes one
+"""
+import os
+import random
+import tempfile
+import unittest
+from matplotlib.testing.compare import compare_images
+from dashboards.config import DashboardConfig
+from dashboards.visualizations import geometry
+from dashboards.visualizations.maps import MapBuilder
+from scripts.synthetic_data import PROVINCES, create_faculty_db, create_province_shapefile
+
+
+class TestPieMapRendering(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        shapefile = create_province_shapefile(os.path.join(self.tmp.name, 'provinces.shp'), vertices=200)
+        self._config = (DashboardConfig.GEOMETRY_CACHE_PATH, DashboardConfig.FACULTY_DB, DashboardConfig.MAP_BATCH_RENDER)
+        DashboardConfig.GEOMETRY_CACHE_PATH = os.path.join(self.tmp.name, 'province_geometry.pkl')
+        DashboardConfig.FACULTY_DB = create_faculty_db(os.path.join(self.tmp.name, 'faculty_data.db'), students=10, faculty=10)
+        geometry.drop_geometry_stores()
+        self.builder = MapBuilder(shapefile)
+    
+    def tearDown(self):
+        geometry.drop_geometry_stores()
+        DashboardConfig.GEOMETRY_CACHE_PATH, DashboardConfig.FACULTY_DB, DashboardConfig.MAP_BATCH_RENDER = self._config
+        self.tmp.cleanup()
+    
+    def render(self, batch, province_data, name):
+        DashboardConfig.MAP_BATCH_RENDER = batch
+        path = os.path.join(self.tmp.name, name)
+        image = self.builder.create_province_map_with_pie_charts(province_data, "توزیع اعضای هیات علمی")
+        with open(path, 'wb') as f:
+            f.write(image.read())
+        return path
+    
+    def test_batched_pies_match_inset_pies(self):
+        rng = random.Random(7)
+        province_data = {code: {'1': rng.randint(1, 900), '2': rng.randint(1, 900)} for code, _ in PROVINCES}
+        province_data[2] = {'1': 40, '2': 0}  # a whole pie with an empty wedge
+        province_data[3] = {'1': 0, '2': 0}  # no pie
+        del province_data[5]
+        
+        expected = self.render(False, province_data, 'insets.png')
+        actual = self.render(True, province_data, 'batched.png')
+        self.assertIsNone(compare_images(expected, actual, tol=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+"""
+Unit tests for the dashboard cache pre-loader
+"""
+import threading
+import time
+import unittest
+from unittest import mock
+from dashboards import preloader
+from dashboards.base import BaseDashboard
+from dashboards.cache import DashboardCache
+from dashboards.cache_backends import MemoryCacheBackend
+from dashboards.context import AccessLevel, UserContext
+from dashboards.registry import DashboardRegistry
+
+
+class CountingDashboard(BaseDashboard):
+    """Dashboard recording the scopes it was computed for"""
+    
+    def __init__(self, dashboard_id="warmup_test", delay=0.0, fail_province=None):
+        super().__init__(dashboard_id, "Warm-up")
+        self.delay = delay
+        self.fail_province = fail_province
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+    
+    def get_data(self, context, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.calls.append((context.access_level, context.province_code))
+        try:
+            time.sleep(self.delay)
+            if self.fail_province is not None and context.province_code == self.fail_province:
+                raise RuntimeError("provider failed")
+            return {"province": context.province_code}
+        finally:
+            with self._lock:
+                self.active -= 1
+    
+    def render(self, data, context):
+        return data
+
+
+class TestUserContextForScope(unittest.TestCase):
+    """Test contexts built without a logged-in user"""
+    
+    def test_province_scope(self):
+        context = UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=3)
+        self.assertIsNone(context.user)
+        self.assertEqual(context.access_level, AccessLevel.PROVINCE_UNIVERSITY)
+        self.assertEqual(context.province_code, 3)
+        self.assertEqual(context.apply_filters({})['province_code'], 3)
+    
+    def test_national_scope(self):
+        context = UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+        self.assertIsNone(context.province_code)
+        self.assertNotIn('province_code', context.apply_filters({}))
+
+
+class TestViewCounts(unittest.TestCase):
+    """Dashboard views are counted in memory and written in batches"""
+    
+    def setUp(self):
+        preloader._view_counts.clear()
+    
+    def tearDown(self):
+        preloader._view_counts.clear()
+    
+    def test_views_written_aggregated(self):
+        with mock.patch.object(preloader, '_write_views') as write:
+            for _ in range(3):
+                preloader.record_view(1, 'd1', 'province_university', 3, None)
+            preloader.record_view(2, 'd1', 'central_org', None, None)
+            write.assert_not_called()
+            
+            self.assertEqual(preloader.flush_view_counts(), 2)
+            counts = write.call_args[0][0]
+            self.assertEqual(counts[(1, 'd1', 'province_university', 3, None)], 3)
+            self.assertEqual(counts[(2, 'd1', 'central_org', None, None)], 1)
+            self.assertEqual(preloader.flush_view_counts(), 0)
+            self.assertEqual(write.call_count, 1)
+    
+    def test_failed_write_kept_for_next_flush(self):
+        preloader.record_view(1, 'd1', 'central_org', None, None)
+        with mock.patch.object(preloader, '_write_views', side_effect=RuntimeError("database is locked")):
+            self.assertEqual(preloader.flush_view_counts(), 0)
+        preloader.record_view(1, 'd1', 'central_org', None, None)
+        with mock.patch.object(preloader, '_write_views') as write:
+            self.assertEqual(preloader.flush_view_counts(), 1)
+        self.assertEqual(write.call_args[0][0][(1, 'd1', 'central_org', None, None)], 2)
+
+
+class TestWarmUp(unittest.TestCase):
+    """Test warm_up runs and status reporting"""
+    
+    def setUp(self):
+        self._previous = DashboardCache._backend
+        DashboardCache.set_backend(MemoryCacheBackend())
+        self.dashboard = CountingDashboard(delay=0.05)
+        DashboardRegistry._dashboards[self.dashboard.dashboard_id] = self.dashboard
+    
+    def tearDown(self):
+        DashboardRegistry._dashboards.pop(self.dashboard.dashboard_id, None)
+        DashboardCache.set_backend(self._previous)
+    
+    def jobs(self, provinces):
+        return [(self.dashboard.dashboard_id, AccessLevel.PROVINCE_UNIVERSITY, p, None) for p in provinces]
+    
+    def test_warm_up_fills_cache(self):
+        """Every job is computed once and later requests are cache hits"""
+        status = preloader.warm_up('test', jobs=self.jobs([1, 2, 3]), max_workers=2)
+        self.assertEqual(status['state'], 'done')
+        self.assertEqual(status['total'], 3)
+        self.assertEqual(status['completed'], 3)
+        self.assertEqual(status['failed'], 0)
+        self.assertEqual(len(self.dashboard.calls), 3)
+        
+        context = UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=2)
+        _, meta = self.dashboard.get_data_with_meta(context, context.apply_filters({}))
+        self.assertEqual(meta['status'], 'fresh')
+        self.assertEqual(len(self.dashboard.calls), 3)
+    
+    def test_concurrency_is_capped(self):
+        """No more than max_workers dashboards are computed at once"""
+        preloader.warm_up('test', jobs=self.jobs(range(1, 9)), max_workers=2)
+        self.assertEqual(len(self.dashboard.calls), 8)
+        self.assertLessEqual(self.dashboard.max_active, 2)
+    
+    def test_failed_job_does_not_stop_run(self):
+        """A failing scope is reported and the rest still run"""
+        self.dashboard.fail_province = 2
+        messages = []
+        status = preloader.warm_up(
+            'test', jobs=self.jobs([1, 2, 3]), max_workers=1,
+            log=lambda message, level: messages.append(level),
+        )
+        self.assertEqual(status['completed'], 2)
+        self.assertEqual(status['failed'], 1)
+        failed = [job for job in status['jobs'] if job['status'] == 'failed']
+        self.assertEqual(failed[0]['province_code'], 2)
+        self.assertEqual(messages, ['info', 'error'])
+    
+    def test_build_jobs_for_source(self):
+        """Only dashboards reading the synced source are warmed"""
+        self.dashboard.data_sources = ('faculty',)
+        original = preloader.DashboardConfig.PRELOAD_PROVINCES
+        preloader.DashboardConfig.PRELOAD_PROVINCES = False
+        try:
+            faculty_jobs = [job for job in preloader.build_warmup_jobs(['faculty'])
+                            if job[0] == self.dashboard.dashboard_id]
+            student_jobs = [job for job in preloader.build_warmup_jobs(['students'])
+                            if job[0] == self.dashboard.dashboard_id]
+        finally:
+            preloader.DashboardConfig.PRELOAD_PROVINCES = original
+        self.assertEqual([job[1] for job in faculty_jobs], [AccessLevel.CENTRAL_ORG])
+        self.assertEqual(student_jobs, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
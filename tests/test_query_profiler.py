@@ -0,0 +1,99 @@
+"""
+Unit tests for per-query profiling in DataProvider
+"""
+import os
+import tempfile
+import unittest
+from collections import deque
+from dashboards.config import DashboardConfig
+from dashboards.data_providers.faculty import FacultyDataProvider
+from dashboards.data_providers.profiler import QueryProfiler
+from scripts.synthetic_data import create_faculty_db
+
+
+class TestQueryProfiler(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmp.name, 'faculty_data.db')
+        create_faculty_db(cls.db_path, students=200, faculty=500, seed=4)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+    
+    def setUp(self):
+        self._enabled = DashboardConfig.QUERY_PROFILING_ENABLED
+        self._slow_ms = DashboardConfig.SLOW_QUERY_MS
+        DashboardConfig.QUERY_PROFILING_ENABLED = True
+        DashboardConfig.SLOW_QUERY_MS = 10_000
+        QueryProfiler.reset()
+        self.provider = FacultyDataProvider(db_path=self.db_path)
+        self.provider.use_aggregates = False
+    
+    def tearDown(self):
+        DashboardConfig.QUERY_PROFILING_ENABLED = self._enabled
+        DashboardConfig.SLOW_QUERY_MS = self._slow_ms
+        QueryProfiler.reset()
+    
+    def test_disabled_records_nothing(self):
+        DashboardConfig.QUERY_PROFILING_ENABLED = False
+        self.provider.get_faculty_by_sex(None, {})
+        self.assertEqual(QueryProfiler.entries(), [])
+        self.assertEqual(QueryProfiler.summary(), [])
+    
+    def test_records_duration_rows_and_method(self):
+        data = self.provider.get_faculty_by_sex(None, {'province_code': 2})
+        entries = QueryProfiler.entries()
+        self.assertEqual(len(entries), 1)
+        entry = entries[0]
+        self.assertEqual(entry['method'], 'FacultyDataProvider.get_faculty_by_sex')
+        self.assertEqual(entry['rows'], len(data['labels']))
+        self.assertGreater(entry['ms'], 0)
+        self.assertIn('FROM faculty', entry['sql'])
+        self.assertIn('2', entry['params'])
+        self.assertFalse(entry['slow'])
+        self.assertIsNone(entry['plan'])
+        
+        self.provider.get_faculty_by_sex(None, {})
+        summary = {stats['method']: stats for stats in QueryProfiler.summary()}
+        self.assertEqual(summary['FacultyDataProvider.get_faculty_by_sex']['count'], 2)
+    
+    def test_execute_query_dict_is_profiled(self):
+        rows = self.provider.execute_query_dict("SELECT sex, COUNT(*) AS n FROM faculty GROUP BY sex")
+        entry = QueryProfiler.entries()[0]
+        self.assertEqual(entry['rows'], len(rows))
+        self.assertEqual(entry['method'], 'TestQueryProfiler.test_execute_query_dict_is_profiled')
+    
+    def test_slow_queries_get_query_plan(self):
+        DashboardConfig.SLOW_QUERY_MS = 0
+        self.provider.execute_query("SELECT COUNT(*) FROM faculty WHERE province_code = ?", (3,))
+        slow = QueryProfiler.entries(slow_only=True)
+        self.assertEqual(len(slow), 1)
+        self.assertTrue(slow[0]['plan'])
+        self.assertTrue(any('faculty' in line for line in slow[0]['plan']), slow[0]['plan'])
+        self.assertEqual(QueryProfiler.summary()[0]['slow'], 1)
+    
+    def test_log_is_bounded(self):
+        recent, slow = QueryProfiler._recent, QueryProfiler._slow
+        QueryProfiler._recent = deque(maxlen=3)
+        QueryProfiler._slow = deque(maxlen=3)
+        try:
+            for _ in range(5):
+                self.provider.execute_query("SELECT 1")
+            DashboardConfig.SLOW_QUERY_MS = 0
+            self.provider.execute_query("SELECT 2")
+            DashboardConfig.SLOW_QUERY_MS = 10_000
+            for _ in range(5):
+                self.provider.execute_query("SELECT 1")
+            self.assertEqual(len(QueryProfiler.entries()), 3)
+            # Fast queries don't push the slow one out
+            self.assertEqual([entry['sql'] for entry in QueryProfiler.entries(slow_only=True)], ['SELECT 2'])
+            self.assertEqual(QueryProfiler.summary()[0]['count'], 11)
+        finally:
+            QueryProfiler._recent, QueryProfiler._slow = recent, slow
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Unit tests for the map render worker pool
+"""
+import os
+import tempfile
+import time
+import unittest
+from flask import Blueprint, Flask
+from dashboards import map_images
+from dashboards.config import DashboardConfig
+from dashboards.render_pool import RenderPool, RenderQueueFull, RenderTimeout, render_pool
+from dashboards.visualizations import geometry
+from dashboards.visualizations.maps import render_map_png
+from scripts.synthetic_data import create_faculty_db, create_province_shapefile
+
+CONFIG = ('RENDER_POOL_WORKERS', 'RENDER_QUEUE_MAX', 'RENDER_TIMEOUT', 'RENDER_WAIT_SECONDS',
+          'RENDER_POOL_ENABLED', 'MAP_IMAGE_CACHE_ENABLED', 'MAP_IMAGE_DIR',
+          'IRAN_SHAPEFILE', 'FACULTY_DB', 'GEOMETRY_CACHE_PATH')
+
+
+def config_value(name):
+    """DashboardConfig attribute as the worker process sees it"""
+    return getattr(DashboardConfig, name)
+
+
+def slow_echo(value, delay=0.0):
+    """Render job stand-in (module-level, so worker processes can import it)"""
+    time.sleep(delay)
+    if value is None:
+        raise ValueError("nothing to render")
+    return value
+
+
+class TestRenderPool(unittest.TestCase):
+
+    def setUp(self):
+        self._config = {name: getattr(DashboardConfig, name) for name in CONFIG}
+        DashboardConfig.RENDER_POOL_WORKERS = 1
+        DashboardConfig.RENDER_QUEUE_MAX = 4
+        DashboardConfig.RENDER_TIMEOUT = 60
+        self.pool = RenderPool()
+    
+    def tearDown(self):
+        self.pool.shutdown()
+        render_pool.shutdown()
+        geometry.drop_geometry_stores()
+        for name, value in self._config.items():
+            setattr(DashboardConfig, name, value)
+    
+    def test_identical_jobs_deduplicated(self):
+        first = self.pool.submit('a', slow_echo, b'png', 0.5, on_result=lambda data: data + b'!')
+        second = self.pool.submit('a', slow_echo, b'other')
+        self.assertIs(first, second)
+        self.assertEqual(first.result(timeout=60), b'png!')
+        
+        failed = self.pool.submit('b', slow_echo, None)
+        with self.assertRaises(ValueError):
+            failed.result(timeout=60)
+        
+        stats = self.pool.stats()
+        self.assertEqual((stats['submitted'], stats['deduplicated'], stats['in_flight']), (2, 1, 0))
+    
+    def test_workers_get_parent_config(self):
+        # Set before the workers start; spawned workers re-read the environment otherwise
+        DashboardConfig.RENDER_QUEUE_MAX = 7
+        self.assertEqual(self.pool.submit('config', config_value, 'RENDER_QUEUE_MAX').result(timeout=60), 7)
+    
+    def test_queue_bound_and_timeout(self):
+        DashboardConfig.RENDER_QUEUE_MAX = 1
+        slow = self.pool.submit('a', slow_echo, b'png', 30)
+        with self.assertRaises(RenderQueueFull):
+            self.pool.submit('b', slow_echo, b'png')
+        
+        # An overdue job is abandoned and its workers replaced
+        DashboardConfig.RENDER_TIMEOUT = 0.01
+        time.sleep(0.05)
+        retried = self.pool.submit('b', slow_echo, b'png')
+        DashboardConfig.RENDER_TIMEOUT = 60
+        with self.assertRaises(RenderTimeout):
+            slow.result(timeout=1)
+        self.assertEqual(retried.result(timeout=60), b'png')
+        self.assertEqual(self.pool.stats()['expired'], 1)
+    
+    def test_map_image_rendered_in_worker(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        DashboardConfig.IRAN_SHAPEFILE = create_province_shapefile(os.path.join(tmp.name, 'provinces.shp'), vertices=200)
+        DashboardConfig.FACULTY_DB = create_faculty_db(os.path.join(tmp.name, 'faculty_data.db'), students=10, faculty=10)
+        DashboardConfig.GEOMETRY_CACHE_PATH = os.path.join(tmp.name, 'province_geometry.pkl')
+        DashboardConfig.MAP_IMAGE_DIR = os.path.join(tmp.name, 'map_images')
+        DashboardConfig.MAP_IMAGE_CACHE_ENABLED = True
+        DashboardConfig.RENDER_POOL_ENABLED = True
+        DashboardConfig.RENDER_WAIT_SECONDS = 60
+        
+        app = Flask(__name__)
+        bp = Blueprint('dashboard', __name__, url_prefix='/dashboards')
+        bp.add_url_rule('/images/<key>.png', 'map_image', map_images.send_image)
+        app.register_blueprint(bp)
+        
+        with app.test_request_context():
+            image = map_images.map_image(
+                'd3', {'province_data': {1: {1: 2, 3: 1}}},
+                render_map_png, 'create_pardis_map', province_data={1: {1: 2, 3: 1}},
+            )
+            self.assertEqual(set(image), {'image_url'})
+            with open(map_images.image_path(image['image_url'].rsplit('/', 1)[1][:-4]), 'rb') as f:
+                self.assertEqual(f.read(4), b'\x89PNG')
+            
+            # Not done within RENDER_WAIT_SECONDS: the page gets a placeholder
+            DashboardConfig.RENDER_WAIT_SECONDS = 0
+            pending = map_images.map_image('d3', {'delay': 1}, slow_echo, b'\x89PNG', 1)
+            self.assertTrue(pending['image_pending'])
+        
+        client = app.test_client()
+        self.assertEqual(client.get(pending['image_url']).status_code, 404)
+        deadline = time.monotonic() + 60
+        while client.get(pending['image_url']).status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self.assertEqual(client.get(pending['image_url']).get_data(), b'\x89PNG')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Unit tests for single-flight dashboard data computation
+"""
+import threading
+import time
+import unittest
+from dashboards.base import BaseDashboard
+from dashboards.cache import DashboardCache, SingleFlight, SingleFlightTimeout
+from dashboards.cache_backends import MemoryCacheBackend
+from dashboards.context import AccessLevel, UserContext
+
+
+class SlowDashboard(BaseDashboard):
+    """Dashboard whose get_data is slow and counts its calls"""
+    
+    def __init__(self, delay=0.2, fail=False):
+        super().__init__("slow_test", "Slow")
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+    
+    def get_data(self, context, **kwargs):
+        with self._calls_lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider failed")
+        return {"value": 42}
+    
+    def render(self, data, context):
+        return data
+
+
+def make_context():
+    return UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+
+
+def run_concurrently(n, target):
+    """Start n threads on target at once, collect results and errors"""
+    barrier = threading.Barrier(n)
+    results, errors = [], []
+    
+    def worker():
+        barrier.wait()
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test request coalescing in BaseDashboard.get_cached_data"""
+    
+    def setUp(self):
+        self._previous = DashboardCache._backend
+        DashboardCache.set_backend(MemoryCacheBackend())
+    
+    def tearDown(self):
+        DashboardCache.set_backend(self._previous)
+    
+    def test_concurrent_requests_compute_once(self):
+        """N concurrent requests for the same key trigger exactly one get_data"""
+        dashboard = SlowDashboard()
+        context = make_context()
+        results, errors = run_concurrently(20, lambda: dashboard.get_cached_data(context, {}))
+        self.assertEqual(errors, [])
+        self.assertEqual(dashboard.calls, 1)
+        self.assertEqual(results, [{"value": 42}] * 20)
+        # Later requests are plain cache hits
+        dashboard.get_cached_data(context, {})
+        self.assertEqual(dashboard.calls, 1)
+    
+    def test_different_keys_compute_separately(self):
+        """Coalescing is per cache key"""
+        dashboard = SlowDashboard(delay=0.05)
+        context = make_context()
+        dashboard.get_cached_data(context, {"province_code": 1})
+        dashboard.get_cached_data(context, {"province_code": 2})
+        self.assertEqual(dashboard.calls, 2)
+    
+    def test_error_propagates_to_waiters_and_is_not_cached(self):
+        """A failing computation fails every waiter and is retried next time"""
+        dashboard = SlowDashboard(fail=True)
+        context = make_context()
+        results, errors = run_concurrently(10, lambda: dashboard.get_cached_data(context, {}))
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 10)
+        self.assertTrue(all(isinstance(e, RuntimeError) for e in errors))
+        self.assertEqual(dashboard.calls, 1)
+        
+        dashboard.fail = False
+        self.assertEqual(dashboard.get_cached_data(context, {}), {"value": 42})
+        self.assertEqual(dashboard.calls, 2)
+    
+    def test_bounded_wait(self):
+        """Followers give up after the wait timeout"""
+        flights = SingleFlight()
+        started = threading.Event()
+        
+        def slow():
+            started.set()
+            time.sleep(0.5)
+            return 1
+        
+        leader = threading.Thread(target=lambda: flights.do("k", slow))
+        leader.start()
+        started.wait()
+        with self.assertRaises(SingleFlightTimeout):
+            flights.do("k", slow, timeout=0.05)
+        leader.join()
+        self.assertEqual(flights.stats['timeouts'], 1)
+        self.assertEqual(flights.in_flight(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
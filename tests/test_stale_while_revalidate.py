@@ -0,0 +1,116 @@
+"""
+Unit tests for stale-while-revalidate dashboard caching
+"""
+import threading
+import time
+import unittest
+from dashboards.base import BaseDashboard
+from dashboards.cache import DashboardCache, RefreshScheduler
+from dashboards.cache_backends import MemoryCacheBackend
+from dashboards.context import AccessLevel, UserContext
+
+
+class CountingDashboard(BaseDashboard):
+    """Dashboard returning an increasing version number"""
+    
+    def __init__(self, soft_ttl, hard_ttl, delay=0.0):
+        super().__init__("swr_test", "SWR")
+        self.cache_ttl = soft_ttl
+        self.cache_hard_ttl = hard_ttl
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def get_data(self, context, **kwargs):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls += 1
+            return {"version": self.calls}
+    
+    def render(self, data, context):
+        return data
+
+
+def make_context():
+    return UserContext.for_scope(AccessLevel.CENTRAL_ORG)
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+    """Test soft/hard TTL handling in get_data_with_meta"""
+    
+    def setUp(self):
+        self._previous = DashboardCache._backend
+        DashboardCache.set_backend(MemoryCacheBackend())
+        self.context = make_context()
+    
+    def tearDown(self):
+        DashboardCache.set_backend(self._previous)
+    
+    def test_fresh_then_stale_then_refreshed(self):
+        """Stale data is served immediately and refreshed in the background"""
+        dashboard = CountingDashboard(soft_ttl=0.2, hard_ttl=30)
+        data, meta = dashboard.get_data_with_meta(self.context, {})
+        self.assertEqual((data["version"], meta["status"]), (1, "miss"))
+        
+        data, meta = dashboard.get_data_with_meta(self.context, {})
+        self.assertEqual((data["version"], meta["status"]), (1, "fresh"))
+        
+        time.sleep(0.25)
+        dashboard.delay = 0.2
+        start = time.monotonic()
+        data, meta = dashboard.get_data_with_meta(self.context, {})
+        self.assertLess(time.monotonic() - start, 0.15)
+        self.assertEqual((data["version"], meta["status"]), (1, "stale"))
+        self.assertGreaterEqual(meta["age"], 0.2)
+        
+        self.assertTrue(wait_for(lambda: dashboard.calls == 2))
+        self.assertTrue(wait_for(
+            lambda: dashboard.get_data_with_meta(self.context, {})[1]["status"] == "fresh"
+        ))
+        data, _ = dashboard.get_data_with_meta(self.context, {})
+        self.assertEqual(data["version"], 2)
+    
+    def test_hard_ttl_forces_foreground_recompute(self):
+        """Past the hard TTL data is recomputed before responding"""
+        dashboard = CountingDashboard(soft_ttl=0.05, hard_ttl=0.1)
+        dashboard.get_data_with_meta(self.context, {})
+        time.sleep(0.15)
+        data, meta = dashboard.get_data_with_meta(self.context, {})
+        self.assertEqual((data["version"], meta["status"]), (2, "miss"))
+    
+    def test_stale_key_refreshed_once(self):
+        """Many requests for a stale key schedule a single refresh"""
+        dashboard = CountingDashboard(soft_ttl=0.05, hard_ttl=30)
+        dashboard.get_data_with_meta(self.context, {})
+        time.sleep(0.1)
+        dashboard.delay = 0.2
+        for _ in range(20):
+            _, meta = dashboard.get_data_with_meta(self.context, {})
+            self.assertEqual(meta["status"], "stale")
+        self.assertTrue(wait_for(lambda: dashboard.calls == 2))
+        time.sleep(0.1)
+        self.assertEqual(dashboard.calls, 2)
+    
+    def test_refresh_cap(self):
+        """The scheduler never runs more than max_refreshes at once"""
+        scheduler = RefreshScheduler(max_refreshes=2)
+        release = threading.Event()
+        accepted = [scheduler.schedule(f"k{i}", release.wait) for i in range(5)]
+        self.assertEqual(accepted, [True, True, False, False, False])
+        self.assertEqual(scheduler.stats["skipped"], 3)
+        release.set()
+        self.assertTrue(wait_for(lambda: scheduler.pending() == 0))
+        self.assertTrue(scheduler.schedule("k9", lambda: None))
+
+
+if __name__ == '__main__':
+    unittest.main()
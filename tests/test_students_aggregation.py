@@ -0,0 +1,112 @@
+"""
+Unit tests for the single-scan StudentsDashboard aggregation
+"""
+import os
+import random
+import tempfile
+import unittest
+from dashboards.data_providers.aggregation import AggregationCube
+from dashboards.data_providers.students import StudentsDataProvider
+from scripts.synthetic_data import create_faculty_db
+
+
+def per_chart_data(provider, filters):
+    """StudentsDashboard data built the old way: one query per chart"""
+    grades = {1: 'kardani', 2: 'napeyvaste', 3: 'peyvaste', 4: 'arshad'}
+    year_grades = {
+        1: 'kardani', 2: 'karshenasi_napeyvaste', 3: 'karshenasi_peyvaste', 4: 'arshad',
+    }
+    data = {
+        "gender_data": provider.get_gender_data(None, filters, year_404=False),
+        "gender_data_404": provider.get_gender_data(None, filters, year_404=True),
+        "vazeiyat_data": provider.get_vazeiyat_data(None, filters, year_404=False),
+        "vazeiyat_data_404": provider.get_vazeiyat_data(None, filters, year_404=True),
+        "province_vazeiyat_data": provider.get_province_vazeiyat_data(None, filters),
+    }
+    for grade, name in grades.items():
+        data[f"course_data_{name}"] = provider.get_course_data_by_grade(None, filters, grade=grade)
+    data.update({
+        "grade_data": provider.get_grade_data(None, filters),
+        "province_data": provider.get_province_data(None, filters),
+        "province_year_data": provider.get_province_year_data(None, filters),
+        "province_sex_data": provider.get_province_sex_data(None, filters),
+        "year_data": provider.get_year_data(None, filters),
+        "year_data_grade": provider.get_year_grade_data(None, filters),
+    })
+    for grade, name in year_grades.items():
+        data[f"course_year_data_{name}"] = provider.get_course_year_data(None, filters, grade=grade)
+    return data
+
+
+class TestStudentsAggregation(unittest.TestCase):
+    """get_dashboard_data must match the per-chart queries exactly"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmp.name, 'faculty_data.db')
+        create_faculty_db(cls.db_path, students=8000, faculty=10, seed=7)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+    
+    def setUp(self):
+        self.provider = StudentsDataProvider(db_path=self.db_path)
+        self.provider.use_pool = False
+    
+    def assert_same_as_per_chart(self, filters):
+        # province_vazeiyat_data picks random colors; replay the same sequence
+        random.seed(1)
+        expected = per_chart_data(self.provider, filters)
+        random.seed(1)
+        actual = self.provider.get_dashboard_data(None, filters)
+        self.assertEqual(list(actual), list(expected))
+        for key in expected:
+            self.assertEqual(actual[key], expected[key], key)
+    
+    def test_matches_per_chart_queries(self):
+        self.assert_same_as_per_chart({})
+    
+    def test_matches_with_filters(self):
+        self.assert_same_as_per_chart({'province_code': 3})
+        self.assert_same_as_per_chart({'province_codes': [1, 4, 9]})
+    
+    def test_single_scan(self):
+        """All charts come from one query"""
+        queries = []
+        execute_query = self.provider.execute_query
+        
+        def counting_execute_query(query, params=(), context=None):
+            queries.append(query)
+            return execute_query(query, params, context)
+        
+        self.provider.execute_query = counting_execute_query
+        self.provider.get_dashboard_data(None, {})
+        self.assertEqual(len(queries), 1)
+
+
+class TestAggregationCube(unittest.TestCase):
+    """Test roll-up ordering"""
+    
+    def setUp(self):
+        self.cube = AggregationCube(('a', 'b'), [
+            ('y', 1, 3), ('x', 2, 1), (None, 1, 2), ('x', 1, 1), ('y', 2, 3),
+        ])
+    
+    def test_rollup_groups_in_sql_order(self):
+        self.assertEqual(self.cube.rollup(['a']), [(None, 2), ('x', 2), ('y', 6)])
+        self.assertEqual(self.cube.rollup(['b'], where=lambda row: row.a is not None), [(1, 4), (2, 4)])
+    
+    def test_rollup_sums(self):
+        rows = self.cube.rollup(['a'], sums={'one': lambda row: row.b == 1})
+        self.assertEqual(rows, [(None, 2, 2), ('x', 2, 1), ('y', 6, 3)])
+    
+    def test_order_by_count_ties(self):
+        rows = self.cube.rollup(['a'])
+        self.assertEqual(AggregationCube.order_by_count(rows), [('y', 6), ('x', 2), (None, 2)])
+        self.assertEqual(AggregationCube.order_by_count(rows, descending=False), [(None, 2), ('x', 2), ('y', 6)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Unit tests for the derived entrance_year/term_year Students columns
+"""
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+from dashboards.data_providers.students import StudentsDataProvider
+from fetch_data.students_main import create_students_table, insert_students
+from migrations.add_students_derived_columns import DERIVED_INDEXES, add_derived_columns, migrate
+from scripts.synthetic_data import create_faculty_db
+
+
+def chart_data(provider, filters):
+    """Every per-chart query that groups or filters by a year prefix"""
+    random.seed(1)
+    return {
+        "gender_data_404": provider.get_gender_data(None, filters, year_404=True),
+        "vazeiyat_data_404": provider.get_vazeiyat_data(None, filters, year_404=True),
+        "province_year_data": provider.get_province_year_data(None, filters),
+        "year_data": provider.get_year_data(None, filters),
+        "year_data_grade": provider.get_year_grade_data(None, filters),
+        "course_year_data": provider.get_course_year_data(None, filters, grade=2),
+        "grade_and_year": provider.get_students_by_grade_and_year(None, filters),
+        "dashboard": provider.get_dashboard_data(None, filters),
+    }
+
+
+class TestStudentsDerivedColumns(unittest.TestCase):
+    """Test the migration, the ingest path and provider use of the columns"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'faculty_data.db')
+        create_faculty_db(self.db_path, students=3000, faculty=50, seed=11)
+        self.provider = StudentsDataProvider(db_path=self.db_path)
+        self.provider.use_pool = False
+        self.provider.use_aggregates = False
+        StudentsDataProvider._derived_columns.clear()
+    
+    def tearDown(self):
+        StudentsDataProvider._derived_columns.clear()
+        self.tmp.cleanup()
+    
+    def migrate(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate(self.db_path)
+        # Normally picked up on the next students data version
+        StudentsDataProvider._derived_columns.clear()
+    
+    def test_backfill_matches_expressions(self):
+        self.migrate()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            mismatched = conn.execute("""
+                SELECT COUNT(*) FROM Students
+                WHERE entrance_year IS NOT SUBSTR(studentnum, 1, 3)
+                   OR term_year IS NOT SUBSTR(term, 1, 3)
+            """).fetchone()[0]
+            self.assertEqual(mismatched, 0)
+            indexes = {row[1] for row in conn.execute("PRAGMA index_list(Students)")}
+            self.assertTrue(set(DERIVED_INDEXES) <= indexes)
+            # Second run has nothing left to do
+            self.assertEqual(add_derived_columns(conn), {'columns_added': [], 'rows_updated': 0, 'indexes_created': []})
+        finally:
+            conn.close()
+    
+    def test_provider_results_unchanged(self):
+        filter_sets = ({}, {'province_code': 5})
+        self.assertEqual(self.provider.year_columns(), ('SUBSTR(studentnum, 1, 3)', 'substr(term, 1, 3)'))
+        before = [chart_data(self.provider, filters) for filters in filter_sets]
+        self.migrate()
+        self.assertEqual(self.provider.year_columns(), ('entrance_year', 'term_year'))
+        self.assertEqual([chart_data(self.provider, filters) for filters in filter_sets], before)
+    
+    def test_year_filter_uses_index(self):
+        self.migrate()
+        queries = []
+        execute_query = self.provider.execute_query
+        
+        def recording_execute_query(query, params=(), context=None):
+            queries.append((query, params))
+            return execute_query(query, params, context)
+        
+        self.provider.execute_query = recording_execute_query
+        self.provider.get_gender_data(None, {}, year_404=True)
+        query, params = queries[0]
+        conn = sqlite3.connect(self.db_path)
+        try:
+            plan = " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+        finally:
+            conn.close()
+        self.assertIn("USING COVERING INDEX idx_students_entrance_year", plan)
+    
+    def test_ingest_fills_derived_columns(self):
+        db_path = os.path.join(self.tmp.name, 'ingest.db')
+        conn = sqlite3.connect(db_path)
+        try:
+            cursor = conn.cursor()
+            create_students_table(cursor)
+            add_derived_columns(conn)
+            student = {field: None for field in (
+                'firstname', 'familyname', 'firstnameeng', 'familynameeng', 'fathername', 'codvaziayat',
+                'vazeiyat', 'birthdate', 'birthplace', 'city', 'address', 'phonenum', 'email', 'sex',
+                'course', 'course_name', 'grade', 'gradname', 'degsdate', 'last_degree', 'uniname',
+                'sub_uniname', 'sub_num', 'code_Markaz', 'province',
+            )}
+            insert_students(cursor, [
+                dict(student, studentnum='4021234567', term='4031', provinceCode=3),
+                dict(student, studentnum=4011234567, term=4022, provinceCode=4),
+            ])
+            rows = cursor.execute(
+                "SELECT entrance_year, term_year, province_code FROM Students ORDER BY studentnum"
+            ).fetchall()
+        finally:
+            conn.close()
+        self.assertEqual(rows, [('401', '402', 4), ('402', '403', 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+Unit tests for the in-memory Students snapshot
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+from dashboards.config import DashboardConfig
+from dashboards.context import AccessLevel, UserContext
+from dashboards.data_providers import snapshot as snapshot_module
+from dashboards.data_providers.students import StudentsDataProvider
+from dashboards.data_version import DataVersions
+from scripts.synthetic_data import create_faculty_db
+
+
+class TestStudentsSnapshot(unittest.TestCase):
+    """Snapshot group-bys must match the SQL queries exactly"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmp.name, 'faculty_data.db')
+        create_faculty_db(cls.db_path, students=6000, faculty=10, seed=3)
+        conn = sqlite3.connect(cls.db_path)
+        # Rows SQL groups in its own way: NULLs, untrimmed text, numeric vs text grades
+        # (chart formatters can't sort NULL provinces/terms/sexes, so those stay set)
+        conn.executemany(
+            "INSERT INTO Students (studentnum, sex, province, grade, term, province_code, code_Markaz) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                ('4049999991', 'خانم', 'فارس', None, '4041', 3, 305),
+                ('4039999992', 'خانم', ' فارس ', 2, '4031', 3, 305),
+                ('4039999993', 'آقا', 'فارس', ' 2', '4032', None, None),
+                ('40', 'آقا', 'فارس', '5', '40', 3, 306),
+            ],
+        )
+        conn.commit()
+        conn.close()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+    
+    def setUp(self):
+        self._version_db = DataVersions.db_path
+        DataVersions.db_path = os.path.join(self.tmp.name, 'data_versions.db')
+        DataVersions.reset_local()
+        self._enabled = DashboardConfig.STUDENTS_SNAPSHOT_ENABLED
+        self._max_mb = DashboardConfig.STUDENTS_SNAPSHOT_MAX_MB
+        DashboardConfig.STUDENTS_SNAPSHOT_ENABLED = True
+        snapshot_module.drop_snapshots()
+        self.provider = StudentsDataProvider(db_path=self.db_path)
+        self.provider.use_pool = False
+        self.provider.use_aggregates = False
+        self.snapshot = self.provider.load_snapshot()
+    
+    def tearDown(self):
+        DashboardConfig.STUDENTS_SNAPSHOT_ENABLED = self._enabled
+        DashboardConfig.STUDENTS_SNAPSHOT_MAX_MB = self._max_mb
+        snapshot_module.wait_for_snapshot_load(self.db_path, 10)
+        snapshot_module.drop_snapshots()
+        DataVersions.db_path = self._version_db
+        DataVersions.reset_local()
+    
+    def sql_group_count(self, where="", params=()):
+        expressions = self.provider.snapshot_expressions()[:len(self.provider.CUBE_DIMENSIONS)]
+        select = ", ".join(sql for _, sql in expressions)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(f"SELECT {select}, COUNT(*) FROM Students {where} GROUP BY {select}", params).fetchall()
+        finally:
+            conn.close()
+        return sorted(rows, key=repr)
+    
+    def snapshot_group_count(self, filters, context=None):
+        rows = self.snapshot.group_count(self.provider.CUBE_DIMENSIONS, self.snapshot.mask(filters, context))
+        return sorted(rows, key=repr)
+    
+    def test_group_count_matches_sql(self):
+        self.assertEqual(self.snapshot_group_count({}), self.sql_group_count())
+        self.assertEqual(
+            self.snapshot_group_count({'province_code': 3}),
+            self.sql_group_count("WHERE province_code = ?", (3,)),
+        )
+        self.assertEqual(
+            self.snapshot_group_count({'province_code': '3'}),
+            self.sql_group_count("WHERE province_code = ?", ('3',)),
+        )
+        self.assertEqual(
+            self.snapshot_group_count({'province_codes': [1, 3, 99]}),
+            self.sql_group_count("WHERE province_code IN (?, ?, ?)", (1, 3, 99)),
+        )
+    
+    def test_context_restrictions(self):
+        province = UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=3)
+        self.assertEqual(
+            self.snapshot_group_count({}, province),
+            self.sql_group_count("WHERE province_code = ?", (3,)),
+        )
+        faculty = UserContext.for_scope(AccessLevel.FACULTY, province_code=3, faculty_code=305)
+        self.assertEqual(
+            self.snapshot_group_count({'province_code': 3}, faculty),
+            self.sql_group_count("WHERE province_code = ? AND province_code = ? AND code_markaz = ?", (3, 3, 305)),
+        )
+    
+    def test_dashboard_data_matches_sql(self):
+        for filters in ({}, {'province_code': 3}, {'province_codes': [2, 4]}):
+            random.seed(2)
+            from_snapshot = self.provider.get_dashboard_data(None, dict(filters))
+            DashboardConfig.STUDENTS_SNAPSHOT_ENABLED = False
+            random.seed(2)
+            from_sql = self.provider.get_dashboard_data(None, dict(filters))
+            DashboardConfig.STUDENTS_SNAPSHOT_ENABLED = True
+            self.assertEqual(from_snapshot, from_sql, filters)
+    
+    def test_no_queries_when_loaded(self):
+        queries = []
+        execute_query = self.provider.execute_query
+        self.provider.execute_query = lambda *args, **kwargs: queries.append(args) or execute_query(*args, **kwargs)
+        self.provider.get_dashboard_data(UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=3), {})
+        self.assertEqual(queries, [])
+    
+    def test_falls_back_to_sql(self):
+        self.assertIsNone(self.provider.students_snapshot({'university_code': 7}))
+        # A context restriction the snapshot has no column for
+        university = UserContext.for_scope(AccessLevel.PROVINCE_UNIVERSITY, province_code=3, university_code=7)
+        university.data_filters['university_code'] = 7
+        self.assertIsNone(self.provider.students_snapshot({}, university))
+        faculty = UserContext.for_scope(AccessLevel.FACULTY, province_code=3, faculty_code=305)
+        self.assertIs(self.provider.students_snapshot({}, faculty), self.snapshot)
+        DashboardConfig.STUDENTS_SNAPSHOT_ENABLED = False
+        self.assertIsNone(self.provider.students_snapshot({}))
+    
+    def test_stale_snapshot_reloads_in_background(self):
+        self.assertIs(self.provider.students_snapshot({}), self.snapshot)
+        DataVersions.bump('students')
+        self.assertIsNone(self.provider.students_snapshot({}))
+        snapshot_module.wait_for_snapshot_load(self.db_path, 10)
+        reloaded = self.provider.students_snapshot({})
+        self.assertIsNotNone(reloaded)
+        self.assertEqual(reloaded.data_version, DataVersions.get('students'))
+    
+    def test_memory_footprint(self):
+        status = snapshot_module.snapshot_status()['snapshots'][self.db_path]
+        self.assertEqual(status['rows'], 6004)
+        self.assertTrue(status['current'])
+        codes = sum(codes.nbytes for codes in self.snapshot.columns.values())
+        self.assertGreater(status['memory_bytes'], codes)
+        # Small dictionaries get one-byte codes
+        self.assertEqual(self.snapshot.columns['sex'].itemsize, 1)
+        
+        DashboardConfig.STUDENTS_SNAPSHOT_MAX_MB = 0
+        snapshot_module.drop_snapshots()
+        DashboardConfig.STUDENTS_SNAPSHOT_MAX_MB = 1
+        original = snapshot_module.StudentsSnapshot.memory_bytes
+        snapshot_module.StudentsSnapshot.memory_bytes = lambda snapshot: 2 * 1024 * 1024
+        try:
+            self.assertIsNone(self.provider.load_snapshot())
+        finally:
+            snapshot_module.StudentsSnapshot.memory_bytes = original
+        self.assertEqual(snapshot_module.snapshot_status()['snapshots'], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Unit tests for the interactive map payloads: simplified province GeoJSON and per-province values
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import shapely
+from flask import Flask
+from flask_login import LoginManager
+from dashboards import api as api_module
+from dashboards.config import DashboardConfig
+from dashboards.http_cache import IMMUTABLE_CACHE_CONTROL
+from dashboards.visualizations import geometry
+from dashboards.visualizations.geometry import SIMPLIFY_TOLERANCES, GeometryStore, get_geometry_store, province_geometry_urls
+from dashboards.visualizations.maps import MapBuilder
+from scripts.synthetic_data import SHAPE_NAMES, create_faculty_db, create_province_shapefile
+
+
+class TestVectorMap(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.shapefile = create_province_shapefile(os.path.join(cls.tmp.name, 'provinces.shp'), vertices=2000)
+        cls.db_path = create_faculty_db(os.path.join(cls.tmp.name, 'faculty_data.db'), students=10, faculty=10)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+    
+    def setUp(self):
+        self._config = (DashboardConfig.GEOMETRY_CACHE_PATH, DashboardConfig.IRAN_SHAPEFILE, DashboardConfig.FACULTY_DB)
+        DashboardConfig.GEOMETRY_CACHE_PATH = os.path.join(self.tmp.name, 'province_geometry.pkl')
+        DashboardConfig.IRAN_SHAPEFILE = self.shapefile
+        DashboardConfig.FACULTY_DB = self.db_path
+        geometry.drop_geometry_stores()
+    
+    def tearDown(self):
+        geometry.drop_geometry_stores()
+        DashboardConfig.GEOMETRY_CACHE_PATH, DashboardConfig.IRAN_SHAPEFILE, DashboardConfig.FACULTY_DB = self._config
+    
+    def test_simplified_levels(self):
+        store = get_geometry_store()
+        vertices = {}
+        for level in SIMPLIFY_TOLERANCES:
+            collection = json.loads(store.geojson(level))
+            self.assertEqual(collection['type'], 'FeatureCollection')
+            self.assertEqual([f['properties']['name_en'] for f in collection['features']], SHAPE_NAMES)
+            shapes = [shapely.from_geojson(json.dumps(f['geometry'])) for f in collection['features']]
+            self.assertTrue(all(shape.is_valid and not shape.is_empty for shape in shapes))
+            vertices[level] = sum(shapely.get_num_coordinates(shape) for shape in shapes)
+        self.assertLess(vertices['low'], vertices['medium'])
+        self.assertLess(vertices['medium'], vertices['high'])
+        
+        razavi = json.loads(store.geojson('medium'))['features'][SHAPE_NAMES.index('Razavi Khorasan')]['properties']
+        self.assertEqual((razavi['province_code'], razavi['name']), (4, 'خراسان رضوی'))
+        with self.assertRaises(KeyError):
+            store.geojson('huge')
+        
+        # Computed once: stored with the geometry cache
+        geometry.drop_geometry_stores()
+        with mock.patch.object(GeometryStore, '_simplified_geojson', side_effect=AssertionError("simplified again")):
+            self.assertEqual(get_geometry_store().geojson('high'), store.geojson('high'))
+    
+    def test_province_map_data(self):
+        data = MapBuilder().create_province_map_data(
+            {4: {'1': 3, '2': 1}, 99: {'2': 2}}, ['1', '2'], ['مرد', 'زن'], ['#36A2EB', '#FF6384'],
+        )
+        self.assertEqual(data['series'], [{'label': 'مرد', 'color': '#36A2EB'}, {'label': 'زن', 'color': '#FF6384'}])
+        self.assertEqual(data['provinces'][4], {'name': 'خراسان رضوی', 'values': [3, 1], 'total': 4})
+        self.assertEqual(data['provinces'][99]['values'], [0, 2])
+    
+    def test_geometry_endpoint(self):
+        app = Flask(__name__)
+        app.config['LOGIN_DISABLED'] = True
+        LoginManager(app)
+        app.register_blueprint(api_module.api_bp)
+        client = app.test_client()
+        
+        with app.test_request_context():
+            urls = province_geometry_urls()
+        self.assertEqual(set(urls), set(SIMPLIFY_TOLERANCES))
+        
+        response = client.get(urls['low'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/geo+json')
+        self.assertEqual(response.get_data(), get_geometry_store().geojson('low'))
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        
+        # Unversioned or stale URLs revalidate
+        unversioned = client.get('/api/dashboards/v1/geometry/provinces.geojson')
+        self.assertIn('no-cache', unversioned.headers['Cache-Control'])
+        revalidated = client.get(urls['medium'], headers={'If-None-Match': unversioned.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        
+        self.assertEqual(client.get('/api/dashboards/v1/geometry/provinces.geojson?level=huge').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()